@@ -0,0 +1,210 @@
+"""
+Measures end to end latency of the `/chat/<user_input>` endpoint. The application
+is started in its own interpreter against local stand-ins for OpenWeather and
+Currents, with its databases kept under a separate data folder so the real ones
+are left alone. The bot in that folder is trained by the first run and reused by
+later runs.
+
+A labelled mix of inputs, greetings, each weather and news intent and off topic
+input, is replayed by concurrent clients. The latency percentiles and throughput
+of each intent are printed and saved as json, together with the commit and the
+settings, so that runs can be compared.
+
+Usage:
+    python -m benchmarks.chat_latency [--requests benchmarks/chat_requests.jsonl ...] [--rounds 20] [--clients 4]
+"""
+
+from argparse import ArgumentParser
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from json import dumps, loads
+from random import Random
+from time import perf_counter
+from urllib.parse import quote
+import os
+import platform
+import subprocess
+
+import requests
+
+from benchmarks.stub_upstreams import StubConfiguration, start_application, wait_until_ready
+
+
+DEFAULT_REQUESTS : str = "benchmarks/chat_requests.jsonl"
+
+
+def load_requests(paths : list) -> list :
+    """
+    Returns the labelled inputs of json lines files. Lines without an input, e.g.
+    those of other json lines files, are skipped.
+    """
+
+    mix : list[dict] = []
+
+    for path in paths :
+
+        with open(path) as file :
+
+            for line in file :
+
+                record : dict = loads(line) if line.strip() else {}
+
+                if isinstance(record.get("input"), str) :
+                    mix.append({"intent" : record.get("intent", os.path.basename(path)), "input" : record["input"]})
+
+    return mix
+
+
+def percentile(latencies : list, fraction : float) -> float :
+    """
+    Returns a percentile of sorted latencies.
+    """
+
+    return round(latencies[min(len(latencies) - 1, int(len(latencies) * fraction))], 2)
+
+
+def replay(url : str, mix : list, rounds : int, clients : int) -> tuple :
+    """
+    Sends every input of the mix once per round, in a shuffled order shared out
+    between concurrent clients. Returns the samples and the wall time.
+    """
+
+    schedule : list[dict] = [entry for _ in range(rounds) for entry in mix]
+    Random(0).shuffle(schedule)
+
+    def client(index : int) -> list :
+
+        session : requests.Session = requests.Session()
+        samples : list[tuple] = []
+
+        for entry in schedule[index::clients] :
+
+            start : float = perf_counter()
+
+            try :
+                status : int = session.get(f"{url}/chat/{quote(entry['input'], safe='')}", timeout=60.0).status_code
+            except requests.exceptions.RequestException :
+                status = 0
+
+            samples.append((entry["intent"], (perf_counter() - start) * 1000, status))
+
+        return samples
+
+    start : float = perf_counter()
+
+    with ThreadPoolExecutor(clients) as executor :
+        samples : list[tuple] = [sample for result in executor.map(client, range(clients)) for sample in result]
+
+    return samples, perf_counter() - start
+
+
+def summarise(samples : list, duration : float) -> dict :
+    """
+    Summarises the latency and throughput of the samples of each intent and of all
+    of them.
+    """
+
+    groups : dict[str, list] = {"all" : samples}
+
+    for sample in samples :
+        groups.setdefault(sample[0], []).append(sample)
+
+    summary : dict = {}
+
+    for intent, group in groups.items() :
+
+        latencies : list[float] = sorted(sample[1] for sample in group)
+
+        summary[intent] = {
+            "requests" : len(group),
+            "errors" : sum(sample[2] != 200 for sample in group),
+            "requests_per_second" : round(len(group) / duration, 2),
+            "mean_ms" : round(sum(latencies) / len(latencies), 2),
+            "p50_ms" : percentile(latencies, 0.50),
+            "p95_ms" : percentile(latencies, 0.95),
+            "p99_ms" : percentile(latencies, 0.99)
+        }
+
+    return summary
+
+
+def commit() -> str :
+    """
+    Returns the commit being measured, or None outside of a git checkout.
+    """
+
+    try :
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError) :
+        return None
+
+
+def main() -> None :
+
+    parser : ArgumentParser = ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", nargs="+", default=[DEFAULT_REQUESTS], help="json lines files of {\"intent\", \"input\"} records")
+    parser.add_argument("--rounds", type=int, default=20, help="times each input is sent")
+    parser.add_argument("--clients", type=int, default=4)
+    parser.add_argument("--port", type=int, default=8091)
+    parser.add_argument("--data", default="SQLite/benchmark", help="folder holding the benchmark's trained bot and databases")
+    parser.add_argument("--upstream-latency", type=float, default=0.0, help="seconds added to every stub response")
+    parser.add_argument("--timeout", type=float, default=1800.0, help="seconds to wait for the bot to be trained and warmed up")
+    parser.add_argument("--output", help="where the results are saved, by default benchmarks/results/chat_latency-<time>.json")
+    arguments = parser.parse_args()
+
+    mix : list[dict] = load_requests(arguments.requests)
+
+    if not mix :
+        raise SystemExit(f"No inputs were found in {', '.join(arguments.requests)}.")
+
+    url : str = f"http://127.0.0.1:{arguments.port}"
+
+    server : subprocess.Popen = start_application(arguments.port, arguments.data, StubConfiguration(latency=arguments.upstream_latency))
+
+    try :
+
+        wait_until_ready(url, server, arguments.timeout)
+
+        # The first pass fills the weather and news tables from the stubs
+        replay(url, mix, 1, 1)
+
+        started : datetime = datetime.now(timezone.utc)
+        samples, duration = replay(url, mix, arguments.rounds, arguments.clients)
+        boot : dict = requests.get(f"{url}/readyz", timeout=5.0).json()["boot"]
+
+    finally :
+
+        server.terminate()
+        server.wait(10)
+
+    report : dict = {
+        "benchmark" : "chat_latency",
+        "time" : started.isoformat(timespec="seconds"),
+        "commit" : commit(),
+        "python" : platform.python_version(),
+        "settings" : {
+            "requests" : arguments.requests,
+            "inputs" : len(mix),
+            "rounds" : arguments.rounds,
+            "clients" : arguments.clients,
+            "upstream_latency" : arguments.upstream_latency
+        },
+        "duration_s" : round(duration, 2),
+        "boot" : boot,
+        "intents" : summarise(samples, duration)
+    }
+
+    output : str = arguments.output or os.path.join("benchmarks", "results", f"chat_latency-{started.strftime('%Y%m%dT%H%M%S')}.json")
+
+    if os.path.dirname(output) :
+        os.makedirs(os.path.dirname(output), exist_ok=True)
+
+    with open(output, "w") as file :
+        file.write(dumps(report, indent=4))
+
+    print(dumps(report["intents"], indent=4))
+    print(f"Results saved to {output}")
+
+
+if __name__ == "__main__" :
+    main()
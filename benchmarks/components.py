@@ -0,0 +1,426 @@
+"""
+Microbenchmarks of each stage a chat request or start up passes through, so that
+a slowdown can be traced to its stage:
+
+- corpus: create_corpus_from_template over every template file.
+- training: GoTravelBot.train on the generated corpus.
+- search: CustomBestMatch.process for inputs of the corpus.
+- sql: the weather and news queries behind each intent.
+- render: the response of each intent, which runs the queries and fills the templates.
+
+Each stage runs for every combination of location count and template count, the
+number of rows read from each template file. The sql and render stages run in
+process against a database filled with generated weather and news, the training
+and search stages need ChatterBot and spaCy and are skipped without them.
+
+The results are saved as json. With --compare the results are checked against a
+saved baseline, every case whose median is slower by more than the threshold is
+flagged and the script exits with status 1. Runs on a shared machine can vary by
+10% or more, compare runs from the same machine and raise the threshold if needed.
+
+Usage:
+    python -m benchmarks.components [--locations 10 100] [--templates 5 20] [--stages corpus sql render]
+    python -m benchmarks.components --compare benchmarks/results/components-baseline.json [--threshold 0.15]
+"""
+
+from argparse import ArgumentParser
+from datetime import datetime, timedelta, timezone
+from json import dumps, load
+from random import Random
+from statistics import median
+from tempfile import TemporaryDirectory
+from time import perf_counter
+from typing import Callable
+import os
+import platform
+
+import pandas as pd
+
+from benchmarks.chat_latency import commit
+from benchmarks.location_lookup import synthetic_locations
+from benchmarks.stub_upstreams import StubUpstreamServer
+
+
+STAGES : list = ["corpus", "training", "search", "sql", "render"]
+
+TEMPLATES : list = [
+    "flaskr/model/chatbot/corpus_templates/best_day_certain_location.csv",
+    "flaskr/model/chatbot/corpus_templates/best_location_near_location.csv",
+    "flaskr/model/chatbot/corpus_templates/current_day_best_location.csv",
+    "flaskr/model/chatbot/corpus_templates/current_weather_request.csv",
+    "flaskr/model/chatbot/corpus_templates/latest_news_request.csv",
+    "flaskr/model/chatbot/corpus_templates/weather_forecast_request.csv"
+]
+
+
+def location_frame(count : int) -> pd.DataFrame :
+    """
+    Returns the served locations followed by generated ones spread over England.
+    """
+
+    served : pd.DataFrame = pd.read_csv("locations.csv")
+
+    if count <= len(served) :
+        return served.head(count).reset_index(drop=True)
+
+    random : Random = Random(0)
+    generated : pd.DataFrame = synthetic_locations(count - len(served), random)
+    generated["lat"] = [round(random.uniform(50.2, 54.8), 4) for _ in range(len(generated))]
+    generated["lon"] = [round(random.uniform(-4.5, 1.5), 4) for _ in range(len(generated))]
+
+    return pd.concat([served, generated], ignore_index=True)
+
+
+def corpus_stage(context : dict, locations : int, templates : int) -> dict :
+    """
+    Generates the training corpus from every template file.
+    """
+
+    from flaskr.model.chatbot.generate_corpus import create_corpus_from_template
+
+    names : list[str] = location_frame(locations)["location"].tolist()
+
+    return {"corpus" : lambda : [create_corpus_from_template(template, names, templates) for template in TEMPLATES]}
+
+
+def trained_bot(context : dict, locations : int, templates : int) -> tuple :
+    """
+    Returns a bot trained on the corpus and the time the training took, each
+    combination is trained once and shared by the training and search stages.
+    """
+
+    key : tuple = ("bot", locations, templates)
+
+    if key not in context :
+
+        from flaskr.model.chatbot.GoTravelBot import GoTravelBot
+        from flaskr.model.chatbot.TemplateLibrary import TemplateLibrary
+        from flaskr.model.chatbot.generate_corpus import corpus_version, create_corpus_from_template
+
+        names : list[str] = location_frame(locations)["location"].tolist()
+        corpus : pd.DataFrame = pd.concat([create_corpus_from_template(template, names, templates) for template in TEMPLATES])
+
+        bot : GoTravelBot = GoTravelBot(
+            os.path.join(context["directory"], f"bot-{locations}-{templates}.db"), {}, TemplateLibrary.from_csv(TEMPLATES)
+        )
+
+        start : float = perf_counter()
+        bot.train(corpus.values.tolist(), corpus_version(corpus.values.tolist(), []))
+
+        context[key] = (bot, (perf_counter() - start) * 1000, corpus["input"].tolist())
+
+    return context[key]
+
+
+def training_stage(context : dict, locations : int, templates : int) -> dict :
+    """
+    Trains a bot on the corpus. Training writes to the bot's database, so it is
+    timed once rather than repeated.
+    """
+
+    bot, training_ms, inputs = trained_bot(context, locations, templates)
+
+    return {"training" : training_ms}
+
+
+def search_stage(context : dict, locations : int, templates : int) -> dict :
+    """
+    Finds the closest known statement and its response for inputs of the corpus.
+    """
+
+    from chatterbot.conversation import Statement
+
+    bot, training_ms, inputs = trained_bot(context, locations, templates)
+    adapter = bot.bot.logic_adapters[0]
+    tagger = bot.bot.storage.tagger
+
+    # ChatterBot versions differ in the name of the tagger's index function
+    index = getattr(tagger, "get_text_index_string", None) or getattr(tagger, "get_bigram_pair_string")
+
+    queries : list = []
+
+    for text in Random(0).sample(inputs, min(20, len(inputs))) :
+        statement = Statement(text=text)
+        statement.search_text = index(text)
+        queries.append(statement)
+
+    position : list[int] = [0]
+
+    def search() -> None :
+        position[0] += 1
+        adapter.process(queries[position[0] % len(queries)])
+
+    return {"search" : search}
+
+
+def application(context : dict, locations : int) -> object :
+    """
+    Creates the application in process for a number of locations, with a database
+    holding five days of weather and news for each of them.
+    """
+
+    key : tuple = ("app", locations)
+
+    if key not in context :
+
+        from flaskr.controller import app as module
+        from flaskr.model.data_access_layer.SQLConnector import DailyForecast, News, Weather
+
+        directory : str = os.path.join(context["directory"], f"app-{locations}")
+        os.makedirs(directory, exist_ok=True)
+
+        frame : pd.DataFrame = location_frame(locations)
+        frame.to_csv(os.path.join(directory, "locations.csv"), index=False)
+
+        with open(os.path.join(directory, "api_key.txt"), "w") as file :
+            file.write("stub-weather-key\nstub-news-key\n")
+
+        module.KEYS_FILE = os.path.join(directory, "api_key.txt")
+        module.LOCATIONS_FILE = os.path.join(directory, "locations.csv")
+        module.STORAGE_DATABASE = os.path.join(directory, "storage-database.db")
+        module.HTTP_CACHE = os.path.join(directory, "http-cache.db")
+        module.SHARED_STATE = os.path.join(directory, "shared-state.db")
+
+        app = module.create_app(False)
+
+        # The data is up to date, the stubs only answer if a refresh is attempted
+        start : datetime = datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0, tzinfo=None)
+        random : Random = Random(0)
+
+        weather : list = [
+            Weather(
+                date_time=start + timedelta(hours=3 * step), location=row.location, lat=row.lat, lon=row.lon,
+                temp=random.uniform(5, 25), min_temp=0.0, max_temp=30.0, feels_temp=random.uniform(5, 25), humidity=70.0,
+                description=random.choice(["clear sky", "light rain", "few clouds"]), wind_speed=random.uniform(0, 10),
+                rain_prob=random.random(), visibility=10000
+            )
+            for row in frame.itertuples() for step in range(40)
+        ]
+
+        module.sql_connector.bulk_save(Weather, weather)
+        module.sql_connector.bulk_save(DailyForecast, module.summarise_forecast(weather))
+
+        module.sql_connector.bulk_save(News, [
+            News(
+                location=row.location, date_time=start, url=f"https://example.com/{row.Index}", imgURL=None,
+                title=f"Local news from {row.location}", description=f"Something happened in {row.location}."
+            )
+            for row in frame.itertuples()
+        ])
+
+        context[key] = (module, app, frame["location"].tolist())
+
+    return context[key]
+
+
+def cycle(app : object, names : list, function : Callable) -> Callable :
+    """
+    Returns a case that calls a function for the next location in a request context.
+    """
+
+    position : list[int] = [0]
+
+    def case() -> None :
+
+        position[0] += 1
+
+        with app.test_request_context() :
+            function(names[position[0] % len(names)])
+
+    return case
+
+
+def sql_stage(context : dict, locations : int, templates : int) -> dict :
+    """
+    Runs the query behind each intent.
+    """
+
+    module, app, names = application(context, locations)
+
+    return {
+        "sql.current_weather" : cycle(app, names, module.get_current_weather),
+        "sql.weather_forecast" : cycle(app, names, module.get_weather_forecast),
+        "sql.best_day" : cycle(app, names, module.find_best_day),
+        "sql.best_location" : cycle(app, names, lambda name : module.find_best_location()),
+        "sql.best_nearby_location" : cycle(app, names, lambda name : module.find_best_location_near(name, module.DEFAULT_SEARCH_RADIUS_KM)),
+        "sql.latest_news" : cycle(app, names, module.get_current_news)
+    }
+
+
+def render_stage(context : dict, locations : int, templates : int) -> dict :
+    """
+    Answers each intent with its response parts, joined as the /chat endpoint does.
+    """
+
+    from flaskr.model.chatbot.TemplateLibrary import IntentResult
+
+    module, app, names = application(context, locations)
+    first : dict = {}
+
+    for template in module.template_library.templates.values() :
+        first.setdefault(template.intent, template)
+
+    def respond(intent : int) -> Callable :
+        return cycle(app, names, lambda name : "".join(module.respond(IntentResult(intent, name, first[intent], first[intent].text), name)))
+
+    return {
+        "render.current_weather" : respond(1),
+        "render.weather_forecast" : respond(2),
+        "render.best_day" : respond(3),
+        "render.best_location" : respond(4),
+        "render.best_nearby_location" : respond(6),
+        "render.latest_news" : respond(5)
+    }
+
+
+STAGE_FUNCTIONS : dict = {
+    "corpus" : corpus_stage,
+    "training" : training_stage,
+    "search" : search_stage,
+    "sql" : sql_stage,
+    "render" : render_stage
+}
+
+
+def measure(case : object, repeat : int) -> dict :
+    """
+    Times a case after a warm up call, cases that were already timed are reported
+    as they are.
+    """
+
+    if not callable(case) :
+        return {"median_ms" : round(case, 3), "min_ms" : round(case, 3), "runs" : 1}
+
+    case()
+    timings : list[float] = []
+
+    for _ in range(repeat) :
+
+        start : float = perf_counter()
+        case()
+        timings.append((perf_counter() - start) * 1000)
+
+    return {"median_ms" : round(median(timings), 3), "min_ms" : round(min(timings), 3), "runs" : repeat}
+
+
+def run(stages : list, location_counts : list, template_counts : list, repeat : int) -> tuple :
+    """
+    Runs every case of the stages for each combination of parameters. Returns the
+    results and the stages that were skipped.
+    """
+
+    results : dict = {}
+    skipped : dict = {}
+
+    with TemporaryDirectory() as directory :
+
+        context : dict = {"directory" : directory}
+
+        for locations in location_counts :
+            for templates in template_counts :
+                for stage in stages :
+
+                    if stage in skipped :
+                        continue
+
+                    try :
+                        cases : dict = STAGE_FUNCTIONS[stage](context, locations, templates)
+                    except ImportError as e :
+                        skipped[stage] = f"missing dependency: {e.name}"
+                        continue
+
+                    for name, case in cases.items() :
+                        results[f"{name}[locations={locations},templates={templates}]"] = measure(case, repeat)
+
+    return results, skipped
+
+
+def compare(results : dict, baseline : dict, threshold : float) -> list :
+    """
+    Returns the change of every case that is in both runs, flagging those that are
+    slower than the baseline by more than the threshold.
+    """
+
+    changes : list[dict] = []
+
+    for name, result in results.items() :
+
+        if name not in baseline or not baseline[name]["median_ms"] :
+            continue
+
+        ratio : float = result["median_ms"] / baseline[name]["median_ms"]
+
+        changes.append({
+            "case" : name,
+            "baseline_ms" : baseline[name]["median_ms"],
+            "median_ms" : result["median_ms"],
+            "change" : f"{(ratio - 1) * 100:+.1f}%",
+            "regression" : ratio > 1 + threshold
+        })
+
+    return changes
+
+
+def main() -> None :
+
+    parser : ArgumentParser = ArgumentParser(description=__doc__)
+    parser.add_argument("--stages", nargs="+", choices=STAGES, default=STAGES)
+    parser.add_argument("--locations", type=int, nargs="+", default=[10, 100])
+    parser.add_argument("--templates", type=int, nargs="+", default=[5, 20], help="rows read from each template file")
+    parser.add_argument("--repeat", type=int, default=20, help="timed runs of each case")
+    parser.add_argument("--compare", help="a saved result to compare against")
+    parser.add_argument("--threshold", type=float, default=0.15, help="the slowdown flagged as a regression, 0.15 for 15%%")
+    parser.add_argument("--output", help="where the results are saved, by default benchmarks/results/components-<time>.json")
+    arguments = parser.parse_args()
+
+    # Refreshes that are attempted are answered locally
+    StubUpstreamServer().start().patch_connectors()
+
+    started : datetime = datetime.now(timezone.utc)
+    results, skipped = run(arguments.stages, arguments.locations, arguments.templates, arguments.repeat)
+
+    report : dict = {
+        "benchmark" : "components",
+        "time" : started.isoformat(timespec="seconds"),
+        "commit" : commit(),
+        "python" : platform.python_version(),
+        "settings" : {
+            "stages" : arguments.stages,
+            "locations" : arguments.locations,
+            "templates" : arguments.templates,
+            "repeat" : arguments.repeat
+        },
+        "skipped" : skipped,
+        "results" : results
+    }
+
+    output : str = arguments.output or os.path.join("benchmarks", "results", f"components-{started.strftime('%Y%m%dT%H%M%S')}.json")
+
+    if os.path.dirname(output) :
+        os.makedirs(os.path.dirname(output), exist_ok=True)
+
+    with open(output, "w") as file :
+        file.write(dumps(report, indent=4))
+
+    print(dumps({"skipped" : skipped, "results" : results}, indent=4))
+    print(f"Results saved to {output}")
+
+    if arguments.compare :
+
+        with open(arguments.compare) as file :
+            baseline : dict = load(file)
+
+        changes : list[dict] = compare(results, baseline["results"], arguments.threshold)
+        regressions : list[dict] = [change for change in changes if change["regression"]]
+
+        print(f"Compared with {arguments.compare} (commit {baseline.get('commit')}):")
+
+        for change in changes :
+            print(f"{'REGRESSION' if change['regression'] else 'ok':>10}  {change['case']:<60} {change['baseline_ms']:>10.3f} ms -> {change['median_ms']:>10.3f} ms  {change['change']}")
+
+        if regressions :
+            raise SystemExit(f"{len(regressions)} of {len(changes)} cases are more than {arguments.threshold:.0%} slower than the baseline.")
+
+
+if __name__ == "__main__" :
+    main()
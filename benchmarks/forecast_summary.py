@@ -0,0 +1,130 @@
+"""
+Measures the daily forecast summaries that answer the weather forecast intent:
+the cost of building and writing them on each weather refresh, and the latency of
+a forecast request reading them against the previous forecast query, which read
+every stored row of the location and kept the noon rows in Python.
+
+Runs in process against the database of the components benchmark, filled with
+five days of generated weather for each location.
+
+Usage:
+    python -m benchmarks.forecast_summary [--locations 10 100 1000] [--repeat 20]
+"""
+
+from argparse import ArgumentParser
+from datetime import datetime, timezone
+from json import dumps
+from statistics import median
+from tempfile import TemporaryDirectory
+from time import perf_counter
+import platform
+
+from benchmarks.chat_latency import commit
+from benchmarks.components import application, cycle, measure
+from benchmarks.stub_upstreams import StubUpstreamServer
+
+
+def previous_weather_forecast(module : object, location : str) -> list :
+    """
+    The weather forecast query before this change, which filtered every stored row
+    of the location down to the noon rows.
+    """
+
+    from flaskr.model.data_access_layer.SQLConnector import Weather
+
+    module.weather_scheduler.record_demand(location)
+
+    if not module.date_check_weather() :
+        module.update_weather_data()
+
+    forecast : list = module.sql_connector.bulk_orm_query(Weather,
+                        """
+                        SELECT * FROM weather
+                        WHERE location = :location
+                        ORDER BY date_time ASC
+                        """,
+                        {
+                            "location" : location
+                        }, "weather_forecast")
+
+    for weather in forecast :
+        weather.date_time = datetime.strptime(weather.date_time, "%Y-%m-%d %H:%M:%S.000000").replace(tzinfo=timezone.utc)
+
+    return [weather for weather in forecast if weather.date_time.hour == 12]
+
+
+def build_cost(module : object, names : list, repeat : int) -> dict :
+    """
+    Times summarising the stored weather of every location and replacing their
+    summaries, as a refresh that updated every location does.
+    """
+
+    from flaskr.model.data_access_layer.SQLConnector import DailyForecast, Weather
+
+    weather_data : list = module.sql_connector.bulk_orm_query(Weather, "SELECT * FROM weather", {}, "all_weather")
+
+    # A refresh summarises the forecasts it has just parsed
+    for weather in weather_data :
+        weather.date_time = datetime.strptime(weather.date_time, "%Y-%m-%d %H:%M:%S.000000").replace(tzinfo=timezone.utc)
+
+    summarise : list[float] = []
+    write : list[float] = []
+
+    for _ in range(repeat) :
+
+        start : float = perf_counter()
+        summaries : list = module.summarise_forecast(weather_data)
+        summarise.append((perf_counter() - start) * 1000)
+
+        start = perf_counter()
+        module.sql_connector.bulk_update(DailyForecast, summaries, names)
+        write.append((perf_counter() - start) * 1000)
+
+    return {
+        "weather_rows" : len(weather_data),
+        "summaries" : len(summaries),
+        "summarise_ms" : round(median(summarise), 3),
+        "write_ms" : round(median(write), 3),
+        "per_location_ms" : round((median(summarise) + median(write)) / len(names), 4)
+    }
+
+
+def main() -> None :
+
+    parser : ArgumentParser = ArgumentParser(description=__doc__)
+    parser.add_argument("--locations", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--repeat", type=int, default=20, help="timed runs of each case")
+    arguments = parser.parse_args()
+
+    # Refreshes that are attempted are answered locally
+    StubUpstreamServer().start().patch_connectors()
+
+    results : dict = {}
+
+    with TemporaryDirectory() as directory :
+
+        context : dict = {"directory" : directory}
+
+        for locations in arguments.locations :
+
+            module, app, names = application(context, locations)
+
+            with app.test_request_context() :
+                rows : dict[str, int] = {
+                    "previous" : len(module.sql_connector.bulk_orm_query(module.Weather, "SELECT * FROM weather WHERE location = :location", {"location" : names[0]}, "weather_rows")),
+                    "summary" : len(module.get_weather_forecast(names[0]))
+                }
+
+            results[f"locations={locations}"] = {
+                "build" : build_cost(module, names, arguments.repeat),
+                "request" : {
+                    "previous" : {**measure(cycle(app, names, lambda name : previous_weather_forecast(module, name)), arguments.repeat), "rows_read" : rows["previous"]},
+                    "summary" : {**measure(cycle(app, names, module.get_weather_forecast), arguments.repeat), "rows_read" : rows["summary"]}
+                }
+            }
+
+    print(dumps({"commit" : commit(), "python" : platform.python_version(), "repeat" : arguments.repeat, "results" : results}, indent=4))
+
+
+if __name__ == "__main__" :
+    main()
@@ -0,0 +1,234 @@
+"""
+Compares the accuracy and latency of the two stage intent search, which first
+classifies an input against the centroid of each intent's statements and then
+searches that intent's statements only, with the flat search over every
+statement. Needs ChatterBot and spaCy.
+
+A bot is trained on the first --templates rows of each template file for the
+served locations. It is evaluated on two labelled sets:
+
+- held out: the remaining rows of each template file, phrasings the bot wasn't
+  trained on, labelled with the intent code of their response.
+- mix: the labelled input mix of chat_latency. Off topic inputs have no right
+  answer, they are timed but not scored.
+
+An input is answered correctly if the intent code of the response matches its
+label. The two stage search is run for each --margins value, the difference in
+similarity between the two closest intents below which every statement is
+searched, along with the proportion of inputs that fall back to it and the
+accuracy of the first stage on its own.
+
+Usage:
+    python -m benchmarks.intent_search [--templates 10] [--margins 0.0 0.02 0.05 0.1] [--repeat 5]
+"""
+
+from argparse import ArgumentParser
+from datetime import datetime, timezone
+from json import dumps
+from statistics import median
+from tempfile import TemporaryDirectory
+from time import perf_counter
+import os
+import platform
+
+import pandas as pd
+
+from benchmarks.chat_latency import DEFAULT_REQUESTS, commit, load_requests
+from benchmarks.components import TEMPLATES
+
+
+INTENT_CODES : dict = {
+    "greeting" : 0,
+    "current_weather" : 1,
+    "weather_forecast" : 2,
+    "best_day" : 3,
+    "best_location" : 4,
+    "latest_news" : 5,
+    "best_nearby_location" : 6
+}
+"""
+The intent code of each label of the input mix, other labels aren't scored.
+"""
+
+
+def held_out_inputs(names : list, templates : int) -> list :
+    """
+    Returns the inputs of the template rows the bot wasn't trained on, labelled
+    with the intent code of their response.
+    """
+
+    from flaskr.model.chatbot.TemplateLibrary import TemplateLibrary
+
+    inputs : list[tuple] = []
+
+    for template in TEMPLATES :
+
+        rows : pd.DataFrame = pd.read_csv(template, delimiter=",", names=["input", "response"], header=None, dtype=str, skiprows=templates)
+
+        for row in rows.dropna().itertuples() :
+
+            code : int = int(TemplateLibrary.CODE_PATTERN.match(row.response.strip()).group(1))
+            inputs += [(row.input.strip().replace("{location}", name), code) for name in names]
+
+    return inputs
+
+
+def evaluate(bot : object, inputs : list, repeat : int) -> dict :
+    """
+    Answers every input with the bot's current search and returns its accuracy
+    and latency.
+    """
+
+    from chatterbot.conversation import Statement
+
+    adapter = bot.bot.logic_adapters[0]
+    tagger = bot.bot.storage.tagger
+
+    # ChatterBot versions differ in the name of the tagger's index function
+    index = getattr(tagger, "get_text_index_string", None) or getattr(tagger, "get_bigram_pair_string")
+
+    timings : list[float] = []
+    correct : int = 0
+    scored : int = 0
+
+    for text, code in inputs :
+
+        statement = Statement(text=text)
+        statement.search_text = index(text)
+        runs : list[float] = []
+
+        for _ in range(repeat) :
+
+            start : float = perf_counter()
+            response = adapter.process(statement)
+            runs.append((perf_counter() - start) * 1000)
+
+        timings.append(median(runs))
+
+        if code is not None :
+            scored += 1
+            correct += bot.templates.parse(response.text).intent == code
+
+    timings.sort()
+
+    return {
+        "inputs" : len(inputs),
+        "accuracy" : round(correct / scored, 4) if scored else None,
+        "median_ms" : round(median(timings), 3),
+        "p95_ms" : round(timings[min(len(timings) - 1, int(len(timings) * 0.95))], 3)
+    }
+
+
+def classification(index : object, inputs : list) -> dict :
+    """
+    Returns the accuracy of the first stage on its own and the margin of each
+    input over the second closest intent.
+    """
+
+    margins : list[float] = []
+    correct : int = 0
+    scored : int = 0
+
+    for text, code in inputs :
+
+        result : tuple | None = index.classify(text)
+        margins.append(result[1] if result else 0.0)
+
+        if code is not None :
+            scored += 1
+            correct += result is not None and result[0] == code
+
+    return {"accuracy" : round(correct / scored, 4) if scored else None, "margins" : margins}
+
+
+def main() -> None :
+
+    parser : ArgumentParser = ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", nargs="+", default=[DEFAULT_REQUESTS], help="json lines files of {\"intent\", \"input\"} records")
+    parser.add_argument("--templates", type=int, default=10, help="rows of each template file the bot is trained on")
+    parser.add_argument("--margins", type=float, nargs="+", default=[0.0, 0.02, 0.05, 0.1])
+    parser.add_argument("--repeat", type=int, default=5, help="timed runs of each input")
+    parser.add_argument("--output", help="where the results are saved, by default benchmarks/results/intent_search-<time>.json")
+    arguments = parser.parse_args()
+
+    from flaskr.model.chatbot.GoTravelBot import GoTravelBot
+    from flaskr.model.chatbot.IntentIndex import IntentIndex
+    from flaskr.model.chatbot.TemplateLibrary import TemplateLibrary
+    from flaskr.model.chatbot.generate_corpus import corpus_version, create_corpus_from_template
+    from flaskr.model.chatbot.language_model import load_statement_vector_store
+
+    names : list[str] = pd.read_csv("locations.csv")["location"].tolist()
+
+    sets : dict[str, list] = {
+        "held_out" : held_out_inputs(names, arguments.templates),
+        "mix" : [(entry["input"], INTENT_CODES.get(entry["intent"])) for entry in load_requests(arguments.requests)]
+    }
+
+    started : datetime = datetime.now(timezone.utc)
+    results : dict = {}
+
+    with TemporaryDirectory() as directory :
+
+        corpus : pd.DataFrame = pd.concat([create_corpus_from_template(template, names, arguments.templates) for template in TEMPLATES])
+
+        bot : GoTravelBot = GoTravelBot(os.path.join(directory, "bot.db"), {}, TemplateLibrary.from_csv(TEMPLATES))
+        bot.train(corpus.values.tolist(), corpus_version(corpus.values.tolist(), []))
+
+        # Inputs must not be learnt, so that every search sees the same statements
+        bot.bot.read_only = True
+        load_statement_vector_store(os.path.join(directory, "statement-vectors.bin"), bot.statement_texts())
+
+        index : IntentIndex = bot.build_intent_index(arguments.margins[0])
+        adapters : list = bot.bot.logic_adapters
+
+        for name, inputs in sets.items() :
+
+            # The flat search is the bot's search without an intent index
+            for adapter in adapters :
+                adapter.intent_index = None
+
+            results[name] = {"flat" : evaluate(bot, inputs, arguments.repeat)}
+            stage : dict = classification(index, inputs)
+
+            for adapter in adapters :
+                adapter.intent_index = index
+
+            for margin in arguments.margins :
+
+                index.margin = margin
+
+                results[name][f"two_stage[margin={margin:g}]"] = {
+                    **evaluate(bot, inputs, arguments.repeat),
+                    "first_stage_accuracy" : stage["accuracy"],
+                    "fallback_rate" : round(sum(value < margin for value in stage["margins"]) / len(inputs), 4)
+                }
+
+    report : dict = {
+        "benchmark" : "intent_search",
+        "time" : started.isoformat(timespec="seconds"),
+        "commit" : commit(),
+        "python" : platform.python_version(),
+        "settings" : {
+            "templates" : arguments.templates,
+            "locations" : len(names),
+            "statements" : len(index),
+            "margins" : arguments.margins,
+            "repeat" : arguments.repeat
+        },
+        "results" : results
+    }
+
+    output : str = arguments.output or os.path.join("benchmarks", "results", f"intent_search-{started.strftime('%Y%m%dT%H%M%S')}.json")
+
+    if os.path.dirname(output) :
+        os.makedirs(os.path.dirname(output), exist_ok=True)
+
+    with open(output, "w") as file :
+        file.write(dumps(report, indent=4))
+
+    print(dumps(results, indent=4))
+    print(f"Results saved to {output}")
+
+
+if __name__ == "__main__" :
+    main()
@@ -0,0 +1,342 @@
+"""
+Drives concurrent chat traffic at the application to find how it behaves from
+tens to hundreds of users and where its throughput saturates. The application is
+served against the local OpenWeather and Currents stubs, whose latency, error rate
+and rate limit can be set, or an already running application is driven with --url.
+
+Two traffic models are supported:
+
+- closed: each of --users clients sends a request, waits for the response and
+  its think time, then sends the next one.
+- open: requests arrive at --rates per second regardless of how quickly they are
+  answered. Latency is measured from each request's scheduled time, so time
+  spent waiting for the client to send it is included.
+
+Each load level runs for --step-duration seconds. With --refresh-at a weather and
+news refresh is forced that many seconds into each level, as a stale data refresh
+would be, and its duration is reported. The script reports latency and errors in
+one second buckets over time, a summary of each level and the level at which the
+throughput stopped growing. The results are saved as json.
+
+Usage:
+    python -m benchmarks.load_test [--mode closed] [--users 50 100 200 500] [--step-duration 30] [--refresh-at 10]
+    python -m benchmarks.load_test --mode open --rates 20 50 100 [--latency 0.2] [--error-rate 0.05] [--rate-limit 60]
+"""
+
+from argparse import ArgumentParser
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from json import dumps
+from random import Random
+from threading import Event, Lock, Thread, local
+from time import perf_counter, sleep
+from urllib.parse import quote
+import os
+import platform
+import subprocess
+
+import requests
+
+from benchmarks.chat_latency import DEFAULT_REQUESTS, commit, load_requests, percentile
+from benchmarks.stub_upstreams import StubConfiguration, start_application, wait_until_ready
+
+
+SATURATION_GAIN : float = 0.05
+"""
+The throughput gain below which a higher load level is considered saturated.
+"""
+
+
+class Recorder :
+    """
+    Collects the outcome of every request of a run.
+    """
+
+    def __init__(self, start : float) -> None :
+        """
+        Initializer
+
+        Parameters:
+            start (float): the time the run started, from perf_counter.
+        """
+
+        self.start : float = start
+        self.lock : Lock = Lock()
+        self.samples : list[tuple] = []
+        self.refreshes : list[dict] = []
+
+
+    def record(self, level : int, scheduled : float, status : int) -> None :
+        """
+        Records a request that was scheduled at a time and has just completed.
+        """
+
+        now : float = perf_counter()
+
+        with self.lock :
+            self.samples.append((level, scheduled - self.start, (now - scheduled) * 1000, status))
+
+
+def send(session : requests.Session, url : str, text : str, timeout : float) -> int :
+    """
+    Sends a chat request, returning its status or 0 if it failed to complete.
+    """
+
+    try :
+        return session.get(f"{url}/chat/{quote(text, safe='')}", timeout=timeout).status_code
+    except requests.exceptions.RequestException :
+        return 0
+
+
+def closed_loop(url : str, inputs : list, users : int, duration : float, think_time : float, timeout : float, recorder : Recorder) -> None :
+    """
+    Runs a number of users that each wait for a response before their next request.
+    """
+
+    deadline : float = perf_counter() + duration
+
+    def user(index : int) -> None :
+
+        session : requests.Session = requests.Session()
+        random : Random = Random(index)
+
+        while perf_counter() < deadline :
+
+            scheduled : float = perf_counter()
+            recorder.record(users, scheduled, send(session, url, random.choice(inputs), timeout))
+
+            if think_time > 0 :
+                sleep(random.expovariate(1 / think_time))
+
+    threads : list[Thread] = [Thread(target=user, args=(index,), daemon=True) for index in range(users)]
+
+    for thread in threads :
+        thread.start()
+
+    for thread in threads :
+        thread.join()
+
+
+def open_loop(url : str, inputs : list, rate : int, duration : float, in_flight : int, timeout : float, recorder : Recorder) -> None :
+    """
+    Sends requests at a rate with exponentially distributed gaps, whether or not
+    earlier requests have been answered.
+    """
+
+    random : Random = Random(rate)
+    threads : local = local()
+
+    def request(scheduled : float, text : str) -> None :
+
+        # Each sending thread keeps its own connection
+        if not hasattr(threads, "session") :
+            threads.session = requests.Session()
+
+        recorder.record(rate, scheduled, send(threads.session, url, text, timeout))
+
+    start : float = perf_counter()
+    scheduled : float = start
+
+    with ThreadPoolExecutor(in_flight) as executor :
+
+        while scheduled < start + duration :
+
+            scheduled += random.expovariate(rate)
+            delay : float = scheduled - perf_counter()
+
+            if delay > 0 :
+                sleep(delay)
+
+            executor.submit(request, scheduled, random.choice(inputs))
+
+
+def force_refresh(url : str, at : float, level : int, stop : Event, recorder : Recorder) -> None :
+    """
+    Forces a weather and news refresh some seconds into a load level.
+    """
+
+    if stop.wait(at) :
+        return
+
+    start : float = perf_counter()
+
+    try :
+        status : int = requests.post(f"{url}/data/update", timeout=600.0).status_code
+    except requests.exceptions.RequestException :
+        status = 0
+
+    with recorder.lock :
+
+        recorder.refreshes.append({
+            "level" : level,
+            "at_s" : round(start - recorder.start, 2),
+            "duration_ms" : round((perf_counter() - start) * 1000, 2),
+            "status" : status
+        })
+
+
+def summarise(samples : list) -> dict :
+    """
+    Summarises the latency and errors of a set of samples.
+    """
+
+    latencies : list[float] = sorted(sample[2] for sample in samples)
+
+    return {
+        "requests" : len(samples),
+        "errors" : sum(sample[3] != 200 for sample in samples),
+        "p50_ms" : percentile(latencies, 0.50) if latencies else None,
+        "p95_ms" : percentile(latencies, 0.95) if latencies else None,
+        "p99_ms" : percentile(latencies, 0.99) if latencies else None
+    }
+
+
+def timeline(samples : list) -> list :
+    """
+    Groups the samples into one second buckets by the time they were scheduled.
+    """
+
+    buckets : dict[int, list] = {}
+
+    for sample in samples :
+        buckets.setdefault(int(sample[1]), []).append(sample)
+
+    return [{"t_s" : second, "level" : buckets[second][0][0], **summarise(buckets[second])} for second in sorted(buckets)]
+
+
+def saturation(levels : list) -> dict :
+    """
+    Returns the highest throughput reached and the first level after which more
+    load gained less than SATURATION_GAIN of throughput.
+    """
+
+    peak : dict = max(levels, key=lambda level : level["throughput_rps"])
+    saturated_at : int = None
+
+    for previous, current in zip(levels, levels[1:]) :
+
+        if current["throughput_rps"] < previous["throughput_rps"] * (1 + SATURATION_GAIN) :
+            saturated_at = previous["level"]
+            break
+
+    return {"peak_throughput_rps" : peak["throughput_rps"], "peak_level" : peak["level"], "saturated_at" : saturated_at}
+
+
+def main() -> None :
+
+    parser : ArgumentParser = ArgumentParser(description=__doc__)
+    parser.add_argument("--mode", choices=["closed", "open"], default="closed")
+    parser.add_argument("--users", type=int, nargs="+", default=[50, 100, 200, 500], help="concurrent users of each closed loop level")
+    parser.add_argument("--rates", type=int, nargs="+", default=[20, 50, 100, 200], help="requests per second of each open loop level")
+    parser.add_argument("--step-duration", type=float, default=30.0, help="seconds each level runs for")
+    parser.add_argument("--think-time", type=float, default=0.0, help="mean seconds a closed loop user waits between requests")
+    parser.add_argument("--in-flight", type=int, default=1000, help="the most open loop requests outstanding at once")
+    parser.add_argument("--refresh-at", type=float, help="seconds into each level at which a data refresh is forced")
+    parser.add_argument("--request-timeout", type=float, default=30.0)
+    parser.add_argument("--requests", nargs="+", default=[DEFAULT_REQUESTS], help="json lines files of {\"intent\", \"input\"} records")
+    parser.add_argument("--url", help="drive an application that is already running rather than starting one")
+    parser.add_argument("--port", type=int, default=8091)
+    parser.add_argument("--workers", type=int, default=1, help="pre-fork workers of the application")
+    parser.add_argument("--data", default="SQLite/benchmark", help="folder holding the benchmark's trained bot and databases")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every stub response")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="probability of a stub responding with a 503")
+    parser.add_argument("--rate-limit", type=int, default=0, help="stub requests allowed per minute, 0 for no limit")
+    parser.add_argument("--timeout", type=float, default=1800.0, help="seconds to wait for the bot to be trained and warmed up")
+    parser.add_argument("--output", help="where the results are saved, by default benchmarks/results/load_test-<time>.json")
+    arguments = parser.parse_args()
+
+    inputs : list[str] = [entry["input"] for entry in load_requests(arguments.requests)]
+
+    if not inputs :
+        raise SystemExit(f"No inputs were found in {', '.join(arguments.requests)}.")
+
+    configuration : StubConfiguration = StubConfiguration(arguments.latency, arguments.error_rate, arguments.rate_limit)
+    url : str = arguments.url or f"http://127.0.0.1:{arguments.port}"
+    server : subprocess.Popen = None
+
+    if not arguments.url :
+        server = start_application(arguments.port, arguments.data, configuration, arguments.workers)
+
+    levels : list[int] = arguments.users if arguments.mode == "closed" else arguments.rates
+    started : datetime = datetime.now(timezone.utc)
+
+    try :
+
+        if server :
+            wait_until_ready(url, server, arguments.timeout)
+
+        recorder : Recorder = Recorder(perf_counter())
+        summaries : list[dict] = []
+
+        for level in levels :
+
+            stop : Event = Event()
+            refresh : Thread = None
+
+            if arguments.refresh_at is not None :
+                refresh = Thread(target=force_refresh, args=(url, arguments.refresh_at, level, stop, recorder), daemon=True)
+                refresh.start()
+
+            level_start : float = perf_counter()
+
+            if arguments.mode == "closed" :
+                closed_loop(url, inputs, level, arguments.step_duration, arguments.think_time, arguments.request_timeout, recorder)
+            else :
+                open_loop(url, inputs, level, arguments.step_duration, arguments.in_flight, arguments.request_timeout, recorder)
+
+            elapsed : float = perf_counter() - level_start
+            stop.set()
+
+            if refresh :
+                refresh.join()
+
+            samples : list[tuple] = [sample for sample in recorder.samples if sample[0] == level]
+            summary : dict = {"level" : level, **summarise(samples)}
+
+            summary["throughput_rps"] = round((summary["requests"] - summary["errors"]) / elapsed, 2)
+            summary["error_rate"] = round(summary["errors"] / summary["requests"], 4) if summary["requests"] else 0.0
+            summaries.append(summary)
+
+            print(dumps(summary))
+
+    finally :
+
+        if server :
+            server.terminate()
+            server.wait(10)
+
+    report : dict = {
+        "benchmark" : "load_test",
+        "time" : started.isoformat(timespec="seconds"),
+        "commit" : commit(),
+        "python" : platform.python_version(),
+        "settings" : {
+            "mode" : arguments.mode,
+            "levels" : levels,
+            "step_duration" : arguments.step_duration,
+            "think_time" : arguments.think_time,
+            "refresh_at" : arguments.refresh_at,
+            "workers" : arguments.workers,
+            "url" : arguments.url,
+            "stub" : vars(configuration)
+        },
+        "levels" : summaries,
+        "saturation" : saturation(summaries),
+        "refreshes" : recorder.refreshes,
+        "timeline" : timeline(recorder.samples)
+    }
+
+    output : str = arguments.output or os.path.join("benchmarks", "results", f"load_test-{started.strftime('%Y%m%dT%H%M%S')}.json")
+
+    if os.path.dirname(output) :
+        os.makedirs(os.path.dirname(output), exist_ok=True)
+
+    with open(output, "w") as file :
+        file.write(dumps(report, indent=4))
+
+    print(dumps({"saturation" : report["saturation"], "refreshes" : report["refreshes"]}, indent=4))
+    print(f"Results saved to {output}")
+
+
+if __name__ == "__main__" :
+    main()
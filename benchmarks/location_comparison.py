@@ -0,0 +1,110 @@
+"""
+Measures the location comparison intents, e.g. "Is it warmer in Oxford or
+Cambridge?", as the number of locations compared grows. The current weather and
+forecast of every location are fetched with a single batched query, which is
+timed against one query per location as the single location intents make. The
+whole comparison response is timed as well, and the batched results are checked
+against the per location ones.
+
+Runs in process against the database of the components benchmark, filled with
+five days of generated weather for each location.
+
+Usage:
+    python -m benchmarks.location_comparison [--counts 2 5 10 20] [--repeat 20]
+"""
+
+from argparse import ArgumentParser
+from json import dumps
+from tempfile import TemporaryDirectory
+from typing import Callable
+import platform
+
+from benchmarks.chat_latency import commit
+from benchmarks.components import application, measure
+from benchmarks.stub_upstreams import StubUpstreamServer
+
+
+def case(app : object, function : Callable) -> Callable :
+    """
+    Returns a case that calls a function in a request context.
+    """
+
+    def run() -> None :
+
+        with app.test_request_context() :
+            function()
+
+    return run
+
+
+def check(app : object, module : object, names : list) -> bool :
+    """
+    Returns whether the batched queries return the same weather as one query per
+    location.
+    """
+
+    with app.test_request_context() :
+
+        current : dict = {weather.location : (weather.date_time, weather.temp) for weather in module.get_current_weather_batch(names)}
+        forecast : dict = {(summary.location, summary.date) : summary.temp for summary in module.get_weather_forecast_batch(names)}
+
+        for name in names :
+
+            weather = module.get_current_weather(name)
+
+            if current.get(name) != ((weather.date_time, weather.temp) if weather else None) :
+                return False
+
+            for summary in module.get_weather_forecast(name) :
+
+                if forecast.get((name, summary.date)) != summary.temp :
+                    return False
+
+    return True
+
+
+def main() -> None :
+
+    parser : ArgumentParser = ArgumentParser(description=__doc__)
+    parser.add_argument("--counts", type=int, nargs="+", default=[2, 5, 10, 20], help="locations compared")
+    parser.add_argument("--repeat", type=int, default=20, help="timed runs of each case")
+    arguments = parser.parse_args()
+
+    # Refreshes that are attempted are answered locally
+    StubUpstreamServer().start().patch_connectors()
+
+    from flaskr.model.chatbot.TemplateLibrary import IntentResult
+
+    results : dict = {}
+
+    with TemporaryDirectory() as directory :
+
+        module, app, served = application({"directory" : directory}, max(arguments.counts))
+        module.MAX_COMPARED_LOCATIONS = max(arguments.counts)
+
+        for count in arguments.counts :
+
+            names : list[str] = served[:count]
+            user_input : str = f"Compare the weather in {', '.join(names[:-1])} and {names[-1]}"
+            current : object = module.template_library.for_intent(7)
+            forecast : object = module.template_library.for_intent(8)
+
+            results[f"locations={count}"] = {
+                "matches" : check(app, module, names),
+                "current_weather" : {
+                    "per_location" : measure(case(app, lambda : [module.get_current_weather(name) for name in names]), arguments.repeat),
+                    "batched" : measure(case(app, lambda : module.get_current_weather_batch(names)), arguments.repeat),
+                    "response" : measure(case(app, lambda : "".join(module.respond(IntentResult(7, None, current, current.text), user_input))), arguments.repeat)
+                },
+                "weather_forecast" : {
+                    "per_location" : measure(case(app, lambda : [module.get_weather_forecast(name) for name in names]), arguments.repeat),
+                    "batched" : measure(case(app, lambda : module.get_weather_forecast_batch(names)), arguments.repeat),
+                    "response" : measure(case(app, lambda : "".join(module.respond(IntentResult(8, None, forecast, forecast.text), user_input))), arguments.repeat)
+                }
+            }
+
+    print(dumps({"commit" : commit(), "python" : platform.python_version(), "repeat" : arguments.repeat, "results" : results}, indent=4))
+
+
+if __name__ == "__main__" :
+    main()
@@ -0,0 +1,95 @@
+"""
+Measures the cost of finding location mentions in user input with the
+LocationRegistry's Aho-Corasick automaton against scanning for every name with a
+regular expression, as the number of locations grows.
+
+Usage:
+    python -m benchmarks.location_lookup [--sizes 1000 10000 100000] [--queries 200]
+"""
+
+from argparse import ArgumentParser
+from json import dumps
+from random import Random
+from time import perf_counter
+import re
+
+import pandas as pd
+
+from flaskr.model.data_access_layer.LocationRegistry import LocationRegistry
+
+
+SYLLABLES : list = ["ash", "bur", "ton", "ley", "wick", "ham", "ford", "by", "mere", "dale", "chester", "well", "stow", "field", "brook"]
+QUERIES : list = [
+    "What is the weather like in {0} right now?",
+    "Is it warmer in {0} or {1}?",
+    "When would you recommend visiting {0}?",
+    "Hello there, how are you today?"
+]
+
+
+def synthetic_locations(count : int, random : Random) -> pd.DataFrame :
+    """
+    Generates unique, pronounceable location names with one or two words.
+    """
+
+    names : list[str] = []
+
+    for index in range(count) :
+
+        word : str = "".join(random.choice(SYLLABLES) for _ in range(random.randint(2, 3))).capitalize()
+        suffix : str = random.choice(["", "", " Bay", " Castle", " on Sea"])
+        names.append(f"{word}{index}{suffix}")
+
+    return pd.DataFrame({"location" : names, "lat" : [51.5] * count, "lon" : [-1.0] * count})
+
+
+def main() -> None :
+
+    parser : ArgumentParser = ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--naive-limit", type=int, default=10000, help="largest size the regex scan is run for")
+    arguments = parser.parse_args()
+
+    random : Random = Random(0)
+    results : list[dict] = []
+
+    for size in arguments.sizes :
+
+        data : pd.DataFrame = synthetic_locations(size, random)
+        names : list[str] = data["location"].tolist()
+        queries : list[str] = [random.choice(QUERIES).format(random.choice(names), random.choice(names)) for _ in range(arguments.queries)]
+
+        start : float = perf_counter()
+        registry : LocationRegistry = LocationRegistry(data)
+        build_ms : float = (perf_counter() - start) * 1000
+
+        start = perf_counter()
+
+        for query in queries :
+            registry.find_all(query)
+
+        result : dict = {
+            "locations" : size,
+            "build_ms" : round(build_ms, 2),
+            "automaton_us_per_query" : round((perf_counter() - start) * 1e6 / len(queries), 2)
+        }
+
+        # The regex scan is linear in the number of locations so it is limited
+        if size <= arguments.naive_limit :
+
+            patterns : list[re.Pattern] = [re.compile(rf"\b{re.escape(name.lower())}\b") for name in names]
+            start = perf_counter()
+
+            for query in queries :
+                [pattern for pattern in patterns if pattern.search(query.lower())]
+
+            result["regex_scan_us_per_query"] = round((perf_counter() - start) * 1e6 / len(queries), 2)
+
+        results.append(result)
+
+    print(dumps(results, indent=4))
+
+
+if __name__ == "__main__" :
+    main()
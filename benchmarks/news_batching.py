@@ -0,0 +1,82 @@
+"""
+Compares the number of upstream Currents calls made by a news refresh when each
+location is queried separately against batched requests that query several
+locations at once. Requests are made against a local stub, --unnamed sets the
+proportion of locations whose articles don't name them, which are requested again
+on their own.
+
+Usage:
+    python -m benchmarks.news_batching [--locations 50] [--batch-sizes 1 5 10] [--unnamed 0.1]
+"""
+
+from argparse import ArgumentParser
+from json import dumps
+from tempfile import TemporaryDirectory
+from time import perf_counter
+import os
+
+import pandas as pd
+
+from benchmarks.stub_upstreams import StubConfiguration, StubUpstreamServer
+from flaskr.model.data_access_layer.CurrentNewsConnector import CurrentNewsConnector
+from flaskr.model.data_access_layer.HTTPResponseCache import HTTPResponseCache
+
+
+def load_locations(count : int) -> list :
+    """
+    Returns the names in locations.csv, padded with synthetic names up to count.
+    """
+
+    names : list[str] = pd.read_csv("locations.csv")["location"].tolist()
+
+    return (names + [f"Town {index}" for index in range(max(0, count - len(names)))])[:count]
+
+
+def main() -> None :
+
+    parser : ArgumentParser = ArgumentParser(description=__doc__)
+    parser.add_argument("--locations", type=int, default=50)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 5, 10])
+    parser.add_argument("--unnamed", type=float, default=0.0)
+    arguments = parser.parse_args()
+
+    locations : list[str] = load_locations(arguments.locations)
+    results : list[dict] = []
+
+    unnamed : tuple = tuple(locations[:round(arguments.unnamed * len(locations))])
+    stub : StubUpstreamServer = StubUpstreamServer(StubConfiguration(unnamed=unnamed)).start()
+    stub.patch_connectors()
+
+    for batch_size in arguments.batch_sizes :
+
+        # A new cache is used for each run so that every request reaches the stub
+        with TemporaryDirectory() as directory :
+
+            connector : CurrentNewsConnector = CurrentNewsConnector("stub", HTTPResponseCache(os.path.join(directory, "cache.db")))
+            connector.batch_size = batch_size
+
+            before : int = stub.requests[StubUpstreamServer.NEWS_PATH]
+            start : float = perf_counter()
+
+            articles : list = connector.bulk_news_request(locations)
+
+            results.append({
+                "batch_size" : batch_size,
+                "locations" : len(locations),
+                "upstream_calls" : stub.requests[StubUpstreamServer.NEWS_PATH] - before,
+                "locations_with_news" : len([article for article in articles if article]),
+                "duration_ms" : round((perf_counter() - start) * 1000, 2)
+            })
+
+    stub.stop()
+
+    baseline : int = len(locations)
+
+    for result in results :
+        result["calls_saved_vs_per_location"] = baseline - result["upstream_calls"]
+
+    print(dumps(results, indent=4))
+
+
+if __name__ == "__main__" :
+    main()
@@ -0,0 +1,116 @@
+"""
+Measures the latency of weather refreshes while OpenWeather is failing, with and
+without a circuit breaker in front of the connector. The outage is simulated by a
+local stub that either hangs past the request timeout or responds with errors.
+
+Usage:
+    python -m benchmarks.outage_latency [--mode hang|error] [--attempts 20]
+"""
+
+from argparse import ArgumentParser
+from json import dumps
+from tempfile import TemporaryDirectory
+from time import perf_counter
+import os
+
+from benchmarks.stub_upstreams import StubConfiguration, StubUpstreamServer
+from flaskr.model.data_access_layer.HTTPResponseCache import HTTPResponseCache
+from flaskr.model.data_access_layer.OpenWeatherConnector import OpenWeatherConnector
+from flaskr.model.exceptions.OpenWeatherRequestException import OpenWeatherRequestException
+from flaskr.model.utils.circuit_breaker_utils import CircuitBreaker
+
+
+LOCATIONS : list = [
+    ["Cumbria", 54.4609, -3.0886],
+    ["Oxford", 51.7520, -1.2577],
+    ["Cambridge", 52.2053, 0.1218],
+    ["Norwich", 52.6309, 1.2974]
+]
+
+
+def refresh(connector : OpenWeatherConnector, breaker : CircuitBreaker) -> str :
+    """
+    Performs a single refresh in the same manner as the application, returning
+    whether fresh or stale data would be served.
+    """
+
+    if breaker and not breaker.allow_request() :
+        return "stale"
+
+    try :
+
+        connector.bulk_weather_request(LOCATIONS)
+
+    except OpenWeatherRequestException :
+
+        if breaker :
+            breaker.record_failure()
+
+        return "stale"
+
+    if breaker :
+        breaker.record_success()
+
+    return "fresh"
+
+
+def measure(connector : OpenWeatherConnector, breaker : CircuitBreaker, attempts : int) -> dict :
+    """
+    Runs a number of refreshes and summarises their latency in milliseconds.
+    """
+
+    latencies : list[float] = []
+
+    for attempt in range(attempts) :
+
+        start : float = perf_counter()
+        refresh(connector, breaker)
+        latencies.append((perf_counter() - start) * 1000)
+
+    latencies.sort()
+
+    return {
+        "attempts" : attempts,
+        "p50_ms" : round(latencies[len(latencies) // 2], 2),
+        "p95_ms" : round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))], 2),
+        "max_ms" : round(latencies[-1], 2),
+        "total_s" : round(sum(latencies) / 1000, 2)
+    }
+
+
+def main() -> None :
+
+    parser : ArgumentParser = ArgumentParser(description=__doc__)
+    parser.add_argument("--mode", choices=["hang", "error"], default="hang")
+    parser.add_argument("--attempts", type=int, default=20)
+    parser.add_argument("--timeout", type=float, default=0.5, help="per request timeout in seconds")
+    arguments = parser.parse_args()
+
+    configuration : StubConfiguration = StubConfiguration(
+        latency=arguments.timeout * 2 if arguments.mode == "hang" else 0.0,
+        error_rate=1.0 if arguments.mode == "error" else 0.0
+    )
+
+    stub : StubUpstreamServer = StubUpstreamServer(configuration).start()
+    stub.patch_connectors()
+
+    OpenWeatherConnector.REQUEST_TIMEOUT = arguments.timeout
+    OpenWeatherConnector.BULK_TIMEOUT = arguments.timeout * 2
+
+    results : dict = {}
+
+    with TemporaryDirectory() as directory :
+
+        cache : HTTPResponseCache = HTTPResponseCache(os.path.join(directory, "cache.db"))
+        connector : OpenWeatherConnector = OpenWeatherConnector("stub", cache, OpenWeatherConnector.GRID_CELL_SIZE)
+
+        results["without_breaker"] = measure(connector, None, arguments.attempts)
+        results["with_breaker"] = measure(connector, CircuitBreaker("OpenWeather", 3, 60.0), arguments.attempts)
+
+    stub.stop()
+
+    print(dumps({"mode" : arguments.mode, "results" : results}, indent=4))
+
+
+if __name__ == "__main__" :
+    main()
@@ -0,0 +1,167 @@
+"""
+Measures chat throughput and memory as pre-fork workers are added. For each worker
+count the application is started with `python -m flaskr.controller.app --workers N`,
+warmed up, and driven by concurrent clients. Memory is reported as the total
+resident set size of the master and workers, which counts shared pages once per
+process, and as the total proportional set size, which divides shared pages
+between the processes that share them (Linux only).
+
+Usage:
+    python -m benchmarks.prefork_scaling [--workers 1 2 4] [--clients 8] [--duration 10]
+"""
+
+from argparse import ArgumentParser
+from concurrent.futures import ThreadPoolExecutor
+from json import dumps
+from time import perf_counter, sleep
+from urllib.parse import quote
+import os
+import subprocess
+import sys
+
+import requests
+
+
+QUERIES : list = [
+    "Hello",
+    "Hi",
+    "How are you?",
+    "Good morning",
+    "What is your name?"
+]
+
+
+def process_tree(pid : int) -> list :
+    """
+    Returns a process id and the ids of its children.
+    """
+
+    children : list[int] = []
+
+    for entry in os.listdir("/proc") :
+
+        if not entry.isdigit() :
+            continue
+
+        try :
+            with open(f"/proc/{entry}/stat") as file :
+                fields : list[str] = file.read().rsplit(")", 1)[1].split()
+        except OSError :
+            continue
+
+        if int(fields[1]) == pid :
+            children.append(int(entry))
+
+    return [pid] + children
+
+
+def memory_kb(pid : int, field : str) -> int :
+    """
+    Returns a memory field of a process from /proc, in kilobytes.
+    """
+
+    path : str = f"/proc/{pid}/smaps_rollup" if field == "Pss" else f"/proc/{pid}/status"
+
+    try :
+
+        with open(path) as file :
+            for line in file :
+                if line.startswith(f"{field}:") :
+                    return int(line.split()[1])
+
+    except OSError :
+        pass
+
+    return 0
+
+
+def wait_until_ready(url : str, timeout : float) -> None :
+    """
+    Polls the readiness endpoint until the chatbot has warmed up.
+    """
+
+    deadline : float = perf_counter() + timeout
+
+    while perf_counter() < deadline :
+
+        try :
+            if requests.get(f"{url}/readyz", timeout=1.0).status_code == 200 :
+                return
+        except requests.exceptions.RequestException :
+            pass
+
+        sleep(0.5)
+
+    raise TimeoutError(f"The application at {url} was not ready within {timeout} seconds.")
+
+
+def drive(url : str, clients : int, duration : float) -> dict :
+    """
+    Sends chat requests from concurrent clients for a duration.
+    """
+
+    def client(index : int) -> list :
+
+        session : requests.Session = requests.Session()
+        latencies : list[float] = []
+        deadline : float = perf_counter() + duration
+
+        while perf_counter() < deadline :
+
+            start : float = perf_counter()
+            session.get(f"{url}/chat/{quote(QUERIES[len(latencies) % len(QUERIES)])}", timeout=30.0)
+            latencies.append((perf_counter() - start) * 1000)
+
+        return latencies
+
+    with ThreadPoolExecutor(clients) as executor :
+        latencies : list[float] = sorted(latency for result in executor.map(client, range(clients)) for latency in result)
+
+    return {
+        "requests_per_second" : round(len(latencies) / duration, 1),
+        "p50_ms" : round(latencies[len(latencies) // 2], 2),
+        "p95_ms" : round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))], 2)
+    }
+
+
+def main() -> None :
+
+    parser : ArgumentParser = ArgumentParser(description=__doc__)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--clients", type=int, default=8)
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds of load per worker count")
+    parser.add_argument("--port", type=int, default=8090)
+    parser.add_argument("--timeout", type=float, default=600.0, help="seconds to wait for the warm up")
+    arguments = parser.parse_args()
+
+    url : str = f"http://localhost:{arguments.port}"
+    results : list[dict] = []
+
+    for workers in arguments.workers :
+
+        server : subprocess.Popen = subprocess.Popen(
+            [sys.executable, "-m", "flaskr.controller.app", "--port", str(arguments.port), "--workers", str(workers)],
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+
+        try :
+
+            wait_until_ready(url, arguments.timeout)
+
+            result : dict = {"workers" : workers, **drive(url, arguments.clients, arguments.duration)}
+            pids : list[int] = process_tree(server.pid)
+
+            result["rss_mb"] = round(sum(memory_kb(pid, "VmRSS") for pid in pids) / 1024, 1)
+            result["pss_mb"] = round(sum(memory_kb(pid, "Pss") for pid in pids) / 1024, 1)
+            results.append(result)
+
+        finally :
+
+            server.terminate()
+            server.wait(10)
+
+    print(dumps(results, indent=4))
+
+
+if __name__ == "__main__" :
+    main()
@@ -0,0 +1,213 @@
+"""
+Measures the per message cost of chatting over the `/chat/ws` WebSocket session
+against sending each message as its own HTTP request. The application is started
+as it is by chat_latency, against local stand-ins for OpenWeather and Currents.
+
+Two conversations are replayed:
+
+- overhead: the greetings of the input mix, whose responses need no data, so
+  that the time measured is mostly that of the transport and the chat bot.
+- follow ups: a question about a location followed by "and tomorrow?", "and the
+  news?" and "what about <another location>?". Over HTTP each follow up must be
+  asked in full and searched, the session answers it from its context.
+
+Each conversation is sent over HTTP with a kept alive connection, over HTTP with
+a new connection per message, and over one WebSocket session. The latency
+percentiles of each are printed and saved as json.
+
+Usage:
+    python -m benchmarks.session_latency [--requests benchmarks/chat_requests.jsonl ...] [--rounds 20]
+"""
+
+from argparse import ArgumentParser
+from datetime import datetime, timezone
+from json import dumps, loads
+from time import perf_counter
+from typing import Callable
+from urllib.parse import quote
+import os
+import platform
+import subprocess
+
+import requests
+from simple_websocket import Client
+
+from benchmarks.chat_latency import DEFAULT_REQUESTS, commit, load_requests, percentile
+from benchmarks.stub_upstreams import StubConfiguration, start_application, wait_until_ready
+
+
+FOLLOW_UPS : list = [
+    ("What is the weather like in {first} today?", "What is the weather like in {first} today?"),
+    ("And tomorrow?", "What is the weather forecast for {first}?"),
+    ("And the news?", "Has anything happened recently in {first}?"),
+    ("What about {second}?", "What is the weather forecast for {second}?")
+]
+"""
+Each message of the follow ups conversation, as sent to the session and as it
+must be asked over HTTP.
+"""
+
+
+def http_client(url : str, keep_alive : bool) -> Callable :
+    """
+    Returns a function that sends a message as a /chat request and waits for the
+    response.
+    """
+
+    session : requests.Session = requests.Session()
+
+    def send(message : str) -> bool :
+
+        headers : dict = {} if keep_alive else {"Connection" : "close"}
+
+        return session.get(f"{url}/chat/{quote(message, safe='')}", headers=headers, timeout=60.0).status_code == 200
+
+    return send
+
+
+def socket_client(url : str) -> tuple :
+    """
+    Returns a function that sends a message over a WebSocket session and waits
+    for its whole response, and the session's connection.
+    """
+
+    ws : Client = Client.connect(url.replace("http://", "ws://") + "/chat/ws")
+
+    def send(message : str) -> bool :
+
+        ws.send(message)
+
+        while True :
+
+            event : dict = loads(ws.receive(timeout=60.0))
+
+            if event["event"] in ["message", "error"] :
+                return event["event"] == "message"
+
+    return send, ws
+
+
+def replay(send : Callable, conversation : list, rounds : int) -> list :
+    """
+    Sends the conversation once per round and returns the latency of each message
+    and whether it succeeded.
+    """
+
+    samples : list[tuple] = []
+
+    for _ in range(rounds) :
+
+        for message in conversation :
+
+            start : float = perf_counter()
+
+            try :
+                succeeded : bool = send(message)
+            except Exception :
+                succeeded = False
+
+            samples.append(((perf_counter() - start) * 1000, succeeded))
+
+    return samples
+
+
+def summarise(samples : list) -> dict :
+    """
+    Summarises the latency of the samples.
+    """
+
+    latencies : list[float] = sorted(sample[0] for sample in samples)
+
+    return {
+        "messages" : len(samples),
+        "errors" : sum(not sample[1] for sample in samples),
+        "mean_ms" : round(sum(latencies) / len(latencies), 2),
+        "p50_ms" : percentile(latencies, 0.50),
+        "p95_ms" : percentile(latencies, 0.95),
+        "p99_ms" : percentile(latencies, 0.99)
+    }
+
+
+def main() -> None :
+
+    parser : ArgumentParser = ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", nargs="+", default=[DEFAULT_REQUESTS], help="json lines files of {\"intent\", \"input\"} records")
+    parser.add_argument("--rounds", type=int, default=20, help="times each conversation is sent over each transport")
+    parser.add_argument("--locations", nargs=2, default=["Oxford", "Cambridge"], help="the locations asked about by the follow ups")
+    parser.add_argument("--port", type=int, default=8091)
+    parser.add_argument("--data", default="SQLite/benchmark", help="folder holding the benchmark's trained bot and databases")
+    parser.add_argument("--timeout", type=float, default=1800.0, help="seconds to wait for the bot to be trained and warmed up")
+    parser.add_argument("--output", help="where the results are saved, by default benchmarks/results/session_latency-<time>.json")
+    arguments = parser.parse_args()
+
+    greetings : list[str] = [entry["input"] for entry in load_requests(arguments.requests) if entry["intent"] == "greeting"]
+
+    if not greetings :
+        raise SystemExit(f"No greetings were found in {', '.join(arguments.requests)}.")
+
+    first, second = arguments.locations
+    session_follow_ups : list[str] = [message.format(first=first, second=second) for message, _ in FOLLOW_UPS]
+    http_follow_ups : list[str] = [message.format(first=first, second=second) for _, message in FOLLOW_UPS]
+
+    url : str = f"http://127.0.0.1:{arguments.port}"
+
+    server : subprocess.Popen = start_application(arguments.port, arguments.data, StubConfiguration())
+    results : dict = {}
+
+    try :
+
+        wait_until_ready(url, server, arguments.timeout)
+
+        # The first pass fills the weather and news tables from the stubs
+        replay(http_client(url, True), http_follow_ups, 1)
+
+        started : datetime = datetime.now(timezone.utc)
+
+        for conversation, messages in [("overhead", (greetings, greetings)), ("follow_ups", (http_follow_ups, session_follow_ups))] :
+
+            send, ws = socket_client(url)
+
+            try :
+
+                results[conversation] = {
+                    "http_keep_alive" : summarise(replay(http_client(url, True), messages[0], arguments.rounds)),
+                    "http_new_connection" : summarise(replay(http_client(url, False), messages[0], arguments.rounds)),
+                    "websocket_session" : summarise(replay(send, messages[1], arguments.rounds))
+                }
+
+            finally :
+                ws.close()
+
+    finally :
+
+        server.terminate()
+        server.wait(10)
+
+    report : dict = {
+        "benchmark" : "session_latency",
+        "time" : started.isoformat(timespec="seconds"),
+        "commit" : commit(),
+        "python" : platform.python_version(),
+        "settings" : {
+            "requests" : arguments.requests,
+            "greetings" : len(greetings),
+            "rounds" : arguments.rounds,
+            "locations" : arguments.locations
+        },
+        "conversations" : results
+    }
+
+    output : str = arguments.output or os.path.join("benchmarks", "results", f"session_latency-{started.strftime('%Y%m%dT%H%M%S')}.json")
+
+    if os.path.dirname(output) :
+        os.makedirs(os.path.dirname(output), exist_ok=True)
+
+    with open(output, "w") as file :
+        file.write(dumps(report, indent=4))
+
+    print(dumps(report["conversations"], indent=4))
+    print(f"Results saved to {output}")
+
+
+if __name__ == "__main__" :
+    main()
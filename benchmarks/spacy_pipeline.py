@@ -0,0 +1,172 @@
+"""
+Compares ChatterBot's PosLemmaTagger and SpacySimilarity, which run the full spaCy
+pipeline, against the slimmed replacements used by GoTravelBot. Each variant runs
+in its own interpreter over the template corpus and reports its per query latency
+and peak resident memory. The script fails if the variants produce different index
+strings or best matches.
+
+Usage:
+    python -m benchmarks.spacy_pipeline [--queries 200] [--candidates 50]
+"""
+
+from argparse import SUPPRESS, ArgumentParser
+from json import dumps, loads
+from random import Random
+from time import perf_counter
+import subprocess
+import sys
+
+import pandas as pd
+
+
+TEMPLATES : list = [
+    "flaskr/model/chatbot/corpus_templates/best_day_certain_location.csv",
+    "flaskr/model/chatbot/corpus_templates/best_location_near_location.csv",
+    "flaskr/model/chatbot/corpus_templates/current_day_best_location.csv",
+    "flaskr/model/chatbot/corpus_templates/current_weather_request.csv",
+    "flaskr/model/chatbot/corpus_templates/latest_news_request.csv",
+    "flaskr/model/chatbot/corpus_templates/weather_forecast_request.csv"
+]
+
+
+def peak_memory_mb() -> float :
+    """
+    Returns the peak resident memory of the process in megabytes, or None where it
+    isn't available.
+    """
+
+    try :
+        import resource
+    except ImportError :
+        return None
+
+    # Linux reports kilobytes and macOS bytes
+    peak : int = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def corpus_inputs() -> list :
+    """
+    Returns the inputs of the training corpus for every location.
+    """
+
+    from flaskr.model.chatbot.generate_corpus import create_corpus_from_template
+
+    locations : list[str] = pd.read_csv("locations.csv")["location"].tolist()
+
+    return pd.concat([create_corpus_from_template(template, locations) for template in TEMPLATES])["input"].tolist()
+
+
+def worker(variant : str, queries : int, candidates : int) -> None :
+    """
+    Loads a variant in this interpreter and prints its results as json.
+    """
+
+    from chatterbot import languages
+    from chatterbot.conversation import Statement
+
+    statements : list[str] = corpus_inputs()
+    random : Random = Random(0)
+    sample : list[str] = random.sample(statements, min(queries, len(statements)))
+    baseline_mb : float = peak_memory_mb()
+
+    start : float = perf_counter()
+
+    if variant == "full" :
+
+        from chatterbot.comparisons import SpacySimilarity
+        from chatterbot.tagging import PosLemmaTagger
+
+        tagger, comparator = PosLemmaTagger(languages.ENG), SpacySimilarity(languages.ENG)
+
+    else :
+
+        from flaskr.model.chatbot.language_model import SlimPosLemmaTagger, SlimSpacySimilarity
+
+        tagger, comparator = SlimPosLemmaTagger(languages.ENG), SlimSpacySimilarity(languages.ENG)
+
+    load_ms : float = (perf_counter() - start) * 1000
+
+    # ChatterBot versions differ in the name of the tagger's index function
+    index = getattr(tagger, "get_text_index_string", None) or getattr(tagger, "get_bigram_pair_string")
+
+    latencies : list[float] = []
+    index_strings : list[str] = []
+    best_matches : list[str] = []
+
+    for query in sample :
+
+        # Each query is compared against the same candidates, as stored statements
+        # are compared against many inputs
+        pool : list[str] = Random(query).sample(statements, min(candidates, len(statements)))
+
+        start = perf_counter()
+
+        index_strings.append(index(query))
+        scores : list[float] = [comparator.compare(Statement(text=query), Statement(text=candidate)) for candidate in pool]
+
+        latencies.append((perf_counter() - start) * 1000)
+        best_matches.append(pool[max(range(len(pool)), key=lambda position : scores[position])])
+
+    latencies.sort()
+
+    print(dumps({
+        "variant" : variant,
+        "pipeline" : list(tagger.nlp.pipe_names),
+        "load_ms" : round(load_ms, 2),
+        "p50_ms_per_query" : round(latencies[len(latencies) // 2], 2),
+        "p95_ms_per_query" : round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))], 2),
+        "peak_memory_mb" : peak_memory_mb(),
+        "model_memory_mb" : round(peak_memory_mb() - baseline_mb, 1) if baseline_mb is not None else None,
+        "index_strings" : index_strings,
+        "best_matches" : best_matches
+    }))
+
+
+def main() -> None :
+
+    parser : ArgumentParser = ArgumentParser(description=__doc__)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--candidates", type=int, default=50, help="statements each query is compared against")
+    parser.add_argument("--worker", choices=["full", "slim"], help=SUPPRESS)
+    arguments = parser.parse_args()
+
+    if arguments.worker :
+        worker(arguments.worker, arguments.queries, arguments.candidates)
+        return
+
+    results : dict = {}
+
+    for variant in ["full", "slim"] :
+
+        process : subprocess.CompletedProcess = subprocess.run(
+            [
+                sys.executable, "-m", "benchmarks.spacy_pipeline", "--worker", variant,
+                "--queries", str(arguments.queries), "--candidates", str(arguments.candidates)
+            ],
+            capture_output=True, text=True
+        )
+
+        if process.returncode != 0 :
+            raise RuntimeError(f"The {variant} pipeline failed:\n{process.stderr}")
+
+        results[variant] = loads(process.stdout.strip().splitlines()[-1])
+
+    full, slim = results["full"], results["slim"]
+
+    report : dict = {
+        "index_string_mismatches" : sum(a != b for a, b in zip(full.pop("index_strings"), slim.pop("index_strings"))),
+        "best_match_mismatches" : sum(a != b for a, b in zip(full.pop("best_matches"), slim.pop("best_matches"))),
+        "full" : full,
+        "slim" : slim
+    }
+
+    print(dumps(report, indent=4))
+
+    if report["index_string_mismatches"] or report["best_match_mismatches"] :
+        raise SystemExit("The slim pipeline changed the match results.")
+
+
+if __name__ == "__main__" :
+    main()
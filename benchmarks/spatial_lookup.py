@@ -0,0 +1,71 @@
+"""
+Measures the cost of finding every location within a radius of a point with the
+grid SpatialIndex against computing the distance to every location, as the
+number of locations grows.
+
+Usage:
+    python -m benchmarks.spatial_lookup [--sizes 10000 100000 1000000] [--queries 200] [--radius 50]
+"""
+
+from argparse import ArgumentParser
+from json import dumps
+from time import perf_counter
+
+import numpy as np
+
+from flaskr.model.utils.spatial_utils import SpatialIndex, haversine_km
+
+
+def main() -> None :
+
+    parser : ArgumentParser = ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000, 1000000])
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--radius", type=float, default=50.0, help="search radius in kilometres")
+    parser.add_argument("--cell-size", type=float, default=0.5, help="grid cell size in degrees")
+    arguments = parser.parse_args()
+
+    random : np.random.Generator = np.random.default_rng(0)
+    results : list[dict] = []
+
+    for size in arguments.sizes :
+
+        # Locations are spread over a box roughly the size of Great Britain
+        lat : np.ndarray = random.uniform(50.0, 59.0, size)
+        lon : np.ndarray = random.uniform(-8.0, 2.0, size)
+        queries : np.ndarray = random.integers(0, size, arguments.queries)
+
+        start : float = perf_counter()
+        index : SpatialIndex = SpatialIndex(lat, lon, arguments.cell_size)
+        build_ms : float = (perf_counter() - start) * 1000
+
+        start = perf_counter()
+        found : int = 0
+
+        for query in queries :
+            found += len(index.within(float(lat[query]), float(lon[query]), arguments.radius)[0])
+
+        grid_us : float = (perf_counter() - start) * 1e6 / len(queries)
+
+        start = perf_counter()
+
+        for query in queries :
+            distances : np.ndarray = haversine_km(float(lat[query]), float(lon[query]), lat, lon)
+            np.flatnonzero(distances <= arguments.radius)
+
+        scan_us : float = (perf_counter() - start) * 1e6 / len(queries)
+
+        results.append({
+            "locations" : size,
+            "build_ms" : round(build_ms, 2),
+            "mean_results" : round(found / len(queries), 1),
+            "grid_us_per_query" : round(grid_us, 2),
+            "full_scan_us_per_query" : round(scan_us, 2),
+            "speedup" : round(scan_us / grid_us, 1)
+        })
+
+    print(dumps(results, indent=4))
+
+
+if __name__ == "__main__" :
+    main()
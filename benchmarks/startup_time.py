@@ -0,0 +1,104 @@
+"""
+Reports where the application's start up time goes: an import time breakdown by
+top level package, taken from `python -X importtime`, and the boot report of
+create_app(). With --warm-up the chatbot is loaded as well and the time until the
+application reports ready is included.
+
+Usage:
+    python -m benchmarks.startup_time [--top 15] [--warm-up]
+"""
+
+from argparse import ArgumentParser
+from json import dumps, loads
+import os
+import subprocess
+import sys
+
+
+BOOT_SCRIPT : str = """
+from json import dumps
+from time import perf_counter
+start = perf_counter()
+from flaskr.controller import app as module
+imported = perf_counter()
+application = module.create_app({warm_up})
+created = perf_counter()
+ready = module.chatbot_ready.wait({timeout}) if {warm_up} else False
+print(dumps({{
+    "import_ms" : round((imported - start) * 1000, 2),
+    "create_app_ms" : round((created - imported) * 1000, 2),
+    "ready" : ready,
+    "ready_ms" : round((perf_counter() - start) * 1000, 2) if ready else None,
+    "boot" : module.boot_report.get_statistics()
+}}))
+"""
+
+
+def import_breakdown(top : int) -> list :
+    """
+    Imports the application in a new interpreter with -X importtime and sums the
+    cumulative import time of each top level package.
+    """
+
+    process : subprocess.CompletedProcess = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import flaskr.controller.app"],
+        capture_output=True, text=True
+    )
+
+    packages : dict[str, int] = {}
+    children : list[tuple] = []
+
+    for line in process.stderr.splitlines() :
+
+        if not line.startswith("import time:") or "[us]" in line :
+            continue
+
+        _, cumulative, name = line[len("import time:"):].split("|")
+        depth : int = (len(name) - len(name.lstrip()) - 1) // 2
+
+        # A module is reported after its imports, the direct imports of the
+        # application are kept once it is reported
+        if depth == 1 :
+
+            children.append((name.strip().split(".")[0], int(cumulative)))
+
+        elif depth == 0 :
+
+            if name.strip() == "flaskr.controller.app" :
+                for package, us in children :
+                    packages[package] = packages.get(package, 0) + us
+
+            children = []
+
+    ranked : list[tuple] = sorted(packages.items(), key=lambda package : package[1], reverse=True)
+
+    return [{"package" : name, "cumulative_ms" : round(us / 1000, 2)} for name, us in ranked[:top]]
+
+
+def main() -> None :
+
+    parser : ArgumentParser = ArgumentParser(description=__doc__)
+    parser.add_argument("--top", type=int, default=15, help="number of packages in the import breakdown")
+    parser.add_argument("--warm-up", action="store_true", help="load the chatbot and wait until ready")
+    parser.add_argument("--timeout", type=float, default=600.0, help="seconds to wait for the warm up")
+    arguments = parser.parse_args()
+
+    # The databases are created in the project's SQLite folder
+    os.makedirs("SQLite", exist_ok=True)
+
+    process : subprocess.CompletedProcess = subprocess.run(
+        [sys.executable, "-c", BOOT_SCRIPT.format(warm_up=arguments.warm_up, timeout=arguments.timeout)],
+        capture_output=True, text=True
+    )
+
+    if process.returncode != 0 :
+        raise RuntimeError(f"The application could not be created:\n{process.stderr}")
+
+    print(dumps({
+        "imports" : import_breakdown(arguments.top),
+        "boot" : loads(process.stdout.strip().splitlines()[-1])
+    }, indent=4))
+
+
+if __name__ == "__main__" :
+    main()
@@ -0,0 +1,183 @@
+"""
+Compares the memory mapped statement vector store against statement vectors held
+privately by each process. Several independent worker processes either open the
+same store or load their own copy of the vectors, touch every vector and answer
+lookups. The script reports each variant's cold start time, until a process can
+answer lookups, its lookup latency and the total resident and proportional set
+size of the workers. Proportional set size divides shared pages between the
+processes that map them (Linux only).
+
+Synthetic vectors are used so that the script runs without the language model.
+The private variant only copies vectors that are already computed, so its cold
+start is a lower bound for processes that run the model over every statement.
+
+Usage:
+    python -m benchmarks.statement_vector_store [--statements 50000] [--dims 96] [--workers 4]
+"""
+
+from argparse import SUPPRESS, ArgumentParser
+from json import dumps, loads
+from random import Random
+from tempfile import TemporaryDirectory
+from time import perf_counter
+import os
+import subprocess
+import sys
+
+import numpy as np
+
+from benchmarks.prefork_scaling import memory_kb
+from flaskr.model.chatbot.StatementVectorStore import StatementVectorStore
+
+
+SIGNATURE : str = "benchmark"
+
+
+def synthetic_text(index : int) -> str :
+    """
+    Returns the text of a synthetic statement.
+    """
+
+    return f"synthetic statement number {index}"
+
+
+def synthetic_statements(count : int, dims : int) -> list :
+    """
+    Returns statements with random token ids and vectors.
+    """
+
+    generator : np.random.Generator = np.random.default_rng(0)
+    vectors : np.ndarray = generator.standard_normal((count, dims), dtype=np.float32)
+
+    return [
+        (synthetic_text(index), tuple(generator.integers(0, 2 ** 63, 6).tolist()), vectors[index], float(np.linalg.norm(vectors[index])))
+        for index in range(count)
+    ]
+
+
+def worker(variant : str, path : str, lookups : int) -> None :
+    """
+    Loads the vectors in this interpreter and prints its cold start time as json,
+    then times lookups when the parent asks.
+    """
+
+    start : float = perf_counter()
+    store : StatementVectorStore = StatementVectorStore(path, SIGNATURE)
+    texts : list[str] = [synthetic_text(index) for index in range(len(store))]
+
+    if variant == "private" :
+
+        # As the per process cache holds them, one entry per statement
+        vectors : dict = {text : store.get(text) for text in texts}
+        vectors = {text : (tokens, np.array(vector), norm) for text, (tokens, vector, norm) in vectors.items()}
+        lookup = vectors.get
+        store.close()
+
+    else :
+
+        lookup = store.get
+
+    ready_ms : float = (perf_counter() - start) * 1000
+
+    # Every vector is read once, as a search over the statements does, so that the
+    # memory measured includes them
+    checksum : float = sum(float(lookup(text)[1].sum()) for text in texts)
+
+    print(dumps({"cold_start_ms" : round(ready_ms, 1), "checksum" : checksum}), flush=True)
+
+    # Lookups are timed one worker at a time, once the parent has measured memory
+    sys.stdin.readline()
+
+    sample : list[str] = Random(0).choices(texts, k=lookups)
+    start = perf_counter()
+
+    for text in sample :
+        lookup(text)
+
+    lookup_us : float = (perf_counter() - start) * 1e6 / lookups
+
+    print(dumps({"lookup_us" : round(lookup_us, 2)}), flush=True)
+
+    sys.stdin.read()
+
+
+def run(variant : str, path : str, workers : int, lookups : int) -> dict :
+    """
+    Starts the workers of a variant and measures them once they are all ready.
+    """
+
+    processes : list[subprocess.Popen] = [
+        subprocess.Popen(
+            [sys.executable, "-m", "benchmarks.statement_vector_store", "--worker", variant, "--path", path, "--lookups", str(lookups)],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True
+        )
+        for _ in range(workers)
+    ]
+
+    try :
+
+        reports : list[dict] = [loads(process.stdout.readline()) for process in processes]
+
+        if len({report["checksum"] for report in reports}) != 1 :
+            raise RuntimeError(f"The {variant} workers read different vectors.")
+
+        result : dict = {
+            "variant" : variant,
+            "cold_start_ms" : max(report["cold_start_ms"] for report in reports),
+            "rss_mb" : round(sum(memory_kb(process.pid, "VmRSS") for process in processes) / 1024, 1),
+            "pss_mb" : round(sum(memory_kb(process.pid, "Pss") for process in processes) / 1024, 1)
+        }
+
+        lookups_us : list[float] = []
+
+        for process in processes :
+            process.stdin.write("\n")
+            process.stdin.flush()
+            lookups_us.append(loads(process.stdout.readline())["lookup_us"])
+
+        result["lookup_us"] = round(sum(lookups_us) / workers, 2)
+
+        return result
+
+    finally :
+
+        for process in processes :
+            process.stdin.close()
+            process.wait(10)
+
+
+def main() -> None :
+
+    parser : ArgumentParser = ArgumentParser(description=__doc__)
+    parser.add_argument("--statements", type=int, default=50000)
+    parser.add_argument("--dims", type=int, default=96, help="the width of the vectors, 96 for the small English model")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--lookups", type=int, default=20000)
+    parser.add_argument("--worker", choices=["store", "private"], help=SUPPRESS)
+    parser.add_argument("--path", help=SUPPRESS)
+    arguments = parser.parse_args()
+
+    if arguments.worker :
+        worker(arguments.worker, arguments.path, arguments.lookups)
+        return
+
+    with TemporaryDirectory() as directory :
+
+        path : str = os.path.join(directory, "statement-vectors.bin")
+        statements : list = synthetic_statements(arguments.statements, arguments.dims)
+
+        start : float = perf_counter()
+        StatementVectorStore.build(path, SIGNATURE, statements)
+        build_ms : float = (perf_counter() - start) * 1000
+
+        print(dumps({
+            "statements" : arguments.statements,
+            "workers" : arguments.workers,
+            "build_ms" : round(build_ms, 1),
+            "file_mb" : round(os.path.getsize(path) / (1024 * 1024), 1),
+            "results" : [run(variant, path, arguments.workers, arguments.lookups) for variant in ["private", "store"]]
+        }, indent=4))
+
+
+if __name__ == "__main__" :
+    main()
@@ -0,0 +1,177 @@
+"""
+Measures how soon a chat response starts to arrive from `/chat/<user_input>`,
+which answers once the whole response is populated, and from its streamed
+counterpart `/chat/<user_input>/stream`, which sends the matched intent and a
+provisional message straight away. The application is started as it is by
+chat_latency, against local stand-ins for OpenWeather and Currents.
+
+For each intent the time to the first byte, the time to the first part of the
+populated response and the time to the whole response are printed and saved as
+json. The plain endpoint's first part is its whole response. Adding upstream
+latency, e.g. --upstream-latency 0.5, shows the difference on the requests that
+refresh the data while the user waits.
+
+Usage:
+    python -m benchmarks.stream_latency [--requests benchmarks/chat_requests.jsonl ...] [--rounds 10] [--upstream-latency 0.0]
+"""
+
+from argparse import ArgumentParser
+from datetime import datetime, timezone
+from json import dumps
+from time import perf_counter
+from urllib.parse import quote
+import os
+import platform
+import subprocess
+
+import requests
+
+from benchmarks.chat_latency import DEFAULT_REQUESTS, commit, load_requests, percentile
+from benchmarks.stub_upstreams import StubConfiguration, start_application, wait_until_ready
+
+
+def measure(session : requests.Session, url : str, streamed : bool) -> tuple :
+    """
+    Sends a chat request and returns the milliseconds until its first byte, its
+    first part and its end, along with its status.
+    """
+
+    start : float = perf_counter()
+    first_byte : float | None = None
+    first_part : float | None = None
+
+    try :
+
+        with session.get(url, stream=True, timeout=60.0) as http_response :
+
+            for chunk in http_response.iter_content(chunk_size=None) :
+
+                now : float = perf_counter()
+                first_byte = first_byte or now
+
+                # The plain endpoint's only part is the whole response
+                if first_part is None and (not streamed or b"event: part" in chunk) :
+                    first_part = now
+
+            status : int = http_response.status_code
+
+    except requests.exceptions.RequestException :
+        status = 0
+
+    end : float = perf_counter()
+
+    return tuple(round(((moment or end) - start) * 1000, 2) for moment in (first_byte, first_part, end)) + (status,)
+
+
+def replay(url : str, mix : list, rounds : int) -> dict :
+    """
+    Sends every input of the mix once per round to both endpoints, one after the
+    other so that both see the same state. Returns the samples of each endpoint.
+    """
+
+    session : requests.Session = requests.Session()
+    samples : dict[str, list] = {"plain" : [], "stream" : []}
+
+    for _ in range(rounds) :
+
+        for entry in mix :
+
+            path : str = f"{url}/chat/{quote(entry['input'], safe='')}"
+
+            samples["plain"].append((entry["intent"],) + measure(session, path, False))
+            samples["stream"].append((entry["intent"],) + measure(session, f"{path}/stream", True))
+
+    return samples
+
+
+def summarise(samples : list) -> dict :
+    """
+    Summarises the time to the first byte, first part and end of the samples of
+    each intent and of all of them.
+    """
+
+    groups : dict[str, list] = {"all" : samples}
+
+    for sample in samples :
+        groups.setdefault(sample[0], []).append(sample)
+
+    summary : dict = {}
+
+    for intent, group in groups.items() :
+
+        summary[intent] = {"requests" : len(group), "errors" : sum(sample[4] != 200 for sample in group)}
+
+        for index, name in [(1, "first_byte"), (2, "first_part"), (3, "total")] :
+
+            latencies : list[float] = sorted(sample[index] for sample in group)
+
+            summary[intent][f"{name}_p50_ms"] = percentile(latencies, 0.50)
+            summary[intent][f"{name}_p95_ms"] = percentile(latencies, 0.95)
+
+    return summary
+
+
+def main() -> None :
+
+    parser : ArgumentParser = ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", nargs="+", default=[DEFAULT_REQUESTS], help="json lines files of {\"intent\", \"input\"} records")
+    parser.add_argument("--rounds", type=int, default=10, help="times each input is sent to each endpoint")
+    parser.add_argument("--port", type=int, default=8091)
+    parser.add_argument("--data", default="SQLite/benchmark", help="folder holding the benchmark's trained bot and databases")
+    parser.add_argument("--upstream-latency", type=float, default=0.0, help="seconds added to every stub response")
+    parser.add_argument("--timeout", type=float, default=1800.0, help="seconds to wait for the bot to be trained and warmed up")
+    parser.add_argument("--output", help="where the results are saved, by default benchmarks/results/stream_latency-<time>.json")
+    arguments = parser.parse_args()
+
+    mix : list[dict] = load_requests(arguments.requests)
+
+    if not mix :
+        raise SystemExit(f"No inputs were found in {', '.join(arguments.requests)}.")
+
+    url : str = f"http://127.0.0.1:{arguments.port}"
+
+    server : subprocess.Popen = start_application(arguments.port, arguments.data, StubConfiguration(latency=arguments.upstream_latency))
+
+    try :
+
+        wait_until_ready(url, server, arguments.timeout)
+
+        # The first pass fills the weather and news tables from the stubs
+        replay(url, mix, 1)
+
+        started : datetime = datetime.now(timezone.utc)
+        samples : dict = replay(url, mix, arguments.rounds)
+
+    finally :
+
+        server.terminate()
+        server.wait(10)
+
+    report : dict = {
+        "benchmark" : "stream_latency",
+        "time" : started.isoformat(timespec="seconds"),
+        "commit" : commit(),
+        "python" : platform.python_version(),
+        "settings" : {
+            "requests" : arguments.requests,
+            "inputs" : len(mix),
+            "rounds" : arguments.rounds,
+            "upstream_latency" : arguments.upstream_latency
+        },
+        "endpoints" : {endpoint : summarise(group) for endpoint, group in samples.items()}
+    }
+
+    output : str = arguments.output or os.path.join("benchmarks", "results", f"stream_latency-{started.strftime('%Y%m%dT%H%M%S')}.json")
+
+    if os.path.dirname(output) :
+        os.makedirs(os.path.dirname(output), exist_ok=True)
+
+    with open(output, "w") as file :
+        file.write(dumps(report, indent=4))
+
+    print(dumps(report["endpoints"], indent=4))
+    print(f"Results saved to {output}")
+
+
+if __name__ == "__main__" :
+    main()
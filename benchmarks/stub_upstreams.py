@@ -0,0 +1,429 @@
+"""
+Local stand-ins for the OpenWeather and Currents APIs, used by the benchmarks and
+tests so that no real API keys or quota are consumed. Each stub can inject
+latency, errors and rate limiting, and send caching headers.
+
+Run as a script, the application is served against the stubs with its keys and
+databases kept under a separate data folder, so the real ones are left alone.
+
+Usage:
+    python -m benchmarks.stub_upstreams [--port 8091] [--latency 0.2] [--error-rate 0.1] [--rate-limit 60] [--workers 4]
+"""
+
+from argparse import ArgumentParser
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from hashlib import sha256
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from json import dumps
+from random import Random
+from threading import Lock, Thread
+from time import monotonic, perf_counter, sleep
+from urllib.parse import parse_qs, urlparse
+import os
+import subprocess
+import sys
+
+import requests
+
+
+
+class StubConfiguration :
+    """
+    The StubConfiguration class holds the faults injected by a stub server, it may
+    be changed while the server is running.
+
+    Parameters:
+        latency (float): the number of seconds added to every response.
+        error_rate (float): the probability (0.0 - 1.0) of responding with a 503.
+        rate_limit (int): the number of requests allowed per minute, 0 for no limit.
+        articles (int): the number of news articles returned per page.
+        cache_control (str): the Cache-Control header of successful responses, e.g. max-age=60.
+        etag (bool): whether responses carry an ETag and answer If-None-Match with a 304.
+        last_modified (bool): whether responses carry a Last-Modified date and answer
+        If-Modified-Since with a 304.
+        unnamed (tuple[str]): the locations whose articles don't name them in their
+        title or description.
+    """
+
+    def __init__(self, latency : float = 0.0, error_rate : float = 0.0, rate_limit : int = 0, articles : int = 1,
+                 cache_control : str = "", etag : bool = False, last_modified : bool = False, unnamed : tuple = ()) -> None :
+        """
+        Initializer
+        """
+
+        self.latency : float = latency
+        self.error_rate : float = error_rate
+        self.rate_limit : int = rate_limit
+        self.articles : int = articles
+        self.cache_control : str = cache_control
+        self.etag : bool = etag
+        self.last_modified : bool = last_modified
+        self.unnamed : tuple = unnamed
+
+
+
+class StubUpstreamServer :
+    """
+    This class runs a local HTTP server on a background thread that answers the
+    OpenWeather forecast path and the Currents search path with generated data.
+    """
+
+    WEATHER_PATH : str = "/data/2.5/forecast"
+    NEWS_PATH : str = "/v1/search"
+
+    def __init__(self, configuration : StubConfiguration = None, seed : int = 0) -> None :
+        """
+        Initializer
+
+        Parameters:
+            configuration (StubConfiguration): the faults to inject.
+            seed (int): the seed used for error injection.
+        """
+
+        self.configuration : StubConfiguration = configuration or StubConfiguration()
+        self.random : Random = Random(seed)
+        self.lock : Lock = Lock()
+        self.requests : dict[str, int] = {StubUpstreamServer.WEATHER_PATH : 0, StubUpstreamServer.NEWS_PATH : 0}
+        self.not_modified : int = 0
+        self.window : list[float] = []
+
+        stub : StubUpstreamServer = self
+
+        class Handler(BaseHTTPRequestHandler) :
+
+            def do_GET(self) -> None :
+                stub._handle(self)
+
+            def log_message(self, *args) -> None :
+                pass
+
+        self.server : ThreadingHTTPServer = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.daemon_threads = True
+        self.thread : Thread = Thread(target=self.server.serve_forever, daemon=True)
+
+
+    @property
+    def url(self) -> str :
+        """
+        Returns the base URL of the server.
+        """
+
+        return f"http://127.0.0.1:{self.server.server_port}"
+
+
+    def start(self) -> "StubUpstreamServer" :
+        """
+        Starts serving requests on a background thread.
+        """
+
+        self.thread.start()
+
+        return self
+
+
+    def stop(self) -> None :
+        """
+        Stops the server.
+        """
+
+        self.server.shutdown()
+        self.server.server_close()
+
+
+    def patch_connectors(self) -> None :
+        """
+        Points the OpenWeather and Currents connectors at this server.
+        """
+
+        from flaskr.model.data_access_layer.CurrentNewsConnector import CurrentNewsConnector
+        from flaskr.model.data_access_layer.OpenWeatherConnector import OpenWeatherConnector
+
+        OpenWeatherConnector.API_URL = self.url + StubUpstreamServer.WEATHER_PATH
+        CurrentNewsConnector.API_URL = self.url + StubUpstreamServer.NEWS_PATH
+
+
+    def _throttled(self) -> bool :
+        """
+        Returns true if the request exceeds the per-minute rate limit.
+        """
+
+        if self.configuration.rate_limit <= 0 :
+            return False
+
+        now : float = monotonic()
+
+        with self.lock :
+
+            self.window = [time for time in self.window if now - time < 60]
+
+            if len(self.window) >= self.configuration.rate_limit :
+                return True
+
+            self.window.append(now)
+
+        return False
+
+
+    def _handle(self, handler : BaseHTTPRequestHandler) -> None :
+        """
+        Answers a single request, injecting the configured faults.
+        """
+
+        url = urlparse(handler.path)
+        params : dict = {key : value[0] for key, value in parse_qs(url.query).items()}
+
+        with self.lock :
+            self.requests[url.path] = self.requests.get(url.path, 0) + 1
+            failed : bool = self.random.random() < self.configuration.error_rate
+
+        if self.configuration.latency > 0 :
+            sleep(self.configuration.latency)
+
+        if url.path not in (StubUpstreamServer.WEATHER_PATH, StubUpstreamServer.NEWS_PATH) :
+            return self._send(handler, 404, {"message" : "not found"})
+
+        if self._throttled() :
+            return self._send(handler, 429, {"cod" : 429, "message" : "rate limit exceeded"})
+
+        if failed :
+            return self._send(handler, 503, {"message" : "service unavailable"})
+
+        if url.path == StubUpstreamServer.WEATHER_PATH :
+            body : dict = self._forecast(float(params.get("lat", 0)), float(params.get("lon", 0)))
+        else :
+            body : dict = self._news(params.get("keywords", ""))
+
+        headers : dict[str, str] = self._cache_headers(dumps(body).encode())
+
+        if self._not_modified(handler, headers) :
+
+            with self.lock :
+                self.not_modified += 1
+
+            return self._send(handler, 304, None, headers)
+
+        return self._send(handler, 200, body, headers)
+
+
+    def _cache_headers(self, content : bytes) -> dict :
+        """
+        Returns the configured caching headers of a response body. The body is last
+        modified at the start of the current hour, when the generated forecast changes.
+        """
+
+        headers : dict[str, str] = {}
+
+        if self.configuration.cache_control :
+            headers["Cache-Control"] = self.configuration.cache_control
+
+        if self.configuration.etag :
+            headers["ETag"] = f"\"{sha256(content).hexdigest()[:16]}\""
+
+        if self.configuration.last_modified :
+            headers["Last-Modified"] = format_datetime(datetime.now(timezone.utc).replace(minute=0, second=0, microsecond=0), usegmt=True)
+
+        return headers
+
+
+    def _not_modified(self, handler : BaseHTTPRequestHandler, headers : dict) -> bool :
+        """
+        Returns true if a conditional request's cached copy is still valid, an ETag
+        match takes precedence over the modification date.
+        """
+
+        if "ETag" in headers and "If-None-Match" in handler.headers :
+            return handler.headers["If-None-Match"] == headers["ETag"]
+
+        if "Last-Modified" in headers and "If-Modified-Since" in handler.headers :
+
+            try :
+                return parsedate_to_datetime(handler.headers["If-Modified-Since"]) >= parsedate_to_datetime(headers["Last-Modified"])
+            except (TypeError, ValueError) :
+                return False
+
+        return False
+
+
+    def _send(self, handler : BaseHTTPRequestHandler, status : int, body : dict, headers : dict = None) -> None :
+        """
+        Writes a JSON response, a 304 response has no body.
+        """
+
+        content : bytes = dumps(body).encode() if body is not None else b""
+
+        # Clients that gave up waiting are ignored
+        try :
+
+            handler.send_response(status)
+            handler.send_header("Content-Type", "application/json")
+            handler.send_header("Content-Length", str(len(content)))
+
+            for name, value in (headers or {}).items() :
+                handler.send_header(name, value)
+
+            handler.end_headers()
+            handler.wfile.write(content)
+
+        except (BrokenPipeError, ConnectionResetError) :
+
+            pass
+
+
+    def _forecast(self, lat : float, lon : float) -> dict :
+        """
+        Generates a deterministic 5 day forecast in 3 hour steps.
+        """
+
+        start : datetime = datetime.now(timezone.utc).replace(minute=0, second=0, microsecond=0)
+        start -= timedelta(hours=start.hour % 3)
+        seed : int = int(abs(lat * 1000) + abs(lon * 1000))
+
+        return {"list" : [
+            {
+                "dt" : int((start + timedelta(hours=3 * step)).timestamp()),
+                "main" : {
+                    "temp" : 10 + (seed + step) % 12,
+                    "temp_min" : 8 + (seed + step) % 12,
+                    "temp_max" : 12 + (seed + step) % 12,
+                    "feels_like" : 9 + (seed + step) % 12,
+                    "humidity" : 70
+                },
+                "weather" : [{"description" : ("clear sky", "light rain", "few clouds")[(seed + step) % 3]}],
+                "wind" : {"speed" : (seed + step) % 9},
+                "pop" : ((seed + step) % 10) / 10,
+                "visibility" : 10000
+            }
+            for step in range(40)
+        ]}
+
+
+    def _news(self, keywords : str) -> dict :
+        """
+        Generates news articles mentioning the requested keywords, unless they are
+        configured as unnamed.
+        """
+
+        published : str = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S +0000")
+        names : list[str] = [name.strip() for name in keywords.split(" OR ") if name.strip()] or ["England"]
+        named : list[str] = ["the area" if name in self.configuration.unnamed else name for name in names]
+
+        return {"status" : "ok", "news" : [
+            {
+                "title" : f"Local news from {named[index % len(names)]}",
+                "description" : f"Something happened in {named[index % len(names)]}.",
+                "url" : f"https://example.com/{index}",
+                "image" : None,
+                "published" : published
+            }
+            for index in range(self.configuration.articles * len(names))
+        ]}
+
+
+
+def serve_application(port : int, data : str, configuration : StubConfiguration, workers : int = 1) -> None :
+    """
+    Serves the application against the stubs until the process is ended. With
+    more than one worker the chatbot is loaded before the workers are forked, as
+    the application does.
+    """
+
+    from werkzeug.serving import make_server
+    import logging
+
+    from flaskr.controller import app as module
+    from flaskr.model.utils.prefork_utils import PreForkServer
+
+    stub : StubUpstreamServer = StubUpstreamServer(configuration).start()
+    stub.patch_connectors()
+
+    data = os.path.abspath(data)
+    os.makedirs(data, exist_ok=True)
+
+    module.KEYS_FILE = os.path.join(data, "api_key.txt")
+
+    with open(module.KEYS_FILE, "w") as file :
+        file.write("stub-weather-key\nstub-news-key\n")
+
+    module.BOT_DATABASE = os.path.join(data, "chatterbot-database.db")
+    module.STATEMENT_VECTORS = os.path.join(data, "statement-vectors.bin")
+    module.STORAGE_DATABASE = os.path.join(data, "storage-database.db")
+    module.HTTP_CACHE = os.path.join(data, "http-cache.db")
+    module.SHARED_STATE = os.path.join(data, "shared-state.db")
+
+    application = module.create_app(workers == 1)
+    logging.getLogger("werkzeug").setLevel(logging.ERROR)
+
+    if workers == 1 :
+        make_server("127.0.0.1", port, application, threaded=True).serve_forever()
+        return
+
+    module.warm_up_chatbot(module.chatbot_loader.get())
+    PreForkServer(application, "127.0.0.1", port, workers, module.start_worker, module.stop_worker).serve()
+
+
+def start_application(port : int, data : str, configuration : StubConfiguration, workers : int = 1) -> subprocess.Popen :
+    """
+    Starts the application against the stubs in its own interpreter.
+    """
+
+    return subprocess.Popen(
+        [
+            sys.executable, "-m", "benchmarks.stub_upstreams", "--port", str(port), "--data", data, "--workers", str(workers),
+            "--latency", str(configuration.latency), "--error-rate", str(configuration.error_rate),
+            "--rate-limit", str(configuration.rate_limit), "--articles", str(configuration.articles)
+        ],
+        stdout=subprocess.DEVNULL
+    )
+
+
+def wait_until_ready(url : str, server : subprocess.Popen, timeout : float) -> None :
+    """
+    Polls the readiness endpoint until the bot is trained and warmed up, failing
+    early if the bot could not be loaded.
+    """
+
+    deadline : float = perf_counter() + timeout
+
+    while perf_counter() < deadline :
+
+        if server.poll() is not None :
+            raise RuntimeError(f"The application exited with status {server.returncode}.")
+
+        try :
+
+            report : dict = requests.get(f"{url}/readyz", timeout=1.0).json()
+
+            if report["status"] == "ready" :
+                return
+
+            if report["status"] == "failed" :
+                raise RuntimeError(f"The chatbot could not be loaded: {report.get('error')}")
+
+        except (requests.exceptions.RequestException, ValueError) :
+            pass
+
+        sleep(0.5)
+
+    raise TimeoutError(f"The application at {url} was not ready within {timeout} seconds.")
+
+
+def main() -> None :
+
+    parser : ArgumentParser = ArgumentParser(description=__doc__)
+    parser.add_argument("--port", type=int, default=8091)
+    parser.add_argument("--data", default="SQLite/benchmark", help="folder holding the trained bot and databases")
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every stub response")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="probability of a 503 response")
+    parser.add_argument("--rate-limit", type=int, default=0, help="stub requests allowed per minute, 0 for no limit")
+    parser.add_argument("--articles", type=int, default=1, help="news articles per location")
+    arguments = parser.parse_args()
+
+    configuration : StubConfiguration = StubConfiguration(arguments.latency, arguments.error_rate, arguments.rate_limit, arguments.articles)
+
+    serve_application(arguments.port, arguments.data, configuration, arguments.workers)
+
+
+if __name__ == "__main__" :
+    main()
@@ -0,0 +1,143 @@
+"""
+Measures the cost of turning a chat bot response into the populated reply for
+each intent, comparing the previous regex post-processing of the response text
+against resolving it with the TemplateLibrary and rendering the precompiled
+template.
+
+Usage:
+    python -m benchmarks.template_rendering [--iterations 20000]
+"""
+
+from argparse import ArgumentParser
+from json import dumps
+from time import perf_counter
+import glob
+import re
+
+from flaskr.model.chatbot.TemplateLibrary import TemplateLibrary
+
+
+FORECAST : list = [
+    {"weekday" : day, "description" : "light rain", "temp" : 11.3} for day in ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday"]
+]
+
+RESPONSES : dict = {
+    "current_weather" : "#1# It is currently {weather_description} in {Oxford} and the temperature is {temp} °C.",
+    "weather_forecast" : "#2# The weather forecast for {Oxford} is: [• {weekday}: {description} with a temperature of {temp} °C]",
+    "best_day" : "#3# According to the weather forecast the best time to visit {Oxford} is {day} at {time}.",
+    "best_location" : "#4# According to the weather forecast {unknown-location} is the best location to visit today.",
+    "latest_news" : "#5# The latest news headline from {Oxford} reads: \"{title}\""
+}
+
+
+def legacy(name : str, response : str) -> str :
+    """
+    Populates a response with the regex post-processing previously used by the
+    application's template population functions.
+    """
+
+    # The intent code and location were found before the template was populated
+    re.search(r"#(.)#", response)
+    response = re.sub(r"#.# ", "", response, count=2)
+    re.search(r"\{(.+?)\}", response)
+
+    if name == "current_weather" :
+        output = re.sub(r"\{weather_description\}", "clear sky", response)
+        output = re.sub(r"\{temp\}", str(4.2), output)
+        return re.sub(r"\{|\}", "", output)
+
+    if name == "weather_forecast" :
+
+        output = response
+        list_match = re.search(r"\[(.+?)\]", response)
+
+        for weather in FORECAST :
+            temp = re.sub(r"\{weekday\}", weather["weekday"], list_match.group(0))
+            temp = re.sub(r"\{description\}", weather["description"], temp)
+            temp = re.sub(r"\{temp\}", str(weather["temp"]), temp)
+            output += f"\n{temp}"
+
+        output = re.sub(list_match.group(1), "", output)
+        output = re.sub(r"\[|\]", "", output)
+        return re.sub(r"\{|\}", "", output)
+
+    if name == "best_day" :
+        output = re.sub(r"\{day\}", "Tuesday", response)
+        output = re.sub(r"\{time\}", "12:00 PM", output)
+        return re.sub(r"\{|\}", "", output)
+
+    if name == "best_location" :
+        return re.sub(r"\{unknown-location\}", "Bath", response)
+
+    output = re.sub(r"\{title\}", "Local news", response)
+    return re.sub(r"\{|\}", "", output)
+
+
+def compiled(library : TemplateLibrary, name : str, response : str) -> str :
+    """
+    Populates a response by resolving it to its precompiled template.
+    """
+
+    intent = library.parse(response)
+
+    if name == "current_weather" :
+        return intent.render({"weather_description" : "clear sky", "temp" : 4.2})
+
+    if name == "weather_forecast" :
+        return intent.render({}, FORECAST)
+
+    if name == "best_day" :
+        return intent.render({"day" : "Tuesday", "time" : "12:00 PM"})
+
+    if name == "best_location" :
+        return intent.render({"unknown-location" : "Bath"})
+
+    return intent.render({"title" : "Local news"})
+
+
+def time_per_call(function, iterations : int) -> float :
+    """
+    Returns the mean duration of a function call in microseconds.
+    """
+
+    start : float = perf_counter()
+
+    for _ in range(iterations) :
+        function()
+
+    return (perf_counter() - start) * 1e6 / iterations
+
+
+def main() -> None :
+
+    parser : ArgumentParser = ArgumentParser(description=__doc__)
+    parser.add_argument("--iterations", type=int, default=20000)
+    arguments = parser.parse_args()
+
+    start : float = perf_counter()
+    library : TemplateLibrary = TemplateLibrary.from_csv(sorted(glob.glob("flaskr/model/chatbot/corpus_templates/*.csv")))
+    load_ms : float = (perf_counter() - start) * 1000
+
+    results : list[dict] = []
+
+    for name, response in RESPONSES.items() :
+
+        # Both approaches must produce the same reply
+        if legacy(name, response).strip() != compiled(library, name, response).strip() :
+            raise AssertionError(f"The {name} renderers disagree.")
+
+        legacy_us : float = time_per_call(lambda : legacy(name, response), arguments.iterations)
+        compiled_us : float = time_per_call(lambda : compiled(library, name, response), arguments.iterations)
+
+        results.append({
+            "intent" : name,
+            "regex_us" : round(legacy_us, 2),
+            "compiled_us" : round(compiled_us, 2),
+            "speedup" : round(legacy_us / compiled_us, 1)
+        })
+
+    print(dumps({"templates" : len(library), "load_ms" : round(load_ms, 2), "results" : results}, indent=4, ensure_ascii=False))
+
+
+if __name__ == "__main__" :
+    main()
@@ -0,0 +1,126 @@
+"""
+Measures the per call overhead of the with_type_validation decorator on the
+shapes of function it wraps in the application: a function of one input, e.g.
+chat_response, a method of four inputs, e.g. SQLConnector.orm_query, and the same
+method called with keyword inputs. Each shape is timed undecorated, with the
+decorator as it was before its type spec was checked once at decoration time,
+with the current decorator and in production mode, where validation is skipped.
+
+Usage:
+    python -m benchmarks.type_validation [--calls 1000000] [--repeats 5]
+"""
+
+from argparse import ArgumentParser
+from json import dumps
+from timeit import repeat
+from typing import Any, Callable
+
+from flaskr.model.exceptions.ValidationException import ValidationException
+from flaskr.model.utils import validation_utils
+from flaskr.model.utils.validation_utils import with_type_validation
+
+
+def previous_type_validation(*types) -> Callable :
+    """
+    The decorator before this change, which rebuilt the inputs and checked its own
+    type spec on every call.
+    """
+
+    def decorator(func : Callable) -> Callable :
+
+        def wrapper(*args, **kwargs) -> Any :
+
+            inputs = list(args) + list(kwargs.values())
+
+            if len(inputs) != len(types) :
+                raise ValidationException()
+
+            for i in range(len(types)) :
+
+                if not isinstance(types[i], type) :
+                    raise TypeError("All inputs must be \"type\" objects")
+
+                if not isinstance(inputs[i], types[i]) :
+                    raise TypeError(f"Invalid input type \"{inputs[i].__class__.__name__}\" for function {func.__name__}.")
+
+            return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def production_type_validation(*types) -> Callable :
+    """
+    The current decorator as applied in production mode.
+    """
+
+    def decorator(func : Callable) -> Callable :
+
+        enabled : bool = validation_utils.VALIDATION_ENABLED
+        validation_utils.VALIDATION_ENABLED = False
+
+        try :
+            return with_type_validation(*types)(func)
+        finally :
+            validation_utils.VALIDATION_ENABLED = enabled
+
+    return decorator
+
+
+def shapes(decorate : Callable) -> dict :
+    """
+    Returns a call of each function shape, wrapped by a decorator or undecorated.
+    """
+
+    class Connector :
+
+        def orm_query(self, kind : type, query : str, substitutions : dict) -> None :
+            return None
+
+    connector : Connector = Connector()
+
+    orm_query : Callable = decorate(object, type, str, dict)(Connector.orm_query) if decorate else Connector.orm_query
+    chat_response : Callable = decorate(str)(lambda output : None) if decorate else (lambda output : None)
+
+    return {
+        "one input" : lambda : chat_response("It is currently sunny."),
+        "four inputs" : lambda : orm_query(connector, dict, "SELECT 1", {}),
+        "keyword inputs" : lambda : orm_query(connector, kind=dict, query="SELECT 1", substitutions={})
+    }
+
+
+def main() -> None :
+
+    parser : ArgumentParser = ArgumentParser(description=__doc__)
+    parser.add_argument("--calls", type=int, default=1000000)
+    parser.add_argument("--repeats", type=int, default=5)
+    arguments = parser.parse_args()
+
+    variants : dict[str, Callable] = {
+        "undecorated" : None,
+        "previous" : previous_type_validation,
+        "current" : with_type_validation,
+        "production" : production_type_validation
+    }
+
+    results : dict = {}
+
+    for variant, decorate in variants.items() :
+
+        for shape, call in shapes(decorate).items() :
+
+            best : float = min(repeat(call, number=arguments.calls, repeat=arguments.repeats))
+            results.setdefault(shape, {})[f"{variant}_ns"] = round(best * 1e9 / arguments.calls, 1)
+
+    # The overhead is the time added to an undecorated call
+    for shape, timings in results.items() :
+
+        for variant in ["previous", "current", "production"] :
+            timings[f"{variant}_overhead_ns"] = round(timings[f"{variant}_ns"] - timings["undecorated_ns"], 1)
+
+    print(dumps({"calls" : arguments.calls, "repeats" : arguments.repeats, "results" : results}, indent=4))
+
+
+if __name__ == "__main__" :
+    main()
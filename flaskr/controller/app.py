@@ -1,12 +1,22 @@
+from time import perf_counter
 
-from datetime import datetime, timezone, timedelta
+IMPORT_STARTED : float = perf_counter()
+
+from argparse import ArgumentParser, ArgumentTypeError
+from datetime import date, datetime, timezone, timedelta
+from hmac import compare_digest
 from json import dumps
+from threading import Event
+from typing import TYPE_CHECKING, Callable, Iterator
+import os
 import re
-from flask import Flask, Response, redirect, render_template
-import numpy as np
+from flask import Blueprint, Flask, Response, current_app, g, has_request_context, redirect, render_template, request, stream_with_context
+from flask_sock import Sock
+from simple_websocket import Server
 import pandas as pd
 from werkzeug.wrappers.response import Response
 
+from flaskr.model.exceptions.ApplicationStartupException import ApplicationStartupException
 from flaskr.model.exceptions.ChatbotDependencyException import ChatbotDependencyException
 from flaskr.model.exceptions.CurrentNewsRequestException import CurrentNewsRequestException
 from flaskr.model.exceptions.InvalidORMClassException import InvalidORMClassException
@@ -15,17 +25,33 @@ from flaskr.model.exceptions.OpenWeatherRequestException import OpenWeatherReque
 from flaskr.model.exceptions.SQLRequestException import SQLRequestException
 from flaskr.model.exceptions.SQLServerError import SQLServerError
 from flaskr.model.exceptions.UntrainedChatbotException import UntrainedChatbotException
+from flaskr.model.utils.circuit_breaker_utils import CircuitBreaker
+from flaskr.model.utils.metrics_utils import Histogram, metrics_registry
+from flaskr.model.utils.prefork_utils import PreForkServer
+from flaskr.model.utils.profiling_utils import RequestProfiler
+from flaskr.model.utils.scheduling_utils import RefreshScheduler
+from flaskr.model.utils.shared_state_utils import SharedState
+from flaskr.model.utils.startup_utils import BootReport, LazyResource
+from flaskr.model.utils.tracing_utils import end_trace, start_trace, trace_stage, traced
 from flaskr.model.utils.validation_utils import with_type_validation
 
-from ..model.chatbot.GoTravelBot import GoTravelBot
-from ..model.chatbot.generate_corpus import create_corpus_from_template
+from ..model.chatbot.ChatSession import ChatSession
+from ..model.chatbot.generate_corpus import corpus_version, create_corpus_from_template
+from ..model.chatbot.TemplateLibrary import IntentResult, ResponseTemplate, TemplateLibrary
 from ..model.data_access_layer.CurrentNewsConnector import CurrentNewsConnector
+from ..model.data_access_layer.HTTPResponseCache import HTTPResponseCache
+from ..model.data_access_layer.LocationRegistry import LocationRegistry
 from ..model.data_access_layer.OpenWeatherConnector import OpenWeatherConnector
-from ..model.data_access_layer.SQLConnector import SQLConnector, News, Weather
+from ..model.data_access_layer.SQLConnector import SQLConnector, DailyForecast, News, Weather
+
+# The chatbot pulls in ChatterBot and spaCy, it is only imported once it is needed
+if TYPE_CHECKING :
+    from ..model.chatbot.GoTravelBot import GoTravelBot
 
 
-# Creath Exception Handlers ||
-# Creath All (2) Endpoints ||
+# Start up is timed so that slow phases can be identified
+boot_report : BootReport = BootReport()
+boot_report.record("import flaskr.controller.app", (perf_counter() - IMPORT_STARTED) * 1000)
 
 
 #################################################################################################
@@ -35,40 +61,44 @@ from ..model.data_access_layer.SQLConnector import SQLConnector, News, Weather
 
 
 KEYS_FILE : str = "api_key.txt"
-api_keys : list = []
+weather_key : str = None
+news_key : str = None
 
 
-# The file is read and exceptions handled
-try :
+def load_api_keys() -> tuple :
+    """
+    This function reads the OpenWeather and Currents API keys from the keys file.
+    """
+
+    api_keys : list = []
 
-    with open(KEYS_FILE, "r") as file:
+    # The file is read and exceptions handled
+    try :
 
-        api_keys : list = file.readlines()
+        with open(KEYS_FILE, "r") as file:
 
-except FileNotFoundError :
-    
-    # The application exits with code 2 - file cannot be found
-    print("Application dependency - api_key.txt file not found. Application exiting...")  
-    exit(2)
+            api_keys = file.readlines()
 
-except Exception :
-    
-    # The application exits with code 1 - an unspecified error
-    print("An unexpected error occurred while retrieving api key. Application exiting...")
-    exit(1)
+    except FileNotFoundError :
+        
+        # The application exits with code 2 - file cannot be found
+        raise ApplicationStartupException("Application dependency - api_key.txt file not found.", 2)
+
+    except Exception :
+        
+        # The application exits with code 1 - an unspecified error
+        raise ApplicationStartupException("An unexpected error occurred while retrieving api key.", 1)
 
 
-# The file contents are validated
-if len(api_keys) != 2 or api_keys[0] == "" or api_keys[1] == "" :
+    # The file contents are validated
+    if len(api_keys) != 2 or api_keys[0] == "" or api_keys[1] == "" :
 
-    # The application exits with windows code 13 - invalid data
-    print("The api_key.txt file doesn't contain the correct number of entries or is empty. Application exiting...")
-    exit(13)
+        # The application exits with windows code 13 - invalid data
+        raise ApplicationStartupException("The api_key.txt file doesn't contain the correct number of entries or is empty.", 13)
 
 
-# If the key file is populated retrieve keys
-weather_key : str = api_keys[0].strip()
-news_key : str = api_keys[1].strip()
+    # If the key file is populated retrieve keys
+    return api_keys[0].strip(), api_keys[1].strip()
 
 
 
@@ -79,34 +109,36 @@ news_key : str = api_keys[1].strip()
 
 
 LOCATIONS_FILE : str = "locations.csv"
+location_registry : LocationRegistry = None
 locations : list = []
+location_names : list = []
 
-# The file is read and exceptions handled
-try :
 
-    data : pd.DataFrame = pd.read_csv(LOCATIONS_FILE, delimiter=",")    
-    locations = [data.to_list() for index, data in data.iterrows()]
+def load_locations() -> LocationRegistry :
+    """
+    This function reads the locations served by the chatbot and their coordinates.
+    """
+
+    # The file is read and exceptions handled
+    try :
 
-except FileNotFoundError :
-    
-    # The application exits with code 2 - file could not be found
-    print("Application dependency - locations.csv file not found. Application exiting...")  
-    exit(2)
+        return LocationRegistry.from_csv(LOCATIONS_FILE)
 
-except pd.errors.ParserError :
+    except FileNotFoundError :
+        
+        # The application exits with code 2 - file could not be found
+        raise ApplicationStartupException("Application dependency - locations.csv file not found.", 2)
 
-    # The application exits with windows code 13 - invalid data
-    print("The locations.csv file could not be parsed. Application exiting...")
-    exit(13)
+    except pd.errors.ParserError :
 
-except Exception :
-    
-    # The application exits with code 1 - an unspecified error
-    print("An unexpected error occurred while retrieving locations information. Application exiting...")
-    exit(1)
+        # The application exits with windows code 13 - invalid data
+        raise ApplicationStartupException("The locations.csv file could not be parsed.", 13)
 
+    except Exception :
+        
+        # The application exits with code 1 - an unspecified error
+        raise ApplicationStartupException("An unexpected error occurred while retrieving locations information.", 1)
 
-location_names = [location[0] for location in locations]
 
 
 #################################################################################################
@@ -117,14 +149,35 @@ location_names = [location[0] for location in locations]
 
 BOT_DATABASE = "SQLite/chatterbot-database.db"
 
+STATEMENT_VECTORS : str = "SQLite/statement-vectors.bin"
+"""
+The memory mapped statement vectors shared by every process that serves the bot.
+"""
+
+INTENT_MARGIN : float = 0.05
+"""
+The difference in similarity between the two intents closest to an input below
+which every statement is searched, rather than only those of the closest intent.
+"""
+
 TEMPLATES : list = [
     "flaskr/model/chatbot/corpus_templates/best_day_certain_location.csv",
+    "flaskr/model/chatbot/corpus_templates/best_location_near_location.csv",
     "flaskr/model/chatbot/corpus_templates/current_day_best_location.csv",
     "flaskr/model/chatbot/corpus_templates/current_weather_request.csv",
     "flaskr/model/chatbot/corpus_templates/latest_news_request.csv",
     "flaskr/model/chatbot/corpus_templates/weather_forecast_request.csv"
 ]
 
+COMPARISON_TEMPLATES : str = "flaskr/model/chatbot/corpus_templates/compare_locations.csv"
+"""
+The response templates of the location comparison intents. These intents are
+recognised from the locations an input mentions rather than learnt, so their
+templates are compiled but not trained on.
+"""
+
+template_library : TemplateLibrary = None
+
 
 def generate_training_data() -> list:
     """
@@ -169,70 +222,334 @@ def generate_default_responses() -> dict:
     return dictionary
 
 
+
+#################################################################################################
+##################################### Deferred Chatbot Loading ##################################
+#################################################################################################
+
+
+
+chatbot_loader : LazyResource = None
+
+chatbot_ready : Event = Event()
+"""
+Set once the chatbot is loaded and, if it is warmed up, has answered the warm up
+queries.
+"""
+
+WARM_UP_QUERIES : list = [
+    "Hello",
+    "What's the weather like in {location} right now?",
+    "What is the latest news from {location}?"
+]
+
+
+@with_type_validation(Flask, bool)
+def load_chatbot(app : Flask, warmed_up : bool) -> "GoTravelBot" :
+    """
+    This function imports, creates and if needed trains the chatbot. It is called
+    once, either by the warm up or by the first chat request.
+
+    Parameters:
+        app (Flask): The flask application
+        warmed_up (bool): Whether the chatbot is warmed up once loaded, if not it
+            is ready as soon as it is built
+    """
+
+    with boot_report.phase("import chatbot dependencies") :
+        from ..model.chatbot.GoTravelBot import GoTravelBot
+        from ..model.chatbot.language_model import load_statement_vector_store
+
+    # Application context is used to reduct thread related errors
+    with app.app_context() :
+
+        with boot_report.phase("recommendations") :
+            recommendations : dict = generate_default_responses()
+
+        with boot_report.phase("chatbot") :
+            bot : GoTravelBot = GoTravelBot(BOT_DATABASE, recommendations, template_library)
+
+        with boot_report.phase("corpus") :
+            training_data : list = generate_training_data()
+            version : str = corpus_version(training_data, [COMPARISON_TEMPLATES])
+
+        # The bot is trained once per version of the corpus, so that templates added
+        # or changed since it was trained are learnt
+        if bot.needs_training(version) :
+
+            print("Please wait while the chatbot is trained...")
+
+            with boot_report.phase("training") :
+                bot.train(training_data, version)
+
+            print("Training Complete")
+
+    # The stored statements' vectors are computed once per host, later starts and
+    # worker processes map the same file
+    with boot_report.phase("statement vectors") :
+        load_statement_vector_store(STATEMENT_VECTORS, bot.statement_texts())
+
+    # Inputs are classified by intent first and only searched within its statements
+    with boot_report.phase("intent index") :
+        bot.build_intent_index(INTENT_MARGIN)
+
+    # Without a warm up nothing else would report the chatbot ready
+    if not warmed_up :
+        chatbot_ready.set()
+
+    return bot
+
+
+
+@with_type_validation(object)
+def warm_up_chatbot(bot : "GoTravelBot") -> None :
+    """
+    This function answers a few representative queries so that the language model
+    and the bot's database are loaded before the application reports ready.
+
+    Parameters:
+        bot (GoTravelBot): The loaded chatbot
+    """
+
+    with boot_report.phase("warm up queries") :
+
+        for query in WARM_UP_QUERIES :
+            bot.get_intent(query.format(location=location_names[0]))
+
+    chatbot_ready.set()
+
+    print(f"Application ready: {dumps(boot_report.get_statistics())}")
+
+
+
+def reset_connections() -> None :
+    """
+    This function discards the database connections inherited from the master
+    process, each worker process opens its own.
+    """
+
+    with sql_connector.app.app_context() :
+        sql_connector.db.engine.dispose()
+
+    if chatbot_loader.loaded.is_set() :
+        chatbot_loader.get().bot.storage.engine.dispose()
+
+
+def start_worker() -> None :
+    """
+    This function prepares a pre-fork worker process once it has been forked, its
+    database connections are opened again and its metrics are published to the
+    shared store so that /metrics reports the sum over every worker. Profiling is
+    refused, as each worker would only profile the requests it happens to serve.
+    """
+
+    global prefork_worker
+
+    reset_connections()
+    metrics_registry.share(shared_state)
+    prefork_worker = True
+
+
+
+@with_type_validation(int)
+def stop_worker(pid : int) -> None :
+    """
+    This function is called by the master once a pre-fork worker process has
+    exited, the metrics it published are added to those of the exited workers so
+    that the counters reported by /metrics don't go backwards.
+
+    Parameters:
+        pid (int): The process id of the worker
+    """
+
+    metrics_registry.retire(shared_state, pid)
+
+
+
 #################################################################################################
 ################################## Initialize Flask Application #################################
 #################################################################################################
 
 
-# Initialize flask and set folder paths
-app = Flask(__name__)
-app.template_folder = "../view/templates"
-app.static_folder = "../view/static"
 
+routes : Blueprint = Blueprint("go_travel", __name__)
+sock : Sock = Sock()
 
-# Initialize SQL Connector
+# Chat sessions over the WebSocket channel are closed after this many idle seconds
+SESSION_IDLE_TIMEOUT : float = 600.0
+
+# Initialize SQL Connector - the path is relative to the application's root path
+STORAGE_DATABASE : str = "../../SQLite/storage-database.db"
 sql_connector : SQLConnector = None
 
-try :
-    
-    sql_connector : SQLConnector = SQLConnector(app, "../../SQLite/storage-database.db")
-    sql_connector.initialize_tables()
+# Initialize the external API response cache
+HTTP_CACHE : str = "SQLite/http-cache.db"
+http_cache : HTTPResponseCache = None
 
-except SQLServerError as e :
 
-    print(f"{str(e)} Application exiting...")
-    exit(1)
+# Refreshes are scheduled within each external API's quota
+WEATHER_QUOTA : tuple = (60, 1000)
+NEWS_QUOTA : tuple = (20, 600)
 
-except Exception :
+weather_scheduler : RefreshScheduler = RefreshScheduler("OpenWeather", *WEATHER_QUOTA)
+news_scheduler : RefreshScheduler = RefreshScheduler("Currents", *NEWS_QUOTA)
 
-    print("Something unexpected went wrong. Application exiting...")
-    exit(1)
 
+# Locations within the same grid cell of this size in degrees share one forecast
+# request, 0 requests a forecast for every location
+GRID_CELL_SIZE : float = OpenWeatherConnector.GRID_CELL_SIZE
 
-# The bot is trained at application start up
-try :
 
-    # Application context is used to reduct thread related errors
-    with app.app_context() :
+# Stored data is served while an external API is failing
+weather_breaker : CircuitBreaker = CircuitBreaker("OpenWeather", 3, 60.0)
+news_breaker : CircuitBreaker = CircuitBreaker("Currents", 3, 60.0)
 
-        app.data = generate_default_responses()
-        app.bot = GoTravelBot(BOT_DATABASE, app.data)
-        
-        # The bot is only trained once
-        if not app.bot.trained :
 
-            print("Please wait while the chatbot is trained...")
+# The quotas and circuits are kept in a store shared by every worker process, so
+# that pre-fork workers don't each spend the whole quota
+SHARED_STATE : str = "SQLite/shared-state.db"
+shared_state : SharedState = None
+
+
+# The proportion of chat requests whose stages are timed and logged
+TRACE_SAMPLE_RATE : float = 1.0
+
+
+# Metrics exported by the /metrics endpoint, the SQL, chatbot and external API
+# metrics are defined alongside the code they measure
+chat_duration : Histogram = metrics_registry.histogram(
+    "go_travel_chat_request_duration_seconds", "Time taken to answer chat requests by intent code.", ("intent",),
+    Histogram.DEFAULT_BUCKETS
+)
+
+refresh_duration : Histogram = metrics_registry.histogram(
+    "go_travel_refresh_duration_seconds", "Time taken by each refresh of the stored data by external API.", ("upstream",),
+    (0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+)
+
+
+def cache_hit_ratios() -> dict :
+    """
+    This function returns the proportion of external API requests answered by
+    the response cache without a download, by whether the cached response was
+    fresh or revalidated by the endpoint.
+    """
+
+    statistics : dict = http_cache.get_statistics() if http_cache else {}
+
+    if not statistics.get("requests", 0) :
+        return None
+
+    return {
+        ("fresh",) : statistics["calls_saved"] / statistics["requests"],
+        ("revalidated",) : statistics["revalidated"] / statistics["requests"]
+    }
+
+
+metrics_registry.callback_gauge(
+    "go_travel_http_cache_hit_ratio", "Proportion of external API requests answered by the response cache.", ("kind",),
+    cache_hit_ratios
+)
+
+
+# Live chat requests can be profiled on demand by an administrator, the admin
+# endpoints are disabled unless a token is set in this environment variable
+ADMIN_TOKEN_VARIABLE : str = "GO_TRAVEL_ADMIN_TOKEN"
+admin_token : str = None
+
+request_profiler : RequestProfiler = RequestProfiler()
+
+# A profile only covers the requests of the process recording it, so profiling is
+# refused by pre-fork workers
+prefork_worker : bool = False
+
+
+
+def create_app(warm_up : bool = True) -> Flask :
+    """
+    This function creates the flask application. Only the lightweight dependencies
+    are loaded here, the chatbot is loaded on a background thread when warm up is
+    enabled or otherwise by the first chat request.
+
+    Parameters:
+        warm_up (bool): Whether the chatbot should be loaded in the background
+    """
+
+    global weather_key, news_key, location_registry, locations, location_names, template_library
+    global sql_connector, http_cache, shared_state, chatbot_loader, admin_token
+
+    # Initialize flask and set folder paths
+    app : Flask = Flask(__name__)
+    app.template_folder = "../view/templates"
+    app.static_folder = "../view/static"
+
+    with boot_report.phase("api keys") :
+        weather_key, news_key = load_api_keys()
+        admin_token = os.environ.get(ADMIN_TOKEN_VARIABLE) or None
+
+    with boot_report.phase("locations") :
+        location_registry = load_locations()
+        locations = location_registry.as_rows()
+        location_names = location_registry.names
+
+    # Response templates are compiled once at start up
+    with boot_report.phase("response templates") :
+
+        try :
+            template_library = TemplateLibrary.from_csv(TEMPLATES + [COMPARISON_TEMPLATES])
+        except (FileNotFoundError, InvalidTemplateException) as e :
+            raise ApplicationStartupException(str(e), 1)
+
+    with boot_report.phase("sql connector") :
+
+        try :
             
-            app.bot.train(generate_training_data())
+            sql_connector = SQLConnector(app, STORAGE_DATABASE)
+            sql_connector.initialize_tables()
 
-            print("Training Complete")
+        except SQLServerError as e :
+            raise ApplicationStartupException(str(e), 1)
+        except Exception :
+            raise ApplicationStartupException("Something unexpected went wrong.", 1)
 
-except InvalidTemplateException as e :
+    with boot_report.phase("forecast summaries") :
 
-    print(f"{str(e)} Application exiting...")
-    exit(1)
+        try :
+            summarise_stored_forecast()
+        except (SQLRequestException, SQLServerError) as e :
+            raise ApplicationStartupException(str(e), 1)
 
-except UntrainedChatbotException as e :
+    with boot_report.phase("http cache") :
 
-    print(f"{str(e)} Application exiting...")
-    exit(1)
+        try :
+            http_cache = HTTPResponseCache(HTTP_CACHE)
+        except Exception :
+            raise ApplicationStartupException("The API response cache could not be created.", 1)
 
-except Exception :
+    # State left by a previous run is discarded, its monotonic times are meaningless
+    with boot_report.phase("shared state") :
 
-    print("Something unexpected went wrong. Application exiting...")
-    exit(1)
+        try :
 
+            shared_state = SharedState(SHARED_STATE)
+            shared_state.clear()
 
+        except Exception :
+            raise ApplicationStartupException("The shared quota and circuit state could not be created.", 1)
+
+        for shared in (weather_scheduler, news_scheduler, weather_breaker, news_breaker) :
+            shared.share(shared_state)
+
+    chatbot_loader = LazyResource("chatbot", lambda : load_chatbot(app, warm_up))
+    chatbot_ready.clear()
+
+    app.register_blueprint(routes)
+    sock.init_app(app)
+
+    if warm_up :
+        chatbot_loader.warm_up(warm_up_chatbot)
+
+    return app
 
 
 
@@ -242,12 +559,12 @@ except Exception :
 
 """
 NOTE: only exceptions that the program can be reasonably be expected to recover from have
-been caught and handled using @app.errorhandler functions.
+been caught and handled using @routes.app_errorhandler functions.
 """
 
 
-@app.errorhandler(404)
-def resource_not_found() -> Response:
+@routes.app_errorhandler(404)
+def resource_not_found(e : Exception) -> Response:
     """
     Error handling function defines a specific response to HTTP error
     code 404.
@@ -257,7 +574,7 @@ def resource_not_found() -> Response:
 
 
 
-@app.errorhandler(CurrentNewsRequestException)
+@routes.app_errorhandler(CurrentNewsRequestException)
 def news_request_exception_handler(e : CurrentNewsRequestException) -> Response:
     """
     Error handling function defines a specific response when news data
@@ -271,7 +588,7 @@ def news_request_exception_handler(e : CurrentNewsRequestException) -> Response:
 
 
 
-@app.errorhandler(OpenWeatherRequestException)
+@routes.app_errorhandler(OpenWeatherRequestException)
 def weather_request_exception_handler(e : OpenWeatherRequestException) -> Response:
     """
     Error handling function defines a specific response when an weather
@@ -285,7 +602,7 @@ def weather_request_exception_handler(e : OpenWeatherRequestException) -> Respon
 
 
 
-@app.errorhandler(InvalidORMClassException)
+@routes.app_errorhandler(InvalidORMClassException)
 def invalid_orm_exception_handler(e : InvalidORMClassException) -> Response:
     """
     Error handling function defines a specific response when an invalid
@@ -299,7 +616,7 @@ def invalid_orm_exception_handler(e : InvalidORMClassException) -> Response:
 
 
 
-@app.errorhandler(SQLRequestException)
+@routes.app_errorhandler(SQLRequestException)
 def weather_request_exception_handler(e : SQLRequestException) -> Response:
     """
     Error handling function defines a specific response when an SQL action
@@ -313,7 +630,7 @@ def weather_request_exception_handler(e : SQLRequestException) -> Response:
 
 
 
-@app.errorhandler(SQLServerError)
+@routes.app_errorhandler(SQLServerError)
 def weather_request_exception_handler(e : SQLServerError) -> Response:
     """
     Error handling function defines a specific response when the SQL
@@ -327,37 +644,267 @@ def weather_request_exception_handler(e : SQLServerError) -> Response:
 
 
 
+@routes.app_errorhandler(ChatbotDependencyException)
+@routes.app_errorhandler(UntrainedChatbotException)
+def chatbot_unavailable_exception_handler(e : RuntimeError) -> Response:
+    """
+    Error handling function defines a specific response when the chatbot
+    could not be loaded.
+    """
+
+    error_message : str = f"The chatbot is unavailable: {e.__str__()}. "\
+                           "If the issue persists please contact the server admin."
+
+    return Response(dumps({"error" : error_message}), status=503)
+
+
+
 #################################################################################################
 ################################### Endpoint Utility Functions ##################################
 #################################################################################################
 
 
 
+def mark_stale_data() -> None :
+    """
+    This utility function flags the current request as being answered from stored
+    data that could not be refreshed, refreshes made outside of a request, e.g. at
+    start up, have nothing to flag.
+    """
+
+    if has_request_context() :
+        g.stale_data = True
+
+
+@with_type_validation(list)
+def summarise_forecast(weather_data : list) -> list :
+    """
+    This utility function summarises the daytime weather data of each location
+    and day - the weather at noon along with the day's minimum, maximum and mean
+    temperature and highest chance of rain. Days without a noon forecast are left
+    out, as they were from the weather forecast before.
+
+    Parameters:
+        weather_data (list[Weather]): the weather data to be summarised.
+    """
+
+    days : dict[tuple, list] = {}
+
+    for weather in weather_data :
+
+        # Stored weather data is read back with text dates
+        date_time : datetime = weather.date_time if isinstance(weather.date_time, datetime) \
+                               else datetime.strptime(weather.date_time, "%Y-%m-%d %H:%M:%S.000000")
+
+        if date_time.hour >= 6 and date_time.hour <= 18 :
+            days.setdefault((weather.location, date_time.date()), []).append((date_time, weather))
+
+    summaries : list[DailyForecast] = []
+
+    for (location, day), rows in days.items() :
+
+        noon : Weather | None = next((weather for date_time, weather in rows if date_time.hour == 12), None)
+        temps : list[float] = [weather.temp for date_time, weather in rows if weather.temp is not None]
+        rain_probs : list[float] = [weather.rain_prob for date_time, weather in rows if weather.rain_prob is not None]
+
+        if noon is None :
+            continue
+
+        summaries.append(DailyForecast(
+            location=location,
+            date=day,
+            description=noon.description,
+            temp=noon.temp,
+            min_temp=min(temps, default=None),
+            max_temp=max(temps, default=None),
+            mean_temp=round(sum(temps) / len(temps), 2) if temps else None,
+            rain_prob=max(rain_probs, default=None)
+        ))
+
+    return summaries
+
+
+def summarise_stored_forecast() -> None :
+    """
+    This utility function builds the daily summaries of the stored weather data if
+    there are none, e.g. for a database written before they were introduced.
+    """
+
+    if sql_connector.orm_query(DailyForecast, "SELECT * FROM daily_forecast LIMIT 1", {}, "any_daily_forecast") :
+        return
+
+    weather_data : list[Weather] = sql_connector.bulk_orm_query(Weather, "SELECT * FROM weather", {}, "all_weather")
+
+    if weather_data :
+        sql_connector.bulk_save(DailyForecast, summarise_forecast(weather_data))
+
+
+@traced("refresh")
+@refresh_duration.time(OpenWeatherConnector.UPSTREAM)
 def update_weather_data() -> None :
     """
     This utility function enables a bulk update of the weather data stored for later
-    use.
+    use. If OpenWeather is unavailable the stored data is left in place and flagged
+    as stale.
     """
 
-    weather_connector : OpenWeatherConnector = OpenWeatherConnector(api_key=weather_key)
+    # Deferred requests wait for the quota to refill rather than being deferred again
+    # by every chat request that finds the data out of date
+    if weather_scheduler.backlogged() :
+        mark_stale_data()
+        return
+
+    # While the circuit is open the stored data is served without blocking
+    if not weather_breaker.allow_request() :
+        mark_stale_data()
+        return
+
+    weather_connector : OpenWeatherConnector = None
+    granted : list[list[str]] = []
+    refreshed : list[str] = []
+    reported : bool = False
+
+    # Every exit reports the request's outcome or releases it, so that a half-open
+    # circuit is never left waiting on a trial request that ended in an error
+    try :
+
+        weather_connector = OpenWeatherConnector(weather_key, http_cache, GRID_CELL_SIZE)
+
+        # Only the most requested locations are refreshed once the quota is exhausted
+        requests : list[list[str]] = [
+            [location[0] for location in cell[0]] for cell in weather_connector.group_by_cell(locations)
+        ]
+        granted = weather_scheduler.schedule(requests)
+        scheduled : set[str] = {location for request in granted for location in request}
+        scheduled_locations : list[list] = [location for location in locations if location[0] in scheduled]
+
+        if not scheduled_locations :
+            mark_stale_data()
+            return
+
+        # Cached responses can only be skipped for the locations whose forecast and
+        # daily summaries are already stored
+        weather_connector.stored_locations = {
+            weather.location for weather in sql_connector.bulk_orm_query(Weather, "SELECT * FROM weather GROUP BY location", {}, "stored_weather_locations")
+        } & {
+            summary.location for summary in sql_connector.bulk_orm_query(DailyForecast, "SELECT * FROM daily_forecast GROUP BY location", {}, "stored_forecast_locations")
+        }
+
+        try :
+
+            weather_data : list[Weather] = [
+                weather for forecast in weather_connector.bulk_weather_request(scheduled_locations) for weather in forecast
+            ]
+
+        except OpenWeatherRequestException as e :
+
+            reported = True
+            weather_breaker.record_failure()
+            mark_stale_data()
+            print(f"{str(e)} Serving stored weather data.")
+            return
+
+        reported = True
+        weather_breaker.record_success()
+
+        # Only the locations whose forecast changed are written, along with their daily
+        # summaries
+        if weather_connector.updated_locations :
+            sql_connector.bulk_update(Weather, weather_data, weather_connector.updated_locations)
+            sql_connector.bulk_update(DailyForecast, summarise_forecast(weather_data), weather_connector.updated_locations)
+
+        refreshed = weather_connector.updated_locations + weather_connector.unchanged_locations
+
+        print(f"Weather refresh: {len(scheduled_locations)} locations served by {weather_connector.network_calls} upstream calls, "\
+              f"{weather_scheduler.queue_depth} requests deferred.")
 
-    weather_data : list[Weather] = np.array(weather_connector.bulk_weather_request(locations=locations)).flatten().tolist()
+    finally :
 
-    sql_connector.bulk_save(Weather, weather_data)
+        if not reported :
+            weather_breaker.release()
 
+        # Only the locations that were retrieved and stored are marked as refreshed
+        if granted :
+            weather_scheduler.record_refresh(refreshed, len(granted) - weather_connector.network_calls)
 
 
+@traced("refresh")
+@refresh_duration.time(CurrentNewsConnector.UPSTREAM)
 def update_news_data() -> None :
     """
     This utility function enables a bulk update of the news data stored for later
-    use.
+    use. If Currents is unavailable the stored data is left in place and flagged
+    as stale.
     """
 
-    news_connector : CurrentNewsConnector = CurrentNewsConnector(api_key=news_key)
+    # Deferred requests wait for the quota to refill rather than being deferred again
+    # by every chat request that finds the data out of date
+    if news_scheduler.backlogged() :
+        mark_stale_data()
+        return
+
+    # While the circuit is open the stored data is served without blocking
+    if not news_breaker.allow_request() :
+        mark_stale_data()
+        return
+
+    news_connector : CurrentNewsConnector = None
+    granted : list[list[str]] = []
+    refreshed : list[str] = []
+    reported : bool = False
+
+    # Every exit reports the request's outcome or releases it, so that a half-open
+    # circuit is never left waiting on a trial request that ended in an error
+    try :
+
+        news_connector = CurrentNewsConnector(news_key, http_cache)
+
+        # Only the most requested locations are refreshed once the quota is exhausted
+        granted = news_scheduler.schedule(news_connector.group_into_batches(location_names))
+        scheduled : set[str] = {location for request in granted for location in request}
+        scheduled_locations : list[str] = [location for location in location_names if location in scheduled]
+
+        if not scheduled_locations :
+            mark_stale_data()
+            return
+
+        # Cached responses can only be skipped for the locations whose news is stored
+        news_connector.stored_locations = {
+            news.location for news in sql_connector.bulk_orm_query(News, "SELECT * FROM news GROUP BY location", {}, "stored_news_locations")
+        }
+
+        try :
 
-    news_data : list[News] = [news for news in news_connector.bulk_news_request(locations=location_names) if news]
+            news_data : list[News] = [news for news in news_connector.bulk_news_request(scheduled_locations) if news]
 
-    sql_connector.bulk_save(News, news_data)
+        except CurrentNewsRequestException as e :
+
+            reported = True
+            news_breaker.record_failure()
+            mark_stale_data()
+            print(f"{str(e)} Serving stored news data.")
+            return
+
+        reported = True
+        news_breaker.record_success()
+
+        # Only the locations whose news changed are written
+        if news_connector.updated_locations :
+            sql_connector.bulk_update(News, news_data, news_connector.updated_locations)
+
+        refreshed = news_connector.updated_locations + news_connector.unchanged_locations
+
+        print(f"News refresh: {len(scheduled_locations)} locations served by {news_connector.network_calls} upstream calls, "\
+              f"{news_scheduler.queue_depth} requests deferred.")
+
+    finally :
+
+        if not reported :
+            news_breaker.release()
+
+        # Only the locations that were retrieved and stored are marked as refreshed
+        if granted :
+            news_scheduler.record_refresh(refreshed, len(granted) - news_connector.network_calls)
 
 
 
@@ -371,6 +918,8 @@ def find_best_day(location : str) -> Weather :
         location (str): the location to be searched
     """
 
+    weather_scheduler.record_demand(location)
+
     # If data is out of date update it
     if not date_check_weather() :
         update_weather_data()
@@ -386,7 +935,7 @@ def find_best_day(location : str) -> Weather :
                                 AND location = :location
                                 ORDER BY rain_prob ASC, feels_temp DESC, visibility DESC, wind_speed DESC
                                 """,
-                                {"location" : location})
+                                {"location" : location}, "best_day")
     
     # Filter outcomes - to times between 6am and 6pm
     for weather in forecast :
@@ -427,7 +976,57 @@ def find_best_location() -> Weather :
                         {
                             "date_time_1" : date_time_1,
                             "date_time_2" : date_time_2,
-                        })
+                        }, "best_location")
+
+    # Fix datetime
+    if weather :
+        weather.date_time = datetime.strptime(weather.date_time, "%Y-%m-%d %H:%M:%S.000000").replace(tzinfo=timezone.utc)
+
+    return weather
+
+
+@with_type_validation(str, float)
+def find_best_location_near(location : str, radius_km : float) -> Weather :
+    """
+    This utility function provides a simple mechanism by which the "ideal" location
+    to visit on a given day within a radius of a location is provided. Only the
+    locations found by the spatial index are searched.
+
+    Parameters:
+        location (str): the location at the centre of the search
+        radius_km (float): the search radius in kilometres
+    """
+
+    location_id : int = location_registry.get_id(location)
+
+    if location_id == -1 :
+        return None
+
+    weather_scheduler.record_demand(location)
+
+    # If data is out of date update it
+    if not date_check_weather() :
+        update_weather_data()
+
+    date_time_1 : datetime = datetime.now(timezone.utc).replace(hour=6)
+    date_time_2 : datetime = datetime.now(timezone.utc).replace(hour=18)
+
+    weather : Weather = sql_connector.orm_query(Weather, 
+                        """
+                        SELECT * FROM weather 
+                        WHERE feels_temp < 30 
+                        AND wind_speed <= 8
+                        AND visibility > 4000
+                        AND location IN :locations
+                        AND date_time BETWEEN :date_time_1 AND :date_time_2
+                        ORDER BY rain_prob ASC, feels_temp DESC, visibility DESC, wind_speed DESC
+                        LIMIT 1
+                        """,
+                        {
+                            "locations" : location_registry.nearby(location_id, radius_km),
+                            "date_time_1" : date_time_1,
+                            "date_time_2" : date_time_2,
+                        }, "best_nearby_location")
 
     # Fix datetime
     if weather :
@@ -446,6 +1045,8 @@ def get_current_weather(location : str) -> Weather :
         location (str): the location to retrieve the current weather data for.
     """
 
+    weather_scheduler.record_demand(location)
+
     # If data is out of date update it
     if not date_check_weather() :
         update_weather_data()
@@ -463,7 +1064,7 @@ def get_current_weather(location : str) -> Weather :
                         {
                             "location" : location,
                             "date_time" : date_time
-                        })
+                        }, "current_weather")
     
     # Fix datetime
     if weather :
@@ -476,49 +1077,129 @@ def get_current_weather(location : str) -> Weather :
 def get_weather_forecast(location : str) -> list :
     """
     This utility function provides a simple mechanism by which the weather 
-    forecast can be retrieved for a given location. It returns the weather
-    data for each day at 12:00 noon.
+    forecast can be retrieved for a given location. It returns the daily
+    summaries built when the weather data was refreshed, in date order.
 
     Parameters:
         location (str): the location to retrieve the weather forecast for
     """
 
+    weather_scheduler.record_demand(location)
+
     # If data is out of date update it
     if not date_check_weather() :
         update_weather_data()
 
-    forecast : list[Weather] = sql_connector.bulk_orm_query(Weather, 
+    forecast : list[DailyForecast] = sql_connector.bulk_orm_query(DailyForecast, 
                         """
-                        SELECT * FROM weather
+                        SELECT * FROM daily_forecast
                         WHERE location = :location
-                        ORDER BY date_time ASC
+                        ORDER BY date ASC
                         """,
                         {
                             "location" : location
-                        })
+                        }, "weather_forecast")
 
     # Fix dates
-    for weather in forecast :
-        weather.date_time = datetime.strptime(weather.date_time, "%Y-%m-%d %H:%M:%S.000000").replace(tzinfo=timezone.utc)
-
-    forecast = [weather for weather in forecast if weather.date_time.hour == 12]
+    for summary in forecast :
+        summary.date = date.fromisoformat(str(summary.date))
 
     return forecast
 
 
-@with_type_validation(str)
-def get_current_news(location : str) -> list :
+@with_type_validation(list)
+def get_current_weather_batch(locations : list) -> list :
     """
-    This utility function provides a simple mechanism by which the latest
-    news for given location can be retrieved.
+    This utility function provides a simple mechanism by which the current
+    weather can be retrieved for several locations with a single query.
 
     Parameters:
-        location (str): the location to retrieve the news for
+        locations (list[str]): the locations to retrieve the current weather data for.
     """
 
+    for location in locations :
+        weather_scheduler.record_demand(location)
+
     # If data is out of date update it
-    if not date_check_news() :
-        update_news_data()
+    if not date_check_weather() :
+        update_weather_data()
+
+    date_time : datetime = datetime.now(timezone.utc)
+
+    weather_data : list[Weather] = sql_connector.bulk_orm_query(Weather, 
+                        """
+                        SELECT weather.* FROM weather
+                        JOIN (
+                            SELECT location, MIN(date_time) AS date_time FROM weather
+                            WHERE location IN :locations
+                            AND date_time >= :date_time
+                            GROUP BY location
+                        ) AS next_weather
+                        ON weather.location = next_weather.location
+                        AND weather.date_time = next_weather.date_time
+                        """,
+                        {
+                            "locations" : locations,
+                            "date_time" : date_time
+                        }, "current_weather_batch")
+
+    # Fix datetime
+    for weather in weather_data :
+        weather.date_time = datetime.strptime(weather.date_time, "%Y-%m-%d %H:%M:%S.000000").replace(tzinfo=timezone.utc)
+
+    return weather_data
+
+
+@with_type_validation(list)
+def get_weather_forecast_batch(locations : list) -> list :
+    """
+    This utility function provides a simple mechanism by which the weather
+    forecast can be retrieved for several locations with a single query. It
+    returns their daily summaries in date order.
+
+    Parameters:
+        locations (list[str]): the locations to retrieve the weather forecast for
+    """
+
+    for location in locations :
+        weather_scheduler.record_demand(location)
+
+    # If data is out of date update it
+    if not date_check_weather() :
+        update_weather_data()
+
+    forecast : list[DailyForecast] = sql_connector.bulk_orm_query(DailyForecast, 
+                        """
+                        SELECT * FROM daily_forecast
+                        WHERE location IN :locations
+                        ORDER BY date ASC
+                        """,
+                        {
+                            "locations" : locations
+                        }, "weather_forecast_batch")
+
+    # Fix dates
+    for summary in forecast :
+        summary.date = date.fromisoformat(str(summary.date))
+
+    return forecast
+
+
+@with_type_validation(str)
+def get_current_news(location : str) -> list :
+    """
+    This utility function provides a simple mechanism by which the latest
+    news for given location can be retrieved.
+
+    Parameters:
+        location (str): the location to retrieve the news for
+    """
+
+    news_scheduler.record_demand(location)
+
+    # If data is out of date update it
+    if not date_check_news() :
+        update_news_data()
 
     news : News = sql_connector.orm_query(News, 
                         """
@@ -528,12 +1209,12 @@ def get_current_news(location : str) -> list :
                         """,
                         {
                             "location" : location
-                        })
+                        }, "current_news")
     
     return news
 
 
-
+@traced("freshness")
 def date_check_news() -> bool:
     """
     This function verifies whether the news data in the database needs to be
@@ -545,7 +1226,7 @@ def date_check_news() -> bool:
                         SELECT * FROM news
                         ORDER BY date_time ASC
                         LIMIT 1
-                        """, {})
+                        """, {}, "oldest_news")
     
     uptodate : bool = False
 
@@ -557,7 +1238,7 @@ def date_check_news() -> bool:
     return uptodate
 
 
-
+@traced("freshness")
 def date_check_weather() -> bool:
     """
     This function verifies whether the weather data in the database needs to be
@@ -569,7 +1250,7 @@ def date_check_weather() -> bool:
                         SELECT * FROM weather
                         ORDER BY date_time ASC
                         LIMIT 1
-                        """, {})
+                        """, {}, "oldest_weather")
     
     uptodate : bool = False
 
@@ -589,139 +1270,151 @@ def date_check_weather() -> bool:
 
 
 
+DEFAULT_SEARCH_RADIUS_KM : float = 50.0
+KM_PER_MILE : float = 1.609344
+DISTANCE_PATTERN : re.Pattern = re.compile(r"(\d+(?:\.\d+)?)\s*(km|kilomet(?:er|re)s?|miles?)\b", re.IGNORECASE)
+MAX_COMPARED_LOCATIONS : int = 10
+COMPARISON_PATTERN : re.Pattern = re.compile(r"\b(warmer|colder|hotter|cooler|sunnier|wetter|drier|compare[sd]?|comparison|versus|vs)\b", re.IGNORECASE)
+FORECAST_PATTERN : re.Pattern = re.compile(r"\b(forecast|tomorrow|week|weekend|next few days|coming days)\b", re.IGNORECASE)
+
+
+
 @with_type_validation(str)
-def current_weather_response(response : str) -> Response :
+def chat_response(output : str) -> Response :
     """
-    This function returns a json encoded HTTP response containing
-    the chat bot's populated response - the current weather at a
-    specified location.
+    This function returns a json encoded HTTP response containing the chat
+    bot's output, flagged as stale if it was populated from stored data that
+    could not be refreshed.
 
     Parameters:
-        response (str): The chat bot's response
+        output (str): The chat bot's populated response
+    """
+
+    return Response(dumps({"Go Travel Bot" : output, "stale" : g.get("stale_data", False)}), status=200)
+
+
+
+@with_type_validation(IntentResult)
+def current_weather_parts(intent : IntentResult) -> Iterator :
+    """
+    This function yields the chat bot's populated response - the
+    current weather at a specified location.
+
+    Parameters:
+        intent (IntentResult): The chat bot's structured response
     """
 
-    
     output : str = None
-    location_match : list | None = re.findall(r"\{(.+?)\}", response)
-    weather : Weather = None
+    weather : Weather | None = None
     
-    if len(location_match) == 3 :
+    if intent.location :
 
-        weather : Weather = get_current_weather(location_match[1])
+        weather = get_current_weather(intent.location)
 
     # Create response or default response
     if weather :
 
-        output = re.sub(r"\{weather_description\}", weather.description, response)
-        output = re.sub(r"\{temp\}", str(weather.temp), output)
-        output = re.sub(r"\{|\}", "", output)
+        output = intent.render({"weather_description" : weather.description, "temp" : weather.temp})
 
-    elif location_match :
+    elif intent.location :
 
-        output = f"Sorry weather data could not be retrieved for {location_match.group(1)}."
+        output = f"Sorry weather data could not be retrieved for {intent.location}."
 
     else :
 
         output = "Sorry something went wrong..."
 
-    return Response(dumps({"Go Travel Bot" : output}), status=200)
+    yield output
 
 
-@with_type_validation(str)
-def weather_forecast_response(response : str) -> Response :
+@with_type_validation(IntentResult)
+def weather_forecast_parts(intent : IntentResult) -> Iterator :
     """
-    This function returns a json encoded HTTP response containing
-    the chat bot's populated response - the weather forecast for
-    a given location.
+    This function yields the chat bot's populated response - the
+    weather forecast for a given location, one line at a time.
 
     Parameters:
-        response (str): The chat bot's response
+        intent (IntentResult): The chat bot's structured response
     """
 
-    output : str = response
-    location_match : re.Match[str] | None = re.search(r"\{(.+?)\}", response)
-    list_match : re.Match[str] | None = re.search(r"\[(.+?)\]", response)
-    forecast : list[Weather] = []
-    template : str | None = None
+    output : str = None
+    forecast : list[DailyForecast] = []
 
-    if location_match and list_match :
+    if intent.location and intent.template.item :
 
-        forecast : list[Weather] = get_weather_forecast(location_match.group(1))
-        template : str = list_match.group(0)
+        forecast = get_weather_forecast(intent.location)
 
-    # Create response or default response
+    # Create response or default response - each day is yielded on its own
     if len(forecast) > 0 :
 
-        for weather in forecast :
-            temp : str = re.sub(r"\{weekday\}", weather.date_time.strftime("%A"), template)
-            temp = re.sub(r"\{description\}", weather.description, temp)
-            temp = re.sub(r"\{temp\}", str(weather.temp), temp)
-            output += f"\n{temp}"
-        
-        output = re.sub(list_match.group(1), "", output)
-        output = re.sub(r"\[|\]", "", output)
-        output = re.sub(r"\{|\}", "", output)
+        yield from intent.render_parts({}, [
+            {
+                "weekday" : summary.date.strftime("%A"),
+                "description" : summary.description,
+                "temp" : summary.temp,
+                "min_temp" : summary.min_temp,
+                "max_temp" : summary.max_temp,
+                "mean_temp" : summary.mean_temp,
+                "rain_chance" : round(summary.rain_prob * 100) if summary.rain_prob is not None else 0
+            } for summary in forecast
+        ])
+
+        return
 
-    elif location_match and list_match :
+    elif intent.location and intent.template.item :
 
-        output = f"Sorry the weather forecast couldn't be retrieved for {location_match.group(1)}."
+        output = f"Sorry the weather forecast couldn't be retrieved for {intent.location}."
 
     else :
 
         raise InvalidTemplateException("Sorry something went wrong while populating the response.")
 
-
-    return Response(dumps({"Go Travel Bot" : output}), status=200)
+    yield output
 
 
 
-@with_type_validation(str)
-def best_day_response(response : str) -> Response :
+@with_type_validation(IntentResult)
+def best_day_parts(intent : IntentResult) -> Iterator :
     """
-    This function returns a json encoded HTTP response containing
-    the chat bot's populated response - the best day to visit a 
-    a given location.
+    This function yields the chat bot's populated response - the
+    best day to visit a given location.
 
     Parameters:
-        response (str): The chat bot's response
+        intent (IntentResult): The chat bot's structured response
     """
 
     output : str = None
-    location_match : re.Match[str] | None  = re.search(r"\{(.+?)\}", response)
     weather : Weather | None = None
 
-    if location_match :   
-        weather : Weather = find_best_day(location_match.group(1))
+    if intent.location :   
+        weather = find_best_day(intent.location)
 
     # Create response or default response
     if weather :
 
-        output = re.sub(r"\{day\}", weather.date_time.strftime("%A"), response)
-        output = re.sub(r"\{time\}", weather.date_time.strftime("%I:00 %p"), output)
-        output = re.sub(r"\{|\}", "", output)
+        output = intent.render({"day" : weather.date_time.strftime("%A"), "time" : weather.date_time.strftime("%I:00 %p")})
 
-    elif location_match :
+    elif intent.location :
 
-        output =  f"Sorry, conditions are too poor for travelling to {location_match.group(1)} "\
+        output =  f"Sorry, conditions are too poor for travelling to {intent.location} "\
                         "for the next few days."
         
     else :
 
         raise InvalidTemplateException("Sorry something went wrong while populating the response.")
 
-    return Response(dumps({"Go Travel Bot" : output}), status=200)
+    yield output
 
 
 
-@with_type_validation(str)
-def best_location_response(response : str) -> Response :
+@with_type_validation(IntentResult)
+def best_location_parts(intent : IntentResult) -> Iterator :
     """
-    This function returns a json encoded HTTP response containing
-    the chat bot's populated response - the best location to visit 
-    today.
+    This function yields the chat bot's populated response - the
+    best location to visit today.
 
     Parameters:
-        response (str): The chat bot's response
+        intent (IntentResult): The chat bot's structured response
     """
 
     output : str = None
@@ -730,52 +1423,414 @@ def best_location_response(response : str) -> Response :
     # Create response or default response
     if weather :
 
-        output = re.sub(r"\{unknown-location\}", weather.location, response)
+        output = intent.render({"unknown-location" : weather.location})
 
     else :
 
         output = "Sorry, either it is too late in the day or conditions are to poor "\
                  "to travel today."
 
-    return Response(dumps({"Go Travel Bot" : output}), status=200)
+    yield output
+
+
+
+@with_type_validation(IntentResult, str)
+def best_nearby_location_parts(intent : IntentResult, user_input : str) -> Iterator :
+    """
+    This function yields the chat bot's populated response - the
+    best location to visit today near a given location. The search
+    radius is taken from the user's input if one was given.
+
+    Parameters:
+        intent (IntentResult): The chat bot's structured response
+        user_input (str): The user's plain text input
+    """
+
+    output : str = None
+    weather : Weather | None = None
+    radius_km : float = DEFAULT_SEARCH_RADIUS_KM
+
+    distance_match : re.Match[str] | None = DISTANCE_PATTERN.search(user_input)
+
+    if distance_match :
+        radius_km = float(distance_match.group(1)) * (KM_PER_MILE if distance_match.group(2).lower().startswith("mile") else 1.0)
+
+    if intent.location :
+        weather = find_best_location_near(intent.location, radius_km)
+
+    # Create response or default response
+    if weather :
+
+        output = intent.render({"nearby-location" : weather.location, "distance" : f"{radius_km:g}"})
+
+    elif intent.location :
+
+        output = f"Sorry, conditions are too poor to travel anywhere within {radius_km:g} km "\
+                 f"of {intent.location} today."
+
+    else :
+
+        raise InvalidTemplateException("Sorry something went wrong while populating the response.")
+
+    yield output
 
 
 
 @with_type_validation(str)
-def current_news_response(response : str) -> Response :
+def compared_locations(user_input : str) -> list :
+    """
+    This function returns the distinct locations mentioned in the user's input,
+    in the order they were mentioned, up to the number that can be compared.
+
+    Parameters:
+        user_input (str): The user's plain text input
+    """
+
+    names : list[str] = list(dict.fromkeys(mention.name for mention in location_registry.find_all(user_input)))
+
+    return names[:MAX_COMPARED_LOCATIONS]
+
+
+@with_type_validation(IntentResult, str)
+def compare_weather_parts(intent : IntentResult, user_input : str) -> Iterator :
+    """
+    This function yields the chat bot's populated response - the
+    current weather in each location mentioned, fetched with a single
+    query, one location at a time.
+
+    Parameters:
+        intent (IntentResult): The chat bot's structured response
+        user_input (str): The user's plain text input
+    """
+
+    output : str = None
+    names : list[str] = compared_locations(user_input)
+    weather_data : dict[str, Weather] = {}
+
+    if names and intent.template.item :
+
+        weather_data = {weather.location : weather for weather in get_current_weather_batch(names)}
+
+    # Create response or default response - each location is yielded on its own
+    if weather_data :
+
+        weather_data = {name : weather_data[name] for name in names if name in weather_data}
+        warmest : Weather = max(weather_data.values(), key=lambda weather : weather.temp if weather.temp is not None else float("-inf"))
+
+        yield from intent.render_parts({"warmest-location" : warmest.location}, [
+            {
+                "compared-location" : weather.location,
+                "weather_description" : weather.description,
+                "temp" : weather.temp
+            } for weather in weather_data.values()
+        ])
+
+        return
+
+    elif names :
+
+        output = f"Sorry weather data could not be retrieved for {', '.join(names)}."
+
+    else :
+
+        raise InvalidTemplateException("Sorry something went wrong while populating the response.")
+
+    yield output
+
+
+@with_type_validation(IntentResult, str)
+def compare_forecast_parts(intent : IntentResult, user_input : str) -> Iterator :
     """
-    This function returns a json encoded HTTP response containing
-    the chat bot's populated response - the latest news from a given
-    location.
+    This function yields the chat bot's populated response - the
+    weather forecast of each location mentioned, fetched with a single
+    query, one day at a time.
 
     Parameters:
-        response (str): The chat bot's response
+        intent (IntentResult): The chat bot's structured response
+        user_input (str): The user's plain text input
+    """
+
+    output : str = None
+    names : list[str] = compared_locations(user_input)
+    days : dict[date, dict] = {}
+
+    if names and intent.template.item :
+
+        for summary in get_weather_forecast_batch(names) :
+            days.setdefault(summary.date, {})[summary.location] = summary
+
+    # Create response or default response - each day is yielded on its own
+    if days :
+
+        temps : dict[str, list] = {}
+
+        for summaries in days.values() :
+            for summary in summaries.values() :
+
+                if summary.temp is not None :
+                    temps.setdefault(summary.location, []).append(summary.temp)
+
+        warmest : str = max(temps, key=lambda name : sum(temps[name]) / len(temps[name])) if temps else names[0]
+
+        yield from intent.render_parts({"warmest-location" : warmest}, [
+            {
+                "weekday" : day.strftime("%A"),
+                "forecasts" : "; ".join(
+                    f"{name}: {summaries[name].description} at {summaries[name].temp} °C" for name in names if name in summaries
+                )
+            } for day, summaries in days.items()
+        ])
+
+        return
+
+    elif names :
+
+        output = f"Sorry the weather forecast couldn't be retrieved for {', '.join(names)}."
+
+    else :
+
+        raise InvalidTemplateException("Sorry something went wrong while populating the response.")
+
+    yield output
+
+
+@with_type_validation(IntentResult)
+def current_news_parts(intent : IntentResult) -> Iterator :
+    """
+    This function yields the chat bot's populated response - the
+    latest news from a given location.
+
+    Parameters:
+        intent (IntentResult): The chat bot's structured response
     """
 
     output : str = None
-    location_match : re.Match[str] | None = re.search(r"\{(.+?)\}", response)
     news : News | None = None
 
-    if location_match :
+    if intent.location :
 
-        news : News = get_current_news(location_match.group(1))
+        news = get_current_news(intent.location)
 
     # Create response or default response
     if news :    
 
-        output = re.sub(r"\{title\}", news.title, response)
-        output = re.sub(r"\{|\}", "", output)
+        output = intent.render({"title" : news.title})
 
-    elif location_match :
+    elif intent.location :
 
-        output = f"Sorry I couldn't retrieve the latest news for {location_match.group(1)}, maybe ask "\
+        output = f"Sorry I couldn't retrieve the latest news for {intent.location}, maybe ask "\
                   "about somewhere else."
         
     else :
 
         raise InvalidTemplateException("Sorry something went wrong while populating the response.")
 
-    return Response(dumps({"Go Travel Bot" : output}), status=200)
+    yield output
+
+
+
+PROVISIONAL_MESSAGES : dict = {
+    1 : "Checking the current weather in {location}...",
+    2 : "Looking up the weather forecast for {location}...",
+    3 : "Looking for the best day to visit {location}...",
+    4 : "Looking for the best place to visit today...",
+    5 : "Looking up the latest news from {location}...",
+    6 : "Looking for the best place to visit near {location}...",
+    7 : "Comparing the current weather in each location...",
+    8 : "Comparing the weather forecast for each location..."
+}
+"""
+The message shown by a streamed chat for each intent while its response is
+being populated.
+"""
+
+
+
+@with_type_validation(str)
+def match_intent(user_input : str) -> IntentResult :
+    """
+    This function returns the chat bot's structured response to the user's
+    input, the intent it matched and the location it refers to.
+
+    Parameters:
+        user_input (str): The user's plain text input
+    """
+
+    # Get response from chatbot - the first request waits if it is still loading
+    with trace_stage("bot") :
+        bot : GoTravelBot = chatbot_loader.get()
+
+    intent : IntentResult = bot.get_intent(user_input)
+    g.intent = intent.intent
+
+    # The matched statement may belong to a similar location, the location the
+    # user actually mentioned takes precedence.
+    if intent.template :
+
+        mentions : list = location_registry.find_all(user_input)
+
+        if len(mentions) == 1 :
+            intent.location = mentions[0].name
+
+    intent = compare_intent(intent, user_input)
+    g.intent = intent.intent
+
+    return intent
+
+
+
+@with_type_validation(IntentResult, str)
+def compare_intent(intent : IntentResult, user_input : str) -> IntentResult :
+    """
+    This function turns the chat bot's structured response into a location
+    comparison if the user's input asks about the weather in several locations,
+    e.g. "Is it warmer in Oxford or Cambridge?". Any other response is returned
+    as it is.
+
+    Parameters:
+        intent (IntentResult): The chat bot's structured response
+        user_input (str): The user's plain text input
+    """
+
+    if intent.intent not in (1, 2) and not COMPARISON_PATTERN.search(user_input) :
+        return intent
+
+    if len(compared_locations(user_input)) < 2 :
+        return intent
+
+    code : int = 8 if intent.intent == 2 or FORECAST_PATTERN.search(user_input) else 7
+    template : ResponseTemplate | None = template_library.for_intent(code)
+
+    return IntentResult(code, None, template, template.text) if template else intent
+
+
+
+@with_type_validation(IntentResult, str)
+def respond(intent : IntentResult, user_input : str) -> Iterator :
+    """
+    This function yields the chat bot's populated response to a matched
+    intent, in the parts it can be sent in.
+
+    Parameters:
+        intent (IntentResult): The chat bot's structured response
+        user_input (str): The user's plain text input
+    """
+
+    # Populate response templates
+    if intent.intent == 1 :
+
+        return current_weather_parts(intent)
+
+    elif intent.intent == 2 :
+
+        return weather_forecast_parts(intent)
+
+    elif intent.intent == 3 :
+
+        return best_day_parts(intent)
+
+    elif intent.intent == 4 :
+
+        return best_location_parts(intent)
+
+    elif intent.intent == 5 :
+
+        return current_news_parts(intent)
+
+    elif intent.intent == 6 :
+
+        return best_nearby_location_parts(intent, user_input)
+
+    elif intent.intent == 7 :
+
+        return compare_weather_parts(intent, user_input)
+
+    elif intent.intent == 8 :
+
+        return compare_forecast_parts(intent, user_input)
+
+    return iter([intent.text])
+
+
+
+@with_type_validation(str, dict)
+def sse_event(name : str, data : dict) -> str :
+    """
+    This function formats a Server-Sent Event whose data is json encoded.
+
+    Parameters:
+        name (str): The name of the event
+        data (dict): The event's data
+    """
+
+    return f"event: {name}\ndata: {dumps(data)}\n\n"
+
+
+
+@with_type_validation(ChatSession, str)
+def match_session_intent(session : ChatSession, user_input : str) -> IntentResult :
+    """
+    This function returns the chat bot's structured response to the user's
+    input within a chat session. Follow ups to the session's previous question
+    are answered from its context without searching the chat bot's statements.
+
+    Parameters:
+        session (ChatSession): The user's chat session
+        user_input (str): The user's plain text input
+    """
+
+    intent : IntentResult | None = session.follow_up(user_input)
+
+    if intent is None :
+        intent = session.contextualise(match_intent(user_input), user_input)
+
+    session.remember(intent)
+    g.intent = intent.intent
+
+    return intent
+
+
+
+@with_type_validation(str, object)
+def chat_events(user_input : str, match : Callable) -> Iterator :
+    """
+    This function yields the events of a streamed chat response as (name, data)
+    pairs - the matched intent and a provisional message, each part of the
+    populated response as it is created and finally the whole response. Errors
+    are yielded as an event carrying the message of the error's handler, as the
+    response has already started.
+
+    Parameters:
+        user_input (str): The user's plain text input
+        match (Callable): Returns the chat bot's structured response to the input
+    """
+
+    try :
+
+        intent : IntentResult = match(user_input)
+        message : str = PROVISIONAL_MESSAGES.get(intent.intent, "").format(location=intent.location or "your location")
+
+        yield "intent", {"intent" : intent.intent, "location" : intent.location, "message" : message}
+
+        parts : list[str] = []
+
+        for part in respond(intent, user_input) :
+
+            parts.append(part)
+            yield "part", {"text" : part}
+
+        yield "message", {"Go Travel Bot" : "".join(parts), "stale" : g.get("stale_data", False)}
+
+    except Exception as e :
+
+        error : dict = {}
+
+        try :
+            error = current_app.handle_user_exception(e).get_json(force=True, silent=True) or {}
+        except Exception as unhandled :
+            print(f"Streamed chat failed: {unhandled!r}")
+
+        yield "error", {"error" : error.get("error", "Sorry something went wrong please try again...")}
 
 
 
@@ -785,14 +1840,14 @@ def current_news_response(response : str) -> Response :
 
 
 
-@app.route("/data/update", methods=["POST"])
+@routes.route("/data/update", methods=["POST"])
 def update() -> Response :
     """
     This endpoint forces the most recent data to be retrieved and the
     database to be updated.
     """
 
-    update_news_data()
+    update_weather_data()
     update_news_data()
 
     return Response(status=204)
@@ -800,57 +1855,292 @@ def update() -> Response :
 
 
 
-@app.route("/chat/<user_input>", methods=["GET"])
-def chatbot(user_input : str) -> Response :
+@routes.route("/data/cache", methods=["GET"])
+def cache_statistics() -> Response :
+    """
+    This endpoint reports the number of external API calls and bytes saved by
+    the response cache.
+    """
+
+    return Response(dumps(http_cache.get_statistics()), status=200, content_type="application/json")
+
+
+
+@routes.route("/data/scheduler", methods=["GET"])
+def scheduler_statistics() -> Response :
+    """
+    This endpoint reports the queue depth and throttling of the refresh
+    scheduler for each external API.
+    """
+
+    statistics : dict = {
+        weather_scheduler.name : weather_scheduler.get_statistics(),
+        news_scheduler.name : news_scheduler.get_statistics()
+    }
+
+    return Response(dumps(statistics), status=200, content_type="application/json")
+
+
+
+@routes.route("/data/circuits", methods=["GET"])
+def circuit_statistics() -> Response :
+    """
+    This endpoint reports the circuit breaker state for each external API.
+    """
+
+    statistics : dict = {
+        weather_breaker.name : weather_breaker.get_statistics(),
+        news_breaker.name : news_breaker.get_statistics()
+    }
+
+    return Response(dumps(statistics), status=200, content_type="application/json")
+
+
+
+@routes.route("/metrics", methods=["GET"])
+def metrics() -> Response :
+    """
+    This endpoint exports the chat, chatbot, SQL, external API and response cache
+    metrics in the Prometheus text format.
+    """
+
+    return Response(metrics_registry.collect(), status=200, content_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+
+def admin_error() -> Response :
+    """
+    This function returns an error response unless the request carries the admin
+    token as a bearer token. The admin endpoints are not found while no token is set.
+    """
+
+    if not admin_token :
+        return Response(dumps({"error" : "Error: resource could not be found."}), status=404)
+
+    if not compare_digest(request.headers.get("Authorization", "").encode(), f"Bearer {admin_token}".encode()) :
+        return Response(dumps({"error" : "Error: the admin token is missing or invalid."}), status=401, headers={"WWW-Authenticate" : "Bearer"})
+
+    return None
+
+
+
+def profiling_error() -> Response :
+    """
+    This function returns an error response unless the request may use the
+    profiling endpoints, i.e. it carries the admin token and the application is
+    served by a single process.
+    """
+
+    error : Response = admin_error()
+
+    if error :
+        return error
+
+    if prefork_worker :
+        return Response(
+            dumps({"error" : "Error: profiling is only available with a single worker, restart the application with --workers 1."}),
+            status=501, content_type="application/json"
+        )
+
+    return None
+
+
+
+@routes.route("/admin/profile", methods=["POST"])
+def start_profile() -> Response :
+    """
+    This endpoint starts profiling live chat requests, either the next number of
+    requests or those in a time window e.g. ?mode=sampling&requests=50 or
+    ?mode=cprofile&seconds=30.
+    """
+
+    error : Response = profiling_error()
+
+    if error :
+        return error
+
+    try :
+
+        request_profiler.start(
+            request.args.get("mode", RequestProfiler.SAMPLING),
+            request.args.get("requests", 0, type=int),
+            request.args.get("seconds", 0.0, type=float)
+        )
+
+    except ValueError as e :
+        return Response(dumps({"error" : f"Error: {str(e)}"}), status=400, content_type="application/json")
+    except RuntimeError as e :
+        return Response(dumps({"error" : f"Error: {str(e)}"}), status=409, content_type="application/json")
+
+    return Response(dumps(request_profiler.get_statistics()), status=202, content_type="application/json")
+
+
+
+@routes.route("/admin/profile", methods=["GET"])
+def profile_statistics() -> Response :
+    """
+    This endpoint reports the state of the profile, the time attributed to the
+    chatbot, the SQL connector and the external API connectors, and the functions
+    the most time was spent in.
+    """
+
+    error : Response = profiling_error()
+
+    if error :
+        return error
+
+    return Response(dumps(request_profiler.get_statistics()), status=200, content_type="application/json")
+
+
+
+@routes.route("/admin/profile/dump", methods=["GET"])
+def profile_dump() -> Response :
+    """
+    This endpoint returns the recorded profile, a pstats file for cprofile or
+    collapsed stacks for flame graphs for sampling.
+    """
+
+    error : Response = profiling_error()
+
+    if error :
+        return error
+
+    dump : bytes | None = request_profiler.dump()
+
+    if dump is None :
+        return Response(dumps({"error" : "Error: no profile has been recorded."}), status=404, content_type="application/json")
+
+    extension : str = "pstats" if request_profiler.mode == RequestProfiler.CPROFILE else "collapsed"
+
+    return Response(
+        dump, status=200, content_type="application/octet-stream" if extension == "pstats" else "text/plain; charset=utf-8",
+        headers={"Content-Disposition" : f"attachment; filename=chat-profile.{extension}"}
+    )
+
+
+
+@routes.route("/healthz", methods=["GET"])
+def healthz() -> Response :
+    """
+    This endpoint reports that the application is alive, it responds as soon as
+    the application is created.
     """
-    This endpoint is the api endpoint to the GoTravel Chat Bot.
+
+    return Response(dumps({"status" : "ok"}), status=200, content_type="application/json")
+
+
+
+@routes.route("/readyz", methods=["GET"])
+def readyz() -> Response :
+    """
+    This endpoint reports whether the chatbot is loaded and has answered its warm
+    up queries, along with the time taken by each start up phase.
+    """
+
+    status : str = "ready"
+
+    if not chatbot_ready.is_set() :
+        status = "failed" if chatbot_loader.error else "warming up"
+
+    report : dict = {"status" : status, "boot" : boot_report.get_statistics()}
+
+    if chatbot_loader.error :
+        report["error"] = str(chatbot_loader.error)
+
+    return Response(dumps(report), status=200 if chatbot_ready.is_set() else 503, content_type="application/json")
+
+
+
+@routes.before_request
+def start_chat_trace() -> None :
+    """
+    This function starts timing each chat request, the stages of a sample of them
+    are recorded.
+    """
+
+    if request.endpoint == "go_travel.chatbot" :
+        g.trace, g.trace_token = start_trace(TRACE_SAMPLE_RATE)
+
+
+
+@routes.after_request
+def report_chat_trace(http_response : Response) -> Response :
+    """
+    This function reports the time taken by each stage of a chat request in its
+    Server-Timing header and, if it was sampled, as a json log line.
 
     Parameters:
-        user_input (str): The user's plain text input.
+        http_response (Response): The response to the chat request
     """
-    
-    # Get response from chatbot - re-intialize may help bot context
-    app.bot = GoTravelBot(BOT_DATABASE, app.data)
 
-    response : str = app.bot.get_response(user_input)
-    
-    # Determine the template type
-    match : re.Match[str] | None = re.search(r"#(.)#", response)
-    code : int = 0
+    if "trace" in g :
 
-    if match :
+        g.trace.finish()
+        http_response.headers["Server-Timing"] = g.trace.server_timing()
+        chat_duration.observe(g.trace.total_ms() / 1000, str(g.get("intent", "none")))
 
-        code = match.group(1)
-        response = re.sub(r"#.# ", "", response, count=2)
+        if g.trace.sampled :
+            print(f"Chat trace: {g.trace.to_log(intent=g.get('intent'), status=http_response.status_code, stale=g.get('stale_data', False))}")
 
-    http_response : Response = None
+    return http_response
 
-    # Populate response templates
-    if code == "1" :
-        
-        http_response = current_weather_response(response)
 
-    elif code == "2" :
 
-        http_response = weather_forecast_response(response)
+@routes.teardown_request
+def end_chat_trace(e : Exception) -> None :
+    """
+    This function stops recording the stages of a chat request.
 
-    elif code == "3" :
+    Parameters:
+        e (Exception): The exception that ended the request, if any
+    """
 
-        http_response = best_day_response(response)
-        
-    elif code == "4" :
+    if "trace_token" in g :
+        end_trace(g.pop("trace_token"))
 
-        http_response = best_location_response(response)
 
-    elif code == "5" :
 
-        http_response = current_news_response(response)
+@routes.before_request
+def start_chat_profile() -> None :
+    """
+    This function starts profiling a chat request if a profile is being recorded.
+    """
+
+    if request_profiler.active and request.endpoint == "go_travel.chatbot" :
+        g.profile = request_profiler.begin_request()
+
+
+
+@routes.teardown_request
+def end_chat_profile(e : Exception) -> None :
+    """
+    This function stops profiling a chat request.
+
+    Parameters:
+        e (Exception): The exception that ended the request, if any
+    """
+
+    if g.get("profile") is not None :
+        request_profiler.end_request(g.pop("profile"))
+
 
-    else :
 
-        http_response = Response(dumps({"Go Travel Bot" : response}), status=200)
+@routes.route("/chat/<user_input>", methods=["GET"])
+def chatbot(user_input : str) -> Response :
+    """
+    This endpoint is the api endpoint to the GoTravel Chat Bot.
+
+    Parameters:
+        user_input (str): The user's plain text input.
+    """
+    
+    intent : IntentResult = match_intent(user_input)
+    http_response : Response = chat_response("".join(respond(intent, user_input)))
 
     # Set Headers
+    if g.get("stale_data", False) :
+        http_response.headers["Warning"] = '110 - "Response is Stale"'
+
     http_response.access_control_allow_origin = "*"
     http_response.content_language = "en"
     http_response.content_type = "application/json"
@@ -859,7 +2149,77 @@ def chatbot(user_input : str) -> Response :
 
 
 
-@app.route("/", methods=["GET","POST"])
+@routes.route("/chat/<user_input>/stream", methods=["GET"])
+def chatbot_stream(user_input : str) -> Response :
+    """
+    This endpoint streams the GoTravel Chat Bot's response as Server-Sent Events.
+    The matched intent and a provisional message are sent straight away, followed
+    by the populated response in parts as it is created (e.g. one event per day of
+    a forecast) and finally the whole response.
+
+    Events:
+        intent: {"intent", "location", "message"} - the provisional message.
+        part: {"text"} - the next part of the response.
+        message: {"Go Travel Bot", "stale"} - the whole response, as /chat returns it.
+        error: {"error"} - the error message if the response failed.
+
+    Parameters:
+        user_input (str): The user's plain text input.
+    """
+
+    events : Iterator = (sse_event(name, data) for name, data in chat_events(user_input, match_intent))
+
+    http_response : Response = Response(stream_with_context(events), status=200, content_type="text/event-stream")
+
+    http_response.access_control_allow_origin = "*"
+    http_response.content_language = "en"
+    http_response.headers["Cache-Control"] = "no-cache"
+    http_response.headers["X-Accel-Buffering"] = "no"
+
+    return http_response
+
+
+
+@sock.route("/chat/ws", bp=routes)
+def chatbot_socket(ws : Server) -> None :
+    """
+    This endpoint is a WebSocket channel to the GoTravel Chat Bot that is kept
+    open for a whole chat session. Each message sent is the user's plain text
+    input, and is answered with the same events as /chat/<user_input>/stream, as
+    json objects whose "event" is the event name. The session remembers the last
+    question and location, so follow ups such as "and tomorrow?" are answered
+    without searching the chat bot's statements. Idle sessions are closed.
+
+    Parameters:
+        ws (Server): The WebSocket connection.
+    """
+
+    session : ChatSession = ChatSession(template_library, location_registry)
+
+    while True :
+
+        user_input : str | bytes | None = ws.receive(timeout=SESSION_IDLE_TIMEOUT)
+
+        if user_input is None :
+            break
+
+        if isinstance(user_input, bytes) :
+            user_input = user_input.decode("utf-8", errors="replace")
+
+        # Each message is answered as a request of its own
+        start : float = perf_counter()
+        g.pop("stale_data", None)
+
+        for name, data in chat_events(user_input, lambda text : match_session_intent(session, text)) :
+            ws.send(dumps({"event" : name, **data}))
+
+        chat_duration.observe(perf_counter() - start, str(g.pop("intent", "none")))
+
+    ws.close(reason=1000, message="Session idle")
+
+
+
+@routes.route("/", methods=["GET","POST"])
 def domain() -> Response:
     """
     Redirects the domain component of the URL to the home / index page.
@@ -868,7 +2228,7 @@ def domain() -> Response:
 
 
 
-@app.route("/index", methods=["GET","POST"])
+@routes.route("/index", methods=["GET","POST"])
 def index() -> str:
     """
     This is the default home / index page of this site - it is
@@ -878,8 +2238,61 @@ def index() -> str:
     return render_template("index.html")
 
 
+def positive_int(value : str) -> int :
+    """
+    This function parses a command line argument that must be a whole number of at
+    least 1, e.g. the number of worker processes.
+
+    Parameters:
+        value (str): The argument as given on the command line
+    """
+
+    try :
+        number : int = int(value)
+    except ValueError :
+        raise ArgumentTypeError(f"invalid int value: '{value}'")
+
+    if number < 1 :
+        raise ArgumentTypeError(f"must be at least 1, got {number}")
+
+    return number
+
+
+
 # Run flask app
 if __name__ == "__main__" :
 
-    app.run("localhost", "80")
+    parser : ArgumentParser = ArgumentParser(description="Runs the Go Travel Bot web service.")
+    parser.add_argument("--host", default="localhost")
+    parser.add_argument("--port", type=int, default=80)
+    parser.add_argument("--workers", type=positive_int, default=1, help="worker processes sharing the loaded chatbot, 1 runs the development server")
+    parser.add_argument("--trace-sample-rate", type=float, default=TRACE_SAMPLE_RATE, help="proportion of chat requests whose stages are logged")
+    parser.add_argument("--grid-cell-size", type=float, default=GRID_CELL_SIZE, help="size in degrees of the grid cells whose locations share a forecast request, 0 disables sharing")
+    arguments = parser.parse_args()
+
+    TRACE_SAMPLE_RATE = arguments.trace_sample_rate
+    GRID_CELL_SIZE = arguments.grid_cell_size
+
+    try :
+
+        app : Flask = create_app(arguments.workers == 1)
+
+    except ApplicationStartupException as e :
+
+        print(f"{str(e)} Application exiting...")
+        exit(e.exit_code)
+
+    if arguments.workers == 1 :
+
+        app.run(arguments.host, arguments.port)
+
+    else :
+
+        # The chatbot is loaded before forking so that the workers share it
+        try :
+            warm_up_chatbot(chatbot_loader.get())
+        except Exception as e :
+            print(f"The chatbot could not be loaded: {str(e)} Application exiting...")
+            exit(1)
 
+        PreForkServer(app, arguments.host, arguments.port, arguments.workers, start_worker, stop_worker).serve()
@@ -0,0 +1,165 @@
+from time import monotonic
+import re
+
+from .TemplateLibrary import IntentResult, ResponseTemplate, TemplateLibrary
+from ..data_access_layer.LocationRegistry import LocationMatch, LocationRegistry
+from ..utils.validation_utils import with_type_validation
+
+
+
+class ChatSession :
+    """
+    This class holds the context of a single chat session - the last intent the
+    chat bot answered and the last location mentioned. Short follow ups, e.g.
+    "and tomorrow?" or "what about Oxford?", are answered from the context without
+    searching the chat bot's statements, and questions that don't mention a
+    location refer to the last location mentioned.
+    """
+
+    FOLLOW_UP_PATTERN : re.Pattern = re.compile(
+        r"^\s*(?:and|what about|how about)\b\s*(?:in\s+|for\s+|at\s+)?(?P<rest>.*?)[\s?.!]*$", re.IGNORECASE
+    )
+    """
+    This (static) class constant defines a follow up to the previous question,
+    e.g. "and the news?".
+    """
+
+    MAX_FOLLOW_UP_WORDS : int = 6
+    """
+    This (static) class constant defines the number of words a follow up may have,
+    longer input is treated as a new question.
+    """
+
+    TOPICS : list = [
+        (re.compile(r"\b(tomorrow|forecast|week|weekend|next few days|coming days)\b", re.IGNORECASE), 2),
+        (re.compile(r"\b(news|headlines?|happening)\b", re.IGNORECASE), 5),
+        (re.compile(r"\b(best day|when)\b", re.IGNORECASE), 3),
+        (re.compile(r"\b(nearby|near|around)\b", re.IGNORECASE), 6),
+        (re.compile(r"\b(weather|today|now)\b", re.IGNORECASE), 1)
+    ]
+    """
+    This (static) class constant defines the words of a follow up that ask for
+    another intent, in order of precedence, with the intent code they ask for.
+    """
+
+    LOCATION_INTENTS : tuple = (1, 2, 3, 5, 6)
+    """
+    This (static) class constant defines the intent codes that are answered for
+    a location.
+    """
+
+    @with_type_validation(object, TemplateLibrary, LocationRegistry)
+    def __init__(self, templates : TemplateLibrary, locations : LocationRegistry) -> None :
+        """
+        Initializer
+
+        Parameters:
+            templates (TemplateLibrary): The compiled response templates.
+            locations (LocationRegistry): The locations served by the chat bot.
+        """
+
+        self.templates : TemplateLibrary = templates
+        self.locations : LocationRegistry = locations
+
+        self.intent : IntentResult | None = None
+        """
+        The last templated intent answered in the session.
+        """
+
+        self.location : str | None = None
+        """
+        The last location the session's questions referred to.
+        """
+
+        self.messages : int = 0
+        self.follow_ups : int = 0
+        self.last_active : float = monotonic()
+
+
+    @with_type_validation(object, str)
+    def follow_up(self, user_input : str) -> IntentResult :
+        """
+        This function answers the user's input from the session's context if it is
+        a follow up to the previous question. Returns None if it isn't, in which
+        case the chat bot must be searched.
+
+        Parameters:
+            user_input (str): The user's plain text input.
+        """
+
+        follow_up_match : re.Match[str] | None = ChatSession.FOLLOW_UP_PATTERN.match(user_input)
+
+        if self.intent is None or not follow_up_match :
+            return None
+
+        rest : str = follow_up_match.group("rest")
+
+        if len(rest.split()) > ChatSession.MAX_FOLLOW_UP_WORDS :
+            return None
+
+        mentions : list[LocationMatch] = self.locations.find_all(rest)
+        intent : int | None = next((code for pattern, code in ChatSession.TOPICS if pattern.search(rest)), None)
+
+        # A follow up must either ask for another intent or name another location
+        if intent is None and len(mentions) != 1 :
+            return None
+
+        intent = intent or self.intent.intent
+        location : str | None = mentions[0].name if len(mentions) == 1 else self.location
+
+        if intent not in ChatSession.LOCATION_INTENTS or location is None :
+            return None
+
+        template : ResponseTemplate | None = self.intent.template if intent == self.intent.intent else self.templates.for_intent(intent)
+
+        if template is None :
+            return None
+
+        self.follow_ups += 1
+
+        return IntentResult(intent, location, template, template.text)
+
+
+    @with_type_validation(object, IntentResult, str)
+    def contextualise(self, intent : IntentResult, user_input : str) -> IntentResult :
+        """
+        This function applies the session's context to the chat bot's response to
+        the user's input - the last location mentioned is used if the input asks
+        about a location without naming one.
+
+        Parameters:
+            intent (IntentResult): The chat bot's structured response
+            user_input (str): The user's plain text input.
+        """
+
+        if intent.intent in ChatSession.LOCATION_INTENTS and self.location and not self.locations.find_all(user_input) :
+            intent.location = self.location
+
+        return intent
+
+
+    @with_type_validation(object, IntentResult)
+    def remember(self, intent : IntentResult) -> None :
+        """
+        This function adds an answered intent to the session's context.
+
+        Parameters:
+            intent (IntentResult): The chat bot's structured response
+        """
+
+        self.messages += 1
+        self.last_active = monotonic()
+
+        if intent.template :
+            self.intent = intent
+
+        if intent.location :
+            self.location = intent.location
+
+
+    def __repr__(self) -> str :
+        """
+        This method displays the session's context as a string.
+        """
+
+        return f"ChatSession({self.intent}, {self.location}, {self.messages})"
@@ -1,3 +1,4 @@
+from chatterbot.conversation import Statement
 from chatterbot.logic import LogicAdapter
 from chatterbot import filters
 
@@ -18,15 +19,44 @@ class CustomBestMatch(LogicAdapter):
         an audience.
         Defaults to None
     :type excluded_words: list
+
+    :param intent_index:
+        The IntentIndex used to find the closest match among the statements of
+        the input's intent, rather than comparing the input to every statement.
+        Inputs the index can't search are searched in full.
+        Defaults to None
+    :type intent_index: IntentIndex
     """
 
     def __init__(self, chatbot, **kwargs):
         super().__init__(chatbot, **kwargs)
 
         self.excluded_words = kwargs.get('excluded_words')
+        self.intent_index = kwargs.get('intent_index')
+
+    def search_intent_index(self, input_statement):
+        """
+        Returns the closest match to the input statement among the statements
+        of its intent, or None if the intent index can't search it.
+        """
+
+        match = self.intent_index.search(input_statement.text)
+
+        if match is None:
+            return None
+
+        text, search_text, confidence, intent = match
+
+        closest_match = Statement(text=text, search_text=search_text)
+        closest_match.confidence = confidence
+
+        return closest_match
+
+    def search_statements(self, input_statement):
+        """
+        Returns the closest match to the input statement among every statement.
+        """
 
-    def process(self, input_statement, additional_response_selection_parameters=None):
-        
         search_results = self.search_algorithm.search(input_statement)
 
         # Only defaults to the input statement if the search returns nothing
@@ -44,6 +74,18 @@ class CustomBestMatch(LogicAdapter):
                     confidence = result.confidence
                     closest_match = result
 
+        return closest_match
+
+    def process(self, input_statement, additional_response_selection_parameters=None):
+
+        closest_match = None
+
+        if self.intent_index is not None:
+            closest_match = self.search_intent_index(input_statement)
+
+        if closest_match is None:
+            closest_match = self.search_statements(input_statement)
+
         self.chatbot.logger.info('Using "{}" as a close match to "{}" with a confidence of {}'.format(
             closest_match.text, input_statement.text, closest_match.confidence
         ))
@@ -1,41 +1,63 @@
 from chatterbot import ChatBot
 from chatterbot.trainers import ChatterBotCorpusTrainer, ListTrainer
 from chatterbot.response_selection import get_first_response
-from chatterbot.comparisons import SpacySimilarity
 from spacy.cli.download import download
-from spacy.util import load_model
+from contextlib import closing
 import os
+import sqlite3
 
 from ..exceptions.ChatbotDependencyException import ChatbotDependencyException
 from ..exceptions.UntrainedChatbotException import UntrainedChatbotException
+from .IntentIndex import IntentIndex
+from .TemplateLibrary import IntentResult, TemplateLibrary
+from .language_model import MODEL_NAME, SlimPosLemmaTagger, SlimSpacySimilarity, load_language_model, statement_vector
+from ..utils.metrics_utils import Histogram, metrics_registry
+from ..utils.tracing_utils import trace_stage
 from ..utils.validation_utils import with_type_validation
 
 
 
 os.environ["CHATTERBOT_SHOW_TRAINING_PROGRESS"] = "False"
 
+
+search_duration : Histogram = metrics_registry.histogram(
+    "go_travel_bot_search_duration_seconds", "Time taken by each search of the chatbot's statements.", (),
+    Histogram.DEFAULT_BUCKETS
+)
+
 class GoTravelBot :
     """
     This class encapsulates the chatbot functionality that is desired for the
     GoTravel website.
     """
 
-    @with_type_validation(object, str, dict)
-    def __init__(self, database_path : str, recommendations : dict)  -> None:
+    CORPUS_TABLE : str = "corpus_version"
+    """
+    This (static) class constant defines the table of the bot's database holding
+    the version of the corpus the bot was trained on.
+    """
+
+    @with_type_validation(object, str, dict, TemplateLibrary)
+    def __init__(self, database_path : str, recommendations : dict, templates : TemplateLibrary)  -> None:
         """
         Initializer
 
         Parameters:
             database_path (str): The path to the SQLite database.
+            recommendations (dict): The input suggested for each response.
+            templates (TemplateLibrary): The compiled response templates.
         """
 
-        # Dependency resolution - spacy no longer uses model name shortcuts
+        # Dependency resolution - spacy no longer uses model name shortcuts. Only
+        # the pipeline components used for tagging and similarity are loaded.
         try :
 
             try :
-                load_model(name="en")
+                load_language_model(SlimPosLemmaTagger.DISABLED_COMPONENTS)
             except OSError :
-                download("en")
+                download(MODEL_NAME)
+
+            load_language_model(SlimSpacySimilarity.DISABLED_COMPONENTS)
 
         except Exception :
             
@@ -47,33 +69,82 @@ class GoTravelBot :
             logic_adapters=[
                 {
                     "import_path" : "flaskr.model.chatbot.CustomBestMatch.CustomBestMatch",
-                    "statement_comparison_function" : SpacySimilarity,
+                    "statement_comparison_function" : SlimSpacySimilarity,
                     "response_selection_method" : get_first_response,
                     "maximum_similarity_threshold" : 0.9
                 }
             ],
             storage_adapter = "chatterbot.storage.SQLStorageAdapter",
+            tagger = SlimPosLemmaTagger,
             database_uri = f"sqlite:///{database_path}",
             read_only=False,
             show_training_progress=False
         )
         
+        # Storage adapters that don't accept a tagger still share the slim pipeline
+        if not isinstance(self.bot.storage.tagger, SlimPosLemmaTagger) :
+            self.bot.storage.tagger = SlimPosLemmaTagger(self.bot.storage.tagger.language)
+
         # This indicates whether the bot is already trained or not
         self.trained : bool = self.bot.storage.count() > 0
 
+        # The version of the corpus the bot was trained on, None if it was trained
+        # before versions were recorded
+        self.database_path : str = database_path
+        self.corpus_version : str | None = self._stored_corpus_version()
+
         # A list of recommendation pairs is stored
         self.recommendations = recommendations
 
+        # Responses are resolved to their compiled templates
+        self.templates : TemplateLibrary = templates
+
+        # Statements are searched by intent once the index is built
+        self.intent_index : IntentIndex | None = None
+
+
+    def _stored_corpus_version(self) -> str | None :
+        """
+        This function reads the version of the corpus the bot was trained on from
+        its database.
+        """
+
+        with closing(sqlite3.connect(self.database_path)) as connection, connection :
 
-    @with_type_validation(object, list)
-    def train(self, training_data : list) -> None :
+            connection.execute(f"CREATE TABLE IF NOT EXISTS {GoTravelBot.CORPUS_TABLE} (version TEXT NOT NULL)")
+            row : tuple | None = connection.execute(f"SELECT version FROM {GoTravelBot.CORPUS_TABLE}").fetchone()
+
+        return row[0] if row else None
+
+
+    @with_type_validation(object, str)
+    def needs_training(self, version : str) -> bool :
+        """
+        Returns true if the bot has not been trained, or was trained on another
+        version of the corpus, e.g. before a template was added or changed.
+
+        Parameters:
+            version (str): The version of the current corpus
         """
-        This method trains the chatterbot using the input training data
+
+        return not self.trained or self.corpus_version != version
+
+
+    @with_type_validation(object, list, str)
+    def train(self, training_data : list, version : str) -> None :
+        """
+        This method trains the chatterbot using the input training data, the
+        statements of any previous training are discarded first.
 
         Parameters:
             training_data (list): An input list of conversation inputs vs responses
+            version (str): The version of the corpus, see corpus_version()
         """
 
+        # Responses learnt from an older corpus would otherwise still be selected
+        if self.bot.storage.count() > 0 :
+            self.bot.storage.drop()
+
         # The model is pre-trained on a corpus of english greetings this is to
         # facilitate simple initial interactions.
         base_trainer = ChatterBotCorpusTrainer(self.bot)
@@ -85,6 +156,12 @@ class GoTravelBot :
 
             ListTrainer(self.bot).train(converation)
 
+        with closing(sqlite3.connect(self.database_path)) as connection, connection :
+
+            connection.execute(f"DELETE FROM {GoTravelBot.CORPUS_TABLE}")
+            connection.execute(f"INSERT INTO {GoTravelBot.CORPUS_TABLE} (version) VALUES (?)", (version,))
+
+        self.corpus_version = version
         self.trained = True
 
 
@@ -113,7 +190,9 @@ class GoTravelBot :
         # Sometimes SQL threading errors cause low confidence responses
         while attempts > 0 :
 
-            response = self.bot.get_response(input_text)
+            # Each attempt is a separate run of the search stage
+            with trace_stage("search"), search_duration.time() :
+                response = self.bot.get_response(input_text)
 
             output = response.text
 
@@ -138,8 +217,68 @@ class GoTravelBot :
                 
         return output
 
-                    
 
+    @with_type_validation(object, str)
+    def get_intent(self, input_text : str) -> IntentResult :
+        """
+        This function returns the chat bot's response as a structured result - the
+        intent, the location it refers to and its response template.
+
+        Parameters:
+            input_text (str) : The user's input
+        """
+
+        return self.templates.parse(self.get_response(input_text))
+
+
+    def statement_texts(self) -> list :
+        """
+        This function returns the text of every statement in the bot's database,
+        the statements that inputs are compared against.
+        """
+
+        return sorted({statement.text for statement in self.bot.storage.filter()})
+
+
+    @with_type_validation(object, float)
+    def build_intent_index(self, margin : float) -> IntentIndex :
+        """
+        This function builds the two stage intent index over the statements the
+        bot has been trained to respond to, and uses it for every later search.
+        Each statement belongs to the intent of its response, statements whose
+        response has no intent code, e.g. greetings, belong to intent 0. The
+        statement vectors should already be loaded. The index is not updated as
+        the bot learns, so the bot is made read only once it is built, otherwise
+        statements learnt from chat inputs would never be searched.
+
+        Parameters:
+            margin (float): the difference in similarity between the two closest
+            intents below which every statement is searched.
+        """
+
+        statements : list = list(self.bot.storage.filter())
+        intents : dict[str, int] = {}
+
+        # The first response to a statement is the one selected
+        for statement in statements :
+
+            if statement.in_response_to :
+
+                code_match = TemplateLibrary.CODE_PATTERN.match(statement.text)
+                intents.setdefault(statement.in_response_to, int(code_match.group(1)) if code_match else 0)
+
+        candidates : dict[str, tuple] = {}
+
+        for statement in statements :
+
+            if statement.text in intents and not (statement.persona or "").startswith("bot:") :
+                candidates.setdefault(statement.text, (statement.text, statement.search_text, intents[statement.text]))
+
+        self.intent_index = IntentIndex(list(candidates.values()), statement_vector, margin)
+
+        for adapter in self.bot.logic_adapters :
+            adapter.intent_index = self.intent_index
 
+        self.bot.read_only = True
 
-        
\ No newline at end of file
+        return self.intent_index
@@ -0,0 +1,192 @@
+from typing import Callable
+
+import numpy as np
+
+from ..utils.validation_utils import with_type_validation
+
+
+
+class IntentIndex :
+    """
+    This class searches the chat bot's statements in two stages. The first stage
+    classifies the input against the centroid of each intent's statements, e.g.
+    greetings or weather forecasts, and the second stage finds the closest
+    statement within the winning intent's statements only. When the input is
+    about as close to two intents, the second stage searches every statement
+    instead.
+
+    The statements' unit vectors are held in a single matrix ordered by intent,
+    so each intent's statements are a contiguous slice of it and each stage is a
+    single matrix product.
+    """
+
+    MARGIN : float = 0.05
+    """
+    This (static) class constant defines the default difference in similarity
+    between the closest and second closest intents below which every statement
+    is searched.
+    """
+
+    @with_type_validation(object, list, object, float)
+    def __init__(self, statements : list, vectorise : Callable, margin : float) -> None :
+        """
+        Initializer
+
+        Parameters:
+            statements (list[tuple]): the (text, search text, intent code) of each
+            statement that can be matched.
+            vectorise (Callable): returns the token ids, vector and vector norm of a
+            statement's text, e.g. language_model.statement_vector.
+            margin (float): the difference in similarity between the two closest
+            intents below which every statement is searched.
+        """
+
+        rows : list[tuple] = sorted(statements, key=lambda statement : statement[2])
+
+        self.vectorise : Callable = vectorise
+        self.margin : float = margin
+
+        self.texts : list[str] = [row[0] for row in rows]
+        self.search_texts : list[str] = [row[1] for row in rows]
+        self.intents : list[int] = [row[2] for row in rows]
+
+        self.rows : dict[str, int] = {text : row for row, text in enumerate(self.texts)}
+        """
+        The row of each statement's text, inputs that are a known statement are
+        matched without a search.
+        """
+
+        vectors : list[np.ndarray] = []
+
+        for text in self.texts :
+
+            orths, vector, norm = vectorise(text)
+            vectors.append(np.asarray(vector, dtype=np.float32) / norm if norm else None)
+
+        dims : int = next((len(vector) for vector in vectors if vector is not None), 0)
+
+        self.vectors : np.ndarray = np.zeros((len(rows), dims), dtype=np.float32)
+        """
+        The unit vector of each statement, statements without a vector are zero.
+        """
+
+        for row, vector in enumerate(vectors) :
+
+            if vector is not None :
+                self.vectors[row] = vector
+
+        self.codes : list[int] = sorted(set(self.intents))
+
+        self.partitions : dict[int, tuple] = {}
+        """
+        The first and last row (exclusive) of each intent's statements.
+        """
+
+        for row, intent in enumerate(self.intents) :
+
+            start, end = self.partitions.get(intent, (row, row))
+            self.partitions[intent] = (start, row + 1)
+
+        self.centroids : np.ndarray = np.zeros((len(self.codes), dims), dtype=np.float32)
+        """
+        The normalised mean of each intent's unit vectors, in the order of codes.
+        """
+
+        for position, intent in enumerate(self.codes) :
+
+            start, end = self.partitions[intent]
+            centroid : np.ndarray = self.vectors[start:end].sum(axis=0)
+            norm : float = float(np.linalg.norm(centroid))
+
+            if norm :
+                self.centroids[position] = centroid / norm
+
+
+    def __len__(self) -> int :
+        """
+        Returns the number of statements in the index.
+        """
+
+        return len(self.texts)
+
+
+    def _unit_vector(self, text : str) -> np.ndarray :
+        """
+        This function returns the unit vector of an input, or None if it has no
+        vector.
+
+        Parameters:
+            text (str): the input's text.
+        """
+
+        orths, vector, norm = self.vectorise(text)
+
+        return np.asarray(vector, dtype=np.float32) / norm if norm else None
+
+
+    def _classify(self, unit : np.ndarray) -> tuple :
+        """
+        This function returns the intent whose centroid is closest to a unit vector
+        and its margin over the second closest intent.
+
+        Parameters:
+            unit (np.ndarray): the input's unit vector.
+        """
+
+        scores : np.ndarray = self.centroids @ unit
+
+        if len(scores) == 1 :
+            return self.codes[0], float("inf")
+
+        second, first = np.argpartition(scores, -2)[-2:]
+
+        return self.codes[int(first)], float(scores[first] - scores[second])
+
+
+    @with_type_validation(object, str)
+    def classify(self, text : str) -> tuple :
+        """
+        This function returns the intent code whose statements are closest to an
+        input and its margin over the second closest intent, or None if the input
+        has no vector.
+
+        Parameters:
+            text (str): the input's text.
+        """
+
+        unit : np.ndarray | None = self._unit_vector(text)
+
+        return self._classify(unit) if unit is not None and self.texts else None
+
+
+    @with_type_validation(object, str)
+    def search(self, text : str) -> tuple :
+        """
+        This function returns the statement closest to an input as its (text,
+        search text, similarity, intent code), or None if the input has no vector
+        and must be searched by other means.
+
+        Parameters:
+            text (str): the input's text.
+        """
+
+        row : int | None = self.rows.get(text)
+
+        if row is not None :
+            return self.texts[row], self.search_texts[row], 1.0, self.intents[row]
+
+        unit : np.ndarray | None = self._unit_vector(text)
+
+        if unit is None or not self.texts :
+            return None
+
+        # Only the winning intent's statements are searched, unless it is too close
+        # to call
+        intent, margin = self._classify(unit)
+        start, end = self.partitions[intent] if margin >= self.margin else (0, len(self.texts))
+
+        similarities : np.ndarray = self.vectors[start:end] @ unit
+        best : int = int(np.argmax(similarities))
+        row = start + best
+
+        return self.texts[row], self.search_texts[row], float(similarities[best]), self.intents[row]
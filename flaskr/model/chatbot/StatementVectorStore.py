@@ -0,0 +1,239 @@
+from bisect import bisect_left
+from hashlib import blake2b
+from os import chmod, fdopen, makedirs, path as os_path, remove, replace
+from tempfile import mkstemp
+import mmap
+import struct
+import sys
+
+import numpy as np
+
+from ..exceptions.InvalidVectorStoreException import InvalidVectorStoreException
+from ..utils.validation_utils import with_type_validation
+
+
+
+class StatementVectorStore :
+    """
+    This class holds precomputed statement vectors in a binary file that is memory
+    mapped read only. The arrays are NumPy views of the mapping rather than copies,
+    so every process on a host that opens the same file shares one physical copy
+    through the page cache.
+
+    The file holds a header followed by 64 byte aligned sections: the statements'
+    text hashes in ascending order, their vectors, vector norms, token ids and text.
+    Statements are found by a binary search of the hashes.
+    """
+
+    MAGIC : bytes = b"GTVS"
+    """
+    This (static) class constant defines the first bytes of a statement vector file.
+    """
+
+    VERSION : int = 1
+    """
+    This (static) class constant defines the version of the file layout.
+    """
+
+    HEADER : struct.Struct = struct.Struct("<4sIQII8Q")
+    """
+    This (static) class constant defines the header layout: magic, version,
+    statement count, vector dimensions, signature length and the offsets of the
+    hashes, vectors, norms, token offsets, tokens, text offsets, text and end of file.
+    """
+
+    ALIGNMENT : int = 64
+    """
+    This (static) class constant defines the alignment of each section in bytes.
+    """
+
+    @with_type_validation(object, str, str)
+    def __init__(self, path : str, signature : str) -> None :
+        """
+        Initializer
+
+        Parameters:
+            path (str): the path to the statement vector file.
+            signature (str): identifies the language model the vectors must have
+            been computed with.
+        """
+
+        self.path : str = path
+
+        try :
+
+            with open(path, "rb") as file :
+                self.mapping : mmap.mmap = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        except (FileNotFoundError, ValueError) as e :
+            raise InvalidVectorStoreException(f"{path} could not be opened") from e
+
+        if sys.byteorder != "little" :
+            raise InvalidVectorStoreException("statement vector files are little endian")
+
+        if len(self.mapping) < StatementVectorStore.HEADER.size :
+            raise InvalidVectorStoreException(f"{path} is truncated")
+
+        magic, version, count, dims, signature_length, *offsets = StatementVectorStore.HEADER.unpack_from(self.mapping, 0)
+
+        if magic != StatementVectorStore.MAGIC or version != StatementVectorStore.VERSION or offsets[-1] != len(self.mapping) :
+            raise InvalidVectorStoreException(f"{path} is not a version {StatementVectorStore.VERSION} statement vector file")
+
+        stored_signature : str = self.mapping[StatementVectorStore.HEADER.size:StatementVectorStore.HEADER.size + signature_length].decode()
+
+        if stored_signature != signature :
+            raise InvalidVectorStoreException(f"{path} was built for {stored_signature} rather than {signature}")
+
+        self.count : int = count
+        self.dims : int = dims
+        self.signature : str = stored_signature
+
+        # Every array is a view of the mapping. The vectors are NumPy arrays, the
+        # columns read while searching are memoryviews, which index faster
+        view : memoryview = memoryview(self.mapping)
+
+        self.vectors : np.ndarray = np.frombuffer(self.mapping, dtype="<f4", count=count * dims, offset=offsets[1]).reshape(count, dims)
+        self.hashes : memoryview = view[offsets[0]:offsets[1]][:count * 8].cast("Q")
+        self.norms : memoryview = view[offsets[2]:offsets[3]][:count * 8].cast("d")
+        self.token_offsets : memoryview = view[offsets[3]:offsets[4]][:(count + 1) * 8].cast("q")
+        self.tokens : memoryview = view[offsets[4]:offsets[5]][:self.token_offsets[-1] * 8].cast("Q")
+        self.text_offsets : memoryview = view[offsets[5]:offsets[6]][:(count + 1) * 8].cast("q")
+        self.text : memoryview = view[offsets[6]:offsets[7]]
+
+
+    @staticmethod
+    def hash_text(text : str) -> int :
+        """
+        This function returns the 64 bit hash statements are ordered by.
+
+        Parameters:
+            text (str): the statement's text.
+        """
+
+        return int.from_bytes(blake2b(text.encode(), digest_size=8).digest(), "little")
+
+
+    @staticmethod
+    def build(path : str, signature : str, statements : list) -> int :
+        """
+        This function writes a statement vector file. The file is written to a
+        temporary file alongside the destination and atomically moved into place,
+        so processes that have the previous file open are unaffected.
+
+        Parameters:
+            path (str): the path to the statement vector file.
+            signature (str): identifies the language model the vectors were computed with.
+            statements (list[tuple]): the (text, token ids, vector, norm) of each statement.
+
+        Returns:
+            int: the number of statements written.
+        """
+
+        unique : dict[str, tuple] = {statement[0] : statement for statement in statements}
+        rows : list[tuple] = sorted(unique.values(), key=lambda statement : StatementVectorStore.hash_text(statement[0]))
+
+        dims : int = len(rows[0][2]) if rows else 0
+        texts : list[bytes] = [row[0].encode() for row in rows]
+
+        sections : list[bytes] = [
+            np.array([StatementVectorStore.hash_text(row[0]) for row in rows], dtype="<u8").tobytes(),
+            np.array([row[2] for row in rows], dtype="<f4").reshape(len(rows), dims).tobytes(),
+            np.array([row[3] for row in rows], dtype="<f8").tobytes(),
+            np.cumsum([0] + [len(row[1]) for row in rows], dtype="<i8").tobytes(),
+            np.array([token for row in rows for token in row[1]], dtype="<u8").tobytes(),
+            np.cumsum([0] + [len(text) for text in texts], dtype="<i8").tobytes(),
+            b"".join(texts)
+        ]
+
+        encoded_signature : bytes = signature.encode()
+        offsets : list[int] = []
+        position : int = StatementVectorStore.HEADER.size + len(encoded_signature)
+
+        for section in sections :
+            position += -position % StatementVectorStore.ALIGNMENT
+            offsets.append(position)
+            position += len(section)
+
+        offsets.append(position)
+
+        if os_path.dirname(path) :
+            makedirs(os_path.dirname(path), exist_ok=True)
+
+        # Each writer has its own uniquely named file in the destination's directory,
+        # so processes building the store at once never write to the same file and
+        # the rename never crosses file systems
+        descriptor, temporary_path = mkstemp(dir=os_path.dirname(path) or ".", prefix=f"{os_path.basename(path)}.", suffix=".tmp")
+
+        try :
+
+            with fdopen(descriptor, "wb") as file :
+
+                file.write(StatementVectorStore.HEADER.pack(
+                    StatementVectorStore.MAGIC, StatementVectorStore.VERSION, len(rows), dims, len(encoded_signature), *offsets
+                ))
+                file.write(encoded_signature)
+
+                for offset, section in zip(offsets, sections) :
+                    file.write(b"\0" * (offset - file.tell()))
+                    file.write(section)
+
+            # mkstemp creates the file readable by its owner only
+            chmod(temporary_path, 0o644)
+            replace(temporary_path, path)
+
+        except BaseException :
+
+            remove(temporary_path)
+            raise
+
+        return len(rows)
+
+
+    def __len__(self) -> int :
+        """
+        Returns the number of statements in the store.
+        """
+
+        return self.count
+
+
+    @with_type_validation(object, str)
+    def get(self, text : str) -> tuple :
+        """
+        This function returns the token ids, vector and vector norm of a statement,
+        or None if it isn't in the store.
+
+        Parameters:
+            text (str): the statement's text.
+        """
+
+        encoded : bytes = text.encode()
+        key : int = int.from_bytes(blake2b(encoded, digest_size=8).digest(), "little")
+        row : int = bisect_left(self.hashes, key)
+
+        # Hash collisions are resolved by comparing the text
+        while row < self.count and self.hashes[row] == key :
+
+            if self.text[self.text_offsets[row]:self.text_offsets[row + 1]] == encoded :
+                return tuple(self.tokens[self.token_offsets[row]:self.token_offsets[row + 1]]), self.vectors[row], self.norms[row]
+
+            row += 1
+
+        return None
+
+
+    def close(self) -> None :
+        """
+        This function releases the mapping, the store can't be used afterwards. The
+        mapping stays open until vectors returned by the store are released.
+        """
+
+        for view in (self.hashes, self.norms, self.token_offsets, self.tokens, self.text_offsets, self.text) :
+            view.release()
+
+        self.hashes = self.vectors = self.norms = self.token_offsets = self.tokens = self.text_offsets = self.text = None
+
+        try :
+            self.mapping.close()
+        except BufferError :
+            pass
@@ -0,0 +1,380 @@
+from typing import Iterator
+import re
+import pandas as pd
+
+from ..exceptions.InvalidTemplateException import InvalidTemplateException
+from ..utils.tracing_utils import trace_stage
+from ..utils.validation_utils import with_type_validation
+
+
+
+class ResponseTemplate :
+    """
+    This class holds a single response template compiled into a slot filling
+    renderer. The template is split once into a header, an optional repeated list
+    section written between square brackets and a trailer, each of which is
+    rendered with a single format call.
+    """
+
+    SLOT_PATTERN : re.Pattern = re.compile(r"\{([^{}]+)\}")
+    """
+    This (static) class constant defines the slots of a template, e.g. {temp}.
+    """
+
+    LIST_PATTERN : re.Pattern = re.compile(r"\[(.+?)\]")
+    """
+    This (static) class constant defines the list section of a template, which is
+    rendered once per item on its own line.
+    """
+
+    LOCATION_SLOT : str = "output-location"
+    """
+    This (static) class constant defines the slot that holds the location the
+    response refers to.
+    """
+
+    @with_type_validation(object, int, int, str)
+    def __init__(self, template_id : int, intent : int, text : str) -> None :
+        """
+        Initializer
+
+        Parameters:
+            template_id (int): the template's position in the library, -1 if it
+            was compiled on demand.
+            intent (int): the intent code the template answers.
+            text (str): the template text without its intent code.
+        """
+
+        self.template_id : int = template_id
+        self.intent : int = intent
+        self.text : str = text
+
+        list_match : re.Match[str] | None = ResponseTemplate.LIST_PATTERN.search(text)
+
+        if list_match :
+            head, item, tail = text[:list_match.start()], list_match.group(1), text[list_match.end():]
+        else :
+            head, item, tail = text, None, ""
+
+        self.head : str = ResponseTemplate._compile(head)
+        self.item : str | None = ResponseTemplate._compile(item) if item is not None else None
+        self.tail : str = ResponseTemplate._compile(tail)
+
+        self.slots : set[str] = set(ResponseTemplate.SLOT_PATTERN.findall(text))
+        """
+        The names of every slot in the template.
+        """
+
+
+    @staticmethod
+    def _compile(text : str) -> str :
+        """
+        This function converts template text into a format string, literal braces
+        are escaped so that only slots are substituted.
+
+        Parameters:
+            text (str): the template text.
+        """
+
+        parts : list[str] = ResponseTemplate.SLOT_PATTERN.split(text)
+
+        # Even parts are literal text and odd parts are slot names
+        return "".join(
+            part.replace("{", "{{").replace("}", "}}") if index % 2 == 0 else f"{{{part}}}"
+            for index, part in enumerate(parts)
+        )
+
+
+    def __repr__(self) -> str :
+        """
+        This method displays the object's intialization specification as a string.
+        """
+
+        return f"ResponseTemplate({self.template_id}, {self.intent}, {self.text})"
+
+
+    def render(self, values : dict, items : list = None) -> str :
+        """
+        This function populates the template's slots. A template without a list
+        section is rendered with a single format call, the parts are only joined
+        for templates that have one.
+
+        Parameters:
+            values (dict): the value of each slot outside the list section.
+            items (list[dict]): the slot values of each list item.
+        """
+
+        if self.item is not None :
+            return "".join(self.render_parts(values, items))
+
+        # Without a list section the trailer is empty and the header is the whole template
+        try :
+            return self.head.format_map(values)
+        except KeyError as e :
+            raise InvalidTemplateException(f"no value was given for the {e} slot of template {self.template_id}")
+
+
+    def render_parts(self, values : dict, items : list = None) -> Iterator[str] :
+        """
+        This function populates the template's slots one part at a time - the
+        header, each list item on its own line and the trailer - so that they can
+        be sent as they are rendered.
+
+        Parameters:
+            values (dict): the value of each slot outside the list section.
+            items (list[dict]): the slot values of each list item.
+        """
+
+        try :
+
+            yield self.head.format_map(values)
+
+            if self.item is not None :
+
+                for item in items or [] :
+                    yield "\n" + self.item.format_map(item)
+
+            yield self.tail.format_map(values)
+
+        except KeyError as e :
+            raise InvalidTemplateException(f"no value was given for the {e} slot of template {self.template_id}")
+
+
+
+class IntentResult :
+    """
+    The IntentResult class encapsulates the structured outcome of a chat bot
+    response: the intent that was recognised, the location it refers to and the
+    template used to answer it.
+
+    Parameters:
+        intent (int): the intent code, 0 for conversational responses.
+        location (str): the location the response refers to, if any.
+        template (ResponseTemplate): the response template, if any.
+        text (str): the chat bot's plain text response.
+    """
+
+    def __init__(self, intent : int, location : str, template : ResponseTemplate, text : str) -> None :
+        """
+        Initializer
+        """
+
+        self.intent : int = intent
+        self.location : str | None = location
+        self.template : ResponseTemplate | None = template
+        self.text : str = text
+
+
+    @property
+    def template_id(self) -> int :
+        """
+        Returns the id of the response template, or -1 if there isn't one.
+        """
+
+        return self.template.template_id if self.template else -1
+
+
+    def render(self, values : dict, items : list = None) -> str :
+        """
+        This function populates the response template, the location slot is filled
+        with the result's location.
+
+        Parameters:
+            values (dict): the value of each slot outside the list section.
+            items (list[dict]): the slot values of each list item.
+        """
+
+        with trace_stage("render") :
+            return self.template.render({ResponseTemplate.LOCATION_SLOT : self.location, **values}, items)
+
+
+    def render_parts(self, values : dict, items : list = None) -> Iterator[str] :
+        """
+        This function populates the response template one part at a time, the
+        location slot is filled with the result's location. Empty parts, e.g. a
+        template without a trailer, are skipped.
+
+        Parameters:
+            values (dict): the value of each slot outside the list section.
+            items (list[dict]): the slot values of each list item.
+        """
+
+        parts : Iterator[str] = self.template.render_parts({ResponseTemplate.LOCATION_SLOT : self.location, **values}, items)
+
+        while True :
+
+            # Only the rendering is timed, not the time spent sending each part
+            with trace_stage("render") :
+                part : str | None = next(parts, None)
+
+            if part is None :
+                return
+
+            if part :
+                yield part
+
+
+    def __repr__(self) -> str :
+        """
+        This method displays the object's intialization specification as a string.
+        """
+
+        return f"IntentResult({self.intent}, {self.location}, {self.template_id})"
+
+
+
+class TemplateLibrary :
+    """
+    This class holds every response template the chat bot was trained on, compiled
+    once at load. The chat bot's text responses are resolved back to their template
+    once and the resolution is reused, the bot only ever answers with the
+    statements it has learnt.
+    """
+
+    CODE_PATTERN : re.Pattern = re.compile(r"#(\d+)#\s*")
+    """
+    This (static) class constant defines the intent code at the start of a
+    templated response, e.g. #1#.
+    """
+
+    @with_type_validation(object, list)
+    def __init__(self, responses : list) -> None :
+        """
+        Initializer
+
+        Parameters:
+            responses (list[str]): the template responses including their intent
+            codes, e.g. "#5# The latest news from {output-location} ...".
+        """
+
+        self.templates : dict[str, ResponseTemplate] = {}
+        """
+        The compiled templates keyed by their text without the intent code.
+        """
+
+        for response in responses :
+
+            code_match : re.Match[str] | None = TemplateLibrary.CODE_PATTERN.match(response)
+
+            if not code_match :
+                raise InvalidTemplateException(f"the response template \"{response}\" has no intent code")
+
+            text : str = response[code_match.end():]
+
+            if text not in self.templates :
+                self.templates[text] = ResponseTemplate(len(self.templates), int(code_match.group(1)), text)
+
+        self.intent_templates : dict[int, ResponseTemplate] = {}
+        """
+        The first template of each intent code, used to answer an intent that was
+        recognised without a chat bot response.
+        """
+
+        for template in self.templates.values() :
+            self.intent_templates.setdefault(template.intent, template)
+
+        self.resolved : dict[str, tuple] = {}
+        """
+        The intent code, location and template each chat bot response resolved to,
+        keyed by the response.
+        """
+
+        self.value_slots : set[str] = {
+            slot for template in self.templates.values() for slot in template.slots
+        } - {ResponseTemplate.LOCATION_SLOT}
+        """
+        The names of the slots that are populated with data, any other slot in a
+        response holds its location.
+        """
+
+
+    @classmethod
+    def from_csv(cls, paths : list) -> "TemplateLibrary" :
+        """
+        This function loads the response templates from the corpus template files,
+        cleaned in the same manner as the training corpus.
+
+        Parameters:
+            paths (list[str]): the paths to the corpus template files.
+        """
+
+        responses : list[str] = []
+
+        for path in paths :
+
+            try :
+                corpus : pd.DataFrame = pd.read_csv(path, delimiter=",", names=["input", "response"], header=None, dtype=str)
+            except FileNotFoundError :
+                raise FileNotFoundError(f"The csv template could not be found at this location: {path}")
+            except (pd.errors.ParserError, pd.errors.EmptyDataError) :
+                raise InvalidTemplateException(f"the file {path} could not be parsed")
+
+            responses += corpus["response"].dropna().str.strip().str.replace("  ", " ").tolist()
+
+        return cls(responses)
+
+
+    def __len__(self) -> int :
+        """
+        Returns the number of templates in the library.
+        """
+
+        return len(self.templates)
+
+
+    @with_type_validation(object, int)
+    def for_intent(self, intent : int) -> ResponseTemplate :
+        """
+        This function returns a template that answers an intent code, or None if
+        the library has none.
+
+        Parameters:
+            intent (int): the intent code.
+        """
+
+        return self.intent_templates.get(intent)
+
+
+    @with_type_validation(object, str)
+    def parse(self, response : str) -> IntentResult :
+        """
+        This function resolves a chat bot response into a structured result. The
+        location is read from the response's location slot, and responses that
+        don't match a known template, e.g. from an older training run, are compiled
+        on demand.
+
+        Parameters:
+            response (str): the chat bot's text response.
+        """
+
+        resolved : tuple | None = self.resolved.get(response)
+
+        # A new result is returned each time as callers may update its location
+        if resolved is not None :
+            return IntentResult(*resolved)
+
+        code_match : re.Match[str] | None = TemplateLibrary.CODE_PATTERN.match(response)
+
+        if not code_match :
+            return IntentResult(0, None, None, response)
+
+        intent : int = int(code_match.group(1))
+        text : str = response[code_match.end():]
+        location : str | None = None
+
+        # The first slot that isn't populated with data holds the location
+        for slot in ResponseTemplate.SLOT_PATTERN.findall(text) :
+
+            if slot not in self.value_slots :
+                location = slot
+                break
+
+        key : str = text.replace(f"{{{location}}}", f"{{{ResponseTemplate.LOCATION_SLOT}}}") if location else text
+        template : ResponseTemplate | None = self.templates.get(key)
+
+        if template is None or template.intent != intent :
+            template = ResponseTemplate(-1, intent, key)
+
+        self.resolved[response] = (intent, location, template, text)
+
+        return IntentResult(intent, location, template, text)
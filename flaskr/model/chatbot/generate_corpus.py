@@ -1,3 +1,6 @@
+from hashlib import sha256
+from json import dumps
+
 import pandas as pd
 
 from ..exceptions.InvalidTemplateException import InvalidTemplateException
@@ -66,4 +69,42 @@ def create_corpus_from_template(csv_file : str, locations : list, num_templates
     conversations["input"] = pd.concat([corpus[i] for i in corpus.columns if "input" in i])
     conversations["response"] = pd.concat([corpus[i] for i in corpus.columns if "response" in i])
 
-    return conversations
\ No newline at end of file
+    return conversations
+
+
+
+def corpus_version(training_data : list, templates : list) -> str :
+    """
+    This function identifies a version of the training corpus, any change to a
+    template or to the locations substituted into it changes the version.
+
+    Parameters:
+        training_data (list): The conversation pairs the chatbot is trained on
+        templates (list): The file paths of templates that are compiled but not
+        trained on, whose changes also change the version
+    """
+
+    # Input validation
+    if not isinstance(training_data, list) :
+
+        raise TypeError(f"Invalid input type \"{training_data.__class__.__name__}\" "\
+                        f"for function corpus_version, \"list\" was expected.")
+
+    elif not isinstance(templates, list) :
+
+        raise TypeError(f"Invalid input type \"{templates.__class__.__name__}\" "\
+                        f"for function corpus_version, \"list\" was expected.")
+
+    digest = sha256(dumps(training_data, ensure_ascii=False).encode())
+
+    for template in templates :
+
+        try :
+
+            with open(template, "rb") as file :
+                digest.update(file.read())
+
+        except FileNotFoundError :
+            raise FileNotFoundError(f"The csv template could not be found at this location: {template}")
+
+    return digest.hexdigest()
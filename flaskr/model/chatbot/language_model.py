@@ -0,0 +1,239 @@
+from functools import lru_cache
+from threading import Lock
+import string
+
+import numpy as np
+
+from chatterbot import languages
+from chatterbot.comparisons import SpacySimilarity
+from chatterbot.tagging import PosLemmaTagger
+from spacy.language import Language
+from spacy.util import load_model
+
+from ..exceptions.InvalidVectorStoreException import InvalidVectorStoreException
+from .StatementVectorStore import StatementVectorStore
+
+
+MODEL_NAME : str = "en"
+"""
+The name of the spaCy model used for tagging and similarity.
+"""
+
+_models : dict = {}
+_models_lock : Lock = Lock()
+
+
+
+def load_language_model(disabled : tuple) -> Language :
+    """
+    This function loads the spaCy model with some of its pipeline components
+    disabled. Each configuration is loaded once per process and shared, so the
+    tagger and the similarity comparator don't each hold their own copy.
+
+    Parameters:
+        disabled (tuple[str]): the names of the pipeline components to disable.
+    """
+
+    if not isinstance(disabled, tuple) :
+
+        raise TypeError(f"Invalid input type \"{disabled.__class__.__name__}\" "\
+                        f"for function load_language_model, \"tuple\" was expected.")
+
+    key : tuple = tuple(sorted(disabled))
+
+    with _models_lock :
+
+        if key not in _models :
+            _models[key] = load_model(MODEL_NAME, disable=list(key))
+
+        return _models[key]
+
+
+
+class SlimPosLemmaTagger(PosLemmaTagger) :
+    """
+    This class is a drop in replacement for ChatterBot's PosLemmaTagger that runs
+    only the pipeline components its index strings depend on. The part of speech
+    tags and lemmas come from the tagger, the dependency parse and named entities
+    are never read.
+    """
+
+    DISABLED_COMPONENTS : tuple = ("parser", "ner")
+    """
+    This (static) class constant defines the pipeline components that are not run
+    when statements are tagged.
+    """
+
+    def __init__(self, language : object = None) -> None :
+        """
+        Initializer
+
+        Parameters:
+            language (object): the ChatterBot language of the statements.
+        """
+
+        self.language = language or languages.ENG
+        self.punctuation_table = str.maketrans(dict.fromkeys(string.punctuation))
+        self.nlp : Language = load_language_model(SlimPosLemmaTagger.DISABLED_COMPONENTS)
+
+
+
+class SlimSpacySimilarity(SpacySimilarity) :
+    """
+    This class is a drop in replacement for ChatterBot's SpacySimilarity that runs
+    only the pipeline components document vectors depend on, and caches the vector
+    of each statement so that stored statements are only processed once.
+    """
+
+    DISABLED_COMPONENTS : tuple = ("parser", "ner")
+    """
+    This (static) class constant defines the pipeline components that are not run
+    when statements are compared. The small English models have no word vectors,
+    their document vectors are taken from the tagger's output so it is kept.
+    """
+
+    def __init__(self, language : object) -> None :
+        """
+        Initializer
+
+        Parameters:
+            language (object): the ChatterBot language of the statements.
+        """
+
+        self.language = language
+        self.nlp : Language = load_language_model(SlimSpacySimilarity.DISABLED_COMPONENTS)
+
+
+    def compare(self, statement_a : object, statement_b : object) -> float :
+        """
+        This function returns the similarity of two statements, computed in the same
+        manner as spaCy's Doc.similarity.
+
+        Parameters:
+            statement_a (Statement): the first statement.
+            statement_b (Statement): the second statement.
+        """
+
+        orths_a, vector_a, norm_a = statement_vector(statement_a.text)
+        orths_b, vector_b, norm_b = statement_vector(statement_b.text)
+
+        # Documents with identical tokens are identical
+        if orths_a == orths_b :
+            return 1.0
+
+        if norm_a == 0 or norm_b == 0 :
+            return 0.0
+
+        return np.dot(vector_a, vector_b) / (norm_a * norm_b)
+
+
+
+VECTOR_CACHE_SIZE : int = 20000
+"""
+The number of statement vectors cached per process, for statements that aren't in
+the statement vector store.
+"""
+
+_vector_store : StatementVectorStore = None
+
+
+
+def statement_vector(text : str) -> tuple :
+    """
+    This function returns the token ids, vector and vector norm of a statement,
+    from the statement vector store if it holds the statement and otherwise from
+    the cache shared by every comparator in the process.
+
+    Parameters:
+        text (str): the statement's text.
+    """
+
+    if _vector_store is not None :
+
+        stored : tuple = _vector_store.get(text)
+
+        if stored is not None :
+            return stored
+
+    return _compute_statement_vector(text)
+
+
+@lru_cache(maxsize=VECTOR_CACHE_SIZE)
+def _compute_statement_vector(text : str) -> tuple :
+    """
+    This function runs the language model over a statement.
+
+    Parameters:
+        text (str): the statement's text.
+    """
+
+    document = load_language_model(SlimSpacySimilarity.DISABLED_COMPONENTS)(text)
+
+    return tuple(token.orth for token in document), document.vector, document.vector_norm
+
+
+
+def model_signature() -> str :
+    """
+    This function identifies the language model and pipeline statement vectors are
+    computed with, so that vectors computed by another model aren't used.
+    """
+
+    nlp : Language = load_language_model(SlimSpacySimilarity.DISABLED_COMPONENTS)
+
+    return f"{nlp.meta.get('lang')}_{nlp.meta.get('name')}-{nlp.meta.get('version')}:{','.join(nlp.pipe_names)}"
+
+
+
+def load_statement_vector_store(path : str, texts : list) -> StatementVectorStore :
+    """
+    This function opens the statement vector store and uses it for every comparison
+    in the process. The store is rebuilt first if it is missing statements or was
+    built by another language model. Only the missing statements are run through
+    the model, so each statement is processed once per host rather than once per
+    process.
+
+    Parameters:
+        path (str): the path to the statement vector file.
+        texts (list[str]): the text of the statements the store should hold.
+    """
+
+    global _vector_store
+
+    if not isinstance(path, str) or not isinstance(texts, list) :
+
+        raise TypeError(f"Invalid input types \"{path.__class__.__name__}\", \"{texts.__class__.__name__}\" "\
+                        f"for function load_statement_vector_store, \"str\", \"list\" were expected.")
+
+    signature : str = model_signature()
+
+    try :
+        store : StatementVectorStore = StatementVectorStore(path, signature)
+    except InvalidVectorStoreException :
+        store = None
+
+    stored : dict[str, tuple] = {text : store.get(text) for text in texts} if store is not None else {}
+    missing : list[str] = [text for text in texts if stored.get(text) is None]
+
+    if missing or store is None :
+
+        documents = load_language_model(SlimSpacySimilarity.DISABLED_COMPONENTS).pipe(missing)
+
+        statements : list[tuple] = [(text, *vector) for text, vector in stored.items() if vector is not None]
+        statements += [
+            (text, tuple(token.orth for token in document), document.vector, document.vector_norm)
+            for text, document in zip(missing, documents)
+        ]
+
+        # The file is replaced, processes that opened the previous file keep it
+        StatementVectorStore.build(path, signature, statements)
+        del stored, statements
+
+        if store is not None :
+            store.close()
+
+        store = StatementVectorStore(path, signature)
+
+    _vector_store = store
+
+    return store
@@ -1,11 +1,11 @@
 from datetime import datetime, timezone, timedelta
-from threading import Thread
-from requests import Response, get
+import re
 from requests.exceptions import RequestException, JSONDecodeError
 
+from .HTTPResponseCache import CachedResponse, HTTPResponseCache
 from .SQLConnector import News
 from ..exceptions.CurrentNewsRequestException import CurrentNewsRequestException
-from ..utils.threading_utils import ThreadingContext
+from ..utils.threading_utils import ConcurrentTaskRunner, TaskResult
 from ..utils.validation_utils import with_type_validation
 
 
@@ -20,15 +20,101 @@ class CurrentNewsConnector :
     This (static) class constant defines the api endpoint being accessed.
     """
 
-    @with_type_validation(object, str)
-    def __init__(self, api_key) -> None:
+    UPSTREAM : str = "Currents"
+    """
+    This (static) class constant defines the name the api's metrics are reported
+    under.
+    """
+
+    REQUEST_TIMEOUT : float = 5.0
+    """
+    This (static) class constant defines the number of seconds a single request
+    may wait on the api endpoint.
+    """
+
+    BULK_TIMEOUT : float = 10.0
+    """
+    This (static) class constant defines the overall deadline in seconds for a
+    bulk request.
+    """
+
+    MAX_WORKERS : int = 8
+    """
+    This (static) class constant defines the number of concurrent requests made
+    during a bulk request.
+    """
+
+    BATCH_SIZE : int = 5
+    """
+    This (static) class constant defines the default number of locations queried
+    by a single request during a bulk request, 1 queries each location separately.
+    """
+
+    ARTICLES_PER_LOCATION : int = 10
+    """
+    This (static) class constant defines the number of articles requested per
+    location in a batched request.
+    """
+
+    KEYWORD_SEPARATOR : str = " OR "
+    """
+    This (static) class constant defines how the location keywords of a batched
+    request are combined.
+    """
+
+    @with_type_validation(object, str, HTTPResponseCache)
+    def __init__(self, api_key : str, cache : HTTPResponseCache) -> None:
         """
         Initializer
 
         Parameters:
-            api_key (str) : The api key for the OpenWeather API
+            api_key (str) : The api key for the Currents API
+            cache (HTTPResponseCache) : The response cache requests are made through
         """
         self.api_key : str = api_key
+        self.cache : HTTPResponseCache = cache
+
+        self.unchanged_locations : list[str] = []
+        """
+        The locations whose response was unchanged since it was last retrieved and
+        whose data is stored, their stored data does not need to be updated.
+        """
+
+        self.stored_locations : set[str] = set()
+        """
+        The locations whose data is already stored, only these can be skipped when
+        their response is unchanged. A location missing from the store, e.g. because
+        it was added to a cached grid cell or its last write failed, is parsed and
+        stored again.
+        """
+
+        self.updated_locations : list[str] = []
+        """
+        The locations whose data was successfully retrieved and changed during the
+        last bulk request, only their stored data needs to be replaced.
+        """
+
+        self.batch_size : int = CurrentNewsConnector.BATCH_SIZE
+        """
+        The number of locations queried by a single request during a bulk request.
+        """
+
+        self.upstream_calls : int = 0
+        """
+        The number of upstream requests made during the last bulk request.
+        """
+
+        self.cached_requests : list[list[str]] = []
+        """
+        The locations of each request answered by the response cache without
+        contacting the endpoint during the last bulk request.
+        """
+
+        self.network_calls : int = 0
+        """
+        The number of requests that reached the endpoint during the last bulk
+        request, only these are charged to the API's quota.
+        """
 
 
     @with_type_validation(object, str)
@@ -41,36 +127,98 @@ class CurrentNewsConnector :
             location (str) : The location for which the news is retrieved.
         """
 
-        news : News | None = None
+        return self.request_news_batch([location])[0]
+
+
+    @staticmethod
+    def mentions(article : dict, location : str) -> bool :
+        """
+        This function determines whether an article mentions a location as a whole
+        word, a leading "The" is optional so that "Cotswolds" matches "The Cotswolds".
+
+        Parameters:
+            article (dict): the article returned by the endpoint.
+            location (str): the location name.
+        """
+
+        text : str = f"{article.get('title', '')} {article.get('description', '')}".lower()
+        name : str = location.lower()
+
+        if name.startswith("the ") :
+            name = name[4:]
+
+        return re.search(rf"\b{re.escape(name)}\b", text) is not None
+
+
+    @with_type_validation(object, list)
+    def request_news_batch(self, locations : list) -> list:
+        """
+        This function retrieves the latest news for several locations with a single
+        request. Each returned article is assigned to the first location it mentions
+        that does not already have an article.
+
+        Parameters:
+            locations (list[str]) : The locations for which the news is retrieved.
+
+        Returns:
+            list[News | None]: one article per location, in the same order as locations.
+        """
+
+        news : list[News | None] = [None for location in locations]
+        page_size : int = 1 if len(locations) == 1 else min(200, CurrentNewsConnector.ARTICLES_PER_LOCATION * len(locations))
         
         try :
 
-            news_data : Response = get(CurrentNewsConnector.API_URL, params={
+            # The start date is truncated to the hour so that repeated requests share a
+            # cache entry.
+            news_data : CachedResponse = self.cache.timed_get(CurrentNewsConnector.UPSTREAM, CurrentNewsConnector.API_URL, {
                 "language" : "en",
                 "type" : 1,
                 "country" : "GB",
-                "limit" : 1,
-                "page_size" : 1,
+                "limit" : page_size,
+                "page_size" : page_size,
                 "start_date" : (
                                 datetime.now(timezone.utc) - timedelta(days=5)\
-                               ).strftime("%Y-%m-%dT%H:%M:%S.00Z"),
-                "keywords" : location,
+                               ).strftime("%Y-%m-%dT%H:00:00.00Z"),
+                "keywords" : CurrentNewsConnector.KEYWORD_SEPARATOR.join(locations),
                 "apiKey" : self.api_key
-            })
+            }, CurrentNewsConnector.REQUEST_TIMEOUT)
 
-            article : list[dict] = news_data.json()["news"]
+            # Responses served by the cache are not charged to the quota
+            if not news_data.from_network :
+                self.cached_requests.append(list(locations))
+
+            # An unchanged response is neither parsed nor stored again for the locations
+            # whose news is already stored
+            refreshed : list[bool] = [news_data.changed or location not in self.stored_locations for location in locations]
+
+            self.unchanged_locations.extend([location for location, refresh in zip(locations, refreshed) if not refresh])
+
+            if not any(refreshed) :
+                return news
+
+            articles : list[dict] = news_data.json()["news"]
             
-            # A news article is only created if an article was returned
-            if len(article) > 0:
-
-                news = News(
-                    location=location,
-                    date_time=datetime.strptime(article[0]["published"], "%Y-%m-%d %H:%M:%S %z"), 
-                    url=article[0]["url"],
-                    imgURL=article[0].get("image", None),
-                    title=article[0]["title"],
-                    description=article[0]["description"]
-                )
+            for article in articles :
+
+                # A single location's articles all match its keywords
+                for index, location in enumerate(locations) :
+
+                    if news[index] is None and (len(locations) == 1 or CurrentNewsConnector.mentions(article, location)) :
+
+                        news[index] = News(
+                            location=location,
+                            date_time=datetime.strptime(article["published"], "%Y-%m-%d %H:%M:%S %z"), 
+                            url=article["url"],
+                            imgURL=article.get("image", None),
+                            title=article["title"],
+                            description=article["description"]
+                        )
+                        break
+
+            # Articles are still assigned in the same order, so that a location that is
+            # stored again gets the article it was given before
+            news = [article if refresh else None for article, refresh in zip(news, refreshed)]
 
         except KeyError as e:
 
@@ -88,57 +236,103 @@ class CurrentNewsConnector :
                                               "connecting to the API endpoint.") from e
         
         return news
+
+
+    @with_type_validation(object, list)
+    def group_into_batches(self, locations : list) -> list :
+        """
+        This function splits a list of locations into the batches queried by each
+        request.
+
+        Parameters:
+            locations (list[str]): A list of location names.
+        """
+
+        size : int = max(1, self.batch_size)
+
+        return [locations[index:index + size] for index in range(0, len(locations), size)]
     
 
     @with_type_validation(object, list)
     def bulk_news_request(self, locations : list) -> list :
         """
-        This function performs a multi-threaded request for current news at a list
-        of locations.
+        This function performs a concurrent request for current news at a list of
+        locations, several locations are queried by each request. Locations left
+        without an article by their batch, e.g. because its articles don't name
+        them, are queried again on their own. Batches that fail are skipped so that
+        a single bad request does not block the rest, an exception is only raised
+        if no location could be retrieved.
 
         Parameters:
             locations (list[str]): A list of location names to search.
+
+        Returns:
+            list[News]: the article found for each location that has one.
         """
 
-        context : ThreadingContext = ThreadingContext()
+        self.unchanged_locations = []
+        self.cached_requests = []
+        self.network_calls = 0
 
-        news_articles : list[News] = []
+        batches : list[list[str]] = self.group_into_batches(locations)
 
+        self.upstream_calls = len(batches)
 
-        @context.with_threading_context(news_articles)
-        def thread_request(location : str) -> None:
-            """
-            This function converts the news request into a threadable function.
+        runner : ConcurrentTaskRunner = ConcurrentTaskRunner(
+            max_workers=CurrentNewsConnector.MAX_WORKERS,
+            timeout=CurrentNewsConnector.BULK_TIMEOUT,
+            failure_policy=ConcurrentTaskRunner.COLLECT
+        )
 
-            Parameters:
-                location (str): the location to search for news from.
-            """
+        results : list[TaskResult] = runner.run(self.request_news_batch, batches)
 
-            return self.request_news(location)
+        # The whole request only fails if every location failed
+        if len(results) > 0 and not any(result.succeeded for result in results) :
 
+            exception : Exception = results[0].exception
 
-        threads : list[Thread] = []
+            if isinstance(exception, CurrentNewsRequestException) :
+                raise exception
 
-        # Threads are intialized
-        for location in locations :
+            raise CurrentNewsRequestException("No news articles could be retrieved.") from exception
 
-            # the args Thread parameter unpacks the tuple too far which causes problems for
-            # further *args unpacking inside a nested function - this is resolved by placing
-            # string parameters within a secondary tuple.
-            threads.append(Thread(target=thread_request, args=(tuple([location])))) 
-            threads[threads.__len__()-1].start()
+        articles : dict[str, News] = CurrentNewsConnector.articles_by_location(results)
 
-        # Threads are joined to the main thread.
-        for thread in threads:
-            thread.join()
+        # A single location's articles all match, so a location left without an
+        # article by its batch is queried on its own
+        unmatched : list[str] = [
+            location for result in results if result.succeeded and len(result.args[0]) > 1
+            for location in result.args[0] if location not in articles and location not in self.unchanged_locations
+        ]
 
-        # The threading context provides access to exceptions thrown inside the 
-        # threading context.
-        for exception in context.exceptions :
-            raise exception
+        if unmatched :
 
-        return news_articles
+            self.upstream_calls += len(unmatched)
+            articles.update(CurrentNewsConnector.articles_by_location(
+                runner.run(self.request_news_batch, [[location] for location in unmatched])
+            ))
 
+        self.network_calls = self.upstream_calls - len(self.cached_requests)
 
+        # Only the locations that have an article replace their stored news
+        self.updated_locations = [location for location in locations if location in articles]
 
-        
+        return [articles[location] for location in self.updated_locations]
+
+
+    @staticmethod
+    def articles_by_location(results : list) -> dict :
+        """
+        This function collects the articles found by a set of batch requests.
+
+        Parameters:
+            results (list[TaskResult]): the outcome of each batch request.
+
+        Returns:
+            dict[str, News]: the article found for each location that has one.
+        """
+
+        return {
+            location : news for result in results if result.succeeded
+            for location, news in zip(result.args[0], result.value) if news is not None
+        }
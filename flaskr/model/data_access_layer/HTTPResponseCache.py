@@ -0,0 +1,348 @@
+from contextlib import contextmanager
+from email.utils import parsedate_to_datetime
+from hashlib import sha256
+from json import loads, JSONDecodeError as CompatJSONDecodeError
+from os import makedirs, path as os_path
+from threading import Lock
+from time import perf_counter, time
+from typing import Iterator
+import sqlite3
+from requests import Response, get
+from requests.exceptions import JSONDecodeError, RequestException
+
+from ..utils.metrics_utils import Counter, Histogram, metrics_registry
+from ..utils.validation_utils import with_type_validation
+
+
+upstream_duration : Histogram = metrics_registry.histogram(
+    "go_travel_upstream_request_duration_seconds", "Time taken by requests that reached an external API.", ("upstream",),
+    (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+)
+
+upstream_outcomes : Counter = metrics_registry.counter(
+    "go_travel_upstream_requests_total", "Requests for an external API by outcome - cached, changed, unchanged, http_error or error.",
+    ("upstream", "outcome")
+)
+
+
+class CachedResponse :
+    """
+    The CachedResponse class encapsulates a response body returned by the
+    HTTPResponseCache, whether it was served from disk or from the network.
+
+    Parameters:
+        content (bytes): the response body.
+        status_code (int): the HTTP status code of the response.
+        changed (bool): false if the body is identical to the previously cached body.
+        from_network (bool): false if the response was served without contacting the endpoint.
+    """
+
+    def __init__(self, content : bytes, status_code : int, changed : bool, from_network : bool) -> None :
+        """
+        Initializer
+        """
+
+        self.content : bytes = content
+        self.status_code : int = status_code
+        self.changed : bool = changed
+        self.from_network : bool = from_network
+
+
+    def json(self) -> object :
+        """
+        This method decodes the response body as JSON in the same manner as a
+        requests Response.
+        """
+
+        try :
+
+            return loads(self.content)
+
+        except (CompatJSONDecodeError, UnicodeDecodeError) as e :
+
+            raise JSONDecodeError(str(e), "", 0) from e
+
+
+
+class HTTPResponseCache :
+    """
+    This class provides a disk-backed HTTP response cache for GET requests made to
+    the external APIs. It honours the Cache-Control and Expires headers, revalidates
+    stale responses with If-None-Match and If-Modified-Since, and reports whether a
+    response body has changed so that callers can skip parsing and database writes.
+    """
+
+    @with_type_validation(object, str)
+    def __init__(self, path : str) -> None :
+        """
+        Initializer
+
+        Parameters:
+            path (str): the relative path to create the SQLite cache database at.
+        """
+
+        self.path : str = path
+
+        self.lock : Lock = Lock()
+        """
+        A mutex lock on the statistics to allow them to be updated in a thread safe
+        manner.
+        """
+
+        self.statistics : dict[str, int] = {
+            "requests" : 0,
+            "network_calls" : 0,
+            "calls_saved" : 0,
+            "revalidated" : 0,
+            "unchanged" : 0,
+            "bytes_downloaded" : 0,
+            "bytes_saved" : 0
+        }
+        """
+        Counters describing the cache's effectiveness since the process started.
+        """
+
+        if os_path.dirname(path) :
+            makedirs(os_path.dirname(path), exist_ok=True)
+
+        with self._connect() as connection :
+
+            connection.execute(
+                """
+                CREATE TABLE IF NOT EXISTS http_cache (
+                    key TEXT PRIMARY KEY,
+                    url TEXT NOT NULL,
+                    etag TEXT,
+                    last_modified TEXT,
+                    expires REAL NOT NULL,
+                    digest TEXT NOT NULL,
+                    content BLOB NOT NULL
+                )
+                """
+            )
+
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection] :
+        """
+        This function opens a new connection to the cache database, a connection
+        is created per operation so that the cache may be shared between threads.
+        """
+
+        connection : sqlite3.Connection = sqlite3.connect(self.path, timeout=30)
+
+        try :
+
+            with connection :
+                yield connection
+
+        finally :
+
+            connection.close()
+
+
+    def _count(self, **counters) -> None :
+        """
+        This function increments the statistics counters in a thread safe manner.
+        """
+
+        with self.lock :
+
+            for name, value in counters.items() :
+                self.statistics[name] += value
+
+
+    @staticmethod
+    def _expiry(response : Response, now : float) -> float :
+        """
+        This function determines when a response becomes stale. It returns None if
+        the response must not be stored, or the current time if it must always be
+        revalidated.
+
+        Parameters:
+            response (Response): the response returned by the endpoint.
+            now (float): the time the response was received.
+        """
+
+        directives : dict[str, str] = {}
+
+        for directive in response.headers.get("Cache-Control", "").split(",") :
+
+            name, _, value = directive.strip().partition("=")
+
+            if name :
+                directives[name.lower()] = value.strip('"')
+
+        if "no-store" in directives :
+            return None
+
+        if "no-cache" in directives :
+            return now
+
+        # Max-age takes precedence over the Expires header
+        for name in ("s-maxage", "max-age") :
+
+            if directives.get(name, "").isdigit() :
+                return now + int(directives[name])
+
+        try :
+
+            if "Expires" in response.headers :
+                return parsedate_to_datetime(response.headers["Expires"]).timestamp()
+
+        except (TypeError, ValueError) :
+
+            pass
+
+        return now
+
+
+    @with_type_validation(object, str, dict, float)
+    def get(self, url : str, params : dict, timeout : float) -> CachedResponse :
+        """
+        This function performs a cached GET request. Fresh responses are served
+        from disk, stale responses are revalidated with a conditional request.
+
+        Parameters:
+            url (str): the endpoint to request.
+            params (dict): the query string parameters.
+            timeout (float): the number of seconds to wait on the endpoint.
+        """
+
+        key : str = sha256(f"{url}?{sorted(params.items())}".encode()).hexdigest()
+        now : float = time()
+
+        with self._connect() as connection :
+
+            entry : tuple | None = connection.execute(
+                "SELECT etag, last_modified, expires, digest, content FROM http_cache WHERE key = ?", (key,)
+            ).fetchone()
+
+        self._count(requests=1)
+
+        # A fresh response is served without contacting the endpoint
+        if entry and entry[2] > now :
+
+            self._count(calls_saved=1, unchanged=1, bytes_saved=len(entry[4]))
+
+            return CachedResponse(entry[4], 200, False, False)
+
+        headers : dict[str, str] = {}
+
+        if entry and entry[0] :
+            headers["If-None-Match"] = entry[0]
+
+        if entry and entry[1] :
+            headers["If-Modified-Since"] = entry[1]
+
+        response : Response = get(url, params=params, headers=headers, timeout=timeout)
+
+        self._count(network_calls=1, bytes_downloaded=len(response.content))
+
+        # The endpoint confirmed the cached response is still valid
+        if response.status_code == 304 and entry :
+
+            expires : float | None = HTTPResponseCache._expiry(response, now)
+
+            with self._connect() as connection :
+                connection.execute("UPDATE http_cache SET expires = ? WHERE key = ?", (expires or now, key))
+
+            self._count(revalidated=1, unchanged=1, bytes_saved=len(entry[4]))
+
+            return CachedResponse(entry[4], 200, False, True)
+
+        digest : str = sha256(response.content).hexdigest()
+        changed : bool = not entry or entry[3] != digest
+
+        if not changed :
+            self._count(unchanged=1)
+
+        # Only successful responses are stored
+        if response.status_code == 200 :
+
+            expires : float | None = HTTPResponseCache._expiry(response, now)
+
+            with self._connect() as connection :
+
+                if expires is None :
+
+                    connection.execute("DELETE FROM http_cache WHERE key = ?", (key,))
+
+                else :
+
+                    connection.execute(
+                        "INSERT OR REPLACE INTO http_cache VALUES (?, ?, ?, ?, ?, ?, ?)",
+                        (
+                            key, url,
+                            response.headers.get("ETag", None),
+                            response.headers.get("Last-Modified", None),
+                            expires, digest, response.content
+                        )
+                    )
+
+        return CachedResponse(response.content, response.status_code, changed, True)
+
+
+    @with_type_validation(object, str, str, dict, float)
+    def timed_get(self, upstream : str, url : str, params : dict, timeout : float) -> CachedResponse :
+        """
+        This function performs a cached GET request on behalf of an external API's
+        connector, recording the request's outcome and, if it reached the endpoint,
+        its duration.
+
+        Parameters:
+            upstream (str): the name of the external API, e.g. OpenWeather.
+            url (str): the endpoint to request.
+            params (dict): the query string parameters.
+            timeout (float): the number of seconds to wait on the endpoint.
+        """
+
+        start : float = perf_counter()
+
+        try :
+
+            response : CachedResponse = self.get(url, params, timeout)
+
+        except RequestException :
+
+            upstream_duration.observe(perf_counter() - start, upstream)
+            upstream_outcomes.inc(upstream, "error")
+            raise
+
+        outcome : str = "cached"
+
+        if response.from_network :
+
+            upstream_duration.observe(perf_counter() - start, upstream)
+
+            if response.status_code != 200 :
+                outcome = "http_error"
+            else :
+                outcome = "changed" if response.changed else "unchanged"
+
+        upstream_outcomes.inc(upstream, outcome)
+
+        return response
+
+
+    @with_type_validation(object, str)
+    def clear(self, url : str) -> None :
+        """
+        This function removes every cached response for a given endpoint, this
+        forces the next request to be treated as changed.
+
+        Parameters:
+            url (str): the endpoint to clear.
+        """
+
+        with self._connect() as connection :
+            connection.execute("DELETE FROM http_cache WHERE url = ?", (url,))
+
+
+    def get_statistics(self) -> dict :
+        """
+        This function returns a snapshot of the cache statistics.
+        """
+
+        with self.lock :
+            return dict(self.statistics)
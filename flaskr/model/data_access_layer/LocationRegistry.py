@@ -0,0 +1,284 @@
+import re
+import numpy as np
+import pandas as pd
+
+from ..utils.spatial_utils import SpatialIndex
+from ..utils.validation_utils import with_type_validation
+
+
+class LocationMatch :
+    """
+    The LocationMatch class encapsulates a single location mention found in a piece
+    of text.
+
+    Parameters:
+        location_id (int): the id of the location that was mentioned.
+        name (str): the location's canonical name.
+        start (int): the index of the first character of the mention.
+        end (int): the index after the last character of the mention.
+    """
+
+    def __init__(self, location_id : int, name : str, start : int, end : int) -> None :
+        """
+        Initializer
+        """
+
+        self.location_id : int = location_id
+        self.name : str = name
+        self.start : int = start
+        self.end : int = end
+
+
+    def __repr__(self) -> str :
+        """
+        This method displays the object's intialization specification as a string.
+        """
+
+        return f"LocationMatch({self.location_id}, {self.name}, {self.start}, {self.end})"
+
+
+
+class LocationRegistry :
+    """
+    This class holds the locations served by the chatbot. Each location is assigned
+    an integer id, and an Aho-Corasick automaton over the words of every name and
+    alias finds all location mentions in a piece of text in a single linear pass.
+    """
+
+    TOKEN_PATTERN : re.Pattern = re.compile(r"[a-z0-9]+(?:'[a-z]+)?")
+    """
+    This (static) class constant defines the words that names and text are split
+    into, matching is case insensitive and ignores punctuation.
+    """
+
+    ALIAS_SEPARATOR : str = "|"
+    """
+    This (static) class constant defines the separator used by the optional aliases
+    column of the locations file.
+    """
+
+    SPATIAL_CELL_SIZE : float = 0.5
+    """
+    This (static) class constant defines the size in degrees of the grid cells used
+    by the spatial index.
+    """
+
+    @with_type_validation(object, pd.DataFrame)
+    def __init__(self, data : pd.DataFrame) -> None :
+        """
+        Initializer
+
+        Parameters:
+            data (pd.DataFrame): the location, lat and lon columns and an optional
+            aliases column.
+        """
+
+        self.names : list[str] = data["location"].astype(str).str.strip().tolist()
+        self.lat : np.ndarray = data["lat"].to_numpy(dtype=np.float64)
+        self.lon : np.ndarray = data["lon"].to_numpy(dtype=np.float64)
+
+        self.ids : dict[str, int] = {}
+        """
+        The id of every name and alias, keyed by its lower case form.
+        """
+
+        aliases : list[str] = data["aliases"].fillna("").astype(str).tolist() if "aliases" in data else [""] * len(self.names)
+
+        for location_id, (name, alias_list) in enumerate(zip(self.names, aliases)) :
+
+            for alias in LocationRegistry.aliases_of(name) + [alias.strip() for alias in alias_list.split(LocationRegistry.ALIAS_SEPARATOR) if alias.strip()] :
+                self.ids.setdefault(alias.lower(), location_id)
+
+        self._build_automaton()
+
+        self.spatial_index : SpatialIndex = SpatialIndex(self.lat, self.lon, LocationRegistry.SPATIAL_CELL_SIZE)
+        """
+        A grid index over the location coordinates used to answer radius queries.
+        """
+
+
+    @classmethod
+    def from_csv(cls, path : str) -> "LocationRegistry" :
+        """
+        This function loads the registry from a CSV file in a single read.
+
+        Parameters:
+            path (str): the path to the locations file.
+        """
+
+        return cls(pd.read_csv(path, delimiter=",", dtype={"location" : str}))
+
+
+    @staticmethod
+    def aliases_of(name : str) -> list :
+        """
+        This function returns the names a location is known by, a leading "The" is
+        optional so that "Cotswolds" refers to "The Cotswolds".
+
+        Parameters:
+            name (str): the location's canonical name.
+        """
+
+        aliases : list[str] = [name]
+
+        if name.lower().startswith("the ") and len(name) > 4 :
+            aliases.append(name[4:])
+
+        return aliases
+
+
+    def _build_automaton(self) -> None :
+        """
+        This function builds a word level Aho-Corasick automaton over every name and
+        alias. Each node stores its child transitions, its failure link and the
+        patterns that end at it as (location id, number of words) pairs.
+        """
+
+        self.children : list[dict[str, int]] = [{}]
+        self.fail : list[int] = [0]
+        self.outputs : list[list[tuple]] = [[]]
+
+        # The trie is built from the tokenised patterns
+        for alias, location_id in self.ids.items() :
+
+            words : list[str] = LocationRegistry.TOKEN_PATTERN.findall(alias)
+
+            if not words :
+                continue
+
+            node : int = 0
+
+            for word in words :
+
+                if word not in self.children[node] :
+                    self.children[node][word] = len(self.children)
+                    self.children.append({})
+                    self.fail.append(0)
+                    self.outputs.append([])
+
+                node = self.children[node][word]
+
+            self.outputs[node].append((location_id, len(words)))
+
+        # Failure links are assigned breadth first, outputs are merged along them
+        queue : list[int] = list(self.children[0].values())
+        head : int = 0
+
+        while head < len(queue) :
+
+            node : int = queue[head]
+            head += 1
+
+            for word, child in self.children[node].items() :
+
+                fallback : int = self.fail[node]
+
+                while fallback and word not in self.children[fallback] :
+                    fallback = self.fail[fallback]
+
+                self.fail[child] = self.children[fallback].get(word, 0)
+                self.outputs[child] = self.outputs[child] + self.outputs[self.fail[child]]
+                queue.append(child)
+
+
+    def __len__(self) -> int :
+        """
+        Returns the number of locations in the registry.
+        """
+
+        return len(self.names)
+
+
+    @with_type_validation(object, str)
+    def get_id(self, name : str) -> int :
+        """
+        This function returns the id of a location name or alias, or -1 if it is not
+        known.
+
+        Parameters:
+            name (str): the location name or alias.
+        """
+
+        return self.ids.get(name.strip().lower(), -1)
+
+
+    def as_rows(self) -> list :
+        """
+        This function returns the locations as [name, lat, lon] rows, as used by the
+        weather connector.
+        """
+
+        return [[name, float(lat), float(lon)] for name, lat, lon in zip(self.names, self.lat, self.lon)]
+
+
+    @with_type_validation(object, int, float)
+    def nearby(self, location_id : int, radius_km : float) -> list :
+        """
+        This function returns the names of every location within a radius of a
+        location, including the location itself, ordered by distance.
+
+        Parameters:
+            location_id (int): the id of the location at the centre of the search.
+            radius_km (float): the search radius in kilometres.
+        """
+
+        ids, distances = self.spatial_index.within(float(self.lat[location_id]), float(self.lon[location_id]), radius_km)
+
+        return [self.names[location] for location in ids]
+
+
+    @with_type_validation(object, str)
+    def find_all(self, text : str) -> list :
+        """
+        This function finds every location mentioned in a piece of text in a single
+        pass. Overlapping mentions are resolved in favour of the leftmost, then the
+        longest, mention.
+
+        Parameters:
+            text (str): the text to search.
+
+        Returns:
+            list[LocationMatch]: the mentions in the order they appear.
+        """
+
+        tokens : list[re.Match] = list(LocationRegistry.TOKEN_PATTERN.finditer(text.lower()))
+        candidates : list[tuple] = []
+        node : int = 0
+
+        for index, token in enumerate(tokens) :
+
+            word : str = token.group(0)
+
+            while node and word not in self.children[node] :
+                node = self.fail[node]
+
+            node = self.children[node].get(word, 0)
+
+            for location_id, length in self.outputs[node] :
+                candidates.append((index - length + 1, index, location_id))
+
+        matches : list[LocationMatch] = []
+        covered : int = -1
+
+        for first, last, location_id in sorted(candidates, key=lambda candidate : (candidate[0], candidate[0] - candidate[1])) :
+
+            if first > covered :
+                matches.append(LocationMatch(location_id, self.names[location_id], tokens[first].start(), tokens[last].end()))
+                covered = last
+
+        return matches
+
+
+    @with_type_validation(object, str)
+    def find(self, text : str) -> LocationMatch :
+        """
+        This function returns the first location mentioned in a piece of text, or
+        None if no location is mentioned.
+
+        Parameters:
+            text (str): the text to search.
+        """
+
+        matches : list[LocationMatch] = self.find_all(text)
+
+        return matches[0] if matches else None
@@ -1,11 +1,11 @@
 from datetime import datetime, timezone
-from threading import Thread
-from requests import Response, get
+from math import floor
 from requests.exceptions import RequestException, JSONDecodeError
 
+from .HTTPResponseCache import CachedResponse, HTTPResponseCache
 from .SQLConnector import Weather
 from ..exceptions.OpenWeatherRequestException import OpenWeatherRequestException
-from ..utils.threading_utils import ThreadingContext
+from ..utils.threading_utils import ConcurrentTaskRunner, TaskResult
 from ..utils.validation_utils import with_type_validation
 
 
@@ -20,18 +20,95 @@ class OpenWeatherConnector :
     This (static) class constant defines the api endpoint being accessed.
     """
 
-    @with_type_validation(object, str)
-    def __init__(self, api_key : str) -> None:
+    UPSTREAM : str = "OpenWeather"
+    """
+    This (static) class constant defines the name the api's metrics are reported
+    under.
+    """
+
+    REQUEST_TIMEOUT : float = 5.0
+    """
+    This (static) class constant defines the number of seconds a single request
+    may wait on the api endpoint.
+    """
+
+    BULK_TIMEOUT : float = 10.0
+    """
+    This (static) class constant defines the overall deadline in seconds for a
+    bulk request.
+    """
+
+    MAX_WORKERS : int = 8
+    """
+    This (static) class constant defines the number of concurrent requests made
+    during a bulk request.
+    """
+
+    GRID_CELL_SIZE : float = 0.1
+    """
+    This (static) class constant defines the default size in degrees of the grid
+    cells used to coalesce requests for nearby locations, 0 disables coalescing.
+    """
+
+    @with_type_validation(object, str, HTTPResponseCache, float)
+    def __init__(self, api_key : str, cache : HTTPResponseCache, cell_size : float) -> None:
         """
         Initializer
 
         Parameters:
             api_key (str) : The api key for the OpenWeather API
+            cache (HTTPResponseCache) : The response cache requests are made through
+            cell_size (float) : The size in degrees of the grid cells used to coalesce
+            requests, e.g. OpenWeatherConnector.GRID_CELL_SIZE, 0 disables coalescing.
         """
         self.api_key : str = api_key
+        self.cache : HTTPResponseCache = cache
+
+        self.unchanged_locations : list[str] = []
+        """
+        The locations whose response was unchanged since it was last retrieved and
+        whose data is stored, their stored data does not need to be updated.
+        """
+
+        self.stored_locations : set[str] = set()
+        """
+        The locations whose data is already stored, only these can be skipped when
+        their response is unchanged. A location missing from the store, e.g. because
+        it was added to a cached grid cell or its last write failed, is parsed and
+        stored again.
+        """
+
+        self.updated_locations : list[str] = []
+        """
+        The locations whose data was successfully retrieved and changed during the
+        last bulk request, only their stored data needs to be replaced.
+        """
+
+        self.cell_size : float = cell_size
+        """
+        The size in degrees of the grid cells used to coalesce requests, locations
+        within the same cell share a single upstream request.
+        """
+
+        self.upstream_calls : int = 0
+        """
+        The number of upstream requests made during the last bulk request.
+        """
+
+        self.cached_requests : list[list[str]] = []
+        """
+        The locations of each request answered by the response cache without
+        contacting the endpoint during the last bulk request.
+        """
+
+        self.network_calls : int = 0
+        """
+        The number of requests that reached the endpoint during the last bulk
+        request, only these are charged to the API's quota.
+        """
 
     @with_type_validation(object, str, float, float)
-    def request_weather(self, location : str, lat : float, lon : float) -> Weather:
+    def request_weather(self, location : str, lat : float, lon : float) -> list:
         """
         This function provides a simple method by which weather data can
         be retrieved for a 5 day period for a given location.
@@ -42,21 +119,52 @@ class OpenWeatherConnector :
             lon (float) : The longitude of the location.
         """            
 
+        return self.request_weather_cell([[location, lat, lon]], lat, lon)[0]
+
+
+    @with_type_validation(object, list, float, float)
+    def request_weather_cell(self, locations : list, lat : float, lon : float) -> list:
+        """
+        This function retrieves a single 5 day forecast for a set of coordinates
+        and fans it out to every location that shares those coordinates.
+
+        Parameters:
+            locations (list[list[str, float, float]]) : The locations served by the forecast.
+            lat (float) : The latitude the forecast is requested for.
+            lon (float) : The longitude the forecast is requested for.
+
+        Returns:
+            list[list[Weather]]: one forecast per location, in the same order as locations.
+        """
+
         # Input validation is performed to range check the coordinates.
-        if lat < -90 or lat > 90 and lat < -180 and lat > 180:
+        if lat < -90 or lat > 90 or lon < -180 or lon > 180:
             raise ValueError(f"Invalid latitude and longitude values: ({lat},{lon}).")
 
-        forecast : list[Weather] | None = []
+        forecasts : list[list[Weather]] = [[] for location in locations]
         
         try :
 
-            forecast_data : Response = get(OpenWeatherConnector.API_URL, params={
+            forecast_data : CachedResponse = self.cache.timed_get(OpenWeatherConnector.UPSTREAM, OpenWeatherConnector.API_URL, {
                 "lat" : lat, 
                 "lon" : lon, 
                 "appid" : self.api_key,
                 "units" : "metric",
                 "lang" : "en"
-            })
+            }, OpenWeatherConnector.REQUEST_TIMEOUT)
+
+            # Responses served by the cache are not charged to the quota
+            if not forecast_data.from_network :
+                self.cached_requests.append([location[0] for location in locations])
+
+            # An unchanged forecast is neither parsed nor stored again for the locations
+            # whose data is already stored
+            refreshed : list[bool] = [forecast_data.changed or location[0] not in self.stored_locations for location in locations]
+
+            self.unchanged_locations.extend([location[0] for location, refresh in zip(locations, refreshed) if not refresh])
+
+            if not any(refreshed) :
+                return forecasts
 
             forecast_json : dict = forecast_data.json()
 
@@ -66,21 +174,26 @@ class OpenWeatherConnector :
 
                 if date_time.hour >= 6 and date_time.hour <= 18 :
 
-                    forecast.append(Weather(
-                        date_time=date_time,
-                        location=location,
-                        lat=lat,
-                        lon=lon,
-                        temp=weather["main"].get("temp", None) ,
-                        min_temp=weather["main"].get("temp_min", None),
-                        max_temp=weather["main"].get("temp_max", None),
-                        feels_temp=weather["main"].get("feels_like", None),
-                        humidity=weather["main"].get("humidity", None),
-                        description=weather.get("weather", [dict()])[0].get("description", None),
-                        wind_speed=weather.get("wind", None).get("speed", None),
-                        rain_prob=weather.get("pop", None),
-                        visibility=weather.get("visibility", None)
-                    ))
+                    for forecast, location, refresh in zip(forecasts, locations, refreshed) :
+
+                        if not refresh :
+                            continue
+
+                        forecast.append(Weather(
+                            date_time=date_time,
+                            location=location[0],
+                            lat=location[1],
+                            lon=location[2],
+                            temp=weather["main"].get("temp", None) ,
+                            min_temp=weather["main"].get("temp_min", None),
+                            max_temp=weather["main"].get("temp_max", None),
+                            feels_temp=weather["main"].get("feels_like", None),
+                            humidity=weather["main"].get("humidity", None),
+                            description=weather.get("weather", [dict()])[0].get("description", None),
+                            wind_speed=weather.get("wind", None).get("speed", None),
+                            rain_prob=weather.get("pop", None),
+                            visibility=weather.get("visibility", None)
+                        ))
 
         except KeyError as e:
 
@@ -97,51 +210,97 @@ class OpenWeatherConnector :
             raise OpenWeatherRequestException("Something went wrong whilst"\
                                               " connecting to the API endpoint.") from e
         
-        return forecast
-        
+        return forecasts
+
+
+    @with_type_validation(object, list)
+    def group_by_cell(self, locations : list) -> list :
+        """
+        This function snaps each location to the centre of its grid cell and groups
+        the locations that share a cell, in order of first appearance.
+
+        Parameters:
+            locations (list[list[str, float, float]]): A list of locations.
+
+        Returns:
+            list[tuple[list, float, float]]: the locations in each cell and the cell's
+            centre coordinates.
+        """
+
+        cells : dict[tuple, tuple] = {}
+
+        for location in locations :
+
+            lat : float = float(location[1])
+            lon : float = float(location[2])
+
+            # Coalescing is disabled for a non-positive cell size
+            if self.cell_size > 0 :
+
+                row : int = floor(lat / self.cell_size)
+                column : int = floor(lon / self.cell_size)
+                key : tuple = (row, column)
+                lat = round((row + 0.5) * self.cell_size, 4)
+                lon = round((column + 0.5) * self.cell_size, 4)
+
+            else :
+
+                key : tuple = (lat, lon)
+
+            cells.setdefault(key, ([], lat, lon))[0].append(location)
+
+        return list(cells.values())
+
+
     @with_type_validation(object, list)
     def bulk_weather_request(self, locations : list) -> list :
         """
-        This function performs a multi-threaded request for weather forecasts 
-        at a list of locations.
+        This function performs a concurrent request for weather forecasts at a
+        list of locations. Nearby locations are coalesced into a single upstream
+        request per grid cell. Locations that fail are skipped so that a single
+        bad location does not block the rest, an exception is only raised if no
+        location could be retrieved.
 
         Parameters:
             locations (list[list[str, float, float]]): A list of location names
             to search.
         """
 
-        context : ThreadingContext = ThreadingContext()
+        self.unchanged_locations = []
+        self.cached_requests = []
+        self.network_calls = 0
 
-        forecasts : list[list[Weather]] = []
+        cells : list[tuple] = self.group_by_cell(locations)
 
+        self.upstream_calls = len(cells)
 
-        @context.with_threading_context(forecasts)
-        def thread_request(location : str, lat : float, lon : float) -> None:
-            """
-            This function converts the weather forecaset request into a threadable
-            function.
+        runner : ConcurrentTaskRunner = ConcurrentTaskRunner(
+            max_workers=OpenWeatherConnector.MAX_WORKERS,
+            timeout=OpenWeatherConnector.BULK_TIMEOUT,
+            failure_policy=ConcurrentTaskRunner.COLLECT
+        )
 
-            Parameters:
-                location (str): the location to search for weather forecast data from.
-            """
+        results : list[TaskResult] = runner.run(self.request_weather_cell, cells)
 
-            return self.request_weather(location, lat, lon)
-            
+        self.network_calls = self.upstream_calls - len(self.cached_requests)
 
-        threads : list[Thread] = []
+        forecasts : list[list[Weather]] = [
+            forecast for result in results if result.succeeded for forecast in result.value
+        ]
 
-        # Threads are intialized
-        for location in locations :
-            threads.append(Thread(target=thread_request, args=(location))) 
-            threads[threads.__len__()-1].start()
+        # The whole request only fails if every location failed
+        if len(forecasts) == 0 and len(results) > 0 :
+
+            exception : Exception = results[0].exception
+
+            if isinstance(exception, OpenWeatherRequestException) :
+                raise exception
 
-        # Threads are joined to the main thread.
-        for thread in threads:
-            thread.join()
+            raise OpenWeatherRequestException("No weather forecasts could be retrieved.") from exception
 
-        # The threading context provides access to exceptions thrown inside the 
-        # threading context.
-        for exception in context.exceptions :
-            raise exception
+        self.updated_locations = [
+            location[0] for result in results if result.succeeded
+            for location in result.args[0] if location[0] not in self.unchanged_locations
+        ]
 
-        return forecasts
\ No newline at end of file
+        return forecasts
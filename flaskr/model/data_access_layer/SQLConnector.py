@@ -1,6 +1,6 @@
 from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
-from sqlalchemy import Column, Integer, Float, String, DateTime, text, bindparam
+from sqlalchemy import Column, Integer, Float, String, Date, DateTime, text, bindparam
 from sqlalchemy.sql.expression import TextClause
 from sqlalchemy.exc import StatementError, InvalidRequestError, SQLAlchemyError
 from sqlalchemy.orm.exc import StaleDataError, MultipleResultsFound
@@ -9,12 +9,20 @@ from sqlalchemy.orm.exc import StaleDataError, MultipleResultsFound
 from ..exceptions.InvalidORMClassException import InvalidORMClassException
 from ..exceptions.SQLRequestException import SQLRequestException
 from ..exceptions.SQLServerError import SQLServerError
+from ..utils.metrics_utils import Histogram, metrics_registry
+from ..utils.tracing_utils import trace_stage
 from ..utils.validation_utils import with_type_validation
 
 
 db : SQLAlchemy = SQLAlchemy()
 
 
+query_duration : Histogram = metrics_registry.histogram(
+    "go_travel_sql_query_duration_seconds", "Time taken by each named SQL query.", ("query",),
+    (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+)
+
+
 class Weather(db.Model) :
     """
     The Weather class encapsulates all the information relating to the weather in 
@@ -73,6 +81,33 @@ class News(db.Model) :
     description : Column = db.Column(String, unique=False, nullable=False)
 
 
+class DailyForecast(db.Model) :
+    """
+    The DailyForecast class encapsulates a summary of the weather forecast for a
+    given location on a given day, built from its daytime Weather rows whenever
+    they are refreshed.
+
+    Parameters:
+        location (str): The plain text location name.
+        date (date): The (UTC) date the summary is for.
+        description (str): The plain text description of the weather at noon.
+        temp (float): The temperature at noon in degrees Celsius.
+        min_temp (float): The minimum daytime temperature in degrees Celsius.
+        max_temp (float): The maximum daytime temperature in degrees Celsius.
+        mean_temp (float): The mean daytime temperature in degrees Celsius.
+        rain_prob (float): The highest probability (0.0 - 1.0) of rainfall in any 3hr window of the day.
+    """
+
+    location : Column = db.Column(String, unique=False, nullable=False, primary_key=True)
+    date : Column = db.Column(Date, unique=False, nullable=False, primary_key=True)
+    description : Column = db.Column(String, unique=False, nullable=True)
+    temp : Column = db.Column(Float, unique=False, nullable=True)
+    min_temp : Column = db.Column(Float, unique=False, nullable=True)
+    max_temp : Column = db.Column(Float, unique=False, nullable=True)
+    mean_temp : Column = db.Column(Float, unique=False, nullable=True)
+    rain_prob : Column = db.Column(Float, unique=False, nullable=True)
+
+
 class SQLConnector:
     """
     This class handles the initialization and communication with an SQLite
@@ -97,6 +132,27 @@ class SQLConnector:
         self.db.init_app(self.app)
 
     
+    @staticmethod
+    def create_statement(query : str, substitutions : dict) -> TextClause :
+        """
+        This function creates a textual SQL statement, list substitutions are bound
+        as expanding parameters so that they may be used with IN clauses.
+
+        Parameters:
+            query (str): a written sql query
+            substitutions (dict[str, Any]): the values to be injected into the query
+        """
+
+        statement : TextClause = text(query)
+
+        for name, value in substitutions.items() :
+
+            if isinstance(value, (list, tuple)) :
+                statement = statement.bindparams(bindparam(name, expanding=True))
+
+        return statement
+
+
     def initialize_tables(self)  -> None:
         """
         The tables in the database are initialized if they are not already created.
@@ -121,14 +177,14 @@ class SQLConnector:
 
         Parameters:
             type (type): The ORM class type.
-            objects (list[Weather] | list[News]): The object to be saved.
+            objects (list[Weather] | list[News] | list[DailyForecast]): The object to be saved.
         """
 
         # Input ORM Class type validation
-        if type != Weather and type != News:
+        if type != Weather and type != News and type != DailyForecast:
             raise InvalidORMClassException()
 
-        # Input validation ORM Class must be Weather or News
+        # Input validation ORM Class must be Weather, News or DailyForecast
         for obj in objects:
             if not isinstance(obj, type):
                 raise InvalidORMClassException() 
@@ -176,15 +232,79 @@ class SQLConnector:
                 raise SQLServerError("An unspecified SQLAlchemy error occurred during an INSERT or UPDATE request.") from e
 
 
-    @with_type_validation(object, type, str, dict)
-    def orm_query(self, type : type, query : str, substitutions : dict)  -> object :
+    @with_type_validation(object, type, list, list)
+    def bulk_update(self, type : type, objects : list, locations : list) -> None:
+        """
+        This function replaces the rows stored for a subset of locations with a list
+        of ORM objects, rows for every other location are left untouched.
+
+        Parameters:
+            type (type): The ORM class type.
+            objects (list[Weather] | list[News] | list[DailyForecast]): The object to be saved.
+            locations (list[str]): The locations whose rows are replaced.
+        """
+
+        # Input ORM Class type validation
+        if type != Weather and type != News and type != DailyForecast:
+            raise InvalidORMClassException()
+
+        # Input validation ORM Class must be Weather, News or DailyForecast
+        for obj in objects:
+            if not isinstance(obj, type):
+                raise InvalidORMClassException() 
+
+        with self.app.app_context():
+
+            # SQL Exception Handling
+            try:
+                
+                self.db.session.query(type).filter(type.location.in_(locations)).delete(synchronize_session=False)
+                self.db.session.bulk_save_objects(objects)
+                self.db.session.commit()
+            
+            # The SQL statement is invalid
+            except StatementError as e :
+                
+                # Cleanup
+                self.db.session.rollback()
+
+                raise SQLRequestException("An SQL syntax error occurred.") from e
+            
+            # The request made was rejected by the server
+            except InvalidRequestError as e :
+
+                # Cleanup
+                self.db.session.rollback()
+
+                raise SQLRequestException("An invalid SQL INSERT or UPDATE request was made.") from e
+            
+            # The SQL statement is invalid
+            except StaleDataError as e :
+
+                # Cleanup
+                self.db.session.rollback()
+
+                raise SQLServerError("A database concurrency issue caused an error.") from e
+            
+            # An unknown error occurred.    
+            except SQLAlchemyError as e :
+
+                # Cleanup
+                self.db.session.rollback()
+
+                raise SQLServerError("An unspecified SQLAlchemy error occurred during an INSERT or UPDATE request.") from e
+
+
+    @with_type_validation(object, type, str, dict, str)
+    def orm_query(self, type : type, query : str, substitutions : dict, name : str)  -> object :
         """
         This function can retrieve a single point of Weather or News data using an SQL query.
 
         Parameters:
-            type (type): ORM class type - valid values "Weather", "News" (see static keywords)
+            type (type): ORM class type - valid values "Weather", "News", "DailyForecast" (see static keywords)
             query (str): a written sql query
             substitutions (dict[str, Any]): the values to be injected into the query
+            name (str): the name the query's duration is reported under
 
         Returns:
             Weather | News : an ORM object created from the tables in the database.
@@ -193,16 +313,16 @@ class SQLConnector:
         result : Weather | News | None = None # type: ignore
 
         # Input ORM Class type validation
-        if type != Weather and type != News:
+        if type != Weather and type != News and type != DailyForecast:
             raise InvalidORMClassException()
         
 
-        with self.app.app_context():
+        with trace_stage("sql"), query_duration.time(name), self.app.app_context():
 
             # SQL Exception Handling
             try:
 
-                result = self.db.session.query(type).from_statement(text(query)).params(**substitutions).one_or_none()
+                result = self.db.session.query(type).from_statement(SQLConnector.create_statement(query, substitutions)).params(**substitutions).one_or_none()
 
             # The SQL statement is invalid
             except StatementError as e :
@@ -220,15 +340,16 @@ class SQLConnector:
         return result
     
 
-    @with_type_validation(object, type, str, dict)
-    def bulk_orm_query(self, type : type, query : str, substitutions : dict) -> list :
+    @with_type_validation(object, type, str, dict, str)
+    def bulk_orm_query(self, type : type, query : str, substitutions : dict, name : str) -> list :
         """
         This function can retrieve a set of Weather or News data using an SQL query.
 
         Parameters:
-            type (type): ORM class type - valid values "Weather", "News" (see static keywords)
+            type (type): ORM class type - valid values "Weather", "News", "DailyForecast" (see static keywords)
             query (str): a written sql query
             substitutions (dict[str, Any]): the values to be injected into the query
+            name (str): the name the query's duration is reported under
 
         Returns:
             list[Weather] | list[News]: a list of ORM objects defined from the tables in the
@@ -238,16 +359,16 @@ class SQLConnector:
         results : list = []
 
         # Input ORM Class type validation
-        if type != Weather and type != News:
+        if type != Weather and type != News and type != DailyForecast:
             raise InvalidORMClassException()
         
         
-        with self.app.app_context():
+        with trace_stage("sql"), query_duration.time(name), self.app.app_context():
 
             # SQL Exception Handling
             try:
 
-                results = self.db.session.query(type).from_statement(text(query)).params(**substitutions).all()
+                results = self.db.session.query(type).from_statement(SQLConnector.create_statement(query, substitutions)).params(**substitutions).all()
             
             # The SQL statement is invalid
             except StatementError as e :
@@ -0,0 +1,34 @@
+class ApplicationStartupException(RuntimeError) :
+    """
+    This custom exception is raised internally by the server when the application
+    cannot be created, e.g. when a required file is missing or invalid.
+    """
+
+    def __init__(self, message, exit_code)  -> None :
+        """
+        Initializer
+
+        Parameters:
+            message (str): The cause of the exception
+            exit_code (int): The code the application should exit with
+        """
+
+        self.message = message
+        self.exit_code = exit_code
+        super().__init__()
+
+
+    def __str__(self)  -> str :
+        """
+        This method displays the exception's cause.
+        """
+
+        return self.message
+
+
+    def __repr__(self) -> str :
+        """
+        This method displays the object's intialization specification as a string.
+        """
+
+        return f"ApplicationStartupException({self.message}, {self.exit_code})"
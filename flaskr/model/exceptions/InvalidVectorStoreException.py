@@ -0,0 +1,32 @@
+class InvalidVectorStoreException(RuntimeError) :
+    """
+    This custom exception is raised internally by the server when a statement vector
+    store is missing, corrupt or was built for a different language model.
+    """
+
+    def __init__(self, message)  -> None :
+        """
+        Initializer
+
+        Parameters:
+            message (str): The cause of the exception
+        """
+
+        self.message = message
+        super().__init__()
+
+
+    def __str__(self)  -> str :
+        """
+        This method displays the exception's cause.
+        """
+
+        return f"The statement vector store could not be used: {self.message}"
+
+
+    def __repr__(self) -> str :
+        """
+        This method displays the object's intialization specification as a string.
+        """
+
+        return f"InvalidVectorStoreException({self.message})"
@@ -0,0 +1,33 @@
+
+class TaskCancelledException(RuntimeError) :
+    """
+    This custom exception is raised internally by the server when a concurrent task
+    is cancelled or does not complete before the task runner's deadline.
+    """
+
+    def __init__(self, message)  -> None :
+        """
+        Initializer
+
+        Parameters:
+            message (str): The cause of the exception
+        """
+
+        self.message = message
+        super().__init__()
+
+
+    def __str__(self)  -> str :
+        """
+        This method displays the exception's cause.
+        """
+
+        return f"A concurrent task did not complete: {self.message}"
+
+
+    def __repr__(self) -> str :
+        """
+        This method displays the object's intialization specification as a string.
+        """
+
+        return f"TaskCancelledException({self.message})"
@@ -0,0 +1,200 @@
+from contextlib import contextmanager
+from threading import Lock
+from time import monotonic
+from typing import Iterator
+
+from ..utils.shared_state_utils import SharedState
+from ..utils.validation_utils import with_type_validation
+
+
+class CircuitBreaker :
+    """
+        This class implements a circuit breaker for an upstream API. After a number
+        of consecutive failures the circuit opens and requests are refused without
+        contacting the API. Once the reset timeout has passed a single trial request
+        is allowed, its outcome closes or re-opens the circuit. The circuit may be
+        shared by several processes, see share().
+    """
+
+    CLOSED : str = "closed"
+    """
+    Circuit state - requests are allowed.
+    """
+
+    OPEN : str = "open"
+    """
+    Circuit state - requests are refused until the reset timeout has passed.
+    """
+
+    HALF_OPEN : str = "half-open"
+    """
+    Circuit state - a single trial request is in progress.
+    """
+
+    @with_type_validation(object, str, int, float)
+    def __init__(self, name : str, failure_threshold : int, reset_timeout : float) -> None :
+        """
+        Initializer
+
+        Parameters:
+            name (str): the name of the upstream API.
+            failure_threshold (int): the number of consecutive failures that open the circuit.
+            reset_timeout (float): the number of seconds the circuit stays open before a trial request.
+        """
+
+        if failure_threshold < 1 or reset_timeout <= 0 :
+            raise ValueError(f"Invalid circuit breaker configuration: {failure_threshold} failures, {reset_timeout} seconds.")
+
+        self.name : str = name
+        self.failure_threshold : int = failure_threshold
+        self.reset_timeout : float = reset_timeout
+
+        self.lock : Lock = Lock()
+        """
+        A mutex lock on the circuit state as requests may run on different threads.
+        """
+
+        self.state : str = CircuitBreaker.CLOSED
+        self.failures : int = 0
+        self.opened_at : float = 0.0
+
+        self.rejected : int = 0
+        """
+        The total number of requests refused while the circuit was open.
+        """
+
+        self.shared : SharedState = None
+        """
+        The store holding the circuit state when it is shared with other processes,
+        None if it is held by this process only.
+        """
+
+
+    @with_type_validation(object, SharedState)
+    def share(self, shared : SharedState) -> None :
+        """
+        This function moves the circuit state into a store shared by the worker
+        processes of a pre-fork server, so that failures seen by any worker open the
+        circuit for all of them and only one trial request is made between them.
+
+        Parameters:
+            shared (SharedState): the store shared by every worker process.
+        """
+
+        with self.lock :
+            self.shared = shared
+
+
+    @contextmanager
+    def _synchronised(self) -> Iterator[None] :
+        """
+        This function holds the lock on the circuit state, when it is shared it also
+        holds the shared store's lock and loads the latest state, saving it again
+        once the caller has updated it. The time the circuit opened is monotonic,
+        which is consistent between the processes of a single machine.
+        """
+
+        with self.lock :
+
+            if self.shared is None :
+                yield
+                return
+
+            key : str = f"circuit:{self.name}"
+
+            with self.shared.transaction({key : self._state()}) as values :
+
+                self.state = values[key]["state"]
+                self.failures = values[key]["failures"]
+                self.opened_at = values[key]["opened_at"]
+                self.rejected = values[key]["rejected"]
+
+                yield
+
+                values[key] = self._state()
+
+
+    def _state(self) -> dict :
+        """
+        Returns the circuit state that is shared.
+        """
+
+        return {
+            "state" : self.state,
+            "failures" : self.failures,
+            "opened_at" : self.opened_at,
+            "rejected" : self.rejected
+        }
+
+
+    def allow_request(self) -> bool :
+        """
+        Returns true if a request may be sent to the upstream API. Callers that are
+        allowed must report the outcome with record_success() or record_failure().
+        """
+
+        with self._synchronised() :
+
+            # The first request after the reset timeout becomes the trial request
+            if self.state == CircuitBreaker.OPEN and monotonic() - self.opened_at >= self.reset_timeout :
+                self.state = CircuitBreaker.HALF_OPEN
+                return True
+
+            if self.state == CircuitBreaker.CLOSED :
+                return True
+
+            self.rejected += 1
+
+            return False
+
+
+    def release(self) -> None :
+        """
+        This function abandons an allowed request that was never sent, a half-open
+        circuit returns to open so that the next caller may make the trial request.
+        """
+
+        with self._synchronised() :
+
+            if self.state == CircuitBreaker.HALF_OPEN :
+                self.state = CircuitBreaker.OPEN
+
+
+    def record_success(self) -> None :
+        """
+        This function closes the circuit after a successful request.
+        """
+
+        with self._synchronised() :
+
+            self.state = CircuitBreaker.CLOSED
+            self.failures = 0
+
+
+    def record_failure(self) -> None :
+        """
+        This function records a failed request, opening the circuit if the trial
+        request failed or the failure threshold was reached.
+        """
+
+        with self._synchronised() :
+
+            self.failures += 1
+
+            if self.state == CircuitBreaker.HALF_OPEN or self.failures >= self.failure_threshold :
+                self.state = CircuitBreaker.OPEN
+                self.opened_at = monotonic()
+
+
+    def get_statistics(self) -> dict :
+        """
+        This function returns a snapshot of the circuit state.
+        """
+
+        with self._synchronised() :
+
+            return {
+                "state" : self.state,
+                "consecutive_failures" : self.failures,
+                "rejected" : self.rejected
+            }
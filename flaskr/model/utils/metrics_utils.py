@@ -0,0 +1,628 @@
+from bisect import bisect_left
+from contextlib import contextmanager
+from threading import Lock, Thread, get_native_id
+from time import perf_counter, sleep
+from typing import Callable, Iterator
+from uuid import uuid4
+import os
+
+from ..utils.shared_state_utils import SharedState
+from ..utils.validation_utils import with_type_validation
+
+
+class Metric :
+    """
+    This class is the base of the metrics exported in the Prometheus text format.
+    The values are spread over several stripes, each with its own lock, chosen by
+    the updating thread's id. Concurrent requests therefore rarely wait on the same
+    lock, and the stripes are only merged when the metrics are collected.
+    """
+
+    TYPE : str = "untyped"
+    """
+    This (static) class constant defines the Prometheus type of the metric.
+    """
+
+    STRIPES : int = 16
+    """
+    This (static) class constant defines the number of independently locked
+    stripes the values are spread over.
+    """
+
+    @with_type_validation(object, str, str, tuple)
+    def __init__(self, name : str, description : str, labels : tuple) -> None :
+        """
+        Initializer
+
+        Parameters:
+            name (str): the name of the metric, e.g. go_travel_sql_query_duration_seconds.
+            description (str): the help text of the metric.
+            labels (tuple[str]): the names of the metric's labels.
+        """
+
+        self.name : str = name
+        self.description : str = description
+        self.labels : tuple[str] = labels
+
+        self.stripes : list[tuple] = [(Lock(), {}) for _ in range(Metric.STRIPES)]
+        """
+        A lock and the values of each label combination, for each stripe.
+        """
+
+
+    def _values(self, label_values : tuple) -> tuple :
+        """
+        This function returns the lock and values of the calling thread's stripe.
+
+        Parameters:
+            label_values (tuple[str]): the values of the metric's labels.
+        """
+
+        if len(label_values) != len(self.labels) :
+            raise ValueError(f"The metric {self.name} expects the labels {self.labels}, {label_values} were given.")
+
+        return self.stripes[get_native_id() % Metric.STRIPES]
+
+
+    def _merge(self) -> dict :
+        """
+        This function returns the values of each label combination summed over
+        every stripe, in the order the combinations were first seen.
+        """
+
+        merged : dict[tuple, list] = {}
+
+        for lock, values in self.stripes :
+
+            with lock :
+
+                for label_values, value in values.items() :
+
+                    total : list | None = merged.get(label_values)
+
+                    if total is None :
+                        merged[label_values] = list(value)
+                    else :
+                        merged[label_values] = [a + b for a, b in zip(total, value)]
+
+        return merged
+
+
+    def snapshot(self) -> list :
+        """
+        This function returns the merged values of each label combination as a json
+        serialisable list, so that they can be summed with other processes' values.
+        """
+
+        return [[list(label_values), values] for label_values, values in self._merge().items()]
+
+
+    def reset(self) -> None :
+        """
+        This function discards every value, e.g. those a forked worker inherited from
+        its master. The locks are replaced too, as another thread may have held one
+        when the process was forked.
+        """
+
+        self.stripes = [(Lock(), {}) for _ in range(Metric.STRIPES)]
+
+
+    def _format_labels(self, label_values : tuple, extra : dict = None) -> str :
+        """
+        This function formats a set of label values, e.g. {intent="1"}.
+
+        Parameters:
+            label_values (tuple[str]): the values of the metric's labels.
+            extra (dict[str, str]): labels added by the sample, e.g. le.
+        """
+
+        pairs : list[tuple] = list(zip(self.labels, label_values)) + list((extra or {}).items())
+
+        if not pairs :
+            return ""
+
+        return "{" + ",".join(f"{name}=\"{Metric.escape(value)}\"" for name, value in pairs) + "}"
+
+
+    @staticmethod
+    def escape(value : object) -> str :
+        """
+        This function escapes the backslashes, quotes and line breaks of a label value.
+
+        Parameters:
+            value (object): the label value.
+        """
+
+        return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+    @staticmethod
+    def format_value(value : float) -> str :
+        """
+        This function formats a sample value without losing precision, whole numbers
+        are formatted as integers.
+
+        Parameters:
+            value (float): the sample value.
+        """
+
+        return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+    def samples(self, merged : dict) -> list :
+        """
+        This function returns the metric's sample lines.
+
+        Parameters:
+            merged (dict[tuple, list]): the values of each label combination.
+        """
+
+        return []
+
+
+    def collect(self, merged : dict = None) -> str :
+        """
+        This function formats the metric in the Prometheus text format.
+
+        Parameters:
+            merged (dict[tuple, list]): the values of each label combination, this
+            process's values if None.
+        """
+
+        lines : list[str] = self.samples(self._merge() if merged is None else merged)
+
+        return "\n".join([f"# HELP {self.name} {self.description}", f"# TYPE {self.name} {self.TYPE}"] + lines)
+
+
+
+class Counter(Metric) :
+    """
+    This class implements a counter, a value that only increases.
+    """
+
+    TYPE : str = "counter"
+
+    def inc(self, *label_values, amount : float = 1.0) -> None :
+        """
+        This function increments the counter.
+
+        Parameters:
+            *label_values (str): the values of the counter's labels.
+            amount (float): the amount added to the counter.
+        """
+
+        lock, values = self._values(label_values)
+
+        with lock :
+
+            value : list | None = values.get(label_values)
+
+            if value is None :
+                values[label_values] = [amount]
+            else :
+                value[0] += amount
+
+
+    def samples(self, merged : dict) -> list :
+        """
+        This function returns the value of each label combination.
+
+        Parameters:
+            merged (dict[tuple, list]): the values of each label combination.
+        """
+
+        return [f"{self.name}{self._format_labels(label_values)} {Metric.format_value(value[0])}" for label_values, value in merged.items()]
+
+
+
+class Histogram(Metric) :
+    """
+    This class implements a histogram, the number of observations falling in each
+    of a set of buckets along with their count and sum.
+    """
+
+    TYPE : str = "histogram"
+
+    DEFAULT_BUCKETS : tuple = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+    """
+    This (static) class constant defines the upper bounds in seconds of the default
+    buckets.
+    """
+
+    @with_type_validation(object, str, str, tuple, tuple)
+    def __init__(self, name : str, description : str, labels : tuple, buckets : tuple) -> None :
+        """
+        Initializer
+
+        Parameters:
+            name (str): the name of the metric.
+            description (str): the help text of the metric.
+            labels (tuple[str]): the names of the metric's labels.
+            buckets (tuple[float]): the upper bounds of the buckets in ascending order.
+        """
+
+        super().__init__(name, description, labels)
+
+        self.buckets : tuple[float] = tuple(sorted(buckets))
+
+
+    def observe(self, value : float, *label_values) -> None :
+        """
+        This function records an observation.
+
+        Parameters:
+            value (float): the observed value.
+            *label_values (str): the values of the histogram's labels.
+        """
+
+        lock, values = self._values(label_values)
+
+        with lock :
+
+            # The count in each bucket is followed by the sum of the observations
+            counts : list | None = values.get(label_values)
+
+            if counts is None :
+                counts = values[label_values] = [0] * (len(self.buckets) + 2)
+
+            counts[bisect_left(self.buckets, value)] += 1
+            counts[-1] += value
+
+
+    @contextmanager
+    def time(self, *label_values) -> Iterator[None] :
+        """
+        This context manager, or decorator, observes the duration in seconds of the
+        code it wraps.
+
+        Parameters:
+            *label_values (str): the values of the histogram's labels.
+        """
+
+        start : float = perf_counter()
+
+        try :
+            yield
+        finally :
+            self.observe(perf_counter() - start, *label_values)
+
+
+    def samples(self, merged : dict) -> list :
+        """
+        This function returns the cumulative bucket counts, the sum and the count of
+        each label combination.
+
+        Parameters:
+            merged (dict[tuple, list]): the values of each label combination.
+        """
+
+        lines : list[str] = []
+
+        for label_values, counts in merged.items() :
+
+            cumulative : int = 0
+
+            for bound, count in zip(self.buckets + (float("inf"),), counts) :
+
+                cumulative += count
+                lines.append(f"{self.name}_bucket{self._format_labels(label_values, {'le' : '+Inf' if bound == float('inf') else f'{bound:g}'})} {cumulative}")
+
+            lines.append(f"{self.name}_sum{self._format_labels(label_values)} {Metric.format_value(counts[-1])}")
+            lines.append(f"{self.name}_count{self._format_labels(label_values)} {cumulative}")
+
+        return lines
+
+
+
+class CallbackGauge(Metric) :
+    """
+    This class implements a gauge whose values are read from a function when the
+    metrics are collected, e.g. from statistics another object already keeps.
+    """
+
+    TYPE : str = "gauge"
+
+    @with_type_validation(object, str, str, tuple, object)
+    def __init__(self, name : str, description : str, labels : tuple, callback : Callable) -> None :
+        """
+        Initializer
+
+        Parameters:
+            name (str): the name of the metric.
+            description (str): the help text of the metric.
+            labels (tuple[str]): the names of the metric's labels.
+            callback (Callable): returns the value of each label combination as a
+            dict, or None while there is nothing to report.
+        """
+
+        super().__init__(name, description, labels)
+
+        self.callback : Callable = callback
+
+
+    def snapshot(self) -> list :
+        """
+        The gauge's values are read when collected rather than kept, so a gauge is
+        always reported by the process that collects it.
+        """
+
+        return []
+
+
+    def samples(self, merged : dict) -> list :
+        """
+        This function returns the value of each label combination read from the
+        callback, the merged values are not used.
+
+        Parameters:
+            merged (dict[tuple, list]): unused.
+        """
+
+        values : dict | None = self.callback()
+
+        return [f"{self.name}{self._format_labels(label_values)} {Metric.format_value(value)}" for label_values, value in (values or {}).items()]
+
+
+
+class MetricsRegistry :
+    """
+    This class holds the metrics exported by the application. Metrics are created
+    through the registry, a metric that already exists is returned rather than
+    created again. The worker processes of a pre-fork server share their values,
+    see share().
+    """
+
+    PUBLISH_INTERVAL : float = 5.0
+    """
+    This (static) class constant defines how often in seconds a worker process
+    publishes its values to the shared store.
+    """
+
+    PREFIX : str = "metrics:"
+    """
+    This (static) class constant defines the prefix of the shared store's keys
+    holding each process's values.
+    """
+
+    RETIRED : str = "metrics:retired"
+    """
+    This (static) class constant defines the shared store's key holding the sum of
+    the values published by worker processes that have exited.
+    """
+
+    def __init__(self) -> None :
+        """
+        Initializer
+        """
+
+        self.lock : Lock = Lock()
+        self.metrics : dict[str, Metric] = {}
+
+        self.shared : SharedState = None
+        """
+        The store each worker process publishes its values to, None if the metrics
+        are only reported by this process.
+        """
+
+        self.key : str = None
+        """
+        The key this process's values are published under.
+        """
+
+
+    def _register(self, metric : Metric) -> Metric :
+        """
+        This function adds a metric, or returns the metric of the same name.
+
+        Parameters:
+            metric (Metric): the metric to add.
+        """
+
+        with self.lock :
+
+            existing : Metric = self.metrics.setdefault(metric.name, metric)
+
+        if type(existing) != type(metric) :
+            raise ValueError(f"The metric {metric.name} is already registered as a {existing.TYPE}.")
+
+        return existing
+
+
+    @with_type_validation(object, str, str, tuple)
+    def counter(self, name : str, description : str, labels : tuple) -> Counter :
+        """
+        This function creates a counter.
+
+        Parameters:
+            name (str): the name of the metric.
+            description (str): the help text of the metric.
+            labels (tuple[str]): the names of the metric's labels.
+        """
+
+        return self._register(Counter(name, description, labels))
+
+
+    @with_type_validation(object, str, str, tuple, tuple)
+    def histogram(self, name : str, description : str, labels : tuple, buckets : tuple) -> Histogram :
+        """
+        This function creates a histogram.
+
+        Parameters:
+            name (str): the name of the metric.
+            description (str): the help text of the metric.
+            labels (tuple[str]): the names of the metric's labels.
+            buckets (tuple[float]): the upper bounds of the buckets.
+        """
+
+        return self._register(Histogram(name, description, labels, buckets))
+
+
+    @with_type_validation(object, str, str, tuple, object)
+    def callback_gauge(self, name : str, description : str, labels : tuple, callback : Callable) -> CallbackGauge :
+        """
+        This function creates a gauge read from a function when collected.
+
+        Parameters:
+            name (str): the name of the metric.
+            description (str): the help text of the metric.
+            labels (tuple[str]): the names of the metric's labels.
+            callback (Callable): returns the value of each label combination.
+        """
+
+        return self._register(CallbackGauge(name, description, labels, callback))
+
+
+    @with_type_validation(object, SharedState)
+    def share(self, shared : SharedState) -> None :
+        """
+        This function is called by each worker process of a pre-fork server once it
+        has been forked. The values inherited from the master are published as the
+        master's and discarded, then the worker publishes its own values
+        periodically and whenever the metrics are collected. A scrape answered by
+        any worker therefore reports the sum over every process, and counters
+        don't go backwards from one scrape to the next. Values published by a
+        worker that has since exited are kept in the sum, see retire().
+
+        Parameters:
+            shared (SharedState): the store shared by every worker process.
+        """
+
+        with self.lock :
+            metrics : list[Metric] = list(self.metrics.values())
+
+        # Every worker inherits the same values, so publishing them again is harmless
+        shared.set(f"{MetricsRegistry.PREFIX}master", {metric.name : metric.snapshot() for metric in metrics})
+
+        for metric in metrics :
+            metric.reset()
+
+        self.shared = shared
+        # A restarted worker may be given the pid of one that exited, the key is made
+        # unique so that it never replaces the values of another process
+        self.key = f"{MetricsRegistry.PREFIX}{os.getpid()}:{uuid4().hex}"
+        self.publish()
+
+        Thread(target=self._publish_periodically, daemon=True).start()
+
+
+    def publish(self) -> None :
+        """
+        This function publishes this process's values to the shared store.
+        """
+
+        with self.lock :
+            metrics : list[Metric] = list(self.metrics.values())
+
+        self.shared.set(self.key, {metric.name : metric.snapshot() for metric in metrics})
+
+
+    def _publish_periodically(self) -> None :
+        """
+        This function publishes this process's values every PUBLISH_INTERVAL seconds
+        until the process exits.
+        """
+
+        while True :
+
+            sleep(MetricsRegistry.PUBLISH_INTERVAL)
+
+            try :
+                self.publish()
+            except Exception as e :
+                print(f"The metrics could not be published: {str(e)}")
+
+
+    @with_type_validation(object, SharedState, int)
+    def retire(self, shared : SharedState, pid : int) -> None :
+        """
+        This function is called by the master of a pre-fork server once a worker
+        process has exited. The values it published are added to those of the
+        workers that exited before it and removed, so that the store holds one
+        entry per running worker however often they are restarted.
+
+        Parameters:
+            shared (SharedState): the store shared by every worker process.
+            pid (int): the process id of the worker that exited.
+        """
+
+        keys : list[str] = list(shared.values(f"{MetricsRegistry.PREFIX}{pid}:"))
+
+        if not keys :
+            return
+
+        with shared.transaction({MetricsRegistry.RETIRED : {}, **{key : None for key in keys}}) as values :
+
+            totals : dict[str, dict] = MetricsRegistry._merge({}, [values[MetricsRegistry.RETIRED]] + [values[key] for key in keys if values[key] is not None])
+
+            values[MetricsRegistry.RETIRED] = {
+                name : [[list(label_values), value] for label_values, value in merged.items()] for name, merged in totals.items()
+            }
+
+            for key in keys :
+                values[key] = None
+
+
+    @staticmethod
+    def _merge(totals : dict, snapshots : list) -> dict :
+        """
+        This function adds the values of several published snapshots to a set of
+        totals, by metric name and label combination.
+
+        Parameters:
+            totals (dict[str, dict]): the totals, updated in place.
+            snapshots (list[dict]): the values published by each process.
+        """
+
+        for snapshot in snapshots :
+
+            for name, values in snapshot.items() :
+
+                merged : dict[tuple, list] = totals.setdefault(name, {})
+
+                for label_values, value in values :
+
+                    total : list | None = merged.get(tuple(label_values))
+
+                    if total is None :
+                        merged[tuple(label_values)] = list(value)
+                    else :
+                        merged[tuple(label_values)] = [a + b for a, b in zip(total, value)]
+
+        return totals
+
+
+    def _totals(self) -> dict :
+        """
+        This function sums the values published by every process, including those
+        that have exited, by metric name and label combination.
+        """
+
+        return MetricsRegistry._merge({}, list(self.shared.values(MetricsRegistry.PREFIX).values()))
+
+
+    def collect(self) -> str :
+        """
+        This function formats every metric in the Prometheus text format. When the
+        metrics are shared, counters and histograms are summed over every worker
+        process while gauges are read by the collecting process.
+        """
+
+        with self.lock :
+            metrics : list[Metric] = list(self.metrics.values())
+
+        if self.shared is None :
+            return "\n".join(metric.collect() for metric in metrics) + "\n"
+
+        # This process's values are up to date, the others' are at most
+        # PUBLISH_INTERVAL seconds old
+        self.publish()
+        totals : dict[str, dict] = self._totals()
+
+        return "\n".join(metric.collect(totals.get(metric.name, {})) for metric in metrics) + "\n"
+
+
+
+metrics_registry : MetricsRegistry = MetricsRegistry()
+"""
+The registry of the metrics exported by the application's /metrics endpoint.
+"""
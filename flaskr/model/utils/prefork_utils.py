@@ -0,0 +1,192 @@
+from threading import Thread
+from typing import Callable
+import gc
+import os
+import signal
+import socket
+import time
+
+from werkzeug.serving import make_server
+
+from ..utils.validation_utils import with_type_validation
+
+
+class PreForkServer :
+    """
+    This class serves a WSGI application from several worker processes forked from
+    a master process. Everything the master loaded before forking, e.g. the language
+    model and the location registry, is shared by the workers copy-on-write rather
+    than loaded again by each one. The workers accept connections from a single
+    listening socket and are restarted if they exit.
+    """
+
+    BACKLOG : int = 128
+    """
+    This (static) class constant defines the number of pending connections the
+    listening socket queues.
+    """
+
+    RESTART_DELAY : float = 1.0
+    """
+    This (static) class constant defines the number of seconds before a worker that
+    failed is restarted, so that a persistent fault doesn't cause a fork loop.
+    """
+
+    PARENT_CHECK_INTERVAL : float = 1.0
+    """
+    This (static) class constant defines how often, in seconds, a worker checks
+    that the master is still running, orphaned workers exit.
+    """
+
+    @with_type_validation(object, object, str, int, int, object, object)
+    def __init__(self, app : Callable, host : str, port : int, workers : int, post_fork : Callable[[], None], post_exit : Callable[[int], None]) -> None :
+        """
+        Initializer
+
+        Parameters:
+            app (Callable): the WSGI application, fully loaded.
+            host (str): the address to listen on.
+            port (int): the port to listen on.
+            workers (int): the number of worker processes.
+            post_fork (Callable): called in each worker after it is forked, e.g. to
+            open its own database connections.
+            post_exit (Callable): called in the master with the process id of each
+            worker that exits, e.g. to keep the metrics it published.
+        """
+
+        if workers < 1 :
+            raise ValueError(f"Invalid number of workers: {workers}.")
+
+        if not hasattr(os, "fork") :
+            raise OSError("Pre-fork serving requires a platform that supports fork.")
+
+        self.app : Callable = app
+        self.host : str = host
+        self.port : int = port
+        self.workers : int = workers
+        self.post_fork : Callable[[], None] = post_fork
+        self.post_exit : Callable[[int], None] = post_exit
+
+        self.pids : set[int] = set()
+        """
+        The process ids of the running workers.
+        """
+
+        self.stopping : bool = False
+        self.listener : socket.socket | None = None
+
+
+    def _spawn(self) -> None :
+        """
+        This function forks a worker that serves requests until it is terminated.
+        """
+
+        master : int = os.getpid()
+        pid : int = os.fork()
+
+        if pid :
+            self.pids.add(pid)
+            return
+
+        # The worker never returns to the master's code
+        exit_code : int = 0
+
+        try :
+
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+            Thread(target=PreForkServer._exit_with_master, args=(master,), daemon=True).start()
+
+            self.post_fork()
+
+            server = make_server(self.host, self.port, self.app, threaded=True, fd=self.listener.fileno())
+            server.serve_forever()
+
+        except Exception as e :
+
+            print(f"Worker {os.getpid()} stopped: {str(e)}")
+            exit_code = 1
+
+        finally :
+            os._exit(exit_code)
+
+
+    @staticmethod
+    def _exit_with_master(master : int) -> None :
+        """
+        This function ends a worker once its master has exited.
+
+        Parameters:
+            master (int): the process id of the master.
+        """
+
+        while os.getppid() == master :
+            time.sleep(PreForkServer.PARENT_CHECK_INTERVAL)
+
+        os._exit(0)
+
+
+    def _stop(self, signal_number : int, frame : object) -> None :
+        """
+        This function terminates the workers when the master is asked to stop.
+        """
+
+        self.stopping = True
+
+        for pid in list(self.pids) :
+
+            try :
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError :
+                self.pids.discard(pid)
+
+
+    def serve(self) -> None :
+        """
+        This function starts the workers and restarts any that exit until the master
+        receives SIGINT or SIGTERM.
+        """
+
+        self.listener = socket.create_server((self.host, self.port), backlog=PreForkServer.BACKLOG)
+        self.listener.set_inheritable(True)
+
+        # Objects created so far are moved out of the garbage collector's reach so
+        # that collections in the workers don't write to the shared pages
+        gc.collect()
+        gc.freeze()
+
+        signal.signal(signal.SIGTERM, self._stop)
+        signal.signal(signal.SIGINT, self._stop)
+
+        for _ in range(self.workers) :
+            self._spawn()
+
+        print(f"Serving on http://{self.host}:{self.port} with {self.workers} workers, master pid {os.getpid()}")
+
+        while self.pids :
+
+            try :
+                pid, status = os.wait()
+            except ChildProcessError :
+                break
+            except InterruptedError :
+                continue
+
+            self.pids.discard(pid)
+
+            try :
+                self.post_exit(pid)
+            except Exception as e :
+                print(f"Worker {pid} could not be cleaned up: {str(e)}")
+
+            if not self.stopping :
+
+                print(f"Worker {pid} exited with status {status}, restarting it.")
+
+                if status != 0 :
+                    time.sleep(PreForkServer.RESTART_DELAY)
+
+                self._spawn()
+
+        self.listener.close()
@@ -0,0 +1,424 @@
+from cProfile import Profile
+from threading import Lock, Thread, get_ident
+from time import monotonic, sleep
+from types import FrameType
+import marshal
+import os
+import pstats
+import sys
+
+from ..utils.validation_utils import with_type_validation
+
+
+cprofile_lock : Lock = Lock()
+"""
+Held while a cProfile profiler is enabled. From Python 3.12 a process can only
+have one profiler enabled at a time and enabling a second raises ValueError, so
+concurrent requests are not profiled by cProfile at the same time.
+"""
+
+
+class RequestProfiler :
+    """
+    This class profiles live requests on demand, either the next number of requests
+    or those that start within a time window. Two profilers are available:
+
+    - cprofile: every call of the profiled requests is recorded, the result is a
+      pstats dump from which call graphs can be drawn, e.g. by gprof2dot or snakeviz.
+      Only one request is profiled at a time, requests that start while another
+      is being profiled are not.
+    - sampling: the stacks of the threads handling the profiled requests are sampled
+      at a fixed interval, the result is a set of collapsed stacks from which flame
+      graphs can be drawn, e.g. by flamegraph.pl or speedscope. Only the sampled
+      requests pay for it, at a much lower cost than cprofile.
+
+    While no profile is being recorded, checking whether a request is profiled costs
+    a single attribute read.
+    """
+
+    CPROFILE : str = "cprofile"
+    SAMPLING : str = "sampling"
+
+    COMPONENTS : tuple = (
+        "GoTravelBot", "CustomBestMatch", "SQLConnector", "OpenWeatherConnector", "CurrentNewsConnector", "HTTPResponseCache"
+    )
+    """
+    This (static) class constant defines the modules the profiled time is
+    attributed to.
+    """
+
+    SAMPLE_INTERVAL : float = 0.005
+    """
+    This (static) class constant defines the number of seconds between the samples
+    taken by the sampling profiler.
+    """
+
+    def __init__(self) -> None :
+        """
+        Initializer
+        """
+
+        self.lock : Lock = Lock()
+
+        self.session : int = 0
+        """
+        The number of profiles started, a sampling thread stops once its profile
+        has been replaced.
+        """
+
+        self.active : bool = False
+        """
+        Whether requests may currently be profiled, read without the lock.
+        """
+
+        self.mode : str = None
+        self.remaining : int | None = None
+        self.deadline : float | None = None
+        self.started : float = None
+        self.finished : float = None
+
+        self.in_flight : set[int] = set()
+        """
+        The ids of the threads handling the requests being profiled.
+        """
+
+        self.profiled : int = 0
+        self.statistics : pstats.Stats | None = None
+        self.stacks : dict[str, int] = {}
+
+
+    @with_type_validation(object, str, int, float)
+    def start(self, mode : str, requests : int, seconds : float) -> None :
+        """
+        This function starts recording a new profile, the previous profile is
+        discarded.
+
+        Parameters:
+            mode (str): the profiler used, cprofile or sampling.
+            requests (int): the number of requests profiled, 0 to profile every request
+            that starts within the time window instead.
+            seconds (float): the length of the time window, 0 if a number of requests
+            is profiled.
+        """
+
+        if mode not in [RequestProfiler.CPROFILE, RequestProfiler.SAMPLING] :
+            raise ValueError(f"Unknown profiler \"{mode}\", \"{RequestProfiler.CPROFILE}\" or \"{RequestProfiler.SAMPLING}\" was expected.")
+
+        if (requests > 0) == (seconds > 0) or requests < 0 or seconds < 0 :
+            raise ValueError("Either a number of requests or a number of seconds must be given.")
+
+        with self.lock :
+
+            if self.active :
+                raise RuntimeError("A profile is already being recorded.")
+
+            if mode == RequestProfiler.CPROFILE and (cprofile_lock.locked() or RequestProfiler._profiler_in_use()) :
+                raise RuntimeError("Another profiler is running, wait for it to finish.")
+
+            self.mode = mode
+            self.remaining = requests if requests > 0 else None
+            self.started = monotonic()
+            self.deadline = self.started + seconds if seconds > 0 else None
+            self.finished = None
+            self.in_flight = set()
+            self.profiled = 0
+            self.statistics = None
+            self.stacks = {}
+            self.active = True
+            self.session += 1
+
+            session : int = self.session
+
+        if mode == RequestProfiler.SAMPLING :
+            Thread(target=self._sample, args=(session,), name="request-profiler", daemon=True).start()
+
+
+    def begin_request(self) -> tuple | None :
+        """
+        This function starts profiling the current request if it is one of those
+        being profiled. Returns the handle to pass to end_request, the profile the
+        request belongs to and its cProfile profiler if any, or None if the request
+        isn't profiled.
+        """
+
+        if not self.active :
+            return None
+
+        with self.lock :
+
+            if not self.active or self.remaining == 0 :
+                return None
+
+            if self.deadline is not None and monotonic() >= self.deadline :
+                self._finish()
+                return None
+
+            profile : Profile | None = None
+
+            if self.mode == RequestProfiler.CPROFILE :
+
+                if not cprofile_lock.acquire(blocking=False) :
+                    return None
+
+                profile = Profile()
+
+                # A profiler enabled outside the application, e.g. a debugger
+                try :
+                    profile.enable()
+                except ValueError :
+                    cprofile_lock.release()
+                    return None
+
+            if self.remaining is not None :
+                self.remaining -= 1
+
+            self.in_flight.add(get_ident())
+            self.profiled += 1
+
+            session : int = self.session
+
+        return session, profile
+
+
+    def end_request(self, handle : tuple) -> None :
+        """
+        This function stops profiling the current request and adds it to the profile.
+
+        Parameters:
+            handle (tuple): the handle returned by begin_request.
+        """
+
+        session, profile = handle
+
+        if profile is not None :
+            profile.disable()
+            cprofile_lock.release()
+
+        with self.lock :
+
+            # The profile may have been replaced while the request was handled
+            if session != self.session :
+                return
+
+            self.in_flight.discard(get_ident())
+
+            if profile is not None :
+
+                if self.statistics is None :
+                    self.statistics = pstats.Stats(profile)
+                else :
+                    self.statistics.add(profile)
+
+            if self.active and not self.in_flight and (self.remaining == 0 or self._expired()) :
+                self._finish()
+
+
+    @staticmethod
+    def _profiler_in_use() -> bool :
+        """
+        This function returns whether a profiler outside the application, e.g. a
+        debugger or a coverage tool, holds the interpreter's profiling hook. Only
+        Python 3.12 and later report it.
+        """
+
+        monitoring = getattr(sys, "monitoring", None)
+
+        return monitoring is not None and monitoring.get_tool(monitoring.PROFILER_ID) is not None
+
+
+    def _expired(self) -> bool :
+        """
+        This function returns whether the time window has passed.
+        """
+
+        return self.deadline is not None and monotonic() >= self.deadline
+
+
+    def _finish(self) -> None :
+        """
+        This function stops recording the profile, the lock must be held.
+        """
+
+        self.active = False
+        self.finished = monotonic()
+
+
+    @staticmethod
+    def _collapse(frame : FrameType) -> str :
+        """
+        This function formats a stack as a single line from its outermost frame to
+        its innermost, e.g. flaskr.controller.app:chatbot;flaskr.model.chatbot.GoTravelBot:GoTravelBot.get_response.
+
+        Parameters:
+            frame (FrameType): the innermost frame of the stack.
+        """
+
+        names : list[str] = []
+
+        while frame is not None :
+
+            names.append(f"{frame.f_globals.get('__name__', frame.f_code.co_filename)}:{frame.f_code.co_qualname}")
+            frame = frame.f_back
+
+        return ";".join(reversed(names))
+
+
+    def _sample(self, session : int) -> None :
+        """
+        This function samples the stacks of the profiled requests until the profile
+        is finished.
+
+        Parameters:
+            session (int): the profile the samples are recorded for.
+        """
+
+        while True :
+
+            with self.lock :
+
+                if self.session != session :
+                    return
+
+                if self.active and not self.in_flight and self._expired() :
+                    self._finish()
+
+                if not self.active and not self.in_flight :
+                    return
+
+                threads : set[int] = set(self.in_flight)
+
+            frames : dict = sys._current_frames()
+            stacks : list[str] = [RequestProfiler._collapse(frames[thread]) for thread in threads if thread in frames]
+
+            with self.lock :
+
+                if self.session != session :
+                    return
+
+                for stack in stacks :
+                    self.stacks[stack] = self.stacks.get(stack, 0) + 1
+
+            del frames
+
+            sleep(RequestProfiler.SAMPLE_INTERVAL)
+
+
+    @staticmethod
+    def _component(module : str) -> str | None :
+        """
+        This function returns the component a module belongs to, if any.
+
+        Parameters:
+            module (str): the name or the source file of the module.
+        """
+
+        name : str = os.path.basename(module).removesuffix(".py").rsplit(".", 1)[-1]
+
+        return name if name in RequestProfiler.COMPONENTS else None
+
+
+    def _components(self) -> dict :
+        """
+        This function returns the time spent in each component including the code
+        it calls, the lock must be held. Nested components are counted in each.
+        """
+
+        seconds : dict[str, float] = {component : 0.0 for component in RequestProfiler.COMPONENTS}
+
+        if self.mode == RequestProfiler.CPROFILE and self.statistics is not None :
+
+            # A component's time is that of the calls made into it from elsewhere
+            for function, (_, _, _, _, callers) in self.statistics.stats.items() :
+
+                component : str | None = RequestProfiler._component(function[0])
+
+                if component is None :
+                    continue
+
+                for caller, (_, _, _, cumulative) in callers.items() :
+
+                    if RequestProfiler._component(caller[0]) != component :
+                        seconds[component] += cumulative
+
+        elif self.mode == RequestProfiler.SAMPLING :
+
+            for stack, count in self.stacks.items() :
+
+                components : set[str] = {RequestProfiler._component(frame.split(":", 1)[0]) for frame in stack.split(";")}
+
+                for component in components - {None} :
+                    seconds[component] += count * RequestProfiler.SAMPLE_INTERVAL
+
+        return {component : round(value, 4) for component, value in seconds.items()}
+
+
+    def _top_functions(self, limit : int) -> list :
+        """
+        This function returns the functions with the most time spent in them and the
+        code they call, the lock must be held.
+
+        Parameters:
+            limit (int): the number of functions returned.
+        """
+
+        if self.mode == RequestProfiler.CPROFILE and self.statistics is not None :
+
+            functions : list = sorted(self.statistics.stats.items(), key=lambda item : item[1][3], reverse=True)[:limit]
+
+            return [
+                {"function" : f"{os.path.join(*filename.split(os.sep)[-2:])}:{line}({name})", "calls" : calls, "own_s" : round(own, 4), "cumulative_s" : round(cumulative, 4)}
+                for (filename, line, name), (_, calls, own, cumulative, _) in functions
+            ]
+
+        samples : dict[str, int] = {}
+
+        for stack, count in self.stacks.items() :
+
+            for frame in set(stack.split(";")) :
+                samples[frame] = samples.get(frame, 0) + count
+
+        return [
+            {"function" : frame, "samples" : count, "cumulative_s" : round(count * RequestProfiler.SAMPLE_INTERVAL, 4)}
+            for frame, count in sorted(samples.items(), key=lambda item : item[1], reverse=True)[:limit]
+        ]
+
+
+    def get_statistics(self) -> dict :
+        """
+        This function returns the state of the profile, the time attributed to each
+        component and the functions the most time was spent in.
+        """
+
+        with self.lock :
+
+            if self.active and not self.in_flight and self._expired() :
+                self._finish()
+
+            if self.mode is None :
+                return {"status" : "idle"}
+
+            return {
+                "status" : "profiling" if self.active else "finished",
+                "mode" : self.mode,
+                "requests_profiled" : self.profiled,
+                "duration_s" : round((self.finished or monotonic()) - self.started, 2),
+                "components_s" : self._components(),
+                "top_functions" : self._top_functions(20)
+            }
+
+
+    def dump(self) -> bytes | None :
+        """
+        This function returns the recorded profile, a pstats dump for cprofile or
+        collapsed stacks for sampling, or None if there is nothing to return.
+        """
+
+        with self.lock :
+
+            if self.mode == RequestProfiler.CPROFILE and self.statistics is not None :
+                return marshal.dumps(self.statistics.stats)
+
+            if self.mode == RequestProfiler.SAMPLING and self.stacks :
+                return "".join(f"{stack} {count}\n" for stack, count in self.stacks.items()).encode()
+
+            return None
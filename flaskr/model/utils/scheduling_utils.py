@@ -0,0 +1,326 @@
+from contextlib import contextmanager
+from threading import Lock
+from time import monotonic
+from typing import Iterator
+
+from ..utils.shared_state_utils import SharedState
+from ..utils.validation_utils import with_type_validation
+
+
+class TokenBucket :
+    """
+        This class implements a token bucket rate limiter, the bucket holds up to
+        capacity tokens and is refilled continuously at a fixed rate.
+    """
+
+    @with_type_validation(object, int, float)
+    def __init__(self, capacity : int, period : float) -> None :
+        """
+        Initializer
+
+        Parameters:
+            capacity (int): the maximum number of tokens, i.e. requests per period.
+            period (float): the number of seconds taken to refill an empty bucket.
+        """
+
+        if capacity < 1 or period <= 0 :
+            raise ValueError(f"Invalid token bucket configuration: {capacity} per {period} seconds.")
+
+        self.capacity : int = capacity
+        self.rate : float = capacity / period
+        self.tokens : float = float(capacity)
+        self.updated : float = monotonic()
+
+
+    def _refill(self) -> None :
+        """
+        This function adds the tokens accumulated since the last update.
+        """
+
+        now : float = monotonic()
+        self.tokens = min(self.capacity, self.tokens + max(0.0, now - self.updated) * self.rate)
+        self.updated = now
+
+
+    def available(self) -> int :
+        """
+        Returns the number of whole tokens currently available.
+        """
+
+        self._refill()
+
+        return int(self.tokens)
+
+
+    def take(self, tokens : int) -> None :
+        """
+        This function removes tokens from the bucket, callers must check that they
+        are available first.
+
+        Parameters:
+            tokens (int): the number of tokens to remove.
+        """
+
+        self._refill()
+        self.tokens -= tokens
+
+
+    def give(self, tokens : int) -> None :
+        """
+        This function returns unused tokens to the bucket, up to its capacity, a
+        negative number takes tokens that were used without being reserved.
+
+        Parameters:
+            tokens (int): the number of tokens to return.
+        """
+
+        self._refill()
+        self.tokens = min(self.capacity, self.tokens + tokens)
+
+
+
+class RefreshScheduler :
+    """
+        This class schedules refresh requests made to a rate limited upstream API.
+        Requests are ordered by how often their locations are asked about in chat
+        weighted by how long ago they were last refreshed, and only as many
+        requests as the per-minute and per-day quotas allow are granted. The
+        remaining requests are deferred to a later refresh. The quotas may be
+        shared by several processes, see share().
+    """
+
+    @with_type_validation(object, str, int, int)
+    def __init__(self, name : str, per_minute : int, per_day : int) -> None :
+        """
+        Initializer
+
+        Parameters:
+            name (str): the name of the upstream API.
+            per_minute (int): the number of requests allowed per minute.
+            per_day (int): the number of requests allowed per day.
+        """
+
+        self.name : str = name
+
+        self.buckets : list[TokenBucket] = [TokenBucket(per_minute, 60.0), TokenBucket(per_day, 86400.0)]
+        """
+        The quotas enforced on the upstream API, a request is only granted if every
+        bucket has a token available.
+        """
+
+        self.lock : Lock = Lock()
+        """
+        A mutex lock on the buckets, demand and statistics as chat requests and
+        refreshes may run on different threads.
+        """
+
+        self.shared : SharedState = None
+        """
+        The store holding the buckets and statistics when they are shared with other
+        processes, None if they are held by this process only.
+        """
+
+        self.demand : dict[str, int] = {}
+        """
+        The number of chat requests made about each location.
+        """
+
+        self.last_refreshed : dict[str, float] = {}
+        """
+        The time each location's data was last refreshed.
+        """
+
+        self.queue_depth : int = 0
+        """
+        The number of requests deferred by the last call to schedule().
+        """
+
+        self.granted : int = 0
+        """
+        The total number of requests granted and sent to the upstream API.
+        """
+
+        self.throttled : int = 0
+        """
+        The total number of requests deferred because the quota was exhausted.
+        """
+
+
+    @with_type_validation(object, SharedState)
+    def share(self, shared : SharedState) -> None :
+        """
+        This function moves the quotas and the granted and throttled statistics into
+        a store shared by the worker processes of a pre-fork server, so that the
+        workers are granted no more requests between them than the quotas allow.
+        Each process still schedules by its own demand and refresh times.
+
+        Parameters:
+            shared (SharedState): the store shared by every worker process.
+        """
+
+        with self.lock :
+            self.shared = shared
+
+
+    @contextmanager
+    def _synchronised(self) -> Iterator[None] :
+        """
+        This function holds the lock on the buckets and statistics, when they are
+        shared it also holds the shared store's lock and loads their latest state,
+        saving it again once the caller has updated it. Bucket times are monotonic,
+        which is consistent between the processes of a single machine.
+        """
+
+        with self.lock :
+
+            if self.shared is None :
+                yield
+                return
+
+            key : str = f"scheduler:{self.name}"
+
+            with self.shared.transaction({key : self._state()}) as values :
+
+                for bucket, (tokens, updated) in zip(self.buckets, values[key]["buckets"]) :
+                    bucket.tokens = tokens
+                    bucket.updated = updated
+
+                self.granted = values[key]["granted"]
+                self.throttled = values[key]["throttled"]
+
+                yield
+
+                values[key] = self._state()
+
+
+    def _state(self) -> dict :
+        """
+        Returns the state of the buckets and statistics that is shared.
+        """
+
+        return {
+            "buckets" : [[bucket.tokens, bucket.updated] for bucket in self.buckets],
+            "granted" : self.granted,
+            "throttled" : self.throttled
+        }
+
+
+    @with_type_validation(object, str)
+    def record_demand(self, location : str) -> None :
+        """
+        This function records that a location was asked about in chat.
+
+        Parameters:
+            location (str): the location that was asked about.
+        """
+
+        with self.lock :
+            self.demand[location] = self.demand.get(location, 0) + 1
+
+
+    def _priority(self, locations : list, now : float) -> tuple :
+        """
+        This function scores a request, locations with more demand and older data
+        are refreshed first. Locations that have never been refreshed always take
+        priority.
+
+        Parameters:
+            locations (list[str]): the locations served by the request.
+            now (float): the current time.
+        """
+
+        demand : int = sum(self.demand.get(location, 0) for location in locations)
+
+        if any(location not in self.last_refreshed for location in locations) :
+            return (1, demand)
+
+        age : float = now - min(self.last_refreshed[location] for location in locations)
+
+        return (0, (1 + demand) * age)
+
+
+    @with_type_validation(object, list)
+    def schedule(self, requests : list) -> list :
+        """
+        This function selects which requests may be sent to the upstream API now,
+        each request reserves one token and covers one or more locations. Once the
+        requests are made record_refresh() must be called to return the tokens of
+        those that did not reach the upstream API.
+
+        Parameters:
+            requests (list[list[str]]): the locations covered by each request.
+
+        Returns:
+            list[list[str]]: the granted requests in priority order.
+        """
+
+        with self._synchronised() :
+
+            now : float = monotonic()
+            ordered : list[list[str]] = sorted(requests, key=lambda request : self._priority(request, now), reverse=True)
+            allowed : int = min(len(ordered), *[bucket.available() for bucket in self.buckets])
+
+            for bucket in self.buckets :
+                bucket.take(allowed)
+
+            self.queue_depth = len(ordered) - allowed
+            self.granted += allowed
+            self.throttled += self.queue_depth
+
+        return ordered[:allowed]
+
+
+    @with_type_validation(object, list, int)
+    def record_refresh(self, locations : list, unused : int) -> None :
+        """
+        This function records the outcome of the requests granted by schedule(),
+        only the locations whose data was refreshed are marked as such and the
+        tokens of requests answered without reaching the upstream API, e.g. from
+        the response cache, are returned to the quota.
+
+        Parameters:
+            locations (list[str]): the locations whose data was refreshed.
+            unused (int): the number of granted requests that did not reach the
+            upstream API, negative if more requests were made than granted, e.g.
+            follow up requests, so that they are charged as well.
+        """
+
+        with self._synchronised() :
+
+            now : float = monotonic()
+
+            for location in locations :
+                self.last_refreshed[location] = now
+
+            for bucket in self.buckets :
+                bucket.give(unused)
+
+            self.granted -= unused
+
+
+    def backlogged(self) -> bool :
+        """
+        Returns true if the last call to schedule() deferred requests and no token
+        has become available since, scheduling again would only defer them again.
+        """
+
+        with self._synchronised() :
+
+            return self.queue_depth > 0 and min(bucket.available() for bucket in self.buckets) < 1
+
+
+    def get_statistics(self) -> dict :
+        """
+        This function returns a snapshot of the scheduler's queue and throttling
+        statistics.
+        """
+
+        with self._synchronised() :
+
+            return {
+                "queue_depth" : self.queue_depth,
+                "granted" : self.granted,
+                "throttled" : self.throttled,
+                "tokens_per_minute" : self.buckets[0].available(),
+                "tokens_per_day" : self.buckets[1].available()
+            }
@@ -0,0 +1,138 @@
+from contextlib import contextmanager
+from json import dumps, loads
+from os import makedirs, path as os_path
+from typing import Iterator
+import sqlite3
+
+from ..utils.validation_utils import with_type_validation
+
+
+class SharedState :
+    """
+        This class provides a small key value store in an SQLite database, so that
+        state such as the external APIs' quotas and circuits is shared by every
+        worker process of a pre-fork server rather than held by each of them. Values
+        are stored as json, and transaction() reads and updates several keys
+        atomically across processes.
+    """
+
+    @with_type_validation(object, str)
+    def __init__(self, path : str) -> None :
+        """
+        Initializer
+
+        Parameters:
+            path (str): the relative path to create the SQLite database at.
+        """
+
+        self.path : str = path
+
+        if os_path.dirname(path) :
+            makedirs(os_path.dirname(path), exist_ok=True)
+
+        with self._connect() as connection :
+            connection.execute("CREATE TABLE IF NOT EXISTS shared_state (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection] :
+        """
+        This function opens a new connection to the database, a connection is
+        created per operation so that the store may be shared between threads and
+        forked processes. Transactions are started explicitly.
+        """
+
+        connection : sqlite3.Connection = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+
+        try :
+            yield connection
+        finally :
+            connection.close()
+
+
+    @contextmanager
+    def transaction(self, defaults : dict) -> Iterator[dict] :
+        """
+        This function reads a set of keys while holding the database's write lock,
+        and writes them back once the caller has updated them. Other processes wait
+        for the transaction, so e.g. a token taken from a quota is never taken twice.
+        Keys whose value is set to None are removed.
+
+        Parameters:
+            defaults (dict): the keys to read and their values if they are not stored yet.
+
+        Yields:
+            dict: the stored values of the keys, to be updated in place.
+        """
+
+        with self._connect() as connection :
+
+            connection.execute("BEGIN IMMEDIATE")
+
+            try :
+
+                values : dict = dict(defaults)
+
+                for key in defaults :
+
+                    row : tuple = connection.execute("SELECT value FROM shared_state WHERE key = ?", (key,)).fetchone()
+
+                    if row is not None :
+                        values[key] = loads(row[0])
+
+                yield values
+
+                connection.executemany(
+                    "INSERT OR REPLACE INTO shared_state (key, value) VALUES (?, ?)",
+                    [(key, dumps(value)) for key, value in values.items() if value is not None]
+                )
+                connection.executemany(
+                    "DELETE FROM shared_state WHERE key = ?", [(key,) for key, value in values.items() if value is None]
+                )
+                connection.execute("COMMIT")
+
+            except BaseException :
+
+                connection.execute("ROLLBACK")
+                raise
+
+
+    @with_type_validation(object, str, object)
+    def set(self, key : str, value : object) -> None :
+        """
+        This function stores a json serialisable value.
+
+        Parameters:
+            key (str): the key to store the value under.
+            value (object): the value.
+        """
+
+        with self._connect() as connection :
+            connection.execute("INSERT OR REPLACE INTO shared_state (key, value) VALUES (?, ?)", (key, dumps(value)))
+
+
+    @with_type_validation(object, str)
+    def values(self, prefix : str) -> dict :
+        """
+        This function returns every stored value whose key starts with a prefix.
+
+        Parameters:
+            prefix (str): the prefix of the keys, e.g. "metrics:".
+        """
+
+        with self._connect() as connection :
+
+            rows : list[tuple] = connection.execute(
+                "SELECT key, value FROM shared_state WHERE substr(key, 1, ?) = ?", (len(prefix), prefix)
+            ).fetchall()
+
+        return {key : loads(value) for key, value in rows}
+
+
+    def clear(self) -> None :
+        """
+        This function removes every stored value, e.g. state left by a previous run.
+        """
+
+        with self._connect() as connection :
+            connection.execute("DELETE FROM shared_state")
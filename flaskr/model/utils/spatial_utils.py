@@ -0,0 +1,132 @@
+import numpy as np
+
+from ..utils.validation_utils import with_type_validation
+
+
+EARTH_RADIUS_KM : float = 6371.0
+"""
+The mean radius of the earth in kilometres.
+"""
+
+KM_PER_DEGREE : float = 111.32
+"""
+The length in kilometres of one degree of latitude.
+"""
+
+
+def haversine_km(lat_1 : float, lon_1 : float, lat_2 : np.ndarray, lon_2 : np.ndarray) -> np.ndarray :
+    """
+    This function returns the great circle distance in kilometres between a point
+    and an array of points.
+
+    Parameters:
+        lat_1 (float): the latitude of the point.
+        lon_1 (float): the longitude of the point.
+        lat_2 (np.ndarray): the latitudes of the other points.
+        lon_2 (np.ndarray): the longitudes of the other points.
+    """
+
+    lat_1, lon_1, lat_2, lon_2 = np.radians(lat_1), np.radians(lon_1), np.radians(lat_2), np.radians(lon_2)
+
+    a : np.ndarray = np.sin((lat_2 - lat_1) / 2) ** 2 + np.cos(lat_1) * np.cos(lat_2) * np.sin((lon_2 - lon_1) / 2) ** 2
+
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+
+class SpatialIndex :
+    """
+    This class implements a uniform grid index over a set of coordinates. Radius
+    queries only compute distances to the points in the grid cells overlapping the
+    query's bounding box rather than to every point.
+    """
+
+    @with_type_validation(object, np.ndarray, np.ndarray, float)
+    def __init__(self, lat : np.ndarray, lon : np.ndarray, cell_size : float) -> None :
+        """
+        Initializer
+
+        Parameters:
+            lat (np.ndarray): the latitude of each point, the point's id is its index.
+            lon (np.ndarray): the longitude of each point.
+            cell_size (float): the size of each grid cell in degrees.
+        """
+
+        if cell_size <= 0 :
+            raise ValueError(f"Invalid cell size: {cell_size}.")
+
+        self.lat : np.ndarray = lat
+        self.lon : np.ndarray = lon
+        self.cell_size : float = cell_size
+
+        self.cells : dict[tuple, np.ndarray] = {}
+        """
+        The ids of the points in each grid cell, keyed by (row, column).
+        """
+
+        rows : np.ndarray = np.floor(lat / cell_size).astype(np.int64)
+        columns : np.ndarray = np.floor(lon / cell_size).astype(np.int64)
+
+        # Points are grouped by cell with a single sort
+        order : np.ndarray = np.lexsort((columns, rows))
+        keys : np.ndarray = np.stack((rows[order], columns[order]), axis=1)
+        boundaries : np.ndarray = np.flatnonzero(np.any(keys[1:] != keys[:-1], axis=1)) + 1
+
+        for ids in np.split(order, boundaries) :
+            if len(ids) > 0 :
+                self.cells[(int(rows[ids[0]]), int(columns[ids[0]]))] = ids
+
+
+    def __len__(self) -> int :
+        """
+        Returns the number of points in the index.
+        """
+
+        return len(self.lat)
+
+
+    @with_type_validation(object, float, float, float)
+    def within(self, lat : float, lon : float, radius_km : float) -> tuple :
+        """
+        This function finds every point within a radius of a location.
+
+        Parameters:
+            lat (float): the latitude of the location.
+            lon (float): the longitude of the location.
+            radius_km (float): the search radius in kilometres.
+
+        Returns:
+            tuple[np.ndarray, np.ndarray]: the ids of the points and their distances
+            in kilometres, ordered by distance.
+        """
+
+        lat_span : float = radius_km / KM_PER_DEGREE
+        lon_span : float = radius_km / (KM_PER_DEGREE * max(np.cos(np.radians(min(abs(lat) + lat_span, 90.0))), 1e-6))
+
+        # The bounding box is widened to whole cells, very wide boxes scan every point
+        if lon_span >= 180 :
+
+            candidates : np.ndarray = np.arange(len(self.lat))
+
+        else :
+
+            row_range : range = range(int(np.floor((lat - lat_span) / self.cell_size)), int(np.floor((lat + lat_span) / self.cell_size)) + 1)
+            column_range : range = range(int(np.floor((lon - lon_span) / self.cell_size)), int(np.floor((lon + lon_span) / self.cell_size)) + 1)
+
+            if len(row_range) * len(column_range) > len(self.cells) :
+
+                candidates = np.concatenate([
+                    ids for (row, column), ids in self.cells.items() if row in row_range and column in column_range
+                ] or [np.empty(0, dtype=np.int64)])
+
+            else :
+
+                candidates = np.concatenate([
+                    self.cells[(row, column)] for row in row_range for column in column_range if (row, column) in self.cells
+                ] or [np.empty(0, dtype=np.int64)])
+
+        distances : np.ndarray = haversine_km(lat, lon, self.lat[candidates], self.lon[candidates])
+        inside : np.ndarray = distances <= radius_km
+        order : np.ndarray = np.argsort(distances[inside], kind="stable")
+
+        return candidates[inside][order], distances[inside][order]
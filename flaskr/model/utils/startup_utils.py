@@ -0,0 +1,153 @@
+from contextlib import contextmanager
+from threading import Event, Lock, Thread
+from time import perf_counter
+from typing import Any, Callable, Iterator
+
+from ..utils.validation_utils import with_type_validation
+
+
+class BootReport :
+    """
+    This class records how long each phase of the application's start up took, so
+    that slow imports and initialisation steps can be identified.
+    """
+
+    def __init__(self) -> None :
+        """
+        Initializer
+        """
+
+        self.lock : Lock = Lock()
+        """
+        A mutex lock on the phases as the warm up runs on a background thread.
+        """
+
+        self.phases : dict[str, float] = {}
+        """
+        The duration of each phase in milliseconds, in the order they completed.
+        """
+
+
+    @with_type_validation(object, str, float)
+    def record(self, name : str, duration_ms : float) -> None :
+        """
+        This function records the duration of a phase.
+
+        Parameters:
+            name (str): the name of the phase.
+            duration_ms (float): the duration of the phase in milliseconds.
+        """
+
+        with self.lock :
+            self.phases[name] = round(duration_ms, 2)
+
+
+    @contextmanager
+    def phase(self, name : str) -> Iterator[None] :
+        """
+        This context manager records the duration of the code it wraps as a phase,
+        phases that fail are recorded as well.
+
+        Parameters:
+            name (str): the name of the phase.
+        """
+
+        start : float = perf_counter()
+
+        try :
+            yield
+        finally :
+            self.record(name, (perf_counter() - start) * 1000)
+
+
+    def get_statistics(self) -> dict :
+        """
+        This function returns the duration of each phase and their total.
+        """
+
+        with self.lock :
+            return {"phases_ms" : dict(self.phases), "total_ms" : round(sum(self.phases.values()), 2)}
+
+
+
+class LazyResource :
+    """
+    This class defers the creation of an expensive resource until it is first
+    needed, or until it is warmed up in the background. The resource is created
+    at most once however many threads request it.
+    """
+
+    @with_type_validation(object, str, object)
+    def __init__(self, name : str, loader : Callable[[], Any]) -> None :
+        """
+        Initializer
+
+        Parameters:
+            name (str): the name of the resource.
+            loader (Callable): creates the resource.
+        """
+
+        self.name : str = name
+        self.loader : Callable[[], Any] = loader
+        self.lock : Lock = Lock()
+        self.value : Any = None
+
+        self.loaded : Event = Event()
+        """
+        Set once the resource has been created.
+        """
+
+        self.error : Exception | None = None
+        """
+        The exception raised by the last failed attempt to create the resource.
+        """
+
+
+    def get(self) -> Any :
+        """
+        This function returns the resource, creating it if needed. Callers block
+        while another thread is creating it, a failed creation is retried by the
+        next caller.
+        """
+
+        if self.loaded.is_set() :
+            return self.value
+
+        with self.lock :
+
+            if not self.loaded.is_set() :
+
+                try :
+
+                    self.value = self.loader()
+                    self.error = None
+                    self.loaded.set()
+
+                except Exception as e :
+
+                    self.error = e
+                    raise
+
+        return self.value
+
+
+    @with_type_validation(object, object)
+    def warm_up(self, on_complete : Callable[[Any], None]) -> Thread :
+        """
+        This function creates the resource on a background thread.
+
+        Parameters:
+            on_complete (Callable): called with the resource once it is created.
+        """
+
+        def load() -> None :
+
+            try :
+                on_complete(self.get())
+            except Exception as e :
+                print(f"The {self.name} could not be loaded: {str(e)}")
+
+        thread : Thread = Thread(target=load, name=f"{self.name} warm up", daemon=True)
+        thread.start()
+
+        return thread
@@ -1,82 +1,223 @@
-from threading import Lock
-from typing import Callable
+from concurrent.futures import Future, ThreadPoolExecutor, FIRST_COMPLETED, wait
+from threading import Event
+from time import monotonic
+from typing import Any, Callable
 
+from ..exceptions.TaskCancelledException import TaskCancelledException
 from ..utils.validation_utils import with_type_validation
 
 
-class ThreadingContext :
+class TaskResult :
     """
-        This class creates simple threading context and allows any given
-        function to operate in a thread safe way.
+        This class stores the outcome of a single task executed by the
+        ConcurrentTaskRunner, keeping the value or exception attached to the
+        input that produced it.
     """
 
-    def __init__(self)  -> None :
+    def __init__(self, args : tuple)  -> None :
         """
         Initializer
+
+        Parameters:
+            args (tuple): the positional arguments the task was called with.
+        """
+
+        self.args : tuple = args
+        """
+        The positional arguments the task was called with.
+        """
+
+        self.value : Any = None
+        """
+        The value returned by the task, None if the task failed.
+        """
+
+        self.exception : Exception | None = None
+        """
+        The exception raised by the task, None if the task succeeded.
+        """
+
+
+    @property
+    def succeeded(self) -> bool :
+        """
+        Returns true if the task completed without raising an exception.
+        """
+
+        return self.exception is None
+
+
+    def __repr__(self) -> str :
+        """
+        This method displays the object's intialization specification as a string.
+        """
+
+        return f"TaskResult({self.args})"
+
+
+
+class ConcurrentTaskRunner :
+    """
+        This class runs a function concurrently over a list of inputs using a
+        thread pool. Results are returned in input order, exceptions remain
+        attached to the input that raised them, and the run can be bounded by
+        an overall deadline or cancelled from another thread. A runner may be
+        reused, each call to run() starts uncancelled.
+    """
+
+    FAIL_FAST : str = "fail-fast"
+    """
+    Failure policy - the first exception cancels all outstanding tasks and is
+    re-raised by run().
+    """
+
+    COLLECT : str = "collect"
+    """
+    Failure policy - failed tasks are recorded against their input and the
+    remaining tasks continue unaffected.
+    """
+
+    POLL_INTERVAL : float = 0.1
+    """
+    The maximum number of seconds the runner waits before re-checking for
+    cancellation.
+    """
+
+    def __init__(self, max_workers : int = 8, timeout : float = None, failure_policy : str = COLLECT)  -> None :
         """
+        Initializer
 
-        self.lock : Lock = Lock()
+        Parameters:
+            max_workers (int): the maximum number of tasks executed at once.
+            timeout (float | None): the overall deadline in seconds, None for no deadline.
+            failure_policy (str): either ConcurrentTaskRunner.FAIL_FAST or ConcurrentTaskRunner.COLLECT.
         """
-        A mutex lock on the shared_list to allow function returns to be stored in a
-        thread safe manner.
+
+        # Input validation is performed on the runner configuration
+        if max_workers < 1 :
+            raise ValueError(f"Invalid number of workers: {max_workers}.")
+
+        if timeout is not None and (not isinstance(timeout, (int, float)) or timeout <= 0) :
+            raise ValueError(f"Invalid timeout: {timeout}.")
+
+        if failure_policy not in (ConcurrentTaskRunner.FAIL_FAST, ConcurrentTaskRunner.COLLECT) :
+            raise ValueError(f"Invalid failure policy: {failure_policy}.")
+
+        self.max_workers : int = max_workers
+        """
+        The maximum number of tasks executed at once.
         """
 
-        self.exception_lock : Lock = Lock()
+        self.timeout : float | None = timeout
         """
-        A mutex lock on the exceptions list to allow exceptions to be stored in a
-        thread safe manner.
+        The overall deadline in seconds for a call to run().
         """
 
-        self.exceptions : list = []
+        self.failure_policy : str = failure_policy
+        """
+        The policy applied when a task raises an exception.
         """
-        A simple shared exceptions list to store exceptions thrown outside the thread
-        context.
+
+        self.cancelled : Event = Event()
+        """
+        An event that is set once the current run is cancelled, a new event is
+        created by each call to run(). Running tasks are never interrupted, a long
+        running task that holds the runner may poll it to stop early.
+        """
+
+
+    def cancel(self) -> None :
+        """
+        Cancels every task of the current run that has not yet started, running
+        tasks are abandoned and their results discarded. run() notices within
+        POLL_INTERVAL seconds. This method is safe to call from any thread.
+        """
+
+        self.cancelled.set()
+
+
+    @with_type_validation(object, object, list)
+    def run(self, func : Callable, arguments : list) -> list :
         """
+        This function executes func once for every entry in arguments and blocks
+        until all tasks have completed, the deadline passes or the runner is
+        cancelled.
+
+        Parameters:
+            func (Callable): the function to execute.
+            arguments (list): one entry per task, tuples are unpacked as positional
+            arguments and any other value is passed as the single argument.
 
-    @with_type_validation(object, list)
-    def with_threading_context(self, shared_list : list) -> Callable :
+        Returns:
+            list[TaskResult]: the task outcomes in the same order as arguments.
         """
-            This function allows the underlying decorator to be parameterized.
 
-            Parameters:
-                shared_list (list): the shared list to be populated by the thread.
-            """
+        # Cancelling a previous run doesn't cancel this one
+        self.cancelled = Event()
+        cancelled : Event = self.cancelled
+
+        results : list[TaskResult] = [
+            TaskResult(args if isinstance(args, tuple) else (args,)) for args in arguments
+        ]
+
+        if len(results) == 0 :
+            return results
+
+        deadline : float | None = None if self.timeout is None else monotonic() + self.timeout
+        reason : str = "the task runner was cancelled."
+        failure : Exception | None = None
+
+        executor : ThreadPoolExecutor = ThreadPoolExecutor(max_workers=min(self.max_workers, len(results)))
+        futures : dict[Future, int] = {
+            executor.submit(func, *result.args) : index for index, result in enumerate(results)
+        }
+        pending : set[Future] = set(futures)
+
+        try :
+
+            while pending and not cancelled.is_set() :
+
+                wait_time : float = ConcurrentTaskRunner.POLL_INTERVAL
+
+                # The deadline bounds the time spent waiting on outstanding tasks
+                if deadline is not None :
+
+                    remaining : float = deadline - monotonic()
+
+                    if remaining <= 0 :
+                        reason = f"the deadline of {self.timeout} seconds was exceeded."
+                        break
+
+                    wait_time = min(wait_time, remaining)
+
+                done, pending = wait(pending, timeout=wait_time, return_when=FIRST_COMPLETED)
+
+                for future in done :
+
+                    result : TaskResult = results[futures[future]]
+                    result.exception = future.exception()
 
-        def decorator(func : Callable) -> Callable :
-            """
-            This is the decorator function
+                    if result.exception is None :
+                        result.value = future.result()
 
-            Parameters:
-                func (function): the function to be wrapped
-            """
-            
-            def wrapper(*args, **kwargs) -> None :
-                """
-                This function wraps the function that is being decorated.
+                    # The first failure cancels every outstanding task
+                    elif self.failure_policy == ConcurrentTaskRunner.FAIL_FAST and failure is None :
+                        failure = result.exception
+                        reason = "another task failed."
+                        self.cancel()
 
-                Parameters:
-                    *args (list): a list of parameters
-                    **kwargs (dict): a dictionary of named parameters
-                """
-                
-                # Generic exception handling catches all exceptions to re-throw
-                try :
-                    
-                    # The shared list is written to in a thread safe manner
-                    with self.lock :
-                        
-                        shared_list.append(func(*args, **kwargs))
+        finally :
 
-                except Exception as e :
-                    
-                    # The shared exception list is written to in a thread safe manner
-                    with self.exception_lock :
-                        self.exceptions.append(e)
-                
-            return wrapper
-        
-        return decorator
+            # Outstanding tasks are cancelled and recorded against their input, threads
+            # that are already running are abandoned rather than joined.
+            for future in pending :
 
+                future.cancel()
+                results[futures[future]].exception = TaskCancelledException(reason)
 
+            executor.shutdown(wait=False)
 
+        if failure is not None :
+            raise failure
 
+        return results
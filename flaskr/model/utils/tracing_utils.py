@@ -0,0 +1,190 @@
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar, Token
+from functools import wraps
+from json import dumps
+from random import random
+from time import perf_counter
+from typing import Any, Callable, ContextManager, Iterator
+
+from ..utils.validation_utils import with_type_validation
+
+
+class Trace :
+    """
+    This class records how long each stage of a single request took. Stages that
+    run inside another stage are counted as part of the outer stage, so the stages
+    never add up to more than the request's total.
+    """
+
+    @with_type_validation(object, bool)
+    def __init__(self, sampled : bool) -> None :
+        """
+        Initializer
+
+        Parameters:
+            sampled (bool): whether the request's stages are recorded, otherwise only
+            its total duration is.
+        """
+
+        self.sampled : bool = sampled
+        self.start : float = perf_counter()
+        self.end : float | None = None
+
+        self.stages : dict[str, list] = {}
+        """
+        The total duration in milliseconds and the number of runs of each stage, in
+        the order the stages first ran.
+        """
+
+        self.depth : int = 0
+        """
+        The number of stages currently running, nested stages are not recorded.
+        """
+
+
+    @contextmanager
+    def stage(self, name : str) -> Iterator[None] :
+        """
+        This context manager records the duration of the code it wraps as a stage,
+        the durations of a stage that runs more than once are summed.
+
+        Parameters:
+            name (str): the name of the stage, a token without spaces.
+        """
+
+        if self.depth > 0 :
+            yield
+            return
+
+        self.depth += 1
+        start : float = perf_counter()
+
+        try :
+            yield
+        finally :
+
+            self.depth -= 1
+            stage : list = self.stages.setdefault(name, [0.0, 0])
+            stage[0] += (perf_counter() - start) * 1000
+            stage[1] += 1
+
+
+    def finish(self) -> None :
+        """
+        This function stops the request's total duration, so that it is reported
+        the same way however many times it is formatted.
+        """
+
+        self.end = perf_counter()
+
+
+    def total_ms(self) -> float :
+        """
+        This function returns the request's total duration in milliseconds, up to
+        now if it hasn't finished.
+        """
+
+        return ((self.end or perf_counter()) - self.start) * 1000
+
+
+    def server_timing(self) -> str :
+        """
+        This function formats the stages as a Server-Timing header value, stages
+        that ran more than once are described with their number of runs.
+        """
+
+        metrics : list[str] = [
+            f"{name};desc=\"{runs} runs\";dur={duration:.2f}" if runs > 1 else f"{name};dur={duration:.2f}"
+            for name, (duration, runs) in self.stages.items()
+        ]
+
+        return ", ".join(metrics + [f"total;dur={self.total_ms():.2f}"])
+
+
+    def to_log(self, **fields) -> str :
+        """
+        This function formats the stages as a single line of json.
+
+        Parameters:
+            **fields (Any): other values describing the request.
+        """
+
+        return dumps({
+            **fields,
+            "stages_ms" : {name : round(duration, 2) for name, (duration, runs) in self.stages.items()},
+            "runs" : {name : runs for name, (duration, runs) in self.stages.items()},
+            "total_ms" : round(self.total_ms(), 2)
+        })
+
+
+
+_current_trace : ContextVar = ContextVar("trace", default=None)
+"""
+The sampled trace of the request being handled by the current thread.
+"""
+
+
+@with_type_validation(float)
+def start_trace(sample_rate : float) -> tuple :
+    """
+    This function starts timing the current request, its stages are only recorded
+    if it is sampled. Returns the trace and the token that ends it.
+
+    Parameters:
+        sample_rate (float): the proportion (0.0 - 1.0) of requests whose stages
+        are recorded.
+    """
+
+    trace : Trace = Trace(sample_rate >= 1.0 or random() < sample_rate)
+
+    return trace, _current_trace.set(trace if trace.sampled else None)
+
+
+@with_type_validation(Token)
+def end_trace(token : Token) -> None :
+    """
+    This function stops recording the stages of the current request.
+
+    Parameters:
+        token (Token): the token returned by start_trace.
+    """
+
+    _current_trace.reset(token)
+
+
+@with_type_validation(str)
+def trace_stage(name : str) -> ContextManager :
+    """
+    This function returns a context manager that records the code it wraps as a
+    stage of the current request, it does nothing if the request isn't sampled.
+
+    Parameters:
+        name (str): the name of the stage, a token without spaces.
+    """
+
+    trace : Trace | None = _current_trace.get()
+
+    return trace.stage(name) if trace is not None else nullcontext()
+
+
+@with_type_validation(str)
+def traced(name : str) -> Callable :
+    """
+    This function enables the underlying decorator to record every call of the
+    wrapped function as a stage of the current request.
+
+    Parameters:
+        name (str): the name of the stage, a token without spaces.
+    """
+
+    def decorator(func : Callable) -> Callable :
+
+        @wraps(func)
+        def wrapper(*args, **kwargs) -> Any :
+
+            with trace_stage(name) :
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
@@ -1,18 +1,50 @@
+from functools import wraps
+from inspect import Parameter, signature
 from typing import Any, Callable
+import os
 
 from ..exceptions.ValidationException import ValidationException
 
 
+PRODUCTION_VARIABLE : str = "GO_TRAVEL_PRODUCTION"
+"""
+The environment variable that enables production mode, in which the functions'
+inputs are trusted and not validated.
+"""
+
+VALIDATION_ENABLED : bool = os.environ.get(PRODUCTION_VARIABLE, "").lower() not in ["1", "true", "yes"]
+"""
+Whether functions decorated from now on validate their inputs. The environment
+variable is only read when this module is imported and this flag only when a
+function is decorated, so production mode must be set before the application
+starts, changing either later has no effect on functions already decorated.
+"""
+
+
 def with_type_validation(*types)  -> None :
     """
-    This function enables the underlying decorator function to be 
-    parameterized.
+    This function enables the underlying decorator function to be
+    parameterized. The types are checked once, when a function is decorated,
+    along with the positions of the function's named parameters. In production
+    mode the function is returned undecorated.
 
     Parameters:
         *types (list[type]): the types corresponding to the wrapped functions
         input parameters types.
     """
 
+    # The decorator only takes "type" objects - input validation is
+    # handled.
+    for kind in types :
+
+        if not isinstance(kind, type) :
+
+            raise TypeError("All inputs must be \"type\" objects")
+
+    # Inputs typed "object" can't fail so they aren't checked
+    checks : tuple = tuple((i, kind) for i, kind in enumerate(types) if kind is not object)
+    count : int = len(types)
+
     def decorator(func : Callable) -> Callable :
         """
         This is the decorator function itself
@@ -21,6 +53,40 @@ def with_type_validation(*types)  -> None :
             func (Callable): The function being wrapped by the decorator.
         """
 
+        if not VALIDATION_ENABLED :
+            return func
+
+        # Keyword inputs are checked against the type of the parameter they name
+        names : tuple = tuple(
+            name for name, parameter in signature(func).parameters.items()
+            if parameter.kind in [Parameter.POSITIONAL_ONLY, Parameter.POSITIONAL_OR_KEYWORD]
+        )
+
+        def invalid(inputs : tuple) -> Exception :
+            """
+            This function creates the error raised for inputs that failed validation.
+
+            Parameters:
+                inputs (tuple | list): The wrapped functions inputs
+            """
+
+            # The decorator must have the correct number of arguments - input
+            # validation is handled.
+            if len(inputs) != count :
+
+                return ValidationException()
+
+            for i, kind in checks :
+
+                # The decorator validates the wrapped functions inputs
+                if not isinstance(inputs[i], kind) :
+
+                    return TypeError(f"Invalid input type \"{inputs[i].__class__.__name__}\" "\
+                                     f"for function {func.__name__}, \"{kind.__name__}\" was expected.")
+
+            return None
+
+        @wraps(func)
         def wrapper(*args, **kwargs) -> Any :
             """
             This function peforms input type validation on the wrapped function.
@@ -30,39 +96,39 @@ def with_type_validation(*types)  -> None :
                 **kwargs (Any): The wrapped functions keyword inputs
             """
 
-            inputs = list(args) + list(kwargs.values())
+            # The common call, every input given by position, is checked directly
+            if not kwargs and len(args) == count :
 
+                for i, kind in checks :
 
-            # The decorator must have the correct number of arguments - input
-            # validation is handled.
-            if len(inputs) != len(types) :
+                    if not isinstance(args[i], kind) :
 
-                raise ValidationException()
-            
-            
-            for i in range(len(types)):
-                
-                # The decorator only takes "type" objects - input validation is
-                # handled.
-                if not isinstance(types[i], type) :
+                        raise invalid(args)
 
-                    raise TypeError("All inputs must be \"type\" objects")
+                return func(*args)
 
-                # The decorator validates the wrapped functions inputs
-                if not isinstance(inputs[i], types[i]) :
+            # Keyword inputs are put in the order of the parameters they name,
+            # unknown names after them in the order they were given
+            inputs : list = list(args)
 
-                    raise TypeError(f"Invalid input type \"{inputs[i].__class__.__name__}\" "\
-                                    f"for function {func.__name__}, \"{types[i].__class__.__name__}\" was expected.")
-        
-            return func(*args, **kwargs)
-        
-        return wrapper
-    
-    return decorator
+            for name in names[len(args):] :
+
+                if name in kwargs :
 
+                    inputs.append(kwargs[name])
 
+            if len(inputs) - len(args) != len(kwargs) :
 
-            
+                inputs.extend(value for name, value in kwargs.items() if name not in names[len(args):])
 
+            error : Exception | None = invalid(inputs)
 
+            if error :
 
+                raise error
+
+            return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
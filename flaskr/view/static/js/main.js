@@ -77,27 +77,132 @@ async function getResponse(event){
 
     chatRegion.scrollTop += 200;
 
-    response = null
+    // The response is streamed over the chat session's WebSocket, or as
+    // Server-Sent Events by browsers without WebSocket support.
+    chat = {bubble : speechBubble, region : chatRegion, parts : 0};
+
+    if("WebSocket" in window){
+        sessionResponse(input, chat);
+    }else{
+        streamResponse(input, chat);
+    }
+}
 
-    // Minimal error handling in case backend fails or fetch times out.
-    try{
 
-        params = encodeURIComponent(input)
+/**
+ * Function renders an event of a streamed response - the provisional message is
+ * shown until the first part arrives and each later part is appended as it
+ * arrives. Returns true once the response is complete.
+ */
+function renderEvent(chat, name, data){
+
+    if(name === "intent"){
 
-        response = await fetch("http://localhost:80/chat/" + params, { method : "GET"});
+        if(data["message"]){
+            chat.bubble.innerText = data["message"];
+        }
 
-    }catch(error){
+        return false;
+    }
 
-        console.log(error);
-        speechBubble.innerText = "Sorry something went wrong please try again...";
+    if(name === "part"){
+
+        chat.bubble.innerText = chat.parts === 0 ? data["text"] : chat.bubble.innerText + data["text"];
+        chat.parts++;
+
+    }else if(name === "message"){
 
+        chat.bubble.innerText = data["Go Travel Bot"];
+
+    }else if(name === "error"){
+
+        chat.bubble.innerText = data["error"];
     }
-    
-    if(response !== null){
-        data = await response.json();
-        speechBubble.innerText = data["Go Travel Bot"];
+
+    chat.region.scrollTop += 200;
+
+    return name === "message" || name === "error";
+}
+
+
+/**
+ * Function streams a single response from the backend as Server-Sent Events.
+ */
+function streamResponse(input, chat){
+
+    const source = new EventSource("http://localhost:80/chat/" + encodeURIComponent(input) + "/stream");
+
+    for(const name of ["intent", "part", "message"]){
+
+        source.addEventListener(name, function(event){
+
+            if(renderEvent(chat, name, JSON.parse(event.data))){
+                source.close();
+            }
+        });
     }
 
-    chatRegion.scrollTop += 200;   
+    // Sent by the server if the response failed, or raised by the browser if
+    // the connection fails - minimal error handling either way.
+    source.addEventListener("error", function(event){
+
+        source.close();
+
+        if(event.data){
+            renderEvent(chat, "error", JSON.parse(event.data));
+        }else{
+            console.log(event);
+            renderEvent(chat, "error", {"error" : "Sorry something went wrong please try again..."});
+        }
+    });
 }
 
+
+// The chat session's WebSocket and the chats waiting for their response, in
+// the order they were sent - the session answers them in that order.
+let socket = null;
+let pending = [];
+
+
+/**
+ * Function sends the user's input over the chat session's WebSocket, which is
+ * opened by the first message and reopened if it was closed.
+ */
+function sessionResponse(input, chat){
+
+    if(socket === null){
+
+        socket = new WebSocket("ws://localhost:80/chat/ws");
+
+        socket.addEventListener("message", function(event){
+
+            data = JSON.parse(event.data);
+
+            if(pending.length > 0 && renderEvent(pending[0], data["event"], data)){
+                pending.shift();
+            }
+        });
+
+        // Minimal error handling in case the backend fails or the session expires.
+        socket.addEventListener("close", function(event){
+
+            console.log(event);
+
+            for(const waiting of pending){
+                renderEvent(waiting, "error", {"error" : "Sorry something went wrong please try again..."});
+            }
+
+            socket = null;
+            pending = [];
+        });
+    }
+
+    pending.push(chat);
+
+    if(socket.readyState === WebSocket.CONNECTING){
+        const opening = socket;
+        opening.addEventListener("open", function(){ opening.send(input); });
+    }else{
+        socket.send(input);
+    }
+}
@@ -0,0 +1,101 @@
+"""
+Tests of the CircuitBreaker's states as held by a single process.
+
+Usage:
+    python -m pytest tests
+    python -m unittest tests.test_circuit_breaker
+"""
+
+from time import sleep
+from unittest import TestCase, main
+
+from flaskr.model.utils.circuit_breaker_utils import CircuitBreaker
+
+
+class CircuitBreakerTest(TestCase) :
+
+    def open_circuit(self, breaker : CircuitBreaker) -> None :
+        """
+        Fails as many requests as it takes to open a circuit.
+        """
+
+        for _ in range(breaker.failure_threshold) :
+            self.assertTrue(breaker.allow_request())
+            breaker.record_failure()
+
+
+    def test_consecutive_failures_open_the_circuit(self) -> None :
+
+        breaker : CircuitBreaker = CircuitBreaker("OpenWeather", 3, 60.0)
+        self.open_circuit(breaker)
+
+        self.assertFalse(breaker.allow_request())
+        self.assertEqual(breaker.get_statistics(), {"state" : CircuitBreaker.OPEN, "consecutive_failures" : 3, "rejected" : 1})
+
+
+    def test_success_resets_the_failures(self) -> None :
+
+        breaker : CircuitBreaker = CircuitBreaker("OpenWeather", 2, 60.0)
+
+        breaker.record_failure()
+        breaker.record_success()
+        breaker.record_failure()
+
+        self.assertTrue(breaker.allow_request())
+        self.assertEqual(breaker.get_statistics()["state"], CircuitBreaker.CLOSED)
+
+
+    def test_successful_trial_closes_the_circuit(self) -> None :
+
+        breaker : CircuitBreaker = CircuitBreaker("OpenWeather", 1, 0.01)
+        self.open_circuit(breaker)
+        sleep(0.02)
+
+        self.assertTrue(breaker.allow_request())
+        self.assertFalse(breaker.allow_request())
+
+        breaker.record_success()
+
+        self.assertTrue(breaker.allow_request())
+        self.assertEqual(breaker.get_statistics()["consecutive_failures"], 0)
+
+
+    def test_failed_trial_opens_the_circuit_again(self) -> None :
+
+        breaker : CircuitBreaker = CircuitBreaker("OpenWeather", 3, 0.01)
+        self.open_circuit(breaker)
+        sleep(0.02)
+
+        self.assertTrue(breaker.allow_request())
+        breaker.record_failure()
+
+        # A single failed trial is enough, whatever the threshold
+        self.assertFalse(breaker.allow_request())
+        self.assertEqual(breaker.get_statistics()["state"], CircuitBreaker.OPEN)
+
+
+    def test_released_trial_is_given_to_the_next_caller(self) -> None :
+
+        breaker : CircuitBreaker = CircuitBreaker("OpenWeather", 1, 0.01)
+        self.open_circuit(breaker)
+        sleep(0.02)
+
+        self.assertTrue(breaker.allow_request())
+        breaker.release()
+
+        self.assertTrue(breaker.allow_request())
+        self.assertEqual(breaker.get_statistics()["state"], CircuitBreaker.HALF_OPEN)
+
+
+    def test_invalid_configuration(self) -> None :
+
+        with self.assertRaises(ValueError) :
+            CircuitBreaker("OpenWeather", 0, 60.0)
+
+        with self.assertRaises(ValueError) :
+            CircuitBreaker("OpenWeather", 3, 0.0)
+
+
+
+if __name__ == "__main__" :
+    main()
@@ -0,0 +1,117 @@
+"""
+Tests of the training corpus generated from the response templates and of the
+version that decides whether the chatbot is trained again.
+
+Usage:
+    python -m pytest tests
+    python -m unittest tests.test_corpus
+"""
+
+from tempfile import TemporaryDirectory
+from unittest import TestCase, main
+import os
+
+from flaskr.model.chatbot.generate_corpus import corpus_version, create_corpus_from_template
+
+
+TEMPLATE_FOLDER : str = "flaskr/model/chatbot/corpus_templates"
+LOCATIONS : list = ["Oxford", "Cambridge"]
+
+
+class CorpusVersionTest(TestCase) :
+
+    def setUp(self) -> None :
+
+        directory : TemporaryDirectory = TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+
+        self.directory : str = directory.name
+
+
+    def template(self, name : str, lines : list) -> str :
+        """
+        Writes a corpus template and returns its path.
+        """
+
+        path : str = os.path.join(self.directory, name)
+
+        with open(path, "w", encoding="utf-8") as file :
+            file.write("\n".join(lines) + "\n")
+
+        return path
+
+
+    def version(self, path : str, locations : list) -> str :
+        """
+        Returns the version of the corpus generated from a template.
+        """
+
+        return corpus_version(create_corpus_from_template(path, locations).values.tolist(), [])
+
+
+    def test_version_is_stable(self) -> None :
+
+        path : str = self.template("news.csv", ["News from {location}?, #5# The latest news in output-location is: {title}"])
+
+        self.assertEqual(self.version(path, LOCATIONS), self.version(path, LOCATIONS))
+
+
+    def test_added_template_changes_the_version(self) -> None :
+
+        before : str = self.version(self.template("before.csv", [
+            "News from {location}?, #5# The latest news in output-location is: {title}"
+        ]), LOCATIONS)
+        after : str = self.version(self.template("after.csv", [
+            "News from {location}?, #5# The latest news in output-location is: {title}",
+            "Best place near {location}?, #6# The best place near output-location is {best-location}"
+        ]), LOCATIONS)
+
+        self.assertNotEqual(before, after)
+
+
+    def test_added_location_changes_the_version(self) -> None :
+
+        path : str = self.template("news.csv", ["News from {location}?, #5# The latest news in output-location is: {title}"])
+
+        self.assertNotEqual(self.version(path, LOCATIONS), self.version(path, LOCATIONS + ["Norwich"]))
+
+
+    def test_best_location_near_location_is_in_the_corpus(self) -> None :
+
+        corpus : list = create_corpus_from_template(os.path.join(TEMPLATE_FOLDER, "best_location_near_location.csv"), LOCATIONS).values.tolist()
+
+        self.assertTrue(corpus)
+        self.assertTrue(all(response.startswith("#6#") for _, response in corpus))
+
+
+    def test_daily_forecast_templates_change_the_version(self) -> None :
+
+        path : str = os.path.join(TEMPLATE_FOLDER, "weather_forecast_request.csv")
+        corpus : list = create_corpus_from_template(path, LOCATIONS).values.tolist()
+
+        with open(path, encoding="utf-8") as file :
+            line : str = file.readline().strip()
+
+        # The forecast template before the daily summaries only gave the temperature
+        previous : str = self.template("previous.csv", [
+            "What's the weather forecast for {location}?, #2# The weather forecast for {output-location} is: [• {weekday}: {description} with a temperature of {temp} °C]"
+        ])
+        current : str = self.template("current.csv", [line])
+
+        self.assertTrue(all("{min_temp}" in response and "{rain_chance}" in response for _, response in corpus))
+        self.assertNotEqual(self.version(current, LOCATIONS), self.version(previous, LOCATIONS))
+
+
+    def test_comparison_templates_change_the_version(self) -> None :
+
+        corpus : list = create_corpus_from_template(os.path.join(TEMPLATE_FOLDER, "latest_news_request.csv"), LOCATIONS).values.tolist()
+        comparison : str = os.path.join(TEMPLATE_FOLDER, "compare_locations.csv")
+        changed : str = self.template("compare_locations.csv", ["Is it warmer in {location} or {location}?, #7# It is warmest in {warmest-location}"])
+
+        self.assertNotEqual(corpus_version(corpus, []), corpus_version(corpus, [comparison]))
+        self.assertNotEqual(corpus_version(corpus, [comparison]), corpus_version(corpus, [changed]))
+
+
+
+if __name__ == "__main__" :
+    main()
@@ -0,0 +1,274 @@
+"""
+Tests of the HTTPResponseCache against a local stand-in for the OpenWeather API,
+so that every request the cache makes can be counted.
+
+Usage:
+    python -m pytest tests
+    python -m unittest tests.test_http_response_cache
+"""
+
+from tempfile import TemporaryDirectory
+from unittest import TestCase, main, mock
+import os
+
+from benchmarks.stub_upstreams import StubConfiguration, StubUpstreamServer
+from flaskr.model.data_access_layer.HTTPResponseCache import CachedResponse, HTTPResponseCache
+from flaskr.model.data_access_layer.OpenWeatherConnector import OpenWeatherConnector
+
+
+PARAMS : dict = {"lat" : 51.75, "lon" : -1.25, "appid" : "stub-weather-key"}
+TIMEOUT : float = 5.0
+
+
+class HTTPResponseCacheTest(TestCase) :
+    """
+    Each test starts a stub with its own caching headers and a cache in a new file.
+    """
+
+    def serve(self, configuration : StubConfiguration) -> str :
+        """
+        Starts a stub that is stopped when the test ends, and returns the URL of its
+        forecast endpoint.
+        """
+
+        self.stub : StubUpstreamServer = StubUpstreamServer(configuration).start()
+        self.addCleanup(self.stub.stop)
+
+        return self.stub.url + StubUpstreamServer.WEATHER_PATH
+
+
+    def network_calls(self) -> int :
+        """
+        Returns the number of forecast requests that reached the stub.
+        """
+
+        return self.stub.requests[StubUpstreamServer.WEATHER_PATH]
+
+
+    def setUp(self) -> None :
+
+        directory : TemporaryDirectory = TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+
+        self.path : str = os.path.join(directory.name, "http-cache.db")
+        self.cache : HTTPResponseCache = HTTPResponseCache(self.path)
+
+
+    def test_max_age_hit_is_served_without_a_network_call(self) -> None :
+
+        url : str = self.serve(StubConfiguration(cache_control="max-age=60"))
+
+        first : CachedResponse = self.cache.get(url, PARAMS, TIMEOUT)
+        second : CachedResponse = self.cache.get(url, PARAMS, TIMEOUT)
+
+        self.assertEqual(self.network_calls(), 1)
+        self.assertTrue(first.from_network)
+        self.assertTrue(first.changed)
+        self.assertFalse(second.from_network)
+        self.assertFalse(second.changed)
+        self.assertEqual(second.status_code, 200)
+        self.assertEqual(second.content, first.content)
+
+
+    def test_etag_revalidation(self) -> None :
+
+        url : str = self.serve(StubConfiguration(cache_control="no-cache", etag=True))
+
+        first : CachedResponse = self.cache.get(url, PARAMS, TIMEOUT)
+        second : CachedResponse = self.cache.get(url, PARAMS, TIMEOUT)
+
+        self.assertEqual(self.network_calls(), 2)
+        self.assertEqual(self.stub.not_modified, 1)
+        self.assertTrue(second.from_network)
+        self.assertFalse(second.changed)
+        self.assertEqual(second.status_code, 200)
+        self.assertEqual(second.content, first.content)
+        self.assertEqual(self.cache.get_statistics()["revalidated"], 1)
+
+
+    def test_if_modified_since_revalidation(self) -> None :
+
+        url : str = self.serve(StubConfiguration(cache_control="no-cache", last_modified=True))
+
+        first : CachedResponse = self.cache.get(url, PARAMS, TIMEOUT)
+        second : CachedResponse = self.cache.get(url, PARAMS, TIMEOUT)
+
+        self.assertEqual(self.network_calls(), 2)
+        self.assertEqual(self.stub.not_modified, 1)
+        self.assertFalse(second.changed)
+        self.assertEqual(second.status_code, 200)
+        self.assertEqual(second.content, first.content)
+        self.assertEqual(self.cache.get_statistics()["revalidated"], 1)
+
+
+    def test_unchanged_body_is_neither_parsed_nor_written(self) -> None :
+
+        url : str = self.serve(StubConfiguration())
+        api_url : str = OpenWeatherConnector.API_URL
+        locations : list = [["Oxford", 51.752, -1.2577], ["Cambridge", 52.2053, 0.1218]]
+
+        OpenWeatherConnector.API_URL = url
+        self.addCleanup(setattr, OpenWeatherConnector, "API_URL", api_url)
+
+        connector : OpenWeatherConnector = OpenWeatherConnector("stub-weather-key", self.cache, OpenWeatherConnector.GRID_CELL_SIZE)
+        first : list = connector.bulk_weather_request(locations)
+
+        self.assertTrue(all(first))
+        self.assertEqual(sorted(connector.updated_locations), ["Cambridge", "Oxford"])
+
+        # The application passes the locations whose data was written
+        connector.stored_locations = set(connector.updated_locations)
+
+        # The stub answers without validators, so the whole body is downloaded again
+        with mock.patch.object(CachedResponse, "json", autospec=True, side_effect=CachedResponse.json) as parse :
+            second : list = connector.bulk_weather_request(locations)
+
+        self.assertEqual(self.network_calls(), 2 * connector.upstream_calls)
+        self.assertEqual(parse.call_count, 0)
+        self.assertFalse(any(second))
+        self.assertEqual(sorted(connector.unchanged_locations), ["Cambridge", "Oxford"])
+
+        # Only the updated locations' stored data is replaced
+        self.assertEqual(connector.updated_locations, [])
+
+
+    def test_unchanged_location_without_stored_data_is_written(self) -> None :
+
+        url : str = self.serve(StubConfiguration(cache_control="max-age=60"))
+        api_url : str = OpenWeatherConnector.API_URL
+        locations : list = [["Oxford", 51.752, -1.2577], ["Cambridge", 52.2053, 0.1218]]
+
+        OpenWeatherConnector.API_URL = url
+        self.addCleanup(setattr, OpenWeatherConnector, "API_URL", api_url)
+
+        connector : OpenWeatherConnector = OpenWeatherConnector("stub-weather-key", self.cache, OpenWeatherConnector.GRID_CELL_SIZE)
+        connector.bulk_weather_request(locations)
+
+        # Cambridge's write failed, so only Oxford's data is stored
+        connector.stored_locations = {"Oxford"}
+        forecasts : list = connector.bulk_weather_request(locations)
+
+        self.assertEqual(self.network_calls(), 2)
+        self.assertEqual(connector.unchanged_locations, ["Oxford"])
+        self.assertEqual(connector.updated_locations, ["Cambridge"])
+        self.assertEqual({weather.location for forecast in forecasts for weather in forecast}, {"Cambridge"})
+
+
+    def test_location_added_to_a_cached_cell_is_written(self) -> None :
+
+        url : str = self.serve(StubConfiguration(cache_control="max-age=60"))
+        api_url : str = OpenWeatherConnector.API_URL
+        oxford : list = ["Oxford", 51.752, -1.2577]
+        headington : list = ["Headington", 51.7602, -1.2093]
+
+        OpenWeatherConnector.API_URL = url
+        self.addCleanup(setattr, OpenWeatherConnector, "API_URL", api_url)
+
+        connector : OpenWeatherConnector = OpenWeatherConnector("stub-weather-key", self.cache, OpenWeatherConnector.GRID_CELL_SIZE)
+        connector.bulk_weather_request([oxford])
+        connector.stored_locations = {"Oxford"}
+
+        # Headington shares Oxford's cell, whose forecast is served by the cache
+        forecasts : list = connector.bulk_weather_request([oxford, headington])
+
+        self.assertEqual(self.network_calls(), 1)
+        self.assertEqual(connector.unchanged_locations, ["Oxford"])
+        self.assertEqual(connector.updated_locations, ["Headington"])
+        self.assertTrue(all(weather.location == "Headington" for forecast in forecasts for weather in forecast))
+        self.assertTrue(any(forecasts))
+
+
+    def test_cell_size_sets_the_requests_shared(self) -> None :
+
+        url : str = self.serve(StubConfiguration())
+        api_url : str = OpenWeatherConnector.API_URL
+        locations : list = [["Oxford", 51.752, -1.2577], ["Headington", 51.7602, -1.2093]]
+
+        OpenWeatherConnector.API_URL = url
+        self.addCleanup(setattr, OpenWeatherConnector, "API_URL", api_url)
+
+        # Both locations share a 0.1 degree cell, but not a 0.01 degree one
+        for cell_size, calls in [(0.1, 1), (0.01, 2), (0.0, 2)] :
+
+            connector : OpenWeatherConnector = OpenWeatherConnector("stub-weather-key", self.cache, cell_size)
+            connector.bulk_weather_request(locations)
+
+            self.assertEqual(connector.upstream_calls, calls)
+
+
+    def test_cache_hits_are_not_network_calls(self) -> None :
+
+        url : str = self.serve(StubConfiguration(cache_control="max-age=60"))
+        api_url : str = OpenWeatherConnector.API_URL
+        locations : list = [["Oxford", 51.752, -1.2577], ["Cambridge", 52.2053, 0.1218]]
+
+        OpenWeatherConnector.API_URL = url
+        self.addCleanup(setattr, OpenWeatherConnector, "API_URL", api_url)
+
+        connector : OpenWeatherConnector = OpenWeatherConnector("stub-weather-key", self.cache, OpenWeatherConnector.GRID_CELL_SIZE)
+        connector.bulk_weather_request(locations)
+
+        self.assertEqual(connector.network_calls, 2)
+        self.assertEqual(connector.cached_requests, [])
+
+        connector.bulk_weather_request(locations)
+
+        self.assertEqual(self.network_calls(), 2)
+        self.assertEqual(connector.network_calls, 0)
+        self.assertEqual(sorted(connector.cached_requests), [["Cambridge"], ["Oxford"]])
+
+
+    def test_entries_survive_reopening_the_cache(self) -> None :
+
+        url : str = self.serve(StubConfiguration(cache_control="max-age=60"))
+
+        first : CachedResponse = self.cache.get(url, PARAMS, TIMEOUT)
+        reopened : CachedResponse = HTTPResponseCache(self.path).get(url, PARAMS, TIMEOUT)
+
+        self.assertEqual(self.network_calls(), 1)
+        self.assertFalse(reopened.from_network)
+        self.assertEqual(reopened.content, first.content)
+
+
+    def test_saved_calls_and_bytes(self) -> None :
+
+        url : str = self.serve(StubConfiguration(cache_control="max-age=60"))
+
+        size : int = len(self.cache.get(url, PARAMS, TIMEOUT).content)
+
+        for _ in range(3) :
+            self.cache.get(url, PARAMS, TIMEOUT)
+
+        self.assertEqual(self.cache.get_statistics(), {
+            "requests" : 4,
+            "network_calls" : 1,
+            "calls_saved" : 3,
+            "revalidated" : 0,
+            "unchanged" : 3,
+            "bytes_downloaded" : size,
+            "bytes_saved" : 3 * size
+        })
+
+
+    def test_revalidated_bytes_are_saved(self) -> None :
+
+        url : str = self.serve(StubConfiguration(cache_control="no-cache", etag=True))
+
+        size : int = len(self.cache.get(url, PARAMS, TIMEOUT).content)
+        self.cache.get(url, PARAMS, TIMEOUT)
+
+        # The 304 response has no body, so only the first download is counted
+        self.assertEqual(self.cache.get_statistics(), {
+            "requests" : 2,
+            "network_calls" : 2,
+            "calls_saved" : 0,
+            "revalidated" : 1,
+            "unchanged" : 1,
+            "bytes_downloaded" : size,
+            "bytes_saved" : size
+        })
+
+
+
+if __name__ == "__main__" :
+    main()
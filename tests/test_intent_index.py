@@ -0,0 +1,88 @@
+"""
+Tests of the IntentIndex's two stage search with hand made statement vectors, so
+that no language model is needed.
+
+Usage:
+    python -m pytest tests
+    python -m unittest tests.test_intent_index
+"""
+
+from unittest import TestCase, main
+
+import numpy as np
+
+from flaskr.model.chatbot.IntentIndex import IntentIndex
+
+
+WORDS : list = ["hello", "weather", "forecast", "news", "headline"]
+
+
+def vectorise(text : str) -> tuple :
+    """
+    Returns the token ids, vector and vector norm of a text, the vector counts
+    the known words it contains.
+    """
+
+    tokens : list[str] = text.lower().split()
+    vector : np.ndarray = np.array([tokens.count(word) for word in WORDS], dtype=np.float32)
+
+    return [WORDS.index(token) for token in tokens if token in WORDS], vector, float(np.linalg.norm(vector))
+
+
+STATEMENTS : list = [
+    ("hello", "hello", 0),
+    ("weather", "weather", 1),
+    ("weather forecast", "weather forecast", 2),
+    ("forecast forecast weather", "forecast forecast weather", 2),
+    ("news", "news", 5),
+    ("news headline", "news headline", 5)
+]
+
+
+class IntentIndexTest(TestCase) :
+
+    def setUp(self) -> None :
+
+        self.index : IntentIndex = IntentIndex(STATEMENTS, vectorise, IntentIndex.MARGIN)
+
+
+    def test_statements_are_partitioned_by_intent(self) -> None :
+
+        self.assertEqual(len(self.index), len(STATEMENTS))
+        self.assertEqual(self.index.partitions, {0 : (0, 1), 1 : (1, 2), 2 : (2, 4), 5 : (4, 6)})
+
+
+    def test_known_statement_is_matched_without_a_search(self) -> None :
+
+        self.assertEqual(self.index.search("news headline"), ("news headline", "news headline", 1.0, 5))
+
+
+    def test_input_is_matched_within_its_intent(self) -> None :
+
+        self.assertEqual(self.index.classify("the news headline today")[0], 5)
+        self.assertEqual(self.index.search("the news headline today")[3], 5)
+        self.assertEqual(self.index.search("forecast for tomorrow")[0], "forecast forecast weather")
+
+
+    def test_close_intents_search_every_statement(self) -> None :
+
+        intent, margin = self.index.classify("weather weather forecast")
+
+        self.assertEqual(intent, 1)
+        self.assertLess(margin, IntentIndex.MARGIN)
+
+        # The closest statement belongs to the runner up, it is only found because
+        # every statement is searched
+        self.assertEqual(self.index.search("weather weather forecast")[3], 2)
+        self.assertEqual(IntentIndex(STATEMENTS, vectorise, 0.0).search("weather weather forecast")[3], 1)
+
+
+    def test_input_without_a_vector(self) -> None :
+
+        self.assertIsNone(self.index.classify("what about tomorrow"))
+        self.assertIsNone(self.index.search("what about tomorrow"))
+
+
+
+if __name__ == "__main__" :
+    main()
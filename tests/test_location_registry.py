@@ -0,0 +1,74 @@
+"""
+Tests of the LocationRegistry's name lookups, mention search and radius queries.
+
+Usage:
+    python -m pytest tests
+    python -m unittest tests.test_location_registry
+"""
+
+from unittest import TestCase, main
+
+import pandas as pd
+
+from flaskr.model.data_access_layer.LocationRegistry import LocationRegistry
+
+
+class LocationRegistryTest(TestCase) :
+
+    def setUp(self) -> None :
+
+        self.registry : LocationRegistry = LocationRegistry(pd.DataFrame({
+            "location" : ["Oxford", "The Cotswolds", "York", "New York", "Bath", "Bristol"],
+            "lat" : [51.7520, 51.8330, 53.9600, 40.7128, 51.3811, 51.4545],
+            "lon" : [-1.2577, -1.8433, -1.0873, -74.0060, -2.3590, -2.5879],
+            "aliases" : [None, "Cotswold Hills", None, "NYC", None, None]
+        }))
+
+
+    def test_names_and_aliases_are_case_insensitive(self) -> None :
+
+        self.assertEqual(self.registry.get_id(" oxford "), 0)
+        self.assertEqual(self.registry.get_id("the cotswolds"), 1)
+        self.assertEqual(self.registry.get_id("Cotswolds"), 1)
+        self.assertEqual(self.registry.get_id("Cotswold Hills"), 1)
+        self.assertEqual(self.registry.get_id("nyc"), 3)
+        self.assertEqual(self.registry.get_id("London"), -1)
+
+
+    def test_every_mention_is_found_in_order(self) -> None :
+
+        text : str = "Is it warmer in BATH, Oxford or the Cotswolds?"
+        matches : list = self.registry.find_all(text)
+
+        self.assertEqual([match.name for match in matches], ["Bath", "Oxford", "The Cotswolds"])
+        self.assertEqual([text[match.start:match.end] for match in matches], ["BATH", "Oxford", "the Cotswolds"])
+
+
+    def test_longest_mention_wins(self) -> None :
+
+        matches : list = self.registry.find_all("Flights from New York to York")
+
+        self.assertEqual([match.name for match in matches], ["New York", "York"])
+
+
+    def test_words_inside_other_words_are_not_mentions(self) -> None :
+
+        self.assertIsNone(self.registry.find("What's the weather like in Bathurst or Yorkshire?"))
+        self.assertEqual(self.registry.find("news from bristol please").name, "Bristol")
+
+
+    def test_nearby_locations_are_ordered_by_distance(self) -> None :
+
+        self.assertEqual(self.registry.nearby(4, 20.0), ["Bath", "Bristol"])
+        self.assertEqual(self.registry.nearby(3, 100.0), ["New York"])
+
+
+    def test_rows_for_the_weather_connector(self) -> None :
+
+        self.assertEqual(self.registry.as_rows()[0], ["Oxford", 51.7520, -1.2577])
+        self.assertEqual(len(self.registry), 6)
+
+
+
+if __name__ == "__main__" :
+    main()
@@ -0,0 +1,98 @@
+"""
+Tests of the CurrentNewsConnector's batched requests against a local stand-in for
+the Currents API.
+
+Usage:
+    python -m pytest tests
+    python -m unittest tests.test_news_connector
+"""
+
+from tempfile import TemporaryDirectory
+from unittest import TestCase, main
+import os
+
+from benchmarks.stub_upstreams import StubConfiguration, StubUpstreamServer
+from flaskr.model.data_access_layer.CurrentNewsConnector import CurrentNewsConnector
+from flaskr.model.data_access_layer.HTTPResponseCache import HTTPResponseCache
+
+
+LOCATIONS : list = ["Oxford", "Cambridge", "Norwich"]
+
+
+class CurrentNewsConnectorTest(TestCase) :
+    """
+    Each test starts a stub with its own articles and a connector with a new cache.
+    """
+
+    def connect(self, configuration : StubConfiguration) -> CurrentNewsConnector :
+        """
+        Starts a stub that is stopped when the test ends, and returns a connector
+        that batches every location into a single request to it.
+        """
+
+        self.stub : StubUpstreamServer = StubUpstreamServer(configuration).start()
+        self.addCleanup(self.stub.stop)
+
+        api_url : str = CurrentNewsConnector.API_URL
+        CurrentNewsConnector.API_URL = self.stub.url + StubUpstreamServer.NEWS_PATH
+        self.addCleanup(setattr, CurrentNewsConnector, "API_URL", api_url)
+
+        directory : TemporaryDirectory = TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+
+        connector : CurrentNewsConnector = CurrentNewsConnector("stub-news-key", HTTPResponseCache(os.path.join(directory.name, "http-cache.db")))
+        connector.batch_size = len(LOCATIONS)
+
+        return connector
+
+
+    def test_every_named_location_is_served_by_one_request(self) -> None :
+
+        connector : CurrentNewsConnector = self.connect(StubConfiguration())
+        articles : list = connector.bulk_news_request(LOCATIONS)
+
+        self.assertEqual([news.location for news in articles], LOCATIONS)
+        self.assertEqual(connector.updated_locations, LOCATIONS)
+        self.assertEqual(self.stub.requests[StubUpstreamServer.NEWS_PATH], 1)
+        self.assertEqual(connector.network_calls, 1)
+
+
+    def test_unmatched_location_is_requested_on_its_own(self) -> None :
+
+        connector : CurrentNewsConnector = self.connect(StubConfiguration(unnamed=("Cambridge",)))
+        articles : list = connector.bulk_news_request(LOCATIONS)
+
+        self.assertEqual(sorted(news.location for news in articles), sorted(LOCATIONS))
+        self.assertEqual(connector.updated_locations, LOCATIONS)
+        self.assertEqual(self.stub.requests[StubUpstreamServer.NEWS_PATH], 2)
+        self.assertEqual(connector.network_calls, 2)
+
+
+    def test_location_without_an_article_keeps_its_stored_news(self) -> None :
+
+        connector : CurrentNewsConnector = self.connect(StubConfiguration(articles=0))
+        articles : list = connector.bulk_news_request(LOCATIONS)
+
+        # Stored news is only replaced for the locations given in updated_locations
+        self.assertEqual(articles, [])
+        self.assertEqual(connector.updated_locations, [])
+
+
+    def test_cached_location_without_stored_news_is_written(self) -> None :
+
+        connector : CurrentNewsConnector = self.connect(StubConfiguration(cache_control="max-age=60"))
+        connector.bulk_news_request(LOCATIONS)
+
+        # Norwich's write failed, so only the others' news is stored
+        connector.stored_locations = {"Oxford", "Cambridge"}
+        articles : list = connector.bulk_news_request(LOCATIONS)
+
+        self.assertEqual(self.stub.requests[StubUpstreamServer.NEWS_PATH], 1)
+        self.assertEqual(connector.unchanged_locations, ["Oxford", "Cambridge"])
+        self.assertEqual(connector.updated_locations, ["Norwich"])
+        self.assertEqual([news.location for news in articles], ["Norwich"])
+
+
+
+if __name__ == "__main__" :
+    main()
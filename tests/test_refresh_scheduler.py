@@ -0,0 +1,76 @@
+"""
+Tests of the RefreshScheduler's quotas, priorities and deferred requests.
+
+Usage:
+    python -m pytest tests
+    python -m unittest tests.test_refresh_scheduler
+"""
+
+from unittest import TestCase, main
+
+from flaskr.model.utils.scheduling_utils import RefreshScheduler
+
+
+class RefreshSchedulerTest(TestCase) :
+
+    def test_requests_beyond_the_quota_are_deferred(self) -> None :
+
+        scheduler : RefreshScheduler = RefreshScheduler("OpenWeather", 2, 1000)
+        granted : list = scheduler.schedule([["Oxford"], ["Cambridge"], ["Norwich"]])
+
+        self.assertEqual(len(granted), 2)
+        self.assertEqual(scheduler.queue_depth, 1)
+        self.assertEqual(scheduler.get_statistics()["throttled"], 1)
+
+
+    def test_most_requested_locations_are_refreshed_first(self) -> None :
+
+        scheduler : RefreshScheduler = RefreshScheduler("OpenWeather", 1, 1000)
+
+        for _ in range(3) :
+            scheduler.record_demand("Norwich")
+
+        self.assertEqual(scheduler.schedule([["Oxford"], ["Norwich"]]), [["Norwich"]])
+
+
+    def test_only_refreshed_locations_are_stamped(self) -> None :
+
+        scheduler : RefreshScheduler = RefreshScheduler("OpenWeather", 5, 1000)
+        scheduler.schedule([["Oxford"], ["Cambridge"]])
+
+        self.assertEqual(scheduler.last_refreshed, {})
+
+        scheduler.record_refresh(["Oxford"], 0)
+
+        self.assertEqual(list(scheduler.last_refreshed), ["Oxford"])
+
+
+    def test_cached_requests_are_not_charged(self) -> None :
+
+        scheduler : RefreshScheduler = RefreshScheduler("OpenWeather", 5, 1000)
+        scheduler.schedule([["Oxford"], ["Cambridge"], ["Norwich"]])
+        scheduler.record_refresh(["Oxford", "Cambridge", "Norwich"], 2)
+
+        self.assertEqual(scheduler.get_statistics()["granted"], 1)
+        self.assertEqual(scheduler.get_statistics()["tokens_per_minute"], 4)
+
+
+    def test_backlog_waits_for_the_quota(self) -> None :
+
+        scheduler : RefreshScheduler = RefreshScheduler("OpenWeather", 1, 1000)
+
+        self.assertFalse(scheduler.backlogged())
+
+        scheduler.schedule([["Oxford"], ["Cambridge"]])
+
+        self.assertTrue(scheduler.backlogged())
+
+        # A request that didn't reach the upstream returns its token
+        scheduler.record_refresh([], 1)
+
+        self.assertFalse(scheduler.backlogged())
+
+
+
+if __name__ == "__main__" :
+    main()
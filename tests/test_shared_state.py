@@ -0,0 +1,166 @@
+"""
+Tests of the quotas, circuits and metrics shared by the worker processes of a
+pre-fork server through a SharedState store.
+
+Usage:
+    python -m pytest tests
+    python -m unittest tests.test_shared_state
+"""
+
+from multiprocessing import get_context
+from tempfile import TemporaryDirectory
+from time import sleep
+from unittest import TestCase, main, skipUnless
+import os
+
+from flaskr.model.utils.circuit_breaker_utils import CircuitBreaker
+from flaskr.model.utils.metrics_utils import Counter, MetricsRegistry
+from flaskr.model.utils.scheduling_utils import RefreshScheduler
+from flaskr.model.utils.shared_state_utils import SharedState
+
+
+WORKERS : int = 4
+PER_MINUTE : int = 10
+
+
+def schedule_in_worker(path : str) -> int :
+    """
+    Schedules as many requests as a forked worker is granted and returns the number
+    granted, the scheduler is shared as it would be by the application.
+    """
+
+    scheduler : RefreshScheduler = RefreshScheduler("OpenWeather", PER_MINUTE, 1000)
+    scheduler.share(SharedState(path))
+
+    return len(scheduler.schedule([[f"Location {index}"] for index in range(PER_MINUTE)]))
+
+
+registry : MetricsRegistry = MetricsRegistry()
+chat_requests : Counter = registry.counter("go_travel_test_chat_requests_total", "Chat requests answered.", ("intent",))
+
+
+def count_in_worker(path : str) -> str :
+    """
+    Counts three requests in a forked worker and returns the metrics it reports,
+    the registry is shared as it would be by the application.
+    """
+
+    registry.share(SharedState(path))
+    chat_requests.inc("1", amount=3)
+
+    return registry.collect()
+
+
+class SharedStateTest(TestCase) :
+    """
+    Each test shares its schedulers and circuits through a store in a new file.
+    """
+
+    def setUp(self) -> None :
+
+        directory : TemporaryDirectory = TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+
+        self.path : str = os.path.join(directory.name, "shared-state.db")
+        self.shared : SharedState = SharedState(self.path)
+
+
+    @skipUnless(hasattr(os, "fork"), "pre-fork workers need os.fork")
+    def test_workers_share_one_quota(self) -> None :
+
+        with get_context("fork").Pool(WORKERS) as pool :
+            granted : list[int] = pool.map(schedule_in_worker, [self.path] * WORKERS)
+
+        self.assertEqual(sum(granted), PER_MINUTE)
+
+
+    def test_unused_tokens_are_returned_to_every_process(self) -> None :
+
+        first : RefreshScheduler = RefreshScheduler("OpenWeather", PER_MINUTE, 1000)
+        second : RefreshScheduler = RefreshScheduler("OpenWeather", PER_MINUTE, 1000)
+        first.share(self.shared)
+        second.share(self.shared)
+
+        granted : list = first.schedule([["Oxford"], ["Cambridge"], ["Norwich"]])
+        first.record_refresh(["Oxford"], 2)
+
+        self.assertEqual(len(granted), 3)
+        self.assertEqual(second.get_statistics()["granted"], 1)
+        self.assertEqual(second.get_statistics()["tokens_per_minute"], PER_MINUTE - 1)
+        self.assertEqual(list(first.last_refreshed), ["Oxford"])
+
+
+    def test_failures_open_the_circuit_for_every_process(self) -> None :
+
+        first : CircuitBreaker = CircuitBreaker("Currents", 2, 60.0)
+        second : CircuitBreaker = CircuitBreaker("Currents", 2, 60.0)
+        first.share(self.shared)
+        second.share(self.shared)
+
+        self.assertTrue(first.allow_request())
+        first.record_failure()
+        self.assertTrue(second.allow_request())
+        second.record_failure()
+
+        self.assertFalse(first.allow_request())
+        self.assertEqual(second.get_statistics()["state"], CircuitBreaker.OPEN)
+        self.assertEqual(second.get_statistics()["rejected"], 1)
+
+
+    def test_only_one_trial_request_is_allowed(self) -> None :
+
+        first : CircuitBreaker = CircuitBreaker("Currents", 1, 0.001)
+        second : CircuitBreaker = CircuitBreaker("Currents", 1, 0.001)
+        first.share(self.shared)
+        second.share(self.shared)
+
+        first.allow_request()
+        first.record_failure()
+        sleep(0.01)
+
+        self.assertTrue(first.allow_request())
+        self.assertFalse(second.allow_request())
+
+        first.release()
+
+        self.assertTrue(second.allow_request())
+
+
+    @skipUnless(hasattr(os, "fork"), "pre-fork workers need os.fork")
+    def test_every_worker_reports_the_sum_of_all_workers(self) -> None :
+
+        # The requests counted before forking are only reported once
+        chat_requests.inc("1", amount=2)
+
+        with get_context("fork").Pool(1, maxtasksperchild=1) as pool :
+            first : str = pool.apply(count_in_worker, (self.path,))
+            second : str = pool.apply(count_in_worker, (self.path,))
+
+        self.assertIn('go_travel_test_chat_requests_total{intent="1"} 5', first)
+        self.assertIn('go_travel_test_chat_requests_total{intent="1"} 8', second)
+
+
+    def test_exited_workers_are_kept_in_the_sum(self) -> None :
+
+        exited : MetricsRegistry = MetricsRegistry()
+        exited.share(self.shared)
+        exited.counter("go_travel_test_refreshes_total", "Refreshes.", ()).inc(amount=3)
+        exited.publish()
+
+        exited.retire(self.shared, os.getpid())
+
+        # The restarted worker is given the same pid as the one that exited
+        restarted : MetricsRegistry = MetricsRegistry()
+        restarted.share(self.shared)
+        restarted.counter("go_travel_test_refreshes_total", "Refreshes.", ()).inc(amount=2)
+
+        self.assertIn("go_travel_test_refreshes_total 5", restarted.collect())
+        self.assertEqual(
+            sorted(self.shared.values(MetricsRegistry.PREFIX)),
+            sorted([MetricsRegistry.RETIRED, f"{MetricsRegistry.PREFIX}master", restarted.key])
+        )
+
+
+
+if __name__ == "__main__" :
+    main()
@@ -0,0 +1,82 @@
+"""
+Tests of the SpatialIndex's radius queries against the distances to every point.
+
+Usage:
+    python -m pytest tests
+    python -m unittest tests.test_spatial_index
+"""
+
+from unittest import TestCase, main
+
+import numpy as np
+
+from flaskr.model.utils.spatial_utils import SpatialIndex, haversine_km
+
+
+class SpatialIndexTest(TestCase) :
+
+    def setUp(self) -> None :
+
+        generator : np.random.Generator = np.random.default_rng(7)
+
+        # Points spread over the United Kingdom, many grid cells wide
+        self.lat : np.ndarray = generator.uniform(50.0, 58.0, 500)
+        self.lon : np.ndarray = generator.uniform(-6.0, 2.0, 500)
+        self.index : SpatialIndex = SpatialIndex(self.lat, self.lon, 0.5)
+
+
+    def brute_force(self, lat : float, lon : float, radius_km : float) -> set :
+        """
+        Returns the ids of the points within a radius by measuring the distance to
+        every point.
+        """
+
+        return set(np.flatnonzero(haversine_km(lat, lon, self.lat, self.lon) <= radius_km).tolist())
+
+
+    def test_matches_the_distance_to_every_point(self) -> None :
+
+        # Around a point, on the corner of four cells, across many cells and at the
+        # edge of the grid
+        queries : list = [(float(self.lat[0]), float(self.lon[0]), 40.0), (52.0, -1.0, 60.0), (54.0, -2.0, 120.0), (50.01, 1.99, 40.0)]
+
+        for lat, lon, radius_km in queries :
+
+            ids, distances = self.index.within(lat, lon, radius_km)
+
+            self.assertGreater(len(ids), 0)
+            self.assertEqual(set(ids.tolist()), self.brute_force(lat, lon, radius_km))
+
+
+    def test_points_are_ordered_by_distance(self) -> None :
+
+        ids, distances = self.index.within(53.0, -1.5, 100.0)
+
+        self.assertGreater(len(ids), 1)
+        self.assertTrue(np.all(np.diff(distances) >= 0))
+        np.testing.assert_allclose(distances, haversine_km(53.0, -1.5, self.lat[ids], self.lon[ids]))
+
+
+    def test_radius_wider_than_the_grid_scans_every_point(self) -> None :
+
+        ids, distances = self.index.within(54.0, -2.0, 5000.0)
+
+        self.assertEqual(len(ids), len(self.index))
+
+
+    def test_far_from_every_point(self) -> None :
+
+        ids, distances = self.index.within(-33.9, 18.4, 50.0)
+
+        self.assertEqual(len(ids), 0)
+
+
+    def test_cell_size_must_be_positive(self) -> None :
+
+        with self.assertRaises(ValueError) :
+            SpatialIndex(self.lat, self.lon, 0.0)
+
+
+
+if __name__ == "__main__" :
+    main()
@@ -0,0 +1,105 @@
+"""
+Tests of the ConcurrentTaskRunner's ordering, failure policies, deadline and
+cancellation.
+
+Usage:
+    python -m pytest tests
+    python -m unittest tests.test_task_runner
+"""
+
+from threading import Event, Timer
+from time import sleep
+from unittest import TestCase, main
+
+from flaskr.model.exceptions.TaskCancelledException import TaskCancelledException
+from flaskr.model.utils.threading_utils import ConcurrentTaskRunner
+
+
+def square(value : int) -> int :
+    """
+    Returns the square of a value after a delay shorter for later inputs, so that
+    the tasks complete out of order.
+    """
+
+    sleep(0.01 * (5 - value))
+
+    return value * value
+
+
+def fail_on_two(value : int) -> int :
+    """
+    Raises for the input 2 and returns every other input.
+    """
+
+    if value == 2 :
+        raise ValueError("two")
+
+    return value
+
+
+class ConcurrentTaskRunnerTest(TestCase) :
+
+    def test_results_are_in_input_order(self) -> None :
+
+        results : list = ConcurrentTaskRunner(max_workers=5).run(square, [1, 2, 3, 4])
+
+        self.assertEqual([result.value for result in results], [1, 4, 9, 16])
+        self.assertEqual([result.args for result in results], [(1,), (2,), (3,), (4,)])
+
+
+    def test_collect_keeps_failures_with_their_input(self) -> None :
+
+        results : list = ConcurrentTaskRunner().run(fail_on_two, [1, 2, 3])
+
+        self.assertEqual([result.succeeded for result in results], [True, False, True])
+        self.assertIsInstance(results[1].exception, ValueError)
+
+
+    def test_fail_fast_raises_the_first_failure(self) -> None :
+
+        runner : ConcurrentTaskRunner = ConcurrentTaskRunner(max_workers=1, failure_policy=ConcurrentTaskRunner.FAIL_FAST)
+
+        with self.assertRaises(ValueError) :
+            runner.run(fail_on_two, [2, 1, 3])
+
+
+    def test_runner_is_reusable_after_a_cancelled_run(self) -> None :
+
+        runner : ConcurrentTaskRunner = ConcurrentTaskRunner(max_workers=1, failure_policy=ConcurrentTaskRunner.FAIL_FAST)
+
+        with self.assertRaises(ValueError) :
+            runner.run(fail_on_two, [2, 1, 3])
+
+        runner.cancel()
+        results : list = runner.run(fail_on_two, [1, 3])
+
+        self.assertEqual([result.value for result in results], [1, 3])
+
+
+    def test_deadline_cancels_outstanding_tasks(self) -> None :
+
+        release : Event = Event()
+        self.addCleanup(release.set)
+
+        results : list = ConcurrentTaskRunner(max_workers=1, timeout=0.2).run(release.wait, [5.0, 5.0])
+
+        self.assertTrue(all(isinstance(result.exception, TaskCancelledException) for result in results))
+
+
+    def test_cancel_from_another_thread(self) -> None :
+
+        release : Event = Event()
+        self.addCleanup(release.set)
+
+        runner : ConcurrentTaskRunner = ConcurrentTaskRunner(max_workers=1)
+        Timer(0.1, runner.cancel).start()
+
+        results : list = runner.run(release.wait, [5.0, 5.0])
+
+        self.assertTrue(runner.cancelled.is_set())
+        self.assertTrue(all(isinstance(result.exception, TaskCancelledException) for result in results))
+
+
+
+if __name__ == "__main__" :
+    main()